@@ -0,0 +1,154 @@
+import hmac
+import logging
+from functools import wraps
+
+from sanic import response
+from sanic.request import Request
+from sanic_ext import validate
+
+from config import Config
+from utils.capture import TrafficCapture
+from utils.constant import API_LOGGER, HttpStatus
+from utils.loop_monitor import LoopMonitor
+from utils.observability import log_event
+from utils.profiling import HandlerTimings, LoopProfiler, MemoryProfiler, ProfileBusy, dump_tasks
+from utils.response import authorized_error, request_error, successfully
+from utils.router import hub_blueprint
+from utils.util import http_response
+
+from . import serializers
+
+
+config = Config()
+logger = logging.getLogger(API_LOGGER)
+
+# Every endpoint answers for the Sanic worker process serving the request
+_profiler = LoopProfiler()
+_memory_profiler = MemoryProfiler()
+
+
+def _extract_admin_token(request: Request) -> str:
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:].strip()
+    return ""
+
+
+def admin_required(handler):
+    """Admit requests bearing `Security.admin_token`; without one configured the endpoints do not exist."""
+    @wraps(handler)
+    async def wrapper(request: Request, *args, **kwargs):
+        expected_token = getattr(config.Security, "admin_token", "").strip()
+        if not expected_token:
+            return http_response(status=HttpStatus.NOT_FOUND)
+        actual_token = _extract_admin_token(request)
+        if not actual_token or not hmac.compare_digest(actual_token, expected_token):
+            log_event(
+                logger,
+                logging.WARNING,
+                service="hub",
+                action="admin_auth",
+                result="failure",
+                error_type="unauthorized",
+                error_msg="invalid_admin_token",
+                path=request.path,
+                client_ip=request.remote_addr,
+            )
+            return http_response(
+                code=authorized_error.code,
+                msg=authorized_error.msg,
+                result="invalid_admin_token",
+                status=HttpStatus.UNAUTHORIZED,
+            )
+        return await handler(request, *args, **kwargs)
+    return wrapper
+
+
+@hub_blueprint.get("/admin/profile")
+@admin_required
+@validate(query=serializers.GetProfileRequest)
+async def hub_get_admin_profile(request: Request, query: serializers.GetProfileRequest):
+    """
+    CPU profile of the event loop thread over the next `seconds`. `collapsed`
+    and `top` come from stack sampling and cost the loop next to nothing;
+    `pstats` and `prof` run cProfile, which slows the hub down meanwhile.
+    """
+    log_event(logger, logging.INFO, service="hub", action="admin_profile", result="started", seconds=query.seconds, format=query.format)
+    try:
+        output = await _profiler.profile(query.seconds, query.format, query.limit)
+    except ProfileBusy as error:
+        return http_response(code=request_error.code, msg=str(error), status=409)
+    if query.format == "prof":
+        return response.raw(output, content_type="application/octet-stream", headers={"Content-Disposition": 'attachment; filename="hub.prof"'})
+    return response.text(output)
+
+
+@hub_blueprint.post("/admin/memory/start")
+@admin_required
+@validate(query=serializers.PostMemoryStartRequest)
+async def hub_post_admin_memory_start(request: Request, query: serializers.PostMemoryStartRequest):
+    started = _memory_profiler.start(query.frames)
+    log_event(logger, logging.INFO, service="hub", action="admin_memory_start", result="started" if started else "noop")
+    return http_response(code=successfully.code, msg=successfully.msg, result={"started": started})
+
+
+@hub_blueprint.get("/admin/memory")
+@admin_required
+@validate(query=serializers.GetMemoryRequest)
+async def hub_get_admin_memory(request: Request, query: serializers.GetMemoryRequest):
+    """The top allocation sites, and their growth since the previous snapshot."""
+    try:
+        result = await _memory_profiler.snapshot(query.limit, query.key_type)
+    except RuntimeError as error:
+        return http_response(code=request_error.code, msg=str(error), status=409)
+    return http_response(code=successfully.code, msg=successfully.msg, result=result)
+
+
+@hub_blueprint.post("/admin/memory/stop")
+@admin_required
+async def hub_post_admin_memory_stop(request: Request):
+    stopped = _memory_profiler.stop()
+    log_event(logger, logging.INFO, service="hub", action="admin_memory_stop", result="stopped" if stopped else "noop")
+    return http_response(code=successfully.code, msg=successfully.msg, result={"stopped": stopped})
+
+
+@hub_blueprint.get("/admin/tasks")
+@admin_required
+@validate(query=serializers.GetTasksRequest)
+async def hub_get_admin_tasks(request: Request, query: serializers.GetTasksRequest):
+    """Every asyncio task of the worker with the await chain it is suspended at."""
+    return http_response(code=successfully.code, msg=successfully.msg, result=dump_tasks(query.limit))
+
+
+@hub_blueprint.post("/admin/capture/start")
+@admin_required
+@validate(query=serializers.PostCaptureStartRequest)
+async def hub_post_admin_capture_start(request: Request, query: serializers.PostCaptureStartRequest):
+    """Record request shapes and arrival times for `main.py replay_traffic`, for `seconds` or until stopped."""
+    capture = TrafficCapture()
+    capture.start(config.Capture.file_path, query.max_events or config.Capture.max_events, query.seconds)
+    log_event(logger, logging.INFO, service="hub", action="admin_capture_start", result="started", path=capture.path)
+    return http_response(code=successfully.code, msg=successfully.msg, result=capture.metrics())
+
+
+@hub_blueprint.post("/admin/capture/stop")
+@admin_required
+async def hub_post_admin_capture_stop(request: Request):
+    result = TrafficCapture().stop()
+    log_event(logger, logging.INFO, service="hub", action="admin_capture_stop", result="stopped", events=result["events"])
+    return http_response(code=successfully.code, msg=successfully.msg, result=result)
+
+
+@hub_blueprint.get("/admin/loop")
+@admin_required
+async def hub_get_admin_loop(request: Request):
+    """Event loop lag of the worker and the latest callbacks that blocked its loop, with their stacks."""
+    return http_response(code=successfully.code, msg=successfully.msg, result=LoopMonitor().metrics())
+
+
+@hub_blueprint.get("/admin/handlers")
+@admin_required
+@validate(query=serializers.GetHandlersRequest)
+async def hub_get_admin_handlers(request: Request, query: serializers.GetHandlersRequest):
+    """The handlers that took the most time, and the slowest requests."""
+    return http_response(code=successfully.code, msg=successfully.msg, result=HandlerTimings().top(query.limit, query.sort))
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Literal
+
+from utils.profiling import MAX_PROFILE_SECONDS
+
+
+class GetProfileRequest(BaseModel):
+    seconds: float = Field(default=10.0, gt=0, le=MAX_PROFILE_SECONDS)
+    format: Literal["collapsed", "top", "pstats", "prof"] = "collapsed"
+    limit: int = Field(default=50, gt=0)
+
+class PostMemoryStartRequest(BaseModel):
+    frames: int = Field(default=1, gt=0, le=64)
+
+class GetMemoryRequest(BaseModel):
+    limit: int = Field(default=20, gt=0)
+    key_type: Literal["lineno", "filename", "traceback"] = "lineno"
+
+class GetTasksRequest(BaseModel):
+    limit: int = Field(default=30, gt=0)
+
+class GetHandlersRequest(BaseModel):
+    limit: int = Field(default=10, gt=0)
+    sort: Literal["total", "mean", "max"] = "total"
+
+class PostCaptureStartRequest(BaseModel):
+    seconds: float = Field(default=0, ge=0)
+    max_events: int = Field(default=0, ge=0)
@@ -21,6 +21,7 @@ from utils.constant import API_LOGGER, HttpStatus, PRIVATE_KEY, PUBLIC_KEY
 from utils.observability import classify_error, log_event
 from utils.response import authorized_error, request_error, successfully
 from utils.router import hub_blueprint
+from utils.tracing import SPAN_KIND_CLIENT, start_span
 from utils.util import http_response
 
 from . import serializers
@@ -194,7 +195,11 @@ async def _dispatch_task_to_node(
         grpc_address=grpc_info,
         http_address=http_info,
     )
-    push_result = await http_server.push_task_details(proof_hash, signature=signature)
+    with start_span("push_task", kind=SPAN_KIND_CLIENT, proof_hash=proof_hash, node_address=grpc_info) as span:
+        push_result = await http_server.push_task_details(proof_hash, signature=signature)
+        span.set_attribute("http.status_code", push_result.get("status"))
+        if not push_result["success"]:
+            span.record_error(push_result.get("error_msg") or "push_task failed")
     log_event(
         logger,
         logging.INFO if push_result["success"] else logging.ERROR,
@@ -233,7 +238,8 @@ async def hub_get_node(request: Request):
 
     try:
         t_load_key_start = time.perf_counter()
-        rsa_encryption = await _key_cache.get_encryptor()
+        with start_span("load_key"):
+            rsa_encryption = await _key_cache.get_encryptor()
         t_load_key = (time.perf_counter() - t_load_key_start) * 1000
     except FileNotFoundError:
         response = serializers.GetNodePrivateKeyNotExistResponse().model_dump()
@@ -273,8 +279,11 @@ async def hub_get_node(request: Request):
     node_models: List[serializers.NodeInfoModel] = []
 
     t_sign_start = time.perf_counter()
-    proof_hash = proof_manager.generate_proof_hash(request.id)
-    signature = proof_manager.generate_signature(proof_hash)
+    with start_span("sign"):
+        proof_hash = proof_manager.generate_proof_hash(request.id)
+        # An RSA signature takes about a millisecond, off the loop it overlaps other requests
+        signature = await asyncio.to_thread(proof_manager.generate_signature, proof_hash)
+    request.ctx.span.set_attribute("proof_hash", proof_hash)
     t_sign = (time.perf_counter() - t_sign_start) * 1000
     log_event(
         logger,
@@ -421,7 +430,6 @@ async def hub_get_node(request: Request):
         selected_nodes=len(node_models),
     )
 
-    time.sleep(0.02)
     return http_response(status=HttpStatus.OK, **response)
 
 
@@ -665,7 +673,7 @@ async def hub_post_node(request: Request, body: serializers.PostNodeRequest):
 
     t_register_start = time.perf_counter()
     node_list = NodeList()
-    node_list.add(grpc_info, http_info)
+    node_list.add(grpc_info, http_info, body.load.model_dump() if body.load else None)
     t_register = (time.perf_counter() - t_register_start) * 1000
     t_total = (time.perf_counter() - t_start) * 1000
 
@@ -704,6 +712,7 @@ def _node_status_payload() -> dict:
                 "http_info": node.get("http_info"),
                 "timestamp": node.get("timestamp"),
                 "poh": node.get("poh"),
+                "load": node.get("load"),
             }
         )
     return {
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Union, Optional, List
+from typing import Union, Optional, List, Dict
 from utils.response import successfully, args_invalid, rate_limit, request_error, private_key_not_exist, public_key_not_exist, register_failed, decryption_failed
 
 class GrpcInfoModel(BaseModel):
@@ -15,9 +15,17 @@ class NodeInfoModel(BaseModel):
     http_info: HttpInfoModel
     poh: str
 
+class NodeLoadModel(BaseModel):
+    running_tasks: Dict[str, Optional[int]] = Field(default_factory=dict)
+    queue_depth: int = 0
+    circuit_templates: List[str] = Field(default_factory=list)
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+
 class PostNodeRequest(BaseModel):
     grpc_info: str
     http_info: str
+    load: Optional[NodeLoadModel] = None
 
 class GetNodeSuccessfullyResponse(BaseModel):
     code: int = Field(default=successfully.code)
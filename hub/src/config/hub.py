@@ -38,7 +38,36 @@ class Config:
 
     class Security:
         node_register_token = ""
+        # Bearer token of the /api/v1/hub/admin profiling endpoints; they
+        # answer 404 while it is empty
+        admin_token = ""
         allowed_node_hosts = []
         allowed_node_cidrs = []
         verify_node_tls = False
         tls_certfile = _default_tls_path("tls.crt")
+
+    class Capture:
+        # Record request shapes and arrival times from startup, for `main.py
+        # replay_traffic`; POST /api/v1/hub/admin/capture/start does it on
+        # demand. Each worker writes file_path suffixed with its pid
+        enabled = False
+        file_path = "src/logs/traffic.jsonl"
+        max_events = 1000000
+
+    class LoopMonitor:
+        # Tick of the event loop lag timer
+        interval = 0.05
+        # A callback running longer than this gets its stack logged; 0 turns
+        # the detector off
+        slow_callback_threshold = 0.1
+
+    class Tracing:
+        service_name = "zerobase-hub"
+        # Share of the traces started here that are recorded; a traceparent from
+        # the client keeps the sampling decision of the client
+        sample_ratio = 0.01
+        # OTLP/HTTP collector, e.g. "http://otel-collector:4318"; without one the
+        # spans are appended to file_path as OTLP/JSON lines
+        otlp_endpoint = ""
+        file_path = "src/logs/traces.jsonl"
+        max_queue_size = 10000
@@ -11,7 +11,8 @@ from utils.create_app import create_app as create_sanic_app
 from utils.router import autodiscover_api, autodiscover_exceptions, blueprints
 from utils import cli
 from utils.constant import API_LOGGER, TASK_LOGGER, JOB_LOGGER, SERVER_LOGGER, SCHEDULER_LOGGER
-from middleware.request_handling.request_handling import request_handling
+from middleware.request_handling.request_handling import request_handling, response_tracing
+from utils.loop_monitor import LoopMonitor
 
 config = Config()
 
@@ -40,6 +41,7 @@ def build_app():
     autodiscover_exceptions()
 
     app.middleware(request_handling)
+    app.middleware(response_tracing, "response")
 
     @app.after_server_start
     async def start_scheduler(app, loop):
@@ -47,6 +49,10 @@ def build_app():
         asyncio.gather(scheduler_task)
         logger.info("Start the service")
 
+    @app.after_server_start
+    async def start_loop_monitor(app, loop):
+        app.ctx.loop_monitor = loop.create_task(LoopMonitor().run())
+
     @app.before_server_stop
     async def stop_scheduler(app, loop):
         await asyncio.sleep(0.1)
@@ -1,17 +1,28 @@
 import logging
+import time
+from utils.capture import TrafficCapture
 from utils.constant import API_LOGGER
 from utils.error import RequestException
 from utils.observability import log_event, set_request_id
+from utils.codec import MEDIA_TYPE_MSGPACK, media_type, load_msgpack_body
+from utils.profiling import HandlerTimings
+from utils.tracing import SPAN_KIND_SERVER, TRACEPARENT_HEADER, Tracer, parse_traceparent
 from sanic import request
 
 logger = logging.getLogger(API_LOGGER)
 async def request_handling(request: request.Request):
-    
+    arrived_at = time.time()
     request_id = request.id
     request.ctx.request_id = request_id
     request.ctx.real_ip = request.remote_addr
     request.ctx.ua = request.headers.get('user-agent')
     set_request_id(request_id)
+    request.ctx.span = Tracer().begin(
+        f"{request.method} {request.path}",
+        parse_traceparent(request.headers.get(TRACEPARENT_HEADER)),
+        SPAN_KIND_SERVER,
+        **{"http.method": request.method, "http.target": request.path, "request_id": str(request_id)},
+    )
 
     request_params = {}
 
@@ -23,9 +34,16 @@ async def request_handling(request: request.Request):
         else:
             if 'application/json' in request.content_type: #json
                 request_params = request.json
+            elif media_type(request.content_type) == MEDIA_TYPE_MSGPACK:
+                load_msgpack_body(request)
+                request_params = request.json
             else:
                 request_params = {key: request.form.get(key) for key in request.form.keys()}
 
+        capture = TrafficCapture()
+        if capture.active:
+            capture.record_request(request, arrived_at, request_params)
+
         log_event(
             logger,
             logging.INFO,
@@ -45,3 +63,18 @@ async def request_handling(request: request.Request):
 
     except Exception as e:
         raise RequestException(e.__str__())
+
+
+async def response_tracing(request: request.Request, response):
+    span = getattr(request.ctx, "span", None)
+    if span is None:
+        return
+    span.set_attribute("http.status_code", response.status)
+    if response.status >= 500:
+        span.record_error(f"HTTP {response.status}")
+    # Clients pass it on to the node they prove with, joining both traces
+    response.headers[TRACEPARENT_HEADER] = span.context.traceparent
+    Tracer().finish(span)
+    # The route template, paths nothing matched would fill the table with scanner noise
+    route = f"/{request.route.path}" if request.route is not None else "<unmatched>"
+    HandlerTimings().record(f"{request.method} {route}", (span.end_ns - span.start_ns) / 1e9)
@@ -6,6 +6,7 @@ from typing import Optional
 from utils.constant import API_LOGGER
 from utils.observability import classify_error
 from utils.tls import aiohttp_ssl_param
+from utils.tracing import trace_headers
 
 class HttpServer:
     def __init__(
@@ -91,10 +92,11 @@ class HttpServer:
     async def push_task_details(self, proof_hash: str, signature: str) -> dict:
         url = f"{self.address}/push_task"
         payload = {"proof_hash": proof_hash, "signature": signature}
+        headers = trace_headers()
         started_at = time.perf_counter()
 
         try:
-            async with self.session.post(url, json=payload, ssl=self._request_ssl()) as response:
+            async with self.session.post(url, json=payload, headers=headers, ssl=self._request_ssl()) as response:
                 duration_ms = (time.perf_counter() - started_at) * 1000
                 success = response.status == 200
                 return {
@@ -108,7 +110,7 @@ class HttpServer:
                 }
         except asyncio.TimeoutError as error:
             try:
-                async with self.session.post(url, json=payload, ssl=self._request_ssl()) as response:
+                async with self.session.post(url, json=payload, headers=headers, ssl=self._request_ssl()) as response:
                     duration_ms = (time.perf_counter() - started_at) * 1000
                     success = response.status == 200
                     return {
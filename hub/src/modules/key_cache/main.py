@@ -31,6 +31,7 @@ class KeyCache:
             async with aiofiles.open(self._public_key_path, mode="r") as f:
                 public_key = await f.read()
 
-            encryptor = RSAEncryption(public_key=public_key, private_key=private_key)
+            # Parsing an RSA private key takes tens of milliseconds, too long for the loop
+            encryptor = await asyncio.to_thread(RSAEncryption, public_key=public_key, private_key=private_key)
             self._cache = (priv_mtime, pub_mtime, encryptor)
             return encryptor
\ No newline at end of file
@@ -38,7 +38,7 @@ class NodeList:
         hash_output = hashlib.sha256(hash_input).hexdigest()
         return hash_output
     
-    def add(self, grpc_info, http_info):
+    def add(self, grpc_info, http_info, load=None):
         timestamp = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
         
         index = self._generate_unique(grpc_info, http_info)
@@ -51,7 +51,8 @@ class NodeList:
             "grpc_info": grpc_info,
             "http_info": http_info,
             "timestamp": timestamp,
-            "poh": poh_index
+            "poh": poh_index,
+            "load": load
         }
         
         self.last_poh_index = poh_index
@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sanic.request import Request
+
+from config import Config
+from utils.constant import SERVER_LOGGER
+
+config = Config()
+logger = logging.getLogger(SERVER_LOGGER)
+
+CAPTURE_VERSION = 1
+
+# Requests carrying any of these are marked as authenticated; the value is never kept
+_AUTH_HEADERS = ("authorization", "x-node-token")
+
+_MAX_DEPTH = 8
+_MAX_KEYS = 64
+
+
+def _bucket(length: int) -> int:
+    """`length` rounded up to a power of two, so shapes repeat while the sizes stay close."""
+    return 0 if length <= 0 else 1 << (length - 1).bit_length()
+
+
+def shape_of(value: Any, depth: int = 0) -> Any:
+    """
+    The shape of a decoded body: its keys and value types, with string and
+    bytes lengths rounded up to a power of two. No value is kept.
+    """
+    if depth >= _MAX_DEPTH:
+        return "any"
+    if isinstance(value, dict):
+        return {str(key): shape_of(item, depth + 1) for key, item in list(value.items())[:_MAX_KEYS]}
+    if isinstance(value, (list, tuple)):
+        return {"list": shape_of(value[0], depth + 1) if value else "null", "len": _bucket(len(value))}
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return f"str:{_bucket(len(value))}"
+    if isinstance(value, (bytes, bytearray)):
+        return f"bytes:{_bucket(len(value))}"
+    if value is None:
+        return "null"
+    return "any"
+
+
+def synthesize(shape: Any) -> Any:
+    """A value of `shape` with placeholder content, for replaying a captured request."""
+    if isinstance(shape, dict):
+        if set(shape) == {"list", "len"}:
+            return [synthesize(shape["list"]) for _ in range(shape["len"])] if shape["list"] != "null" else []
+        return {key: synthesize(item) for key, item in shape.items()}
+    if shape == "bool":
+        return False
+    if shape == "int":
+        return 0
+    if shape == "float":
+        return 0.0
+    if isinstance(shape, str) and shape.startswith("str:"):
+        return "A" * int(shape[4:])
+    if isinstance(shape, str) and shape.startswith("bytes:"):
+        return b"\0" * int(shape[6:])
+    return None
+
+
+class TrafficCapture:
+    """
+    Capture of the requests a hub worker serves, for `main.py replay_traffic`.
+
+    Each request is recorded as its arrival time and a shape: the route, the
+    content type, whether it was authenticated and the keys and value sizes of
+    its body and query, never the values themselves. Shapes are written once
+    and events refer to them, so a line per request is a few bytes:
+
+        {"capture": 1, "service": "hub", "pid": 7, "started_at": 1714560000.0}
+        {"shape": 0, "method": "GET", "path": "/api/v1/hub/node", ...}
+        [12.5, 0, 0]                          # ms since started_at, shape, body bytes
+
+    A background thread writes the lines, one file per Sanic worker process.
+    Off, the only cost to a request is reading `active`.
+    """
+    _instance = None
+    _MAX_SHAPES = 10000
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.active = False
+        self.path = ""
+        self.started_at = 0.0
+        self._deadline = None
+        self._max_events = 0
+        self._shapes: Dict[str, int] = {}
+        self._queue: Optional[queue.Queue] = None
+        self.stats = {"events": 0, "dropped": 0}
+        if config.Capture.enabled:
+            self.start(config.Capture.file_path, config.Capture.max_events)
+
+    def start(self, file_path: str, max_events: int = 1000000, seconds: float = 0) -> str:
+        """Start capturing into `file_path`, suffixed with the pid; stops by itself after `max_events` or `seconds`."""
+        if self.active:
+            return self.path
+        root, ext = os.path.splitext(file_path)
+        self.path = f"{root}-{os.getpid()}{ext}"
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.started_at = time.time()
+        self._deadline = self.started_at + seconds if seconds > 0 else None
+        self._max_events = max_events
+        self._shapes = {}
+        self.stats = {"events": 0, "dropped": 0}
+        self._queue = queue.Queue(maxsize=10000)
+        self._queue.put({"capture": CAPTURE_VERSION, "service": "hub", "pid": os.getpid(), "started_at": self.started_at})
+        threading.Thread(target=self._write_loop, args=(self.path, self._queue), name="traffic-capture", daemon=True).start()
+        self.active = True
+        logger.info(f"[TrafficCapture] - Capturing requests to {self.path}")
+        return self.path
+
+    def stop(self) -> Dict[str, Any]:
+        if self.active:
+            self.active = False
+            self._queue.put(None)
+            logger.info(f"[TrafficCapture] - Captured {self.stats['events']} requests to {self.path}")
+        return self.metrics()
+
+    def record(self, arrived_at: float, shape: Dict[str, Any], size: int) -> None:
+        if not self.active:
+            return
+        if self.stats["events"] >= self._max_events or (self._deadline is not None and arrived_at >= self._deadline):
+            self.stop()
+            return
+        key = json.dumps(shape, sort_keys=True)
+        shape_id = self._shapes.get(key)
+        try:
+            if shape_id is None:
+                if len(self._shapes) >= self._MAX_SHAPES:
+                    self.stats["dropped"] += 1
+                    return
+                shape_id = len(self._shapes)
+                self._queue.put_nowait({"shape": shape_id, **shape})
+                self._shapes[key] = shape_id
+            self._queue.put_nowait([round(max(0.0, arrived_at - self.started_at) * 1000, 1), shape_id, size])
+            self.stats["events"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def record_request(self, request: Request, arrived_at: float, params: Any) -> None:
+        """Record a request the middleware parsed into `params`, its query for a GET, else its body."""
+        # Unmatched paths are scanner noise, admin calls are not load
+        if request.route is None or request.route.path.startswith("api/v1/hub/admin"):
+            return
+        query = {name: shape_of(values[0] if len(values) == 1 else values) for name, values in request.args.items()}
+        self.record(arrived_at, {
+            "method": request.method,
+            "path": f"/{request.route.path}",
+            "content_type": request.headers.get("content-type", ""),
+            "accept": request.headers.get("accept", ""),
+            "auth": any(name in request.headers for name in _AUTH_HEADERS),
+            "query": query,
+            "body": shape_of(params) if request.method != "GET" and params else None,
+        }, len(request.body or b""))
+
+    def _write_loop(self, path: str, lines: queue.Queue) -> None:
+        try:
+            with open(path, "a") as file:
+                while True:
+                    line = lines.get()
+                    if line is None:
+                        return
+                    file.write(json.dumps(line, separators=(",", ":")) + "\n")
+                    if lines.empty():
+                        file.flush()
+        except OSError as e:
+            self.active = False
+            logger.error(f"[TrafficCapture] - Failed to write {path}: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"active": self.active, "path": self.path, "shapes": len(self._shapes), **self.stats}
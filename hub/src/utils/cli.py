@@ -1,10 +1,16 @@
 import argparse
+import asyncio
+import json
 import os
 import logging
+import sys
 
 from modules.encryptor import RSAEncryption
 from utils.logger import setup_logger
 from utils.constant import CLI_LOGGER, PUBLIC_KEY, PRIVATE_KEY
+from utils.log_analytics import TABLES, analyze_logs, parse_time, write_csv, write_json
+from utils.load_test import Faults, run_load_test
+from utils.replay import run_replay
 
 
 def init_key(key_size, path, logger):
@@ -27,13 +33,84 @@ def init_key(key_size, path, logger):
         f.write(encryptor.private_key)
         logger.info(f"Private key is created in [{private_key_path}]")
 
+def analyze(paths, bucket, since, until, output_format, table, output, logger):
+    try:
+        since = parse_time(since) if since else None
+        until = parse_time(until) if until else None
+    except ValueError as e:
+        logger.error(str(e))
+        return
+
+    report, stats = analyze_logs(paths, bucket, since, until)
+    tables = report.tables()
+    if table != "all":
+        tables = {table: tables[table]}
+
+    out = open(output, mode='w', newline='') if output != "-" else sys.stdout
+    try:
+        if output_format == "csv":
+            write_csv(tables, out)
+        else:
+            write_json(tables, out, {**stats, "bucket_seconds": bucket})
+    finally:
+        if out is not sys.stdout:
+            out.close()
+            logger.info(f"Report of {stats['events']} events from {stats['files']} files is written to [{output}]")
+
+def replay(paths, url, speed, headers, max_in_flight, timeout, logger):
+    try:
+        summary = asyncio.run(run_replay(paths, url, speed, headers, max_in_flight, timeout))
+    except (OSError, ValueError) as e:
+        logger.error(str(e))
+        return
+    logger.info(
+        f"Sent {summary['requests']} requests captured over {summary['captured_seconds']}s "
+        f"in {summary['elapsed_seconds']}s at {speed}x, schedule lag p99 {summary['lag_p99_ms']}ms"
+    )
+    json.dump(summary, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+def load_test(args, hub_url, public_key_path, token, tls_certfile, tls_keyfile, logger):
+    try:
+        with open(public_key_path, mode='r') as f:
+            public_key = f.read()
+    except FileNotFoundError:
+        logger.error(f"Public key [{public_key_path}] is not exist")
+        return
+
+    faults = Faults(args.latency_ms, args.jitter_ms, args.failure_rate)
+    try:
+        summary = asyncio.run(run_load_test(
+            hub_url, public_key, token,
+            nodes=args.nodes,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            rate=args.rate,
+            result_ratio=args.result_ratio,
+            faults=faults,
+            heartbeat_interval=args.heartbeat_interval,
+            bind_host=args.bind_host,
+            advertised_host=args.node_host,
+            tls_certfile=tls_certfile,
+            tls_keyfile=tls_keyfile,
+            verify_signature=args.verify_signature,
+            base_port=args.base_port,
+        ))
+    except (OSError, RuntimeError) as e:
+        logger.error(str(e))
+        return
+    for endpoint, row in summary["endpoints"].items():
+        logger.info(f"{endpoint}: {row['throughput_per_s']}/s, p50 {row['latency_p50_ms']}ms, p99 {row['latency_p99_ms']}ms, {row['outcomes']}")
+    json.dump(summary, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
 def main():
     from config import Config
     config = Config()
     setup_logger(CLI_LOGGER, config.Env.logs_path, "M", logging.DEBUG)
     logger = logging.getLogger(CLI_LOGGER)
 
-    parser = argparse.ArgumentParser(description="RSA Key Generator CLI Tool")
+    parser = argparse.ArgumentParser(description="Hub CLI Tool")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     parser_init_keys = subparsers.add_parser("init_keys", help="Initialize RSA keys")
@@ -50,10 +127,93 @@ def main():
         help="Path to save the generated keys",
     )
 
+    parser_analyze_logs = subparsers.add_parser(
+        "analyze_logs",
+        help="Stage percentiles, node push tables and throughput from the hub logs",
+    )
+    parser_analyze_logs.add_argument(
+        "paths",
+        nargs="*",
+        help="Log files or directories, .gz included (default: the configured logs path)",
+    )
+    parser_analyze_logs.add_argument("--bucket", type=int, default=60, help="Throughput bucket in seconds")
+    parser_analyze_logs.add_argument("--since", type=str, default="", help="Only events at or after this ISO 8601 time")
+    parser_analyze_logs.add_argument("--until", type=str, default="", help="Only events before this ISO 8601 time")
+    parser_analyze_logs.add_argument("--format", type=str, choices=["json", "csv"], default="json", help="Output format")
+    parser_analyze_logs.add_argument("--table", type=str, choices=["all", *TABLES], default="all", help="Table to output")
+    parser_analyze_logs.add_argument("--output", type=str, default="-", help="Output file, - for stdout")
+
+    parser_replay = subparsers.add_parser(
+        "replay_traffic",
+        help="Replay a request capture against a hub",
+    )
+    parser_replay.add_argument("files", nargs="+", help="Capture files, one per worker")
+    parser_replay.add_argument("--url", type=str, default="", help="Hub base URL (default: the configured Sanic address)")
+    parser_replay.add_argument("--speed", type=float, default=1.0, help="Replay speed, 2 sends twice as fast as captured")
+    parser_replay.add_argument("--header", type=str, action="append", default=[], help="Header as Name:Value added to every request")
+    parser_replay.add_argument("--max_in_flight", type=int, default=1000, help="Most requests waiting for a reply at once")
+    parser_replay.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+
+    parser_load_test = subparsers.add_parser(
+        "load_test",
+        help="Drive a hub with fake nodes and report throughput and latency per endpoint",
+    )
+    parser_load_test.add_argument("--url", type=str, default="", help="Hub base URL (default: the configured Sanic address)")
+    parser_load_test.add_argument("--nodes", type=int, default=10, help="Fake nodes to start")
+    parser_load_test.add_argument("--concurrency", type=int, default=16, help="Clients, or most requests in flight with --rate")
+    parser_load_test.add_argument("--duration", type=float, default=30.0, help="Seconds to drive the hub for")
+    parser_load_test.add_argument("--rate", type=float, default=0.0, help="GET /node requests a second, 0 for as fast as the clients go")
+    parser_load_test.add_argument("--result_ratio", type=float, default=1.0, help="Share of the dispatched proofs reported to /result")
+    parser_load_test.add_argument("--latency_ms", type=float, default=0.0, help="Latency the fake nodes add to every call")
+    parser_load_test.add_argument("--jitter_ms", type=float, default=0.0, help="Random latency on top of --latency_ms")
+    parser_load_test.add_argument("--failure_rate", type=float, default=0.0, help="Share of the fake node calls that fail")
+    parser_load_test.add_argument("--heartbeat_interval", type=float, default=5.0, help="Seconds between the heartbeats of a fake node")
+    parser_load_test.add_argument("--bind_host", type=str, default="127.0.0.1", help="Address the fake nodes listen on")
+    parser_load_test.add_argument("--node_host", type=str, default="127.0.0.1", help="Host the fake nodes register with, allowlisted in the hub")
+    parser_load_test.add_argument("--public_key", type=str, default="", help="Hub session public key (default: the configured session keys path)")
+    parser_load_test.add_argument("--token", type=str, default="", help="Node register token (default: the configured one)")
+    parser_load_test.add_argument("--tls_certfile", type=str, default="", help="Certificate the fake nodes serve gRPC with (default: the hub's)")
+    parser_load_test.add_argument("--tls_keyfile", type=str, default="", help="Key of --tls_certfile (default: the hub's)")
+    parser_load_test.add_argument("--base_port", type=int, default=0, help="First of the fixed ports of the fake nodes, 0 for ephemeral ports")
+    parser_load_test.add_argument("--verify_signature", action="store_true", help="Check the signature of every pushed task like a node")
+
     args = parser.parse_args()
 
     if args.command == "init_keys":
         init_key(args.key_size, args.path, logger)
+    elif args.command == "analyze_logs":
+        if args.bucket <= 0:
+            parser.error("--bucket must be positive")
+        analyze(args.paths or [config.Env.logs_path], args.bucket, args.since, args.until, args.format, args.table, args.output, logger)
+    elif args.command == "replay_traffic":
+        if args.speed <= 0 or args.max_in_flight <= 0:
+            parser.error("--speed and --max_in_flight must be positive")
+        headers = {}
+        for header in args.header:
+            name, separator, value = header.partition(":")
+            if not separator:
+                parser.error(f"Invalid header {header}, expected Name:Value")
+            headers[name.strip()] = value.strip()
+        url = args.url or f"http://{config.Server.Sanic.host}:{config.Server.Sanic.port}"
+        replay(args.files, url, args.speed, headers, args.max_in_flight, args.timeout, logger)
+    elif args.command == "load_test":
+        if args.nodes <= 0 or args.concurrency <= 0 or args.duration <= 0:
+            parser.error("--nodes, --concurrency and --duration must be positive")
+        if not 0 <= args.failure_rate <= 1 or not 0 <= args.result_ratio <= 1:
+            parser.error("--failure_rate and --result_ratio must be within [0, 1]")
+        if args.base_port and not 0 < args.base_port <= 65536 - 2 * args.nodes:
+            parser.error("--base_port leaves no room for the ports of --nodes")
+        url = args.url or f"http://{config.Server.Sanic.host}:{config.Server.Sanic.port}"
+        public_key_path = args.public_key or os.path.join(config.Env.session_keys_path, PUBLIC_KEY)
+        token = args.token or config.Security.node_register_token
+        if not token:
+            parser.error("--token is required while Security.node_register_token is empty")
+        load_test(
+            args, url, public_key_path, token,
+            args.tls_certfile or config.Env.tls_certfile,
+            args.tls_keyfile or config.Env.tls_keyfile,
+            logger,
+        )
     else:
         parser.print_help()
 
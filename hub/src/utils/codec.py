@@ -0,0 +1,75 @@
+from typing import Any, Optional
+
+import msgpack
+from sanic import response
+from sanic.exceptions import BadRequest
+from sanic.request import Request
+
+MEDIA_TYPE_JSON = "application/json"
+MEDIA_TYPE_JSON_BASE64 = "application/x-base64+json"
+MEDIA_TYPE_MSGPACK = "application/msgpack"
+MEDIA_TYPE_PROTOBUF = "application/x-protobuf"
+
+_MEDIA_TYPES = {
+    MEDIA_TYPE_JSON: MEDIA_TYPE_JSON,
+    MEDIA_TYPE_JSON_BASE64: MEDIA_TYPE_JSON_BASE64,
+    MEDIA_TYPE_MSGPACK: MEDIA_TYPE_MSGPACK,
+    "application/x-msgpack": MEDIA_TYPE_MSGPACK,
+    "application/vnd.msgpack": MEDIA_TYPE_MSGPACK,
+    MEDIA_TYPE_PROTOBUF: MEDIA_TYPE_PROTOBUF,
+    "application/protobuf": MEDIA_TYPE_PROTOBUF,
+}
+
+
+def media_type(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return _MEDIA_TYPES.get(value.split(";", 1)[0].strip().lower())
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """The supported media type of an Accept header with the highest quality, JSON when none is."""
+    best, best_quality = MEDIA_TYPE_JSON, 0.0
+    for entry in (accept or "").split(","):
+        candidate = media_type(entry)
+        if candidate is None:
+            continue
+        quality = 1.0
+        for param in entry.split(";")[1:]:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best, best_quality = candidate, quality
+    return best
+
+
+def load_msgpack_body(request: Request) -> None:
+    """Parse a MessagePack body as the request JSON, so `@validate(json=...)` and the handlers read it unchanged."""
+    try:
+        request.parsed_json = msgpack.unpackb(request.body, raw=False)
+    except (ValueError, msgpack.UnpackException):
+        raise BadRequest("Failed when parsing body as msgpack")
+
+
+def encode_response(output: Any, status: int):
+    """
+    Encode a hub response in the format negotiated by the current request.
+
+    The hub payloads hold no bytes, so base64 JSON is the plain JSON body, and
+    the hub API has no protobuf messages, so protobuf clients get JSON.
+    """
+    request = None
+    try:
+        request = Request.get_current()
+    except Exception:
+        pass
+    negotiated = negotiate(request.headers.get("accept") if request is not None else None)
+    if negotiated == MEDIA_TYPE_MSGPACK:
+        return response.raw(msgpack.packb(output, use_bin_type=True), status=status, content_type=MEDIA_TYPE_MSGPACK)
+    if negotiated == MEDIA_TYPE_JSON_BASE64:
+        return response.json(output, status=status, content_type=MEDIA_TYPE_JSON_BASE64)
+    return response.json(output, status=status)
@@ -0,0 +1,369 @@
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import aiohttp
+import grpc
+from aiohttp import web
+
+from modules.encryptor import RSAEncryption
+from modules.grpc_server import prove_service_pb2
+from modules.grpc_server import prove_service_pb2_grpc
+from utils.constant import CLI_LOGGER
+from utils.log_analytics import QuantileSketch
+
+logger = logging.getLogger(CLI_LOGGER)
+
+# Endpoints the load generator drives, relative to the hub base URL
+GET_NODE = "GET /api/v1/hub/node"
+POST_RESULT = "POST /api/v1/hub/result"
+
+
+class Faults:
+    """
+    Behaviour injected into the handlers of a fake node: each call waits
+    `latency_ms` plus up to `jitter_ms`, then fails with `failure_rate`.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+
+    async def apply(self) -> bool:
+        """Wait the injected latency; False when this call is to fail."""
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        return random.random() >= self.failure_rate
+
+
+class _PingServicer(prove_service_pb2_grpc.ProveServiceServicer):
+    def __init__(self, node: "FakeNode"):
+        self.node = node
+
+    async def Ping(self, request, context):
+        if not await self.node.faults.apply():
+            self.node.stats["grpc_ping_failed"] += 1
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "injected failure")
+        self.node.stats["grpc_ping"] += 1
+        return prove_service_pb2.Empty()
+
+
+class FakeNode:
+    """
+    A node as the hub sees it, without a prover behind it.
+
+    It serves the gRPC `ProveService.Ping` over TLS, as the hub only dials
+    nodes over TLS, and the HTTP `/ping` and `/push_task` in plain HTTP, and
+    registers itself with heartbeats to `POST /api/v1/hub/node` carrying its
+    addresses encrypted with the hub's session public key. Pushed tasks are
+    counted and, with `verify_signature`, checked like a node checks them.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        encryptor: RSAEncryption,
+        faults: Faults,
+        bind_host: str = "127.0.0.1",
+        advertised_host: str = "127.0.0.1",
+        tls_certfile: str = "",
+        tls_keyfile: str = "",
+        verify_signature: bool = False,
+        grpc_port: int = 0,
+        http_port: int = 0,
+    ):
+        self.index = index
+        self.encryptor = encryptor
+        self.faults = faults
+        self.bind_host = bind_host
+        self.advertised_host = advertised_host
+        self.tls_certfile = tls_certfile
+        self.tls_keyfile = tls_keyfile
+        self.verify_signature = verify_signature
+        self.grpc_port = grpc_port
+        self.http_port = http_port
+        self.grpc_address = ""
+        self.http_address = ""
+        self.registered = asyncio.Event()
+        self.stats: Counter = Counter()
+        self._grpc_server: Optional[grpc.aio.Server] = None
+        self._http_runner: Optional[web.AppRunner] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        with open(self.tls_certfile, "rb") as file:
+            certificate = file.read()
+        with open(self.tls_keyfile, "rb") as file:
+            key = file.read()
+        self._grpc_server = grpc.aio.server()
+        prove_service_pb2_grpc.add_ProveServiceServicer_to_server(_PingServicer(self), self._grpc_server)
+        grpc_port = self._grpc_server.add_secure_port(f"{self.bind_host}:{self.grpc_port}", grpc.ssl_server_credentials([(key, certificate)]))
+        await self._grpc_server.start()
+
+        app = web.Application()
+        app.router.add_get("/ping", self._http_ping)
+        app.router.add_post("/push_task", self._push_task)
+        self._http_runner = web.AppRunner(app, access_log=None)
+        await self._http_runner.setup()
+        site = web.TCPSite(self._http_runner, self.bind_host, self.http_port)
+        await site.start()
+        http_port = self._http_runner.addresses[0][1]
+
+        self.grpc_address = f"{self.advertised_host}:{grpc_port}"
+        self.http_address = f"http://{self.advertised_host}:{http_port}"
+
+    async def stop(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        if self._http_runner is not None:
+            await self._http_runner.cleanup()
+        if self._grpc_server is not None:
+            await self._grpc_server.stop(None)
+
+    async def _http_ping(self, request: web.Request) -> web.Response:
+        if not await self.faults.apply():
+            self.stats["http_ping_failed"] += 1
+            return web.json_response({"code": -1, "msg": "injected failure"}, status=503)
+        self.stats["http_ping"] += 1
+        return web.json_response({"code": 0, "msg": "Successfully"})
+
+    async def _push_task(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+            proof_hash, signature = body["proof_hash"], body["signature"]
+        except (ValueError, KeyError, TypeError):
+            self.stats["push_task_invalid"] += 1
+            return web.json_response({"code": -1, "msg": "invalid body"}, status=422)
+        if self.verify_signature and not await asyncio.to_thread(self.encryptor.verify, proof_hash, signature):
+            self.stats["push_task_invalid"] += 1
+            return web.json_response({"code": -1, "msg": "invalid signature"}, status=400)
+        if not await self.faults.apply():
+            self.stats["push_task_failed"] += 1
+            return web.json_response({"code": -1, "msg": "injected failure"}, status=503)
+        self.stats["push_task"] += 1
+        return web.json_response({"code": 0, "msg": "Successfully"})
+
+    def start_heartbeat(self, session: aiohttp.ClientSession, hub_url: str, token: str, interval: float) -> None:
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop(session, hub_url, token, interval))
+
+    async def _heartbeat_loop(self, session: aiohttp.ClientSession, hub_url: str, token: str, interval: float) -> None:
+        # Spread the nodes over the interval so the hub does not see them in lockstep
+        await asyncio.sleep(random.uniform(0, min(interval, 1.0)))
+        url = f"{hub_url}/api/v1/hub/node"
+        headers = {"X-Node-Token": token}
+        while True:
+            body = {
+                "grpc_info": self.encryptor.encrypt(self.grpc_address),
+                "http_info": self.encryptor.encrypt(self.http_address),
+                "load": {"running_tasks": {}, "queue_depth": 0, "circuit_templates": []},
+            }
+            try:
+                async with session.post(url, json=body, headers=headers, ssl=False) as response:
+                    text = await response.text()
+                if response.status == 200:
+                    self.stats["heartbeat"] += 1
+                    self.registered.set()
+                else:
+                    self.stats["heartbeat_failed"] += 1
+                    if self.stats["heartbeat_failed"] == 1:
+                        logger.warning(f"Heartbeat of node {self.index} failed with {response.status}: {text}")
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.stats["heartbeat_failed"] += 1
+            await asyncio.sleep(interval * random.uniform(0.9, 1.1))
+
+
+class LoadGenerator:
+    """
+    Requests to the hub from `concurrency` clients for `duration` seconds.
+
+    Each client asks for nodes and, with `result_ratio`, reports a result of
+    the proof hash it was given, with the fields encrypted like a node does.
+    With `rate` the clients send that many requests a second between them,
+    open loop, instead of as fast as the replies come back.
+    """
+
+    def __init__(self, hub_url: str, encryptor: RSAEncryption, concurrency: int = 16, duration: float = 30.0, rate: float = 0.0, result_ratio: float = 1.0, timeout: float = 30.0):
+        self.hub_url = hub_url
+        self.encryptor = encryptor
+        self.concurrency = concurrency
+        self.duration = duration
+        self.rate = rate
+        self.result_ratio = result_ratio
+        self.timeout = timeout
+        self.latency: Dict[str, QuantileSketch] = {GET_NODE: QuantileSketch(), POST_RESULT: QuantileSketch()}
+        self.outcomes: Dict[str, Counter] = {GET_NODE: Counter(), POST_RESULT: Counter()}
+        self.selected_nodes: Counter = Counter()
+
+    async def _call(self, session: aiohttp.ClientSession, endpoint: str, method: str, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        payload = None
+        try:
+            async with session.request(method, self.hub_url + path, ssl=False, **kwargs) as response:
+                raw = await response.read()
+            try:
+                payload = json.loads(raw)
+            except ValueError:
+                pass
+            code = payload.get("code") if isinstance(payload, dict) else None
+            outcome = f"{response.status}" if code in (None, 0) else f"{response.status}:{code}"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        except aiohttp.ClientError as e:
+            outcome = type(e).__name__
+        self.latency[endpoint].add((time.perf_counter() - started) * 1000)
+        self.outcomes[endpoint][outcome] += 1
+        return payload if outcome == "200" else None
+
+    async def _result_body(self, proof_hash: str) -> Dict[str, str]:
+        fields = {
+            "project_name": "load_test",
+            "proof_hash": proof_hash,
+            "duration": str(random.randint(1000, 5000)),
+            "verifiers": json.dumps(["load_test"]),
+        }
+        # Four RSA encryptions take a couple of milliseconds, off the loop they do not skew the latencies
+        return await asyncio.to_thread(lambda: {name: self.encryptor.encrypt(value) for name, value in fields.items()})
+
+    async def _iteration(self, session: aiohttp.ClientSession) -> None:
+        payload = await self._call(session, GET_NODE, "GET", "/api/v1/hub/node")
+        if payload is None:
+            return
+        self.selected_nodes[len(payload.get("results") or [])] += 1
+        if random.random() < self.result_ratio:
+            body = await self._result_body(payload.get("proof_hash") or uuid.uuid4().hex)
+            await self._call(session, POST_RESULT, "POST", "/api/v1/hub/result", json=body)
+
+    async def run(self) -> float:
+        """Drive the hub; returns the seconds it took, stragglers included."""
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            deadline = started + self.duration
+
+            if self.rate > 0:
+                in_flight = asyncio.Semaphore(self.concurrency)
+                tasks = set()
+
+                async def fire():
+                    try:
+                        await self._iteration(session)
+                    finally:
+                        in_flight.release()
+
+                sent = 0
+                while loop.time() < deadline:
+                    delay = started + sent / self.rate - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    await in_flight.acquire()
+                    task = asyncio.create_task(fire())
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    sent += 1
+                if tasks:
+                    await asyncio.gather(*tasks)
+            else:
+                async def client():
+                    while loop.time() < deadline:
+                        await self._iteration(session)
+
+                await asyncio.gather(*(client() for _ in range(self.concurrency)))
+            return loop.time() - started
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, sketch in self.latency.items():
+            if not sketch.count:
+                continue
+            outcomes = self.outcomes[endpoint]
+            endpoints[endpoint] = {
+                "throughput_per_s": round(sketch.count / elapsed, 3),
+                "success_per_s": round(outcomes.get("200", 0) / elapsed, 3),
+                **{f"latency_{key}_ms" if key != "count" else key: value for key, value in sketch.summary().items()},
+                "outcomes": dict(outcomes),
+            }
+        return {"elapsed_seconds": round(elapsed, 3), "endpoints": endpoints, "selected_nodes": dict(sorted(self.selected_nodes.items()))}
+
+
+async def run_load_test(
+    hub_url: str,
+    public_key: str,
+    token: str,
+    nodes: int = 10,
+    concurrency: int = 16,
+    duration: float = 30.0,
+    rate: float = 0.0,
+    result_ratio: float = 1.0,
+    faults: Optional[Faults] = None,
+    heartbeat_interval: float = 5.0,
+    bind_host: str = "127.0.0.1",
+    advertised_host: str = "127.0.0.1",
+    tls_certfile: str = "",
+    tls_keyfile: str = "",
+    verify_signature: bool = False,
+    base_port: int = 0,
+    register_timeout: float = 30.0,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """
+    Start `nodes` fake nodes, wait for the hub to register them and drive it
+    with a LoadGenerator; returns its per-endpoint throughput and latency
+    percentiles with what the nodes saw.
+
+    The hub has to take the nodes: its node register token is `token`, its
+    `Security.allowed_node_cidrs` covers `advertised_host`, and its
+    `Security.tls_certfile` verifies the certificate the nodes serve gRPC
+    with, by default the hub's own.
+
+    The hub keeps a node for minutes after its last heartbeat, so nodes on
+    ephemeral ports pile up there run after run and take dispatches they
+    never answer. With `base_port` node i listens on base_port + 2i for gRPC
+    and the port after for HTTP, and a new run replaces the nodes of the last.
+    """
+    hub_url = hub_url.rstrip("/")
+    encryptor = RSAEncryption(public_key=public_key)
+    faults = faults or Faults()
+    fake_nodes = [
+        FakeNode(
+            index, encryptor, faults, bind_host, advertised_host, tls_certfile, tls_keyfile, verify_signature,
+            grpc_port=base_port + 2 * index if base_port else 0,
+            http_port=base_port + 2 * index + 1 if base_port else 0,
+        )
+        for index in range(nodes)
+    ]
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as heartbeat_session:
+        try:
+            for node in fake_nodes:
+                await node.start()
+                node.start_heartbeat(heartbeat_session, hub_url, token, heartbeat_interval)
+            try:
+                await asyncio.wait_for(asyncio.gather(*(node.registered.wait() for node in fake_nodes)), register_timeout)
+            except asyncio.TimeoutError:
+                registered = sum(node.registered.is_set() for node in fake_nodes)
+                if not registered:
+                    raise RuntimeError(f"No fake node was registered by the hub within {register_timeout}s, see the hub logs")
+                logger.warning(f"Only {registered} of {nodes} fake nodes were registered within {register_timeout}s")
+
+            generator = LoadGenerator(hub_url, encryptor, concurrency, duration, rate, result_ratio, timeout)
+            elapsed = await generator.run()
+            # The hub pushes tasks after answering, give the last ones time to land
+            await asyncio.sleep(1.0)
+        finally:
+            for node in fake_nodes:
+                await node.stop()
+
+    node_stats: Counter = Counter()
+    for node in fake_nodes:
+        node_stats.update(node.stats)
+    return {
+        **generator.summary(elapsed),
+        "nodes": {"count": nodes, "registered": sum(node.registered.is_set() for node in fake_nodes), **node_stats},
+    }
@@ -0,0 +1,268 @@
+import csv
+import glob
+import gzip
+import json
+import math
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+# Duration fields of the events `log_event` writes, per action
+STAGE_FIELDS = {
+    "prove_dispatch_complete": ("duration_ms", "load_key_ms", "sign_ms", "process_nodes_ms", "response_ms"),
+    "push_task_complete": ("duration_ms",),
+    "node_register_complete": ("duration_ms", "load_key_ms", "decrypt_ms", "ping_ms", "register_ms"),
+}
+
+# Actions counted per time bucket
+THROUGHPUT_ACTIONS = ("prove_dispatch_complete", "push_task_complete", "node_register_complete")
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+TABLES = ("stages", "nodes", "throughput")
+
+
+class QuantileSketch:
+    """
+    Streaming percentiles within `accuracy` relative error.
+
+    Values are counted in logarithmic buckets, so memory depends on the range
+    of the values, a few hundred buckets for milliseconds to minutes, and
+    never on how many were added.
+    """
+
+    def __init__(self, accuracy: float = 0.01):
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Counter = Counter()
+        self._zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self._zeros += 1
+        else:
+            self._buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        row = {"count": self.count, "mean": _round(self.sum / self.count if self.count else None)}
+        for q in PERCENTILES:
+            row[f"p{q * 100:g}"] = _round(self.quantile(q))
+        row["max"] = _round(self.max if self.count else None)
+        return row
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def find_log_files(paths: Iterable[str]) -> List[str]:
+    """
+    The files of `paths`, directories expanded to the hub's logs: the rotated
+    `<date>.log` files, gzipped or not, oldest first, then `default.log`.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        rotated = glob.glob(os.path.join(path, "*.log")) + glob.glob(os.path.join(path, "*.log.gz"))
+        current = os.path.join(path, "default.log")
+        files.extend(sorted(name for name in rotated if name != current))
+        if os.path.exists(current):
+            files.append(current)
+    return files
+
+
+def _open(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode="rt", encoding="utf-8", errors="replace")
+    return open(path, mode="r", encoding="utf-8", errors="replace")
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def iter_events(files: Iterable[str], stats: Optional[Counter] = None) -> Iterator[Dict[str, Any]]:
+    """The JSON events of the files, one line at a time; lines that are not JSON objects are counted and skipped."""
+    stats = stats if stats is not None else Counter()
+    for path in files:
+        stats["files"] += 1
+        with _open(path) as file:
+            for line in file:
+                stats["lines"] += 1
+                if not line.startswith("{"):
+                    stats["skipped"] += 1
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    stats["skipped"] += 1
+                    continue
+                if isinstance(event, dict):
+                    yield event
+                else:
+                    stats["skipped"] += 1
+
+
+class LogReport:
+    """Aggregates of the hub events: per-stage percentiles, per-node pushes and throughput over time."""
+
+    def __init__(self, bucket_seconds: int = 60, since: Optional[float] = None, until: Optional[float] = None):
+        self.bucket_seconds = bucket_seconds
+        self.since = since
+        self.until = until
+        self.stages: Dict[tuple, QuantileSketch] = {}
+        self.results: Counter = Counter()
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.throughput: Dict[int, Counter] = {}
+        self.events = 0
+
+    def add(self, event: Dict[str, Any]) -> None:
+        action = event.get("action")
+        if action not in STAGE_FIELDS:
+            return
+        timestamp = _timestamp(event.get("timestamp"))
+        if timestamp is None:
+            return
+        if (self.since is not None and timestamp < self.since) or (self.until is not None and timestamp >= self.until):
+            return
+        self.events += 1
+        result = event.get("result") or "unknown"
+        self.results[(action, result)] += 1
+
+        if result == "success":
+            for field in STAGE_FIELDS[action]:
+                value = event.get(field)
+                if isinstance(value, (int, float)):
+                    sketch = self.stages.get((action, field))
+                    if sketch is None:
+                        sketch = self.stages[(action, field)] = QuantileSketch()
+                    sketch.add(float(value))
+
+        if action == "push_task_complete":
+            self._add_push(event, result)
+
+        bucket = int(timestamp // self.bucket_seconds) * self.bucket_seconds
+        counts = self.throughput.get(bucket)
+        if counts is None:
+            counts = self.throughput[bucket] = Counter()
+        counts[f"{action}:{result}"] += 1
+
+    def _add_push(self, event: Dict[str, Any], result: str) -> None:
+        address = event.get("node_address") or event.get("grpc_address") or "unknown"
+        node = self.nodes.get(address)
+        if node is None:
+            node = self.nodes[address] = {"pushes": 0, "failures": 0, "latency": QuantileSketch(), "errors": Counter()}
+        node["pushes"] += 1
+        if result != "success":
+            node["failures"] += 1
+            node["errors"][event.get("error_type") or "unknown_error"] += 1
+        value = event.get("duration_ms")
+        if isinstance(value, (int, float)):
+            node["latency"].add(float(value))
+
+    def stage_rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for (action, field), sketch in sorted(self.stages.items()):
+            rows.append({"action": action, "stage": field, **sketch.summary()})
+        return rows
+
+    def node_rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for address, node in self.nodes.items():
+            rows.append({
+                "node_address": address,
+                "pushes": node["pushes"],
+                "failures": node["failures"],
+                "failure_rate": round(node["failures"] / node["pushes"], 4),
+                **{f"latency_{key}": value for key, value in node["latency"].summary().items() if key != "count"},
+                "top_error": node["errors"].most_common(1)[0][0] if node["errors"] else None,
+            })
+        rows.sort(key=lambda row: (row["failures"], row["pushes"]), reverse=True)
+        return rows
+
+    def throughput_rows(self) -> List[Dict[str, Any]]:
+        columns = sorted({column for counts in self.throughput.values() for column in counts})
+        rows = []
+        for bucket in sorted(self.throughput):
+            counts = self.throughput[bucket]
+            row = {"bucket_start": datetime.fromtimestamp(bucket, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+            for column in columns:
+                row[column] = counts.get(column, 0)
+            row["prove_dispatch_per_s"] = round(counts.get("prove_dispatch_complete:success", 0) / self.bucket_seconds, 3)
+            rows.append(row)
+        return rows
+
+    def tables(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {"stages": self.stage_rows(), "nodes": self.node_rows(), "throughput": self.throughput_rows()}
+
+
+def write_json(tables: Dict[str, List[Dict[str, Any]]], out: IO[str], meta: Dict[str, Any]) -> None:
+    json.dump({"meta": meta, **tables}, out, indent=2)
+    out.write("\n")
+
+
+def write_csv(tables: Dict[str, List[Dict[str, Any]]], out: IO[str]) -> None:
+    """One CSV block per table, each with its own header, separated by a blank line."""
+    for index, (name, rows) in enumerate(tables.items()):
+        if index:
+            out.write("\n")
+        out.write(f"# {name}\n")
+        if not rows:
+            continue
+        columns = list(rows[0])
+        for row in rows[1:]:
+            columns.extend(column for column in row if column not in columns)
+        writer = csv.DictWriter(out, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def analyze_logs(paths: List[str], bucket_seconds: int = 60, since: Optional[float] = None, until: Optional[float] = None):
+    """Stream the log files of `paths` into a LogReport; returns it and the read statistics."""
+    stats: Counter = Counter()
+    report = LogReport(bucket_seconds, since, until)
+    for event in iter_events(find_log_files(paths), stats):
+        report.add(event)
+    stats["events"] = report.events
+    return report, stats
+
+
+def parse_time(value: str) -> float:
+    """An ISO 8601 time, UTC unless it says otherwise, as a Unix timestamp."""
+    timestamp = _timestamp(value)
+    if timestamp is None:
+        raise ValueError(f"Invalid time {value!r}, expected ISO 8601 like 2024-05-01T12:00:00Z")
+    return timestamp
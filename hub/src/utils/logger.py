@@ -1,6 +1,8 @@
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+import atexit
 import logging
 import os
+import queue
 import time
 import re
 import sys
@@ -24,6 +26,21 @@ class ReTimedRotatingFileHandler(TimedRotatingFileHandler):
         return result
  
  
+class LocalQueueHandler(QueueHandler):
+    """
+    Hand records to a QueueListener thread, which writes them to the file and
+    stdout so no logging call blocks the event loop on disk I/O.
+
+    The listener runs in the same process, so records are passed on as they
+    are, exception info and structured payload included, with only the
+    message rendered up front.
+    """
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
 def splitFileName(filename):
     filePath = filename.split('default.log.')
     return ''.join(filePath)
@@ -56,8 +73,12 @@ def setup_logger(logName, logsPath, when, level):
     loggerHandler.setFormatter(logger_formatter)
     streamHandler.setFormatter(logger_formatter)
  
-    loggerObj.addHandler(loggerHandler)
-    loggerObj.addHandler(streamHandler)
+    # Writes happen on the listener thread, flushed on exit
+    listener = QueueListener(queue.SimpleQueue(), loggerHandler, streamHandler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    loggerObj.addHandler(LocalQueueHandler(listener.queue))
  
     loggerObj.setLevel(level)
     
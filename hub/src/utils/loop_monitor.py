@@ -0,0 +1,124 @@
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from config import Config
+from utils.constant import SERVER_LOGGER
+from utils.observability import log_event
+
+config = Config()
+logger = logging.getLogger(SERVER_LOGGER)
+
+_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class LoopMonitor:
+    """
+    Event loop lag of a hub worker, and a detector of the callbacks blocking it.
+
+    A timer ticks every `Config.LoopMonitor.interval` and records how late it
+    fires. A watchdog thread checks that the ticks keep coming; once one is
+    overdue by `slow_callback_threshold`, the loop is stuck in one callback and
+    the stack of the loop thread shows which. The stall is logged with that
+    stack as `loop_slow_callback` and again as `loop_resumed` with its full
+    length; the figures and latest stalls are served by `GET /admin/loop`.
+    """
+    _instance = None
+    _RECENT = 20
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.interval = config.LoopMonitor.interval
+        self.slow_callback_threshold = config.LoopMonitor.slow_callback_threshold
+        self.stats = {"last": 0.0, "max": 0.0, "count": 0, "sum": 0.0, "slow_callbacks": 0}
+        # Cumulative counts of lags up to each bound, the last one unbounded
+        self.buckets = [0] * (len(_LAG_BUCKETS) + 1)
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=self._RECENT)
+        self._due = time.monotonic()
+        # Due time of the overdue tick and its stall, completed when the loop resumes
+        self._stall: Optional[Tuple[float, Dict[str, Any]]] = None
+
+    async def run(self) -> None:
+        if self.slow_callback_threshold > 0:
+            threading.Thread(target=self._watch, args=(threading.get_ident(),), name="loop-watchdog", daemon=True).start()
+        while True:
+            due = self._due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - due)
+            self._observe(lag)
+            caught, self._stall = self._stall, None
+            if caught is not None and caught[0] == due:
+                stall = caught[1]
+                stall["blocked_ms"] = round(lag * 1000, 3)
+                log_event(
+                    logger,
+                    logging.WARNING,
+                    service="hub",
+                    action="loop_resumed",
+                    result="slow",
+                    duration_ms=lag * 1000,
+                    callback=stall["callback"],
+                )
+
+    def _observe(self, lag: float) -> None:
+        self.stats["last"] = lag
+        self.stats["max"] = max(self.stats["max"], lag)
+        self.stats["count"] += 1
+        self.stats["sum"] += lag
+        self.buckets[bisect.bisect_left(_LAG_BUCKETS, lag)] += 1
+
+    def _watch(self, thread_id: int) -> None:
+        caught_due = None
+        while True:
+            time.sleep(self.slow_callback_threshold / 2)
+            due = self._due
+            overdue = time.monotonic() - due
+            if overdue < self.slow_callback_threshold or due == caught_due:
+                continue
+            caught_due = due
+            frame = sys._current_frames().get(thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            del frame
+            stall = {
+                "at": time.time(),
+                "callback": stack[-1].strip().splitlines()[0] if stack else "",
+                "blocked_ms": round(overdue * 1000, 3),
+                "stack": [line.rstrip() for line in stack],
+            }
+            self.stats["slow_callbacks"] += 1
+            self.recent.append(stall)
+            self._stall = (due, stall)
+            log_event(
+                logger,
+                logging.WARNING,
+                service="hub",
+                action="loop_slow_callback",
+                result="blocked",
+                duration_ms=overdue * 1000,
+                threshold_ms=self.slow_callback_threshold * 1000,
+                callback=stall["callback"],
+                stack=stall["stack"],
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*_LAG_BUCKETS, "+Inf"), self.buckets):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            **self.stats,
+            "slow_callback_threshold": self.slow_callback_threshold,
+            "lag_buckets": buckets,
+            "recent": list(self.recent),
+        }
@@ -6,6 +6,8 @@ import time
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
+from utils.tracing import current_span
+
 
 _REQUEST_ID: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
 
@@ -92,10 +94,12 @@ def log_event(
     message: Optional[str] = None,
     **extra: Any,
 ) -> None:
+    span = current_span()
     payload: Dict[str, Any] = {
         "timestamp": now_iso(),
         "service": service,
         "request_id": request_id or get_request_id(),
+        "trace_id": span.context.trace_id if span is not None else None,
         "proof_hash": proof_hash,
         "hub_name": hub_name,
         "node_address": node_address,
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+import msgpack
+
+from utils.capture import synthesize
+from utils.codec import MEDIA_TYPE_MSGPACK, media_type
+
+
+def load_capture(paths: List[str]) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    The captured requests of `paths` as (arrival time, shape), oldest first.
+
+    Files of several workers are merged on their wall clock times, and a file
+    holding several captures, one appended after the other, is read in full.
+    """
+    events = []
+    for path in paths:
+        started_at, shapes = None, {}
+        with open(path, "r") as file:
+            for line in file:
+                record = json.loads(line)
+                if isinstance(record, list):
+                    if started_at is not None and record[1] in shapes:
+                        events.append((started_at + record[0] / 1000, shapes[record[1]]))
+                elif "capture" in record:
+                    started_at, shapes = record["started_at"], {}
+                elif "shape" in record:
+                    shapes[record["shape"]] = record
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def _percentile(ordered: List[float], percentile: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def _body(shape: Dict[str, Any]) -> Optional[bytes]:
+    if shape.get("body") is None:
+        return None
+    body = synthesize(shape["body"])
+    if media_type(shape.get("content_type")) == MEDIA_TYPE_MSGPACK:
+        return msgpack.packb(body, use_bin_type=True)
+    return json.dumps(body).encode("utf-8")
+
+
+async def run_replay(
+    paths: List[str],
+    base_url: str,
+    speed: float = 1.0,
+    headers: Optional[Dict[str, str]] = None,
+    max_in_flight: int = 1000,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """
+    Send the captured requests of `paths` to a hub with the arrival process
+    of the capture, `speed` times as fast.
+
+    The bodies are synthesized from the captured shapes, so node heartbeats,
+    whose fields are RSA ciphertexts, are turned away at decryption after the
+    token check; `headers`, e.g. the node register token, are added to every
+    request. A request is sent when due whatever the replies, up to
+    `max_in_flight` at a time; how late the sends fell behind the schedule is
+    reported as lag.
+    """
+    events = load_capture(paths)
+    if not events:
+        raise ValueError(f"No captured requests in {', '.join(paths)}")
+
+    base_url = base_url.rstrip("/")
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(max_in_flight)
+    results: Dict[str, Dict[str, Any]] = {}
+    tasks = set()
+    lags = []
+    origin = events[0][0]
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async def fire(shape):
+            endpoint = f"{shape['method']} {shape['path']}"
+            request_headers = dict(headers or {})
+            for name in ("content_type", "accept"):
+                if shape.get(name):
+                    request_headers[name.replace("_", "-")] = shape[name]
+            query = []
+            for name, value in (shape.get("query") or {}).items():
+                value = synthesize(value)
+                query.extend((name, str(item)) for item in (value if isinstance(value, list) else [value]))
+            started = time.perf_counter()
+            try:
+                async with session.request(shape["method"], base_url + shape["path"], params=query, data=_body(shape), headers=request_headers, ssl=False) as response:
+                    await response.read()
+                    outcome = str(response.status)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+            except aiohttp.ClientError as e:
+                outcome = type(e).__name__
+            finally:
+                in_flight.release()
+            result = results.get(endpoint)
+            if result is None:
+                result = results[endpoint] = {"latencies": [], "outcomes": Counter()}
+            result["latencies"].append((time.perf_counter() - started) * 1000)
+            result["outcomes"][outcome] += 1
+
+        started = loop.time()
+        for arrived_at, shape in events:
+            due = started + (arrived_at - origin) / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            lags.append(max(0.0, loop.time() - due))
+            task = asyncio.create_task(fire(shape))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+
+    lags.sort()
+    summary = {
+        "requests": len(events),
+        "captured_seconds": round(events[-1][0] - origin, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "rate_per_second": round(len(events) / elapsed, 3) if elapsed > 0 else None,
+        "lag_p99_ms": round(_percentile(lags, 0.99) * 1000, 3),
+        "lag_max_ms": round(lags[-1] * 1000, 3),
+        "endpoints": {},
+    }
+    for endpoint, result in sorted(results.items()):
+        latencies = sorted(result["latencies"])
+        summary["endpoints"][endpoint] = {
+            "count": len(latencies),
+            "p50_ms": round(_percentile(latencies, 0.5), 3),
+            "p90_ms": round(_percentile(latencies, 0.9), 3),
+            "p99_ms": round(_percentile(latencies, 0.99), 3),
+            "outcomes": dict(result["outcomes"]),
+        }
+    return summary
@@ -0,0 +1,246 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+TRACEPARENT_HEADER = "traceparent"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_STATUS_ERROR = 2
+
+config = Config()
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """The context of a W3C `traceparent` header, None when it is missing or malformed."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff" or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        if int(parts[1], 16) == 0 or int(parts[2], 16) == 0:
+            return None
+    except ValueError:
+        return None
+    return SpanContext(parts[1].lower(), parts[2].lower(), bool(flags & 1))
+
+
+class Span:
+    __slots__ = ("name", "context", "parent_id", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, message: str) -> None:
+        self.error = message
+
+
+_CURRENT: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _attribute_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": span.context.trace_id,
+        "spanId": span.context.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _attributes(span.attributes),
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    if span.error is not None:
+        data["status"] = {"code": _STATUS_ERROR, "message": span.error}
+    return data
+
+
+class FileSpanExporter:
+    """Append batches as OTLP/JSON lines, the format of the collector's `otlpjsonfile` receiver."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        with open(self.path, "a") as file:
+            file.write(json.dumps(payload) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """Post batches to an OTLP/HTTP endpoint in its JSON encoding, e.g. http://otel-collector:4318."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer:
+    """
+    Span recorder of the hub, configured by `Config.Tracing`.
+
+    A request continues the `traceparent` of its caller, sampled or not as the
+    caller decided; other requests start a trace sampled with `sample_ratio`.
+    Ended spans of sampled traces are exported in batches by a background
+    thread. The hub hands the context on to the nodes in the push_task call
+    and to the client in the `traceparent` response header.
+    """
+    _instance = None
+    _BATCH_SIZE = 256
+    _FLUSH_INTERVAL = 2.0
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.service_name = config.Tracing.service_name
+        self.sample_ratio = config.Tracing.sample_ratio
+        self.exporter = None
+        if config.Tracing.otlp_endpoint:
+            self.exporter = OtlpHttpSpanExporter(config.Tracing.otlp_endpoint)
+        elif config.Tracing.file_path:
+            self.exporter = FileSpanExporter(config.Tracing.file_path)
+        self._queue: queue.Queue = queue.Queue(maxsize=config.Tracing.max_queue_size)
+        self.stats = {"exported": 0, "dropped": 0, "export_failures": 0}
+        if self.exporter is not None:
+            threading.Thread(target=self._export_loop, daemon=True).start()
+
+    def begin(self, name: str, parent: Optional[SpanContext] = None, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Span:
+        """Start a span as a child of `parent`, or of the current span, or as a new trace, and make it current."""
+        if parent is None:
+            current = _CURRENT.get()
+            parent = current.context if current is not None else None
+        if parent is not None:
+            context = SpanContext(parent.trace_id, f"{random.getrandbits(64):016x}", parent.sampled)
+        else:
+            sampled = self.exporter is not None and random.random() < self.sample_ratio
+            context = SpanContext(f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}", sampled)
+        span = Span(name, context, parent.span_id if parent is not None else None, kind, attributes)
+        _CURRENT.set(span)
+        return span
+
+    def finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if span.context.sampled and self.exporter is not None:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self.stats["dropped"] += 1
+
+    @contextmanager
+    def start_span(self, name: str, parent: Optional[SpanContext] = None, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        previous = _CURRENT.get()
+        span = self.begin(name, parent, kind, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(repr(e))
+            raise
+        finally:
+            _CURRENT.set(previous)
+            self.finish(span)
+
+    def _batch(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": self.service_name, "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "zerobase-hub"}, "spans": [_otlp_span(span) for span in spans]}],
+        }]}
+
+    def _export_loop(self) -> None:
+        while True:
+            spans = []
+            deadline = time.monotonic() + self._FLUSH_INTERVAL
+            while len(spans) < self._BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    spans.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if not spans:
+                continue
+            try:
+                self.exporter.export(self._batch(spans))
+                self.stats["exported"] += len(spans)
+            except Exception as error:
+                self.stats["export_failures"] += 1
+                logging.getLogger(__name__).error("Failed to export %d spans: %s", len(spans), error)
+
+
+def start_span(name: str, parent: Optional[SpanContext] = None, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    return Tracer().start_span(name, parent, kind, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _CURRENT.get()
+
+
+def trace_headers() -> Dict[str, str]:
+    """Headers carrying the current trace to an HTTP call."""
+    span = _CURRENT.get()
+    return {TRACEPARENT_HEADER: span.context.traceparent} if span is not None else {}
@@ -2,6 +2,8 @@ import datetime
 
 from sanic import response
 
+from utils.codec import encode_response
+
 class Paginator:
     def __init__(self, query, page_size):
         self.query = query
@@ -39,7 +41,7 @@ def http_response(code=None, msg=None, result=None, status=200, **kwargs):
     output = {'code': code, 'msg': msg, 'results': result}
     if kwargs:
         output.update(kwargs)
-    return response.json(output, status=status)
+    return encode_response(output, status)
 
 def get_timestamp():
     timestamp = int(datetime.datetime.utcnow().timestamp() * 1000)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The hub runs from src, its packages are imported top-level
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
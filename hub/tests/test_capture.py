@@ -0,0 +1,28 @@
+import json
+
+from utils.capture import shape_of, synthesize
+from utils.replay import _body, load_capture
+
+
+def test_synthesized_bodies_have_the_captured_shape():
+    body = {"proof_hash": "0x" + "ab" * 32, "load": {"queue_depth": 3, "running_tasks": {"circom": None}}, "verifiers": ["a", "b"]}
+    shape = shape_of(body)
+    assert "ab" not in json.dumps(shape)
+    assert shape_of(synthesize(shape)) == shape
+    assert shape_of(json.loads(_body({"body": shape}))) == shape
+
+
+def _write_capture(path, pid, started_at, events):
+    lines = [{"capture": 1, "service": "hub", "pid": pid, "started_at": started_at}]
+    lines.append({"shape": 0, "method": "POST", "path": "/result", "body": {"proof_hash": "str:8"}})
+    lines.extend([offset_ms, 0] for offset_ms in events)
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+
+def test_load_capture_merges_workers_on_the_wall_clock(tmp_path):
+    first, second = tmp_path / "traffic-1.jsonl", tmp_path / "traffic-2.jsonl"
+    _write_capture(first, 1, 100.0, [0, 2000])
+    _write_capture(second, 2, 101.0, [0, 500])
+    events = load_capture([str(first), str(second)])
+    assert [arrived_at for arrived_at, _ in events] == [100.0, 101.0, 101.5, 102.0]
+    assert all(shape["path"] == "/result" for _, shape in events)
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from utils.log_analytics import QuantileSketch
+
+
+def _exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_empty_sketch():
+    sketch = QuantileSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.summary()["count"] == 0
+    assert sketch.summary()["max"] is None
+
+
+@pytest.mark.parametrize("q", [0.0, 0.5, 0.9, 0.99, 1.0])
+def test_quantiles_within_the_relative_accuracy(q):
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3, 1.5) for _ in range(20000)]
+    sketch = QuantileSketch(accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    assert sketch.quantile(q) == pytest.approx(_exact(values, q), rel=0.011)
+
+
+def test_zeros_and_extremes():
+    sketch = QuantileSketch()
+    for value in [0, 0, 0, 5.0, 10.0]:
+        sketch.add(value)
+    assert sketch.quantile(0.0) == 0.0
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(10.0, rel=0.01)
+    assert sketch.min == 0 and sketch.max == 10.0
+    assert sketch.summary()["mean"] == 3.0
+
+
+def test_memory_depends_on_the_range_only():
+    sketch = QuantileSketch(accuracy=0.01)
+    for index in range(100000):
+        sketch.add(1 + index % 1000)
+    assert sketch.count == 100000
+    assert len(sketch._buckets) < 400
@@ -37,6 +37,10 @@ if docker ps -a --format '{{.Names}}' | grep -Eq "^${NAME}$"; then
   docker rm -f "${NAME}" >/dev/null 2>&1 || true
 fi
 
+# With SOCKET_DIR set, the prover also serves on a Unix socket in it for a node on the same host
+SOCKET_ENVS=()
+[[ -n "${SOCKET_DIR:-}" ]] && SOCKET_ENVS+=(-v "${SOCKET_DIR}:/run/prover" -e "PROVER_UDS=/run/prover/circom.sock")
+
 echo "Starting container: ${NAME}"
 if [[ "$MODE" == "gpu" ]]; then
   docker run -d --name "${NAME}" \
@@ -44,6 +48,7 @@ if [[ "$MODE" == "gpu" ]]; then
     --network prover-network \
     -p "${HOST_PORT}:${CONTAINER_PORT}" \
     -v "$(pwd)/certs:/app/certs:ro" \
+    "${SOCKET_ENVS[@]}" \
     -e PORT="${CONTAINER_PORT}" \
     -e REQUIRE_TLS="${REQUIRE_TLS:-true}" \
     -e SSL_CERTFILE="${SSL_CERTFILE:-/app/certs/tls.crt}" \
@@ -60,6 +65,7 @@ else
     --network prover-network \
     -p "${HOST_PORT}:${CONTAINER_PORT}" \
     -v "$(pwd)/certs:/app/certs:ro" \
+    "${SOCKET_ENVS[@]}" \
     -e PORT="${CONTAINER_PORT}" \
     -e REQUIRE_TLS="${REQUIRE_TLS:-true}" \
     -e SSL_CERTFILE="${SSL_CERTFILE:-/app/certs/tls.crt}" \
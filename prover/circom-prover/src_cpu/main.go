@@ -16,6 +16,7 @@ import (
 	"os"
 	"os/exec"
 	"path/filepath"
+	"strconv"
 	"strings"
 	"sync/atomic"
 	"time"
@@ -27,6 +28,8 @@ import (
 	"github.com/google/uuid"
 	"google.golang.org/grpc"
 	"google.golang.org/grpc/credentials"
+	"google.golang.org/grpc/credentials/local"
+	"google.golang.org/grpc/metadata"
 )
 
 // CircuitData holds the data for a circuit template
@@ -1100,9 +1103,71 @@ func firstExistingPath(paths ...string) string {
 	return ""
 }
 
+// sampledTraceparent returns the W3C traceparent sent by the node when its
+// sampled flag is set.
+func sampledTraceparent(ctx context.Context) (string, bool) {
+	md, ok := metadata.FromIncomingContext(ctx)
+	if !ok {
+		return "", false
+	}
+	values := md.Get("traceparent")
+	if len(values) == 0 {
+		return "", false
+	}
+	// version-traceid-parentid-flags, bit 0 of the flags is sampled
+	parts := strings.Split(values[0], "-")
+	if len(parts) != 4 {
+		return "", false
+	}
+	flags, err := strconv.ParseUint(parts[3], 16, 8)
+	if err != nil || flags&1 == 0 {
+		return "", false
+	}
+	return values[0], true
+}
+
+// traceInterceptor logs the calls the node sampled with their traceparent, so
+// a slow proof found in the node traces can be looked up in the prover log.
+// Unsampled calls are not logged, a line per RPC would flood the log.
+func traceInterceptor(ctx context.Context, req interface{}, info *grpc.UnaryServerInfo, handler grpc.UnaryHandler) (interface{}, error) {
+	traceparent, sampled := sampledTraceparent(ctx)
+	if !sampled {
+		return handler(ctx, req)
+	}
+	start := time.Now()
+	resp, err := handler(ctx, req)
+	log.Printf("[Trace] %s traceparent=%s took %v err=%v", info.FullMethod, traceparent, time.Since(start), err)
+	return resp, err
+}
+
+// serveUnix serves the prover on a Unix domain socket for a node on the same
+// host. The socket carries no TLS: local credentials refuse any connection
+// that could leave the host, and the socket mode limits who may connect.
+func serveUnix(path string, srv *server) {
+	if err := os.Remove(path); err != nil && !os.IsNotExist(err) {
+		log.Fatalf("Failed to remove stale socket %v: %v", path, err)
+	}
+	lis, err := net.Listen("unix", path)
+	if err != nil {
+		log.Fatalf("Failed to listen on %v: %v", path, err)
+	}
+	if err := os.Chmod(path, 0660); err != nil {
+		log.Fatalf("Failed to set the mode of %v: %v", path, err)
+	}
+
+	s := grpc.NewServer(grpc.Creds(local.NewCredentials()), grpc.UnaryInterceptor(traceInterceptor))
+	pb.RegisterProveServiceServer(s, srv)
+
+	log.Printf("Server listening on unix socket %v", path)
+	if err := s.Serve(lis); err != nil {
+		log.Fatalf("Unix socket server failed: %v", err)
+	}
+}
+
 func main() {
 	port := flag.Int("p", DefaultPort, "The port on which the server will listen")
 	templateFolderPath := flag.String("temp", "./template", "Circuits template folder path")
+	udsPath := flag.String("uds", os.Getenv("PROVER_UDS"), "Unix domain socket to also serve on, without TLS, for a node on the same host")
 	flag.Parse()
 
 	log.Printf("Starting Circom Prover (CPU mode), version: %s", Version)
@@ -1131,10 +1196,14 @@ func main() {
 		log.Fatalf("Failed to load TLS credentials: %v", err)
 	}
 
-	s := grpc.NewServer(grpc.Creds(creds))
-	pb.RegisterProveServiceServer(s, &server{
+	s := grpc.NewServer(grpc.Creds(creds), grpc.UnaryInterceptor(traceInterceptor))
+	srv := &server{
 		circuits: circuits,
-	})
+	}
+	pb.RegisterProveServiceServer(s, srv)
+	if *udsPath != "" {
+		go serveUnix(*udsPath, srv)
+	}
 
 	log.Printf("Server listening on port %v", *port)
 	if err := s.Serve(lis); err != nil {
@@ -90,6 +90,10 @@ HUB_ENVS=()
 [[ -n "${HUB_API}" ]] && HUB_ENVS+=(-e "HUB_API=${HUB_API}")
 [[ -n "${HUB_API_URL:-}" ]] && HUB_ENVS+=(-e "HUB_API_URL=${HUB_API_URL}")
 
+# The provers' Unix sockets, see Prover.*.address = "unix:/run/prover/<prover>.sock" in node.py
+SOCKET_ENVS=()
+[[ -n "${SOCKET_DIR:-}" ]] && SOCKET_ENVS+=(-v "${SOCKET_DIR}:/run/prover")
+
 echo "Starting container: ${NAME}"
 docker run -d --name "${NAME}" \
   -p "${HOST_GRPC_PORT}:${GRPC_PORT_IN}" \
@@ -111,6 +115,7 @@ docker run -d --name "${NAME}" \
   -v "${HOST_SRC_DIR}/session_keys:/app/src/session_keys:ro" \
   -v "${HOST_SRC_DIR}/config:/app/src/config:ro" \
   -v "${HOST_CERT_DIR}:/app/certs:ro" \
+  "${SOCKET_ENVS[@]}" \
   --network "${NET_NAME}" \
   --restart unless-stopped \
   "${IMAGE}"
@@ -1,39 +1,40 @@
-import aiofiles
 import ujson
 import grpc
 import time
-import os
-
-from config import Config
 
 from . import prove_service_pb2
 from . import prove_service_pb2_grpc
 
-from modules.prove_service.v1 import ProveServiceV1, ProofResult
-from modules.hub import Hub
-from modules.proof_manager import ProofManager
-from modules.encryptor import RSAEncryption
+from modules.prove_service.v1 import ProofResult
+
+from utils.context_util import AppContext
+from utils.error_util import grpc_abort_on_rejection
+from utils.deadline_util import grpc_propagate_deadline
 
 from utils.constant import STATUS_CODE_PRIVATE_KEY_INVALID, STATUS_CODE_PRIVATE_KEY_NOT_FOUND
 from utils.constant import OAUTH_PROVIDER_GOOGLE
 from utils.constant import TASK_TYPE_ZKLOGIN
-from utils.constant import PRIVATE_KEY
 from utils.constant import STATUS_CODE_SUCCESSFULLY, STATUS_CODE_ERROR
 
 class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
 
-    def __init__(self, prove_service: ProveServiceV1, proof_manager:ProofManager, hub: Hub):
+    def __init__(self, context: AppContext):
         """
         Initialize GrpcServer with dependency injection.
 
         Args:
-            prove_service (ProveService): An instance of ProveService to handle proof generation logic.
+            context (AppContext): The shared node context holding the prove service and its dependencies.
         """
-        self.prove_service = prove_service
-        self.proof_manager = proof_manager
-        self.hub = hub
-        self.config = Config()
-
+        self.prove_service = context.prove_service_v1
+        self.proof_manager = context.proof_manager
+        self.hub = context.hub
+        self.result_reporter = context.result_reporter
+        self.admission = context.admission
+        self.node_key = context.node_key
+        self.config = context.config
+
+    @grpc_abort_on_rejection
+    @grpc_propagate_deadline
     async def ProveNosha256(self, request:prove_service_pb2.ProveNosha256Request, context:grpc.aio.ServicerContext):
         """
         Handle the ProveNosha256 request to generate proof data without SHA256.
@@ -59,19 +60,21 @@ class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
 
         proof_hash = request.proof_hash
 
-        ok, msg = self.proof_manager.claim_task(proof_hash)
-        if ok != True:
-            return prove_service_pb2.ProveNosha256Response(
-                base_response=prove_service_pb2.StatusResponse(
-                    code=ok,
-                    msg=msg
-                ),
-            )        
-
-        proof_result: ProofResult = await self.prove_service.prove_nosha256(method, prover_id, circuit_template_id, input_data, is_encrypted, auth_token, length, oauth_provider)
+        async with self.admission.admit(circuit_template_id) as ticket:
+            ok, msg = self.proof_manager.claim_task(proof_hash)
+            if ok != True:
+                return prove_service_pb2.ProveNosha256Response(
+                    base_response=prove_service_pb2.StatusResponse(
+                        code=ok,
+                        msg=msg
+                    ),
+                )        
+
+            proof_result: ProofResult = await self.prove_service.prove_nosha256(method, prover_id, circuit_template_id, input_data, is_encrypted, auth_token, length, oauth_provider)
+            ticket.record(proof_result.code)
         
         if proof_result.project_name:
-            await self.hub.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+            self.result_reporter.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
 
         return prove_service_pb2.ProveNosha256Response(
             base_response=prove_service_pb2.StatusResponse(
@@ -81,6 +84,8 @@ class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
             proof_data=proof_result.proof,
         )
 
+    @grpc_abort_on_rejection
+    @grpc_propagate_deadline
     async def ProveNosha256WithWitness(self, request:prove_service_pb2.ProveNosha256WithWitnessRequest, context:grpc.aio.ServicerContext):
         """
         Handle the ProveNosha256WithWitness request to generate proof and witness data without SHA256.
@@ -106,19 +111,21 @@ class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
 
         proof_hash = request.proof_hash
 
-        ok, msg = self.proof_manager.claim_task(proof_hash)
-        if ok != True:
-            return prove_service_pb2.ProveNosha256WithWitnessResponse(
-                base_response=prove_service_pb2.StatusResponse(
-                    code=ok,
-                    msg=msg
-                ),
-            )
-                
-        proof_result: ProofResult = await self.prove_service.prove_nosha256_with_witness(method, prover_id, circuit_template_id, input_data, is_encrypted, auth_token, length, oauth_provider)
+        async with self.admission.admit(circuit_template_id) as ticket:
+            ok, msg = self.proof_manager.claim_task(proof_hash)
+            if ok != True:
+                return prove_service_pb2.ProveNosha256WithWitnessResponse(
+                    base_response=prove_service_pb2.StatusResponse(
+                        code=ok,
+                        msg=msg
+                    ),
+                )
+
+            proof_result: ProofResult = await self.prove_service.prove_nosha256_with_witness(method, prover_id, circuit_template_id, input_data, is_encrypted, auth_token, length, oauth_provider)
+            ticket.record(proof_result.code)
         
         if proof_result.project_name:
-            await self.hub.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+            self.result_reporter.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
 
         return prove_service_pb2.ProveNosha256WithWitnessResponse(
             base_response=prove_service_pb2.StatusResponse(
@@ -131,6 +138,8 @@ class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
     
     
 
+    @grpc_abort_on_rejection
+    @grpc_propagate_deadline
     async def ProveNosha256Offchain(self, request:prove_service_pb2.ProveNosha256OffchainRequest, context:grpc.aio.ServicerContext):
         """
         Handle the ProveNosha256Offchain request to generate proof and witness data for off-chain verification.
@@ -156,19 +165,21 @@ class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
 
         proof_hash = request.proof_hash
 
-        ok, msg = self.proof_manager.claim_task(proof_hash)
-        if ok != True:
-            return prove_service_pb2.ProveNosha256OffchainResponse(
-                base_response=prove_service_pb2.StatusResponse(
-                    code=ok,
-                    msg=msg
-                ),
-            )
-
-        proof_result: ProofResult = await self.prove_service.prove_nosha256_offchain(method, prover_id, circuit_template_id, input_data, is_encrypted, auth_token, length, oauth_provider)
+        async with self.admission.admit(circuit_template_id) as ticket:
+            ok, msg = self.proof_manager.claim_task(proof_hash)
+            if ok != True:
+                return prove_service_pb2.ProveNosha256OffchainResponse(
+                    base_response=prove_service_pb2.StatusResponse(
+                        code=ok,
+                        msg=msg
+                    ),
+                )
+
+            proof_result: ProofResult = await self.prove_service.prove_nosha256_offchain(method, prover_id, circuit_template_id, input_data, is_encrypted, auth_token, length, oauth_provider)
+            ticket.record(proof_result.code)
         
         if proof_result.project_name:
-            await self.hub.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+            self.result_reporter.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
 
         return prove_service_pb2.ProveNosha256OffchainResponse(
             base_response=prove_service_pb2.StatusResponse(
@@ -244,11 +255,8 @@ class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
         proof_hash = request.proof_hash
         verifiers = request.verifier
 
-        private_key_path = os.path.join(self.config.Env.crypto_keys_path, PRIVATE_KEY)
-
         try:
-            async with aiofiles.open(private_key_path, mode='r') as file:
-                private_key = await file.read()
+            rsa_encryption = await self.node_key.get_encryptor()
         except FileNotFoundError:
             return prove_service_pb2.UpdateVerifierResponse(base_response=prove_service_pb2.StatusResponse(
                 code=STATUS_CODE_PRIVATE_KEY_NOT_FOUND,
@@ -256,7 +264,6 @@ class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
             ))
 
         # Decrypt the input data using RSA
-        rsa_encryption = RSAEncryption(private_key=private_key)
         try:
             proof_hash = rsa_encryption.decrypt(proof_hash)
             verifiers = ujson.loads(rsa_encryption.decrypt(verifiers))
@@ -297,20 +304,19 @@ class ProveService(prove_service_pb2_grpc.ProveServiceServicer):
         await self.prove_service.ping()
         return prove_service_pb2.Empty()
 
-def create_grpc_prover_service(server: grpc.Server, prove_service: ProveServiceV1, proof_manager:ProofManager, hub: Hub):
+def create_grpc_prover_service(server: grpc.Server, context: AppContext):
     """
-    Start the gRPC server and listen on the specified host and port.
+    Register the v1 ProveService on the gRPC server.
 
     Args:
-        host (str): Host to bind the gRPC server to.
-        port (int): Port to bind the gRPC server to.
-        prove_service (ProveService): The ProveService instance to inject into the GrpcServer.
+        server (grpc.Server): The gRPC server to register the service on.
+        context (AppContext): The shared node context to inject into the service.
 
     Returns:
         grpc.aio.Server: The configured gRPC server.
     """
     # Add the ProveService to the server with dependency injection
-    service = ProveService(prove_service, proof_manager, hub)
+    service = ProveService(context)
     prove_service_pb2_grpc.add_ProveServiceServicer_to_server(service, server)
     # Bind the server to the specified address and port
 
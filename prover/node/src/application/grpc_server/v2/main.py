@@ -1,31 +1,44 @@
-import grpc
+import time
 
-from config import Config
+import grpc
 
 from . import prove_service_v2_pb2
 from . import prove_service_v2_pb2_grpc
 
-from modules.prove_service.v2 import ProveServiceV2, ProofResult
-from modules.hub import Hub
-from modules.proof_manager import ProofManager
+from modules.prove_service.v2 import ProofResult
+from modules.job_manager import Job
+from modules.admission import AdmissionRejected
+
+from utils.context_util import AppContext
+from utils.error_util import grpc_abort_on_rejection
+from utils.deadline_util import grpc_propagate_deadline, deadline_scope
+from utils.batch_util import bounded_as_completed
+from utils.progress_util import ProgressEvent, emit_progress, stream_progress
+from utils.progress_util import PROGRESS_CLAIMED, PROGRESS_REPORTED, PROGRESS_DONE
 
 from utils.constant import OAUTH_PROVIDER_GOOGLE
 from utils.constant import TASK_TYPE_ZKLOGIN
+from utils.constant import STATUS_CODE_SUCCESSFULLY, STATUS_CODE_JOB_NOT_FOUND, STATUS_CODE_NODE_OVERLOADED, STATUS_CODE_CALLBACK_URL_INVALID
 
 class ProveService(prove_service_v2_pb2_grpc.ProveServiceServicer):
 
-    def __init__(self, prove_service: ProveServiceV2, proof_manager:ProofManager, hub: Hub):
+    def __init__(self, context: AppContext):
         """
         Initialize GrpcServer with dependency injection.
 
         Args:
-            prove_service (ProveService): An instance of ProveService to handle proof generation logic.
+            context (AppContext): The shared node context holding the prove service and its dependencies.
         """
-        self.prove_service = prove_service
-        self.proof_manager = proof_manager
-        self.hub = hub
-        self.config = Config()
+        self.prove_service = context.prove_service_v2
+        self.proof_manager = context.proof_manager
+        self.hub = context.hub
+        self.result_reporter = context.result_reporter
+        self.admission = context.admission
+        self.job_manager = context.job_manager
+        self.config = context.config
     
+    @grpc_abort_on_rejection
+    @grpc_propagate_deadline
     async def Prove(self, request:prove_service_v2_pb2.GenerateProofRequest, context:grpc.aio.ServicerContext):
         """
         Handle the Prove request to generate proof data.
@@ -37,6 +50,10 @@ class ProveService(prove_service_v2_pb2_grpc.ProveServiceServicer):
         Returns:
             ProveResponse: The response object containing status and proof data.
         """
+        proof_result = await self._prove(request)
+        return self._proof_response(proof_result)
+
+    async def _prove(self, request:prove_service_v2_pb2.GenerateProofRequest) -> ProofResult:
         # Extract base request parameters
         prover = request.prover                   # Identifier for the prover
         circuit_template_id = request.circuit_template_id  # Circuit template identifier
@@ -49,18 +66,23 @@ class ProveService(prove_service_v2_pb2_grpc.ProveServiceServicer):
 
         proof_hash = request.proof_hash
 
-        ok, msg = self.proof_manager.claim_task(proof_hash)
-        if ok != True:
-            return prove_service_v2_pb2.GenerateProofResponse(
-                code=ok,
-                msg=msg
-            )
-                
-        proof_result: ProofResult = await self.prove_service.prove(task_type, prover, circuit_template_id, payload, is_encrypted, auth_token, length, oauth_provider)
+        async with self.admission.admit(circuit_template_id) as ticket:
+            ok, msg = self.proof_manager.claim_task(proof_hash)
+            if ok != True:
+                return ProofResult(code=ok, msg=msg)
+            emit_progress(PROGRESS_CLAIMED)
+
+            proof_result: ProofResult = await self.prove_service.prove(task_type, prover, circuit_template_id, payload, is_encrypted, auth_token, length, oauth_provider, request.fields)
+            ticket.record(proof_result.code)
         
         if proof_result.project_name:
-            await self.hub.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+            self.result_reporter.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+            emit_progress(PROGRESS_REPORTED)
 
+        return proof_result
+
+    @staticmethod
+    def _proof_response(proof_result: ProofResult) -> prove_service_v2_pb2.GenerateProofResponse:
         return prove_service_v2_pb2.GenerateProofResponse(
             code=proof_result.code,
             msg=proof_result.msg,
@@ -71,20 +93,197 @@ class ProveService(prove_service_v2_pb2_grpc.ProveServiceServicer):
             public_witness_bytes=proof_result.public_witness_bytes
         )
 
-def create_grpc_prover_service(grpc_server:grpc.Server, prove_service: ProveService, proof_manager:ProofManager, hub: Hub):
+    async def ProveStream(self, request:prove_service_v2_pb2.GenerateProofRequest, context:grpc.aio.ServicerContext):
+        """
+        Handle a Prove request, streaming its stage events before the result.
+
+        Args:
+            request (GenerateProofRequest): The request object containing base request info.
+            context (grpc.aio.ServicerContext): Context information.
+
+        Yields:
+            ProveProgressEvent: One event per stage, the last one has stage "done" and the result.
+        """
+        with deadline_scope(context.time_remaining()):
+            try:
+                async for event in stream_progress(lambda: self._prove(request)):
+                    if isinstance(event, ProgressEvent):
+                        yield prove_service_v2_pb2.ProveProgressEvent(
+                            stage=event.stage,
+                            timestamp=event.timestamp,
+                            queue_position=event.queue_position or 0,
+                            backend=event.backend or "",
+                        )
+                    else:
+                        yield prove_service_v2_pb2.ProveProgressEvent(stage=PROGRESS_DONE, timestamp=time.time(), result=self._proof_response(event))
+            except AdmissionRejected as e:
+                yield prove_service_v2_pb2.ProveProgressEvent(
+                    stage=PROGRESS_DONE,
+                    timestamp=time.time(),
+                    result=prove_service_v2_pb2.GenerateProofResponse(code=STATUS_CODE_NODE_OVERLOADED, msg=e.msg),
+                )
+
+    async def _prove_batch_item(self, index: int, item: prove_service_v2_pb2.ProveBatchItem, request: prove_service_v2_pb2.ProveBatchRequest):
+        try:
+            async with self.admission.admit(request.circuit_template_id) as ticket:
+                ok, msg = self.proof_manager.claim_task(item.proof_hash)
+                if ok != True:
+                    return index, item, ProofResult(code=ok, msg=msg)
+
+                proof_result: ProofResult = await self.prove_service.prove(
+                    request.task_type or TASK_TYPE_ZKLOGIN,
+                    request.prover,
+                    request.circuit_template_id,
+                    item.payload,
+                    request.is_encrypted,
+                    request.auth_token,
+                    item.length or request.length,
+                    request.oauth_provider or OAUTH_PROVIDER_GOOGLE,
+                    request.fields,
+                )
+                ticket.record(proof_result.code)
+        except AdmissionRejected as e:
+            return index, item, ProofResult(code=STATUS_CODE_NODE_OVERLOADED, msg=e.msg)
+
+        if proof_result.project_name:
+            self.result_reporter.report(proof_result.project_name, item.proof_hash, proof_result.duration, proof_result.verifiers)
+        return index, item, proof_result
+
+    async def ProveBatch(self, request:prove_service_v2_pb2.ProveBatchRequest, context:grpc.aio.ServicerContext):
+        """
+        Prove a batch of items sharing prover, circuit and task type, streaming each result as it finishes.
+
+        Args:
+            request (ProveBatchRequest): The shared request fields and the items to prove.
+            context (grpc.aio.ServicerContext): Context information.
+
+        Yields:
+            ProveBatchResponse: The index and proof hash of an item with its proof data.
+        """
+        if len(request.items) > self.config.Batch.max_items:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Batch is limited to {self.config.Batch.max_items} items")
+
+        ok, msg = await self.prove_service.validate_batch(
+            request.task_type or TASK_TYPE_ZKLOGIN,
+            request.prover,
+            request.circuit_template_id,
+            request.is_encrypted,
+            request.oauth_provider or OAUTH_PROVIDER_GOOGLE,
+            request.fields,
+        )
+        if ok != True:
+            # The proof hashes are left unclaimed so the batch can be sent again
+            for index, item in enumerate(request.items):
+                yield prove_service_v2_pb2.ProveBatchResponse(
+                    index=index,
+                    proof_hash=item.proof_hash,
+                    result=prove_service_v2_pb2.GenerateProofResponse(code=ok, msg=msg),
+                )
+            return
+
+        factories = [
+            (lambda index=index, item=item: self._prove_batch_item(index, item, request))
+            for index, item in enumerate(request.items)
+        ]
+        with deadline_scope(context.time_remaining()):
+            async for index, item, proof_result in bounded_as_completed(factories, self.config.Batch.max_concurrency):
+                yield prove_service_v2_pb2.ProveBatchResponse(
+                    index=index,
+                    proof_hash=item.proof_hash,
+                    result=self._proof_response(proof_result),
+                )
+
+    async def _prove_job(self, job: Job, request: prove_service_v2_pb2.GenerateProofRequest) -> ProofResult:
+        async with self.job_manager.admit(job, self.admission, request.circuit_template_id) as ticket:
+            proof_result: ProofResult = await self.prove_service.prove(
+                request.task_type or TASK_TYPE_ZKLOGIN,
+                request.prover,
+                request.circuit_template_id,
+                request.payload,
+                request.is_encrypted,
+                request.auth_token,
+                request.length,
+                request.oauth_provider or OAUTH_PROVIDER_GOOGLE,
+                request.fields,
+            )
+            ticket.record(proof_result.code)
+
+        if proof_result.project_name:
+            self.result_reporter.report(proof_result.project_name, request.proof_hash, proof_result.duration, proof_result.verifiers)
+        return proof_result
+
+    @grpc_abort_on_rejection
+    async def SubmitProof(self, request:prove_service_v2_pb2.SubmitProofRequest, context:grpc.aio.ServicerContext):
+        """
+        Start a Prove request in the background and return its job id right away.
+
+        Args:
+            request (SubmitProofRequest): The prove request and an optional callback URL.
+            context (grpc.aio.ServicerContext): Context information.
+
+        Returns:
+            SubmitProofResponse: The response object containing status and the job id.
+        """
+        if request.callback_url:
+            reason = self.job_manager.check_callback_url(request.callback_url)
+            if reason is not None:
+                return prove_service_v2_pb2.SubmitProofResponse(code=STATUS_CODE_CALLBACK_URL_INVALID, msg=reason)
+        # A full job queue turns the request away before the single-use proof hash is spent
+        self.job_manager.ensure_capacity()
+        # Claim right away so an unknown or reused proof hash fails like Prove
+        ok, msg = self.proof_manager.claim_task(request.request.proof_hash)
+        if ok != True:
+            return prove_service_v2_pb2.SubmitProofResponse(code=ok, msg=msg)
+
+        prove_request = request.request
+        try:
+            job = self.job_manager.submit(lambda job: self._prove_job(job, prove_request), request.callback_url or None)
+        except AdmissionRejected:
+            self.proof_manager.release_task(prove_request.proof_hash)
+            raise
+        return prove_service_v2_pb2.SubmitProofResponse(code=STATUS_CODE_SUCCESSFULLY, msg="Successfully", job_id=job.id)
+
+    @grpc_abort_on_rejection
+    async def GetProofJob(self, request:prove_service_v2_pb2.GetProofJobRequest, context:grpc.aio.ServicerContext):
+        """
+        Return the status of a job, waiting up to `wait_ms` for it to finish.
+
+        Args:
+            request (GetProofJobRequest): The job id and the long-poll wait.
+            context (grpc.aio.ServicerContext): Context information.
+
+        Returns:
+            GetProofJobResponse: The job status and, once done, its proof.
+        """
+        wait = min(request.wait_ms / 1000, self.config.Jobs.max_wait)
+        job = await self.job_manager.wait(request.job_id, wait)
+        if job is None:
+            return prove_service_v2_pb2.GetProofJobResponse(code=STATUS_CODE_JOB_NOT_FOUND, msg="Job does not exist or has expired", job_id=request.job_id)
+
+        response = prove_service_v2_pb2.GetProofJobResponse(
+            code=STATUS_CODE_SUCCESSFULLY,
+            msg="Successfully",
+            job_id=job.id,
+            status=job.status,
+            error=job.error or "",
+        )
+        if job.result is not None:
+            response.result.CopyFrom(self._proof_response(job.result))
+        return response
+
+def create_grpc_prover_service(grpc_server:grpc.Server, context: AppContext):
     """
-    Start the gRPC server and listen on the specified host and port.
+    Register the v2 ProveService on the gRPC server.
 
     Args:
-        host (str): Host to bind the gRPC server to.
-        port (int): Port to bind the gRPC server to.
-        prove_service (ProveService): The ProveService instance to inject into the GrpcServer.
+        grpc_server (grpc.Server): The gRPC server to register the service on.
+        context (AppContext): The shared node context to inject into the service.
 
     Returns:
         grpc.aio.Server: The configured gRPC server.
     """
     # Add the ProveService to the server with dependency injection
-    service = ProveService(prove_service, proof_manager, hub)
+    service = ProveService(context)
     prove_service_v2_pb2_grpc.add_ProveServiceServicer_to_server(service, grpc_server)
     # Bind the server to the specified address and port
 
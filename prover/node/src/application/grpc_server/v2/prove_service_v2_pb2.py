@@ -15,7 +15,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import empty_pb2 as google_dot_protobuf_dot_empty__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16prove_service_v2.proto\x12\x10prove_service.v2\x1a\x1bgoogle/protobuf/empty.proto\"\xcd\x01\n\x14GenerateProofRequest\x12\x0e\n\x06prover\x18\x01 \x01(\t\x12\x1b\n\x13\x63ircuit_template_id\x18\x02 \x01(\t\x12\x0f\n\x07payload\x18\x03 \x01(\t\x12\x0e\n\x06length\x18\x04 \x01(\x05\x12\x14\n\x0cis_encrypted\x18\x05 \x01(\x08\x12\x12\n\nauth_token\x18\x06 \x01(\t\x12\x11\n\ttask_type\x18\x07 \x01(\x05\x12\x16\n\x0eoauth_provider\x18\x08 \x01(\t\x12\x12\n\nproof_hash\x18\t \x01(\t\"\xa4\x01\n\x15GenerateProofResponse\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0b\n\x03msg\x18\x02 \x01(\t\x12\r\n\x05proof\x18\x03 \x01(\t\x12\x16\n\x0eproof_solidity\x18\x04 \x01(\t\x12\x13\n\x0bproof_bytes\x18\x05 \x01(\x0c\x12\x16\n\x0epublic_witness\x18\x06 \x01(\t\x12\x1c\n\x14public_witness_bytes\x18\x07 \x01(\x0c\"E\n\x14GetPublicKeyResponse\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0b\n\x03msg\x18\x02 \x01(\t\x12\x12\n\npublic_key\x18\x03 \x01(\t2\xf0\x01\n\x0cProveService\x12X\n\x05Prove\x12&.prove_service.v2.GenerateProofRequest\x1a\'.prove_service.v2.GenerateProofResponse\x12N\n\x0cGetPublicKey\x12\x16.google.protobuf.Empty\x1a&.prove_service.v2.GetPublicKeyResponse\x12\x36\n\x04Ping\x12\x16.google.protobuf.Empty\x1a\x16.google.protobuf.Emptyb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16prove_service_v2.proto\x12\x10prove_service.v2\x1a\x1bgoogle/protobuf/empty.proto\"\xdd\x01\n\x14GenerateProofRequest\x12\x0e\n\x06prover\x18\x01 \x01(\t\x12\x1b\n\x13\x63ircuit_template_id\x18\x02 \x01(\t\x12\x0f\n\x07payload\x18\x03 \x01(\t\x12\x0e\n\x06length\x18\x04 \x01(\x05\x12\x14\n\x0cis_encrypted\x18\x05 \x01(\x08\x12\x12\n\nauth_token\x18\x06 \x01(\t\x12\x11\n\ttask_type\x18\x07 \x01(\x05\x12\x16\n\x0eoauth_provider\x18\x08 \x01(\t\x12\x12\n\nproof_hash\x18\t \x01(\t\x12\x0e\n\x06\x66ields\x18\n \x03(\t\"\xa4\x01\n\x15GenerateProofResponse\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0b\n\x03msg\x18\x02 \x01(\t\x12\r\n\x05proof\x18\x03 \x01(\t\x12\x16\n\x0eproof_solidity\x18\x04 \x01(\t\x12\x13\n\x0bproof_bytes\x18\x05 \x01(\x0c\x12\x16\n\x0epublic_witness\x18\x06 \x01(\t\x12\x1c\n\x14public_witness_bytes\x18\x07 \x01(\x0c\"E\n\x14GetPublicKeyResponse\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0b\n\x03msg\x18\x02 \x01(\t\x12\x12\n\npublic_key\x18\x03 \x01(\t\"\x98\x01\n\x12ProveProgressEvent\x12\r\n\x05stage\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x01\x12\x16\n\x0equeue_position\x18\x03 \x01(\x05\x12\x0f\n\x07\x62\x61\x63kend\x18\x04 \x01(\t\x12\x37\n\x06result\x18\x05 \x01(\x0b\x32\'.prove_service.v2.GenerateProofResponse\"E\n\x0eProveBatchItem\x12\x0f\n\x07payload\x18\x01 \x01(\t\x12\x12\n\nproof_hash\x18\x02 \x01(\t\x12\x0e\n\x06length\x18\x03 \x01(\x05\"\xe6\x01\n\x11ProveBatchRequest\x12\x0e\n\x06prover\x18\x01 \x01(\t\x12\x1b\n\x13\x63ircuit_template_id\x18\x02 \x01(\t\x12\x11\n\ttask_type\x18\x03 \x01(\x05\x12\x16\n\x0eoauth_provider\x18\x04 \x01(\t\x12\x14\n\x0cis_encrypted\x18\x05 \x01(\x08\x12\x12\n\nauth_token\x18\x06 \x01(\t\x12\x0e\n\x06length\x18\x07 \x01(\x05\x12/\n\x05items\x18\x08 \x03(\x0b\x32 .prove_service.v2.ProveBatchItem\x12\x0e\n\x06\x66ields\x18\t \x03(\t\"p\n\x12ProveBatchResponse\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x12\n\nproof_hash\x18\x02 \x01(\t\x12\x37\n\x06result\x18\x03 \x01(\x0b\x32\'.prove_service.v2.GenerateProofResponse\"c\n\x12SubmitProofRequest\x12\x37\n\x07request\x18\x01 \x01(\x0b\x32&.prove_service.v2.GenerateProofRequest\x12\x14\n\x0c\x63\x61llback_url\x18\x02 \x01(\t\"@\n\x13SubmitProofResponse\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0b\n\x03msg\x18\x02 \x01(\t\x12\x0e\n\x06job_id\x18\x03 \x01(\t\"5\n\x12GetProofJobRequest\x12\x0e\n\x06job_id\x18\x01 \x01(\t\x12\x0f\n\x07wait_ms\x18\x02 \x01(\x05\"\x98\x01\n\x13GetProofJobResponse\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0b\n\x03msg\x18\x02 \x01(\t\x12\x0e\n\x06job_id\x18\x03 \x01(\t\x12\x0e\n\x06status\x18\x04 \x01(\t\x12\x37\n\x06result\x18\x05 \x01(\x0b\x32\'.prove_service.v2.GenerateProofResponse\x12\r\n\x05\x65rror\x18\x06 \x01(\t2\xe2\x04\n\x0cProveService\x12X\n\x05Prove\x12&.prove_service.v2.GenerateProofRequest\x1a\'.prove_service.v2.GenerateProofResponse\x12]\n\x0bProveStream\x12&.prove_service.v2.GenerateProofRequest\x1a$.prove_service.v2.ProveProgressEvent0\x01\x12Y\n\nProveBatch\x12#.prove_service.v2.ProveBatchRequest\x1a$.prove_service.v2.ProveBatchResponse0\x01\x12Z\n\x0bSubmitProof\x12$.prove_service.v2.SubmitProofRequest\x1a%.prove_service.v2.SubmitProofResponse\x12Z\n\x0bGetProofJob\x12$.prove_service.v2.GetProofJobRequest\x1a%.prove_service.v2.GetProofJobResponse\x12N\n\x0cGetPublicKey\x12\x16.google.protobuf.Empty\x1a&.prove_service.v2.GetPublicKeyResponse\x12\x36\n\x04Ping\x12\x16.google.protobuf.Empty\x1a\x16.google.protobuf.Emptyb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -23,11 +23,27 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'prove_service_v2_pb2', _glo
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_GENERATEPROOFREQUEST']._serialized_start=74
-  _globals['_GENERATEPROOFREQUEST']._serialized_end=279
-  _globals['_GENERATEPROOFRESPONSE']._serialized_start=282
-  _globals['_GENERATEPROOFRESPONSE']._serialized_end=446
-  _globals['_GETPUBLICKEYRESPONSE']._serialized_start=448
-  _globals['_GETPUBLICKEYRESPONSE']._serialized_end=517
-  _globals['_PROVESERVICE']._serialized_start=520
-  _globals['_PROVESERVICE']._serialized_end=760
+  _globals['_GENERATEPROOFREQUEST']._serialized_end=295
+  _globals['_GENERATEPROOFRESPONSE']._serialized_start=298
+  _globals['_GENERATEPROOFRESPONSE']._serialized_end=462
+  _globals['_GETPUBLICKEYRESPONSE']._serialized_start=464
+  _globals['_GETPUBLICKEYRESPONSE']._serialized_end=533
+  _globals['_PROVEPROGRESSEVENT']._serialized_start=536
+  _globals['_PROVEPROGRESSEVENT']._serialized_end=688
+  _globals['_PROVEBATCHITEM']._serialized_start=690
+  _globals['_PROVEBATCHITEM']._serialized_end=759
+  _globals['_PROVEBATCHREQUEST']._serialized_start=762
+  _globals['_PROVEBATCHREQUEST']._serialized_end=992
+  _globals['_PROVEBATCHRESPONSE']._serialized_start=994
+  _globals['_PROVEBATCHRESPONSE']._serialized_end=1106
+  _globals['_SUBMITPROOFREQUEST']._serialized_start=1108
+  _globals['_SUBMITPROOFREQUEST']._serialized_end=1207
+  _globals['_SUBMITPROOFRESPONSE']._serialized_start=1209
+  _globals['_SUBMITPROOFRESPONSE']._serialized_end=1273
+  _globals['_GETPROOFJOBREQUEST']._serialized_start=1275
+  _globals['_GETPROOFJOBREQUEST']._serialized_end=1328
+  _globals['_GETPROOFJOBRESPONSE']._serialized_start=1331
+  _globals['_GETPROOFJOBRESPONSE']._serialized_end=1483
+  _globals['_PROVESERVICE']._serialized_start=1486
+  _globals['_PROVESERVICE']._serialized_end=2096
 # @@protoc_insertion_point(module_scope)
@@ -1,12 +1,13 @@
 from google.protobuf import empty_pb2 as _empty_pb2
+from google.protobuf.internal import containers as _containers
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
-from typing import ClassVar as _ClassVar, Optional as _Optional
+from typing import ClassVar as _ClassVar, Iterable as _Iterable, Mapping as _Mapping, Optional as _Optional, Union as _Union
 
 DESCRIPTOR: _descriptor.FileDescriptor
 
 class GenerateProofRequest(_message.Message):
-    __slots__ = ("prover", "circuit_template_id", "payload", "length", "is_encrypted", "auth_token", "task_type", "oauth_provider", "proof_hash")
+    __slots__ = ("prover", "circuit_template_id", "payload", "length", "is_encrypted", "auth_token", "task_type", "oauth_provider", "proof_hash", "fields")
     PROVER_FIELD_NUMBER: _ClassVar[int]
     CIRCUIT_TEMPLATE_ID_FIELD_NUMBER: _ClassVar[int]
     PAYLOAD_FIELD_NUMBER: _ClassVar[int]
@@ -16,6 +17,7 @@ class GenerateProofRequest(_message.Message):
     TASK_TYPE_FIELD_NUMBER: _ClassVar[int]
     OAUTH_PROVIDER_FIELD_NUMBER: _ClassVar[int]
     PROOF_HASH_FIELD_NUMBER: _ClassVar[int]
+    FIELDS_FIELD_NUMBER: _ClassVar[int]
     prover: str
     circuit_template_id: str
     payload: str
@@ -25,7 +27,8 @@ class GenerateProofRequest(_message.Message):
     task_type: int
     oauth_provider: str
     proof_hash: str
-    def __init__(self, prover: _Optional[str] = ..., circuit_template_id: _Optional[str] = ..., payload: _Optional[str] = ..., length: _Optional[int] = ..., is_encrypted: bool = ..., auth_token: _Optional[str] = ..., task_type: _Optional[int] = ..., oauth_provider: _Optional[str] = ..., proof_hash: _Optional[str] = ...) -> None: ...
+    fields: _containers.RepeatedScalarFieldContainer[str]
+    def __init__(self, prover: _Optional[str] = ..., circuit_template_id: _Optional[str] = ..., payload: _Optional[str] = ..., length: _Optional[int] = ..., is_encrypted: bool = ..., auth_token: _Optional[str] = ..., task_type: _Optional[int] = ..., oauth_provider: _Optional[str] = ..., proof_hash: _Optional[str] = ..., fields: _Optional[_Iterable[str]] = ...) -> None: ...
 
 class GenerateProofResponse(_message.Message):
     __slots__ = ("code", "msg", "proof", "proof_solidity", "proof_bytes", "public_witness", "public_witness_bytes")
@@ -54,3 +57,101 @@ class GetPublicKeyResponse(_message.Message):
     msg: str
     public_key: str
     def __init__(self, code: _Optional[int] = ..., msg: _Optional[str] = ..., public_key: _Optional[str] = ...) -> None: ...
+
+class ProveProgressEvent(_message.Message):
+    __slots__ = ("stage", "timestamp", "queue_position", "backend", "result")
+    STAGE_FIELD_NUMBER: _ClassVar[int]
+    TIMESTAMP_FIELD_NUMBER: _ClassVar[int]
+    QUEUE_POSITION_FIELD_NUMBER: _ClassVar[int]
+    BACKEND_FIELD_NUMBER: _ClassVar[int]
+    RESULT_FIELD_NUMBER: _ClassVar[int]
+    stage: str
+    timestamp: float
+    queue_position: int
+    backend: str
+    result: GenerateProofResponse
+    def __init__(self, stage: _Optional[str] = ..., timestamp: _Optional[float] = ..., queue_position: _Optional[int] = ..., backend: _Optional[str] = ..., result: _Optional[_Union[GenerateProofResponse, _Mapping]] = ...) -> None: ...
+
+class ProveBatchItem(_message.Message):
+    __slots__ = ("payload", "proof_hash", "length")
+    PAYLOAD_FIELD_NUMBER: _ClassVar[int]
+    PROOF_HASH_FIELD_NUMBER: _ClassVar[int]
+    LENGTH_FIELD_NUMBER: _ClassVar[int]
+    payload: str
+    proof_hash: str
+    length: int
+    def __init__(self, payload: _Optional[str] = ..., proof_hash: _Optional[str] = ..., length: _Optional[int] = ...) -> None: ...
+
+class ProveBatchRequest(_message.Message):
+    __slots__ = ("prover", "circuit_template_id", "task_type", "oauth_provider", "is_encrypted", "auth_token", "length", "items", "fields")
+    PROVER_FIELD_NUMBER: _ClassVar[int]
+    CIRCUIT_TEMPLATE_ID_FIELD_NUMBER: _ClassVar[int]
+    TASK_TYPE_FIELD_NUMBER: _ClassVar[int]
+    OAUTH_PROVIDER_FIELD_NUMBER: _ClassVar[int]
+    IS_ENCRYPTED_FIELD_NUMBER: _ClassVar[int]
+    AUTH_TOKEN_FIELD_NUMBER: _ClassVar[int]
+    LENGTH_FIELD_NUMBER: _ClassVar[int]
+    ITEMS_FIELD_NUMBER: _ClassVar[int]
+    FIELDS_FIELD_NUMBER: _ClassVar[int]
+    prover: str
+    circuit_template_id: str
+    task_type: int
+    oauth_provider: str
+    is_encrypted: bool
+    auth_token: str
+    length: int
+    items: _containers.RepeatedCompositeFieldContainer[ProveBatchItem]
+    fields: _containers.RepeatedScalarFieldContainer[str]
+    def __init__(self, prover: _Optional[str] = ..., circuit_template_id: _Optional[str] = ..., task_type: _Optional[int] = ..., oauth_provider: _Optional[str] = ..., is_encrypted: bool = ..., auth_token: _Optional[str] = ..., length: _Optional[int] = ..., items: _Optional[_Iterable[_Union[ProveBatchItem, _Mapping]]] = ..., fields: _Optional[_Iterable[str]] = ...) -> None: ...
+
+class ProveBatchResponse(_message.Message):
+    __slots__ = ("index", "proof_hash", "result")
+    INDEX_FIELD_NUMBER: _ClassVar[int]
+    PROOF_HASH_FIELD_NUMBER: _ClassVar[int]
+    RESULT_FIELD_NUMBER: _ClassVar[int]
+    index: int
+    proof_hash: str
+    result: GenerateProofResponse
+    def __init__(self, index: _Optional[int] = ..., proof_hash: _Optional[str] = ..., result: _Optional[_Union[GenerateProofResponse, _Mapping]] = ...) -> None: ...
+
+class SubmitProofRequest(_message.Message):
+    __slots__ = ("request", "callback_url")
+    REQUEST_FIELD_NUMBER: _ClassVar[int]
+    CALLBACK_URL_FIELD_NUMBER: _ClassVar[int]
+    request: GenerateProofRequest
+    callback_url: str
+    def __init__(self, request: _Optional[_Union[GenerateProofRequest, _Mapping]] = ..., callback_url: _Optional[str] = ...) -> None: ...
+
+class SubmitProofResponse(_message.Message):
+    __slots__ = ("code", "msg", "job_id")
+    CODE_FIELD_NUMBER: _ClassVar[int]
+    MSG_FIELD_NUMBER: _ClassVar[int]
+    JOB_ID_FIELD_NUMBER: _ClassVar[int]
+    code: int
+    msg: str
+    job_id: str
+    def __init__(self, code: _Optional[int] = ..., msg: _Optional[str] = ..., job_id: _Optional[str] = ...) -> None: ...
+
+class GetProofJobRequest(_message.Message):
+    __slots__ = ("job_id", "wait_ms")
+    JOB_ID_FIELD_NUMBER: _ClassVar[int]
+    WAIT_MS_FIELD_NUMBER: _ClassVar[int]
+    job_id: str
+    wait_ms: int
+    def __init__(self, job_id: _Optional[str] = ..., wait_ms: _Optional[int] = ...) -> None: ...
+
+class GetProofJobResponse(_message.Message):
+    __slots__ = ("code", "msg", "job_id", "status", "result", "error")
+    CODE_FIELD_NUMBER: _ClassVar[int]
+    MSG_FIELD_NUMBER: _ClassVar[int]
+    JOB_ID_FIELD_NUMBER: _ClassVar[int]
+    STATUS_FIELD_NUMBER: _ClassVar[int]
+    RESULT_FIELD_NUMBER: _ClassVar[int]
+    ERROR_FIELD_NUMBER: _ClassVar[int]
+    code: int
+    msg: str
+    job_id: str
+    status: str
+    result: GenerateProofResponse
+    error: str
+    def __init__(self, code: _Optional[int] = ..., msg: _Optional[str] = ..., job_id: _Optional[str] = ..., status: _Optional[str] = ..., result: _Optional[_Union[GenerateProofResponse, _Mapping]] = ..., error: _Optional[str] = ...) -> None: ...
@@ -45,6 +45,26 @@ class ProveServiceStub(object):
                 request_serializer=prove__service__v2__pb2.GenerateProofRequest.SerializeToString,
                 response_deserializer=prove__service__v2__pb2.GenerateProofResponse.FromString,
                 _registered_method=True)
+        self.ProveStream = channel.unary_stream(
+                '/prove_service.v2.ProveService/ProveStream',
+                request_serializer=prove__service__v2__pb2.GenerateProofRequest.SerializeToString,
+                response_deserializer=prove__service__v2__pb2.ProveProgressEvent.FromString,
+                _registered_method=True)
+        self.ProveBatch = channel.unary_stream(
+                '/prove_service.v2.ProveService/ProveBatch',
+                request_serializer=prove__service__v2__pb2.ProveBatchRequest.SerializeToString,
+                response_deserializer=prove__service__v2__pb2.ProveBatchResponse.FromString,
+                _registered_method=True)
+        self.SubmitProof = channel.unary_unary(
+                '/prove_service.v2.ProveService/SubmitProof',
+                request_serializer=prove__service__v2__pb2.SubmitProofRequest.SerializeToString,
+                response_deserializer=prove__service__v2__pb2.SubmitProofResponse.FromString,
+                _registered_method=True)
+        self.GetProofJob = channel.unary_unary(
+                '/prove_service.v2.ProveService/GetProofJob',
+                request_serializer=prove__service__v2__pb2.GetProofJobRequest.SerializeToString,
+                response_deserializer=prove__service__v2__pb2.GetProofJobResponse.FromString,
+                _registered_method=True)
         self.GetPublicKey = channel.unary_unary(
                 '/prove_service.v2.ProveService/GetPublicKey',
                 request_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
@@ -66,6 +86,30 @@ class ProveServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ProveStream(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ProveBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SubmitProof(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetProofJob(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def GetPublicKey(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -86,6 +130,26 @@ def add_ProveServiceServicer_to_server(servicer, server):
                     request_deserializer=prove__service__v2__pb2.GenerateProofRequest.FromString,
                     response_serializer=prove__service__v2__pb2.GenerateProofResponse.SerializeToString,
             ),
+            'ProveStream': grpc.unary_stream_rpc_method_handler(
+                    servicer.ProveStream,
+                    request_deserializer=prove__service__v2__pb2.GenerateProofRequest.FromString,
+                    response_serializer=prove__service__v2__pb2.ProveProgressEvent.SerializeToString,
+            ),
+            'ProveBatch': grpc.unary_stream_rpc_method_handler(
+                    servicer.ProveBatch,
+                    request_deserializer=prove__service__v2__pb2.ProveBatchRequest.FromString,
+                    response_serializer=prove__service__v2__pb2.ProveBatchResponse.SerializeToString,
+            ),
+            'SubmitProof': grpc.unary_unary_rpc_method_handler(
+                    servicer.SubmitProof,
+                    request_deserializer=prove__service__v2__pb2.SubmitProofRequest.FromString,
+                    response_serializer=prove__service__v2__pb2.SubmitProofResponse.SerializeToString,
+            ),
+            'GetProofJob': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetProofJob,
+                    request_deserializer=prove__service__v2__pb2.GetProofJobRequest.FromString,
+                    response_serializer=prove__service__v2__pb2.GetProofJobResponse.SerializeToString,
+            ),
             'GetPublicKey': grpc.unary_unary_rpc_method_handler(
                     servicer.GetPublicKey,
                     request_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
@@ -134,6 +198,114 @@ class ProveService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ProveStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/prove_service.v2.ProveService/ProveStream',
+            prove__service__v2__pb2.GenerateProofRequest.SerializeToString,
+            prove__service__v2__pb2.ProveProgressEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ProveBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/prove_service.v2.ProveService/ProveBatch',
+            prove__service__v2__pb2.ProveBatchRequest.SerializeToString,
+            prove__service__v2__pb2.ProveBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SubmitProof(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/prove_service.v2.ProveService/SubmitProof',
+            prove__service__v2__pb2.SubmitProofRequest.SerializeToString,
+            prove__service__v2__pb2.SubmitProofResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetProofJob(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/prove_service.v2.ProveService/GetProofJob',
+            prove__service__v2__pb2.GetProofJobRequest.SerializeToString,
+            prove__service__v2__pb2.GetProofJobResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def GetPublicKey(request,
             target,
@@ -0,0 +1,125 @@
+import hmac
+import logging
+import os
+from typing import Literal
+
+from fastapi import FastAPI, HTTPException, Depends, APIRouter, Request, Query
+from fastapi.responses import PlainTextResponse, Response
+
+from . import serializers
+
+from utils.capture_util import TrafficCapture
+from utils.context_util import AppContext
+from utils.profile_util import PROFILE_FORMATS, MAX_PROFILE_SECONDS, HandlerTimings, ProfileBusy, dump_tasks
+
+
+def get_context(request: Request) -> AppContext:
+    return request.app.state.context
+
+def _bearer_token(request: Request) -> str:
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:].strip()
+    return ""
+
+def require_admin(request: Request):
+    """Admit requests bearing the admin token; without a configured token the endpoints do not exist."""
+    expected = getattr(get_context(request).config.Env, "admin_token", "") or os.getenv("ADMIN_TOKEN", "")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    actual = _bearer_token(request)
+    if not actual or not hmac.compare_digest(actual, expected):
+        logging.warning(f"[Admin] - Rejected {request.method} {request.url.path} from {request.client.host if request.client else '-'}")
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+# Every endpoint answers for the worker process serving the request
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+@router.get("/profile")
+async def profile(
+    request: Request,
+    seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+    format: str = Query("collapsed"),
+    limit: int = Query(50, gt=0),
+):
+    """
+    CPU profile of the event loop thread over the next `seconds`. `collapsed`
+    and `top` come from stack sampling and cost the loop next to nothing;
+    `pstats` and `prof` run cProfile, which slows the node down meanwhile.
+    """
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(PROFILE_FORMATS)}")
+    logging.info(f"[Admin] - Profiling the event loop for {seconds}s as {format}")
+    try:
+        output = await get_context(request).profiler.profile(seconds, format, limit)
+    except ProfileBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "prof":
+        return Response(output, media_type="application/octet-stream", headers={"Content-Disposition": 'attachment; filename="node.prof"'})
+    return PlainTextResponse(output)
+
+@router.post("/memory/start", response_model=serializers.AdminResponse)
+async def memory_start(request: Request, frames: int = Query(1, gt=0, le=64)):
+    started = get_context(request).memory_profiler.start(frames)
+    logging.info(f"[Admin] - tracemalloc {'started' if started else 'already tracing'}")
+    return serializers.AdminResponse(code=0, msg="OK", results={"started": started})
+
+@router.get("/memory", response_model=serializers.AdminResponse)
+async def memory_snapshot(
+    request: Request,
+    limit: int = Query(20, gt=0),
+    key_type: Literal["lineno", "filename", "traceback"] = Query("lineno"),
+):
+    """The top allocation sites, and their growth since the previous snapshot."""
+    try:
+        results = await get_context(request).memory_profiler.snapshot(limit, key_type)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return serializers.AdminResponse(code=0, msg="OK", results=results)
+
+@router.post("/memory/stop", response_model=serializers.AdminResponse)
+async def memory_stop(request: Request):
+    stopped = get_context(request).memory_profiler.stop()
+    logging.info(f"[Admin] - tracemalloc {'stopped' if stopped else 'was not tracing'}")
+    return serializers.AdminResponse(code=0, msg="OK", results={"stopped": stopped})
+
+@router.get("/tasks", response_model=serializers.AdminResponse)
+async def tasks(limit: int = Query(30, gt=0)):
+    """Every asyncio task of the worker with the await chain it is suspended at."""
+    return serializers.AdminResponse(code=0, msg="OK", results=dump_tasks(limit))
+
+@router.post("/capture/start", response_model=serializers.AdminResponse)
+async def capture_start(request: Request, seconds: float = Query(0, ge=0), max_events: int = Query(0, ge=0)):
+    """Record request shapes and arrival times for `main.py replay`, for `seconds` or until stopped."""
+    capture_config = get_context(request).config.Capture
+    TrafficCapture().start(capture_config.file_path, max_events or capture_config.max_events, seconds)
+    return serializers.AdminResponse(code=0, msg="OK", results=TrafficCapture().metrics())
+
+@router.post("/capture/stop", response_model=serializers.AdminResponse)
+async def capture_stop():
+    return serializers.AdminResponse(code=0, msg="OK", results=TrafficCapture().stop())
+
+@router.get("/loop", response_model=serializers.AdminResponse)
+async def loop(request: Request):
+    """Event loop lag and the latest callbacks that blocked the loop, with their stacks."""
+    loop_lag = get_context(request).loop_lag
+    results = {
+        **loop_lag.metrics(),
+        "slow_callback_threshold": loop_lag.slow_callback_threshold,
+        "recent": list(loop_lag.recent),
+    }
+    return serializers.AdminResponse(code=0, msg="OK", results=results)
+
+@router.get("/handlers", response_model=serializers.AdminResponse)
+async def handlers(limit: int = Query(10, gt=0), sort: Literal["total", "mean", "max"] = Query("total")):
+    """The HTTP and gRPC handlers that took the most time, and the slowest requests."""
+    return serializers.AdminResponse(code=0, msg="OK", results=HandlerTimings().top(limit, sort))
+
+
+def create_http_admin_service(app: FastAPI, context: AppContext | None = None) -> FastAPI:
+    """Mount the admin profiling endpoints on the node's FastAPI app."""
+    if context is not None:
+        app.state.context = context
+    app.include_router(router)
+    return app
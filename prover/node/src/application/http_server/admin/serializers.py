@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+
+
+class AdminResponse(BaseModel):
+    code: int
+    msg: str
+    results: Optional[Any] = None
@@ -1,68 +1,66 @@
 from typing import  Annotated
 
 import logging
-import os
-import aiofiles
 import ujson
 
 from . import serializers
 
-from config import Config, NodeConfig
+from config import NodeConfig
 from utils.constant import TASK_TYPE_ZKLOGIN
-from utils.constant import OAUTH_PROVIDER_GOOGLE, OAUTH_PROVIDER_TELEGRAM, OAUTH_PROVIDER_X509_GOOGLE
-from utils.constant import PRIVATE_KEY
+from utils.constant import OAUTH_PROVIDER_GOOGLE
 from utils.constant import TASK_STATUS_PENGDING
 from utils.constant import STATUS_CODE_SUCCESSFULLY, STATUS_CODE_ERROR
 from utils.constant import STATUS_CODE_PRIVATE_KEY_INVALID, STATUS_CODE_PRIVATE_KEY_NOT_FOUND
 from modules.encryptor import RSAEncryption
 from modules.proof_manager import ProofManager
-from modules.project_manager import ProjectManager
+from modules.key_cache import KeyCache
 from modules.hub import Hub
+from modules.result_reporter import ResultReporter
+from modules.admission import AdmissionController, AdmissionRejected
 from modules.prove_service.v1 import ProveServiceV1, ProofResult
 
-from modules.oauth_provider import OAuthProviderResolver
-from modules.oauth_provider import google
-from modules.oauth_provider import x509_google
+from utils.context_util import AppContext
 
 
-from fastapi import FastAPI, HTTPException, Depends, APIRouter
+from fastapi import FastAPI, HTTPException, Depends, APIRouter, Request
+from fastapi.responses import PlainTextResponse
 
 from fastapi.middleware.cors import CORSMiddleware
 
+from utils.error_util import admission_rejected_handler
+from utils.trace_util import Tracer
 
-def get_prove_service() -> ProveServiceV1:
-    oauth_provider = {}
-    config = Config()
-    oauth_provider[OAUTH_PROVIDER_GOOGLE] = google.Provider(config.OauthProvider.Google.api, config.OauthProvider.Google.circom_bigint_n, config.OauthProvider.Google.circom_bigint_k)
-    oauth_provider[OAUTH_PROVIDER_X509_GOOGLE] = x509_google.Provider(config.OauthProvider.X509Google.api, config.OauthProvider.X509Google.circom_bigint_n, config.OauthProvider.X509Google.circom_bigint_k)
-    oauth_provider_resolver = OAuthProviderResolver(config.Env.oauth_provider_resolver_path)
-    project_manager = ProjectManager(config.Env.project_path)
-    return ProveServiceV1(project_manager, oauth_provider, oauth_provider_resolver, config)
-
-def get_encryptor() -> RSAEncryption:
-    config = Config()
-    try: 
-        with open(config.Env.session_keys_path, mode='r') as file:
-            session_key = file.read()
+
+def get_context(request: Request) -> AppContext:
+    return request.app.state.context
+
+def get_prove_service(request: Request) -> ProveServiceV1:
+    return get_context(request).prove_service_v1
+
+async def get_encryptor(request: Request) -> RSAEncryption:
+    try:
+        return await get_context(request).hub.session_key.get_encryptor()
     except FileNotFoundError:
         logging.error("[API] - Public key file not found")
         raise HTTPException(status_code=500, detail="public key file not found")
-    encrytor = RSAEncryption(public_key=session_key)
-    return encrytor
 
-def get_proof_manager() -> ProofManager:
-    config = Config()
-    proof_manager = ProofManager(config.Env.cache_path)
-    return proof_manager
+def get_node_key(request: Request) -> KeyCache:
+    return get_context(request).node_key
+
+def get_proof_manager(request: Request) -> ProofManager:
+    return get_context(request).proof_manager
 
-def get_hub() -> Hub:
-    config = Config()
-    hub = Hub(config.Hub.API.url, config.Env.session_keys_path, config)
-    return hub
+def get_hub(request: Request) -> Hub:
+    return get_context(request).hub
 
-def get_config() -> NodeConfig:
-    config = Config()
-    return config
+def get_result_reporter(request: Request) -> ResultReporter:
+    return get_context(request).result_reporter
+
+def get_admission(request: Request) -> AdmissionController:
+    return get_context(request).admission
+
+def get_config(request: Request) -> NodeConfig:
+    return get_context(request).config
 
 
 router = APIRouter()
@@ -71,18 +69,33 @@ router = APIRouter()
 async def health():
     return serializers.StatusResponse(code=0, msg="OK")
 
+@router.get("/ready", response_model=serializers.StatusResponse)
+async def ready(request: Request):
+    """Readiness for rollouts: 503 until the node is warm and both transports listen."""
+    if not get_context(request).ready.is_set():
+        raise HTTPException(status_code=503, detail="Node is starting")
+    return serializers.StatusResponse(code=0, msg="OK")
+
 @router.get("/ping", response_model=serializers.PingResponse)
 async def ping():
     return serializers.PingResponse(code=0, msg="Pong")
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Prometheus metrics of the process answering; with several workers a scrape reaches any one of them."""
+    return PlainTextResponse(get_context(request).render_metrics(), media_type="text/plain; version=0.0.4")
+
 prove_service_dependency = Annotated[ProveServiceV1, Depends(get_prove_service)]
 encryptor_dependency = Annotated[RSAEncryption, Depends(get_encryptor)]
 proof_manager_dependency = Annotated[ProofManager, Depends(get_proof_manager)]
 hub_dependency = Annotated[Hub, Depends(get_hub)]
+result_reporter_dependency = Annotated[ResultReporter, Depends(get_result_reporter)]
+admission_dependency = Annotated[AdmissionController, Depends(get_admission)]
 config_dependency = Annotated[NodeConfig, Depends(get_config)]
+node_key_dependency = Annotated[KeyCache, Depends(get_node_key)]
 
 @router.post("/prove", response_model=serializers.ProveResponse)
-async def prove(request: serializers.ProveRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, hub_cls: hub_dependency):
+async def prove(request: serializers.ProveRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency, admission_cls: admission_dependency):
     prover_id = request.prover_id
     circuit_template_id = request.circuit_template_id
     input_data = request.input_data
@@ -93,14 +106,16 @@ async def prove(request: serializers.ProveRequest, prove_service_cls: prove_serv
 
     proof_hash = request.proof_hash
     
-    ok, msg = proof_manager_cls.claim_task(proof_hash)
-    if ok != True:
-        raise HTTPException(status_code=400, detail=msg)
-    
-    proof_result: ProofResult = await prove_service_cls.prove(method, prover_id, circuit_template_id, input_data, is_encrypted, "", oauth_provider)
+    async with admission_cls.admit(circuit_template_id) as ticket:
+        ok, msg = proof_manager_cls.claim_task(proof_hash)
+        if ok != True:
+            raise HTTPException(status_code=400, detail=msg)
+
+        proof_result: ProofResult = await prove_service_cls.prove(method, prover_id, circuit_template_id, input_data, is_encrypted, "", oauth_provider)
+        ticket.record(proof_result.code)
         
     if proof_result.project_name:
-        await hub_cls.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+        result_reporter_cls.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
 
     return serializers.ProveResponse(
         code=proof_result.code,
@@ -109,21 +124,21 @@ async def prove(request: serializers.ProveRequest, prove_service_cls: prove_serv
     )
 
 @router.post("/prove_with_witness", response_model=serializers.ProveWithWitnessResponse)
-async def prove_with_witness(request: serializers.ProveWithWitnessRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, hub_cls: hub_dependency):
+async def prove_with_witness(request: serializers.ProveWithWitnessRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency):
     raise HTTPException(
         status_code=501,
         detail="prove_with_witness is not supported in the current v1 service implementation"
     )
 
 @router.post("/prove_offchain", response_model=serializers.ProveOffchainResponse)
-async def prove_offchain(request: serializers.ProveWithWitnessRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, hub_cls: hub_dependency):
+async def prove_offchain(request: serializers.ProveWithWitnessRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency):
     raise HTTPException(
         status_code=501,
         detail="prove_offchain is not supported in the current v1 service implementation"
     )
 
 @router.post("/prove_nosha256", response_model=serializers.ProveNosha256Response)
-async def prove_nosha256(request: serializers.ProveNosha256Request, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, hub_cls: hub_dependency):
+async def prove_nosha256(request: serializers.ProveNosha256Request, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency, admission_cls: admission_dependency):
     prover_id = request.prover_id
     circuit_template_id = request.circuit_template_id
     input_data = request.input_data
@@ -135,14 +150,16 @@ async def prove_nosha256(request: serializers.ProveNosha256Request, prove_servic
 
     proof_hash = request.proof_hash
 
-    ok, msg = proof_manager_cls.claim_task(proof_hash)
-    if ok != True:
-        raise HTTPException(status_code=400, detail=msg)
-                
-    proof_result: ProofResult = await prove_service_cls.prove_nosha256(method, prover_id, circuit_template_id, input_data, is_encrypted, "", length, oauth_provider)
+    async with admission_cls.admit(circuit_template_id) as ticket:
+        ok, msg = proof_manager_cls.claim_task(proof_hash)
+        if ok != True:
+            raise HTTPException(status_code=400, detail=msg)
+
+        proof_result: ProofResult = await prove_service_cls.prove_nosha256(method, prover_id, circuit_template_id, input_data, is_encrypted, "", length, oauth_provider)
+        ticket.record(proof_result.code)
         
     if proof_result.project_name:
-        await hub_cls.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+        result_reporter_cls.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
 
     return serializers.ProveNosha256Response(
         code=proof_result.code,
@@ -151,7 +168,7 @@ async def prove_nosha256(request: serializers.ProveNosha256Request, prove_servic
     )
 
 @router.post("/prove_nosha256_with_witness", response_model=serializers.ProveNosha256WithWitnessResponse)
-async def prove_nosha256_with_witness(request: serializers.ProveNosha256WithWitnessRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, hub_cls: hub_dependency):
+async def prove_nosha256_with_witness(request: serializers.ProveNosha256WithWitnessRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency, admission_cls: admission_dependency):
     prover_id = request.prover_id
     circuit_template_id = request.circuit_template_id
     input_data = request.input_data
@@ -163,14 +180,16 @@ async def prove_nosha256_with_witness(request: serializers.ProveNosha256WithWitn
 
     proof_hash = request.proof_hash
 
-    ok, msg = proof_manager_cls.claim_task(proof_hash)
-    if ok != True:
-        raise HTTPException(status_code=400, detail=msg)
+    async with admission_cls.admit(circuit_template_id) as ticket:
+        ok, msg = proof_manager_cls.claim_task(proof_hash)
+        if ok != True:
+            raise HTTPException(status_code=400, detail=msg)
 
-    proof_result: ProofResult = await prove_service_cls.prove_nosha256_with_witness(method, prover_id, circuit_template_id, input_data, is_encrypted, "", length, oauth_provider)
+        proof_result: ProofResult = await prove_service_cls.prove_nosha256_with_witness(method, prover_id, circuit_template_id, input_data, is_encrypted, "", length, oauth_provider)
+        ticket.record(proof_result.code)
         
     if proof_result.project_name:
-        await hub_cls.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+        result_reporter_cls.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
 
     return serializers.ProveNosha256WithWitnessResponse(
         code=proof_result.code,
@@ -181,7 +200,7 @@ async def prove_nosha256_with_witness(request: serializers.ProveNosha256WithWitn
 
 
 @router.post("/prove_nosha256_offchain", response_model=serializers.ProveNosha256OffchainResponse)
-async def prove_nosha256_offchain(request: serializers.ProveNosha256OffchainRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, hub_cls: hub_dependency):
+async def prove_nosha256_offchain(request: serializers.ProveNosha256OffchainRequest, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency, admission_cls: admission_dependency):
     prover_id = request.prover_id
     circuit_template_id = request.circuit_template_id
     input_data = request.input_data
@@ -193,14 +212,16 @@ async def prove_nosha256_offchain(request: serializers.ProveNosha256OffchainRequ
 
     proof_hash = request.proof_hash
 
-    ok, msg = proof_manager_cls.claim_task(proof_hash)
-    if ok != True:
-        raise HTTPException(status_code=400, detail=msg)
-            
-    proof_result: ProofResult = await prove_service_cls.prove_nosha256_offchain(method, prover_id, circuit_template_id, input_data, is_encrypted, "", length, oauth_provider)
+    async with admission_cls.admit(circuit_template_id) as ticket:
+        ok, msg = proof_manager_cls.claim_task(proof_hash)
+        if ok != True:
+            raise HTTPException(status_code=400, detail=msg)
+
+        proof_result: ProofResult = await prove_service_cls.prove_nosha256_offchain(method, prover_id, circuit_template_id, input_data, is_encrypted, "", length, oauth_provider)
+        ticket.record(proof_result.code)
         
     if proof_result.project_name:
-        await hub_cls.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+        result_reporter_cls.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
 
     return serializers.ProveNosha256OffchainResponse(
         code=proof_result.code,
@@ -227,21 +248,16 @@ async def ping(prove_service_cls: prove_service_dependency):
     )
 
 @router.put("/verifier", response_model=serializers.StatusResponse)
-async def verifier(request: serializers.UpdateVerifierRequest, hub_cls: hub_dependency, config_cls: config_dependency):
+async def verifier(request: serializers.UpdateVerifierRequest, hub_cls: hub_dependency, node_key_cls: node_key_dependency):
     proof_hash = request.proof_hash
     verifiers = request.verifier
 
-
-    private_key_path = os.path.join(config_cls.Env.crypto_keys_path, PRIVATE_KEY)
-
     try:
-        async with aiofiles.open(private_key_path, mode='r') as file:
-            private_key = await file.read()
+        rsa_encryption = await node_key_cls.get_encryptor()
     except FileNotFoundError:
         return serializers.StatusResponse(code=STATUS_CODE_PRIVATE_KEY_NOT_FOUND, msg="Private key file not found")
 
     # Decrypt the input data using RSA
-    rsa_encryption = RSAEncryption(private_key=private_key)
     try:
         proof_hash = rsa_encryption.decrypt(proof_hash)
         verifiers = ujson.loads(rsa_encryption.decrypt(verifiers))
@@ -268,6 +284,8 @@ async def push_task(request: serializers.PushTaskRequest, encryptor: encryptor_d
         raise HTTPException(status_code=400, detail="Proof hash is exist.")
     
     proof_manager_cls.set(proof_hash, TASK_STATUS_PENGDING, 60)
+    # The prove request of this proof hash links its trace to the hub's dispatch
+    Tracer().remember(proof_hash)
     
     return serializers.StatusResponse(
         code=STATUS_CODE_SUCCESSFULLY,
@@ -275,10 +293,13 @@ async def push_task(request: serializers.PushTaskRequest, encryptor: encryptor_d
     )
 
 
-def create_http_prover_service(app: FastAPI = FastAPI()) -> FastAPI:
+def create_http_prover_service(app: FastAPI = FastAPI(), context: AppContext | None = None) -> FastAPI:
     """
     Initializes and configures the FastAPI server with necessary middlewares and settings.
+    The shared node context is attached to the app state for the route dependencies.
     """
+    if context is not None:
+        app.state.context = context
     
     # Set up CORS (Cross-Origin Resource Sharing) to allow requests from specific origins
     app.add_middleware(
@@ -289,6 +310,9 @@ def create_http_prover_service(app: FastAPI = FastAPI()) -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Overloaded nodes answer 429 so clients can move to another node right away
+    app.add_exception_handler(AdmissionRejected, admission_rejected_handler)
+
     # Include the router with all endpoints
     app.include_router(router)
 
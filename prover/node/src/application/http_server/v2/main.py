@@ -1,71 +1,71 @@
-from typing import  Annotated
+from typing import  Annotated, List
 
 import logging
-import os
-import aiofiles
 import ujson
 
 from . import serializers
 
-from config import Config, NodeConfig
+from config import NodeConfig
 from utils.constant import TASK_TYPE_ZKLOGIN
-from utils.constant import OAUTH_PROVIDER_GOOGLE, OAUTH_PROVIDER_TELEGRAM, OAUTH_PROVIDER_X509_GOOGLE
-from utils.constant import PRIVATE_KEY
+from utils.constant import OAUTH_PROVIDER_GOOGLE
 from utils.constant import TASK_STATUS_PENGDING
-from utils.constant import STATUS_CODE_SUCCESSFULLY, STATUS_CODE_ERROR
-from utils.constant import STATUS_CODE_PRIVATE_KEY_INVALID, STATUS_CODE_PRIVATE_KEY_NOT_FOUND
+from utils.constant import STATUS_CODE_SUCCESSFULLY, STATUS_CODE_ERROR, STATUS_CODE_JOB_NOT_FOUND, STATUS_CODE_NODE_OVERLOADED, STATUS_CODE_CALLBACK_URL_INVALID
+from utils.constant import STATUS_CODE_PRIVATE_KEY_INVALID, STATUS_CODE_PRIVATE_KEY_NOT_FOUND, STATUS_CODE_PUBLIC_KEY_NOT_FOUND
 from modules.encryptor import RSAEncryption
 from modules.proof_manager import ProofManager
-from modules.project_manager import ProjectManager
 from modules.hub import Hub
-from modules.prove_service.v2 import ProveServiceV2, ProofResult
+from modules.result_reporter import ResultReporter
+from modules.admission import AdmissionController, AdmissionRejected
+from modules.job_manager import Job, JobManager
+from modules.prove_service.v2 import ProveServiceV2, ProofResult, OUTPUT_FIELDS
 
-from modules.oauth_provider import OAuthProviderResolver
-from modules.oauth_provider import google
-from modules.oauth_provider import telegram
-from modules.oauth_provider import x509_google
+from utils.context_util import AppContext
+from utils.batch_util import bounded_as_completed
+from utils.progress_util import ProgressEvent, emit_progress, stream_progress
+from utils.progress_util import PROGRESS_CLAIMED, PROGRESS_REPORTED, PROGRESS_DONE
+from utils.codec_util import ContentNegotiationMiddleware, MEDIA_TYPE_JSON
+from utils.codec_util import response_format, negotiated_response, encode_stream_item, stream_media_type, message_to_dict
 
+from application.grpc_server.v2 import prove_service_v2_pb2
 
-from fastapi import FastAPI, Depends, APIRouter
-from utils.error_util import HTTPException
+
+from fastapi import FastAPI, Depends, APIRouter, Request
+from fastapi.responses import StreamingResponse
+from utils.error_util import HTTPException, admission_rejected_handler
 
 from fastapi.middleware.cors import CORSMiddleware
 
 
-def get_prove_service() -> ProveServiceV2:
-    oauth_provider = {}
-    config = Config()
-    oauth_provider[OAUTH_PROVIDER_GOOGLE] = google.Provider(config.OauthProvider.Google.api, config.OauthProvider.Google.circom_bigint_n, config.OauthProvider.Google.circom_bigint_k)
-    oauth_provider[OAUTH_PROVIDER_TELEGRAM] = telegram.Provider(config.OauthProvider.Telegram.api, config.OauthProvider.Telegram.circom_bigint_n, config.OauthProvider.Telegram.circom_bigint_k)
-    oauth_provider[OAUTH_PROVIDER_X509_GOOGLE] = x509_google.Provider(config.OauthProvider.X509Google.api, config.OauthProvider.X509Google.circom_bigint_n, config.OauthProvider.X509Google.circom_bigint_k)
-    oauth_provider_resolver = OAuthProviderResolver(config.Env.oauth_provider_resolver_path)
-    project_manager = ProjectManager(config.Env.project_path)
-    return ProveServiceV2(project_manager, oauth_provider, oauth_provider_resolver, config)
-
-def get_encryptor() -> RSAEncryption:
-    config = Config()
-    try: 
-        with open(config.Env.session_keys_path, mode='r') as file:
-            session_key = file.read()
+def get_context(request: Request) -> AppContext:
+    return request.app.state.context
+
+def get_prove_service(request: Request) -> ProveServiceV2:
+    return get_context(request).prove_service_v2
+
+async def get_encryptor(request: Request) -> RSAEncryption:
+    try:
+        return await get_context(request).hub.session_key.get_encryptor()
     except FileNotFoundError:
         logging.error("[API] - Public key file not found")
         raise HTTPException(code=STATUS_CODE_PUBLIC_KEY_NOT_FOUND, msg="Public key file not found", status_code=500)
-    encrytor = RSAEncryption(public_key=session_key)
-    return encrytor
 
-def get_proof_manager() -> ProofManager:
-    config = Config()
-    proof_manager = ProofManager(config.Env.cache_path)
-    return proof_manager
+def get_proof_manager(request: Request) -> ProofManager:
+    return get_context(request).proof_manager
+
+def get_hub(request: Request) -> Hub:
+    return get_context(request).hub
+
+def get_result_reporter(request: Request) -> ResultReporter:
+    return get_context(request).result_reporter
+
+def get_admission(request: Request) -> AdmissionController:
+    return get_context(request).admission
 
-def get_hub() -> Hub:
-    config = Config()
-    hub = Hub(config.Hub.API.url, config.Env.session_keys_path, config)
-    return hub
+def get_job_manager(request: Request) -> JobManager:
+    return get_context(request).job_manager
 
-def get_config() -> NodeConfig:
-    config = Config()
-    return config
+def get_config(request: Request) -> NodeConfig:
+    return get_context(request).config
 
 
 router = APIRouter()
@@ -79,10 +79,26 @@ prove_service_dependency = Annotated[ProveServiceV2, Depends(get_prove_service)]
 encryptor_dependency = Annotated[RSAEncryption, Depends(get_encryptor)]
 proof_manager_dependency = Annotated[ProofManager, Depends(get_proof_manager)]
 hub_dependency = Annotated[Hub, Depends(get_hub)]
+result_reporter_dependency = Annotated[ResultReporter, Depends(get_result_reporter)]
+admission_dependency = Annotated[AdmissionController, Depends(get_admission)]
+job_manager_dependency = Annotated[JobManager, Depends(get_job_manager)]
 config_dependency = Annotated[NodeConfig, Depends(get_config)]
 
-@router.post("/api/v2/prove", response_model=serializers.ProveV2Response)
-async def prove(request: serializers.ProveV2Request, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, hub_cls: hub_dependency):
+def _proof_outputs(proof_result: ProofResult, fields: List[str]) -> dict:
+    outputs = {name: getattr(proof_result, name) for name in OUTPUT_FIELDS if not fields or name in fields}
+    return {"code": proof_result.code, "msg": proof_result.msg, **outputs}
+
+def _proof_response(proof_result: ProofResult, fields: List[str]):
+    """
+    Only the selected representations are set, the others are neither encoded nor serialized.
+    Plain JSON goes through ProveV2Response and Base85, the other negotiated formats skip pydantic.
+    """
+    if response_format() != MEDIA_TYPE_JSON:
+        return negotiated_response(_proof_outputs(proof_result, fields), prove_service_v2_pb2.GenerateProofResponse)
+    return serializers.ProveV2Response(**_proof_outputs(proof_result, fields))
+
+@router.post("/api/v2/prove", response_model=serializers.ProveV2Response, response_model_exclude_unset=True)
+async def prove(request: serializers.ProveV2Request, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency, admission_cls: admission_dependency):
     prover = request.prover
     circuit_template_id = request.circuit_template_id
     payload = request.payload
@@ -94,29 +110,211 @@ async def prove(request: serializers.ProveV2Request, prove_service_cls: prove_se
 
     proof_hash = request.proof_hash
     
-    ok, msg = proof_manager_cls.claim_task(proof_hash)
-    if ok != True:
-        raise HTTPException(code=ok, msg=msg, status_code=500)
+    async with admission_cls.admit(circuit_template_id) as ticket:
+        ok, msg = proof_manager_cls.claim_task(proof_hash)
+        if ok != True:
+            raise HTTPException(code=ok, msg=msg, status_code=500)
 
-    proof_result: ProofResult = await prove_service_cls.prove(task_type, prover, circuit_template_id, payload, is_encrypted, auth_token, length, oauth_provider)
+        proof_result: ProofResult = await prove_service_cls.prove(task_type, prover, circuit_template_id, payload, is_encrypted, auth_token, length, oauth_provider, request.fields)
+        ticket.record(proof_result.code)
         
     if proof_result.project_name:
-        await hub_cls.send_result(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
+        result_reporter_cls.report(proof_result.project_name, proof_hash, proof_result.duration, proof_result.verifiers)
             
-    return serializers.ProveV2Response(
-        code=proof_result.code,
-        msg=proof_result.msg,
-        proof=proof_result.proof,
-        proof_solidity=proof_result.proof_solidity,
-        proof_bytes=proof_result.proof_bytes,
-        public_witness=proof_result.public_witness,
-        public_witness_bytes=proof_result.public_witness_bytes
+    return _proof_response(proof_result, request.fields)
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+@router.post("/api/v2/prove_stream")
+async def prove_stream(request: serializers.ProveV2Request, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency, admission_cls: admission_dependency):
+    """
+    /api/v2/prove as Server-Sent Events: one event per stage with its timestamp,
+    queue position and backend, then a `done` event carrying the ProveV2Response.
+    """
+    async def run() -> ProofResult:
+        async with admission_cls.admit(request.circuit_template_id) as ticket:
+            ok, msg = proof_manager_cls.claim_task(request.proof_hash)
+            if ok != True:
+                return ProofResult(code=ok, msg=msg)
+            emit_progress(PROGRESS_CLAIMED)
+
+            proof_result: ProofResult = await prove_service_cls.prove(
+                request.task_type or TASK_TYPE_ZKLOGIN,
+                request.prover,
+                request.circuit_template_id,
+                request.payload,
+                request.is_encrypted,
+                request.auth_token,
+                request.length,
+                request.oauth_provider or OAUTH_PROVIDER_GOOGLE,
+                request.fields,
+            )
+            ticket.record(proof_result.code)
+
+        if proof_result.project_name:
+            result_reporter_cls.report(proof_result.project_name, request.proof_hash, proof_result.duration, proof_result.verifiers)
+            emit_progress(PROGRESS_REPORTED)
+        return proof_result
+
+    async def stream():
+        try:
+            async for event in stream_progress(run):
+                if isinstance(event, ProgressEvent):
+                    yield _sse(event.stage, ujson.dumps(event.__dict__))
+                    continue
+                yield _sse(PROGRESS_DONE, serializers.ProveV2Response(**_proof_outputs(event, request.fields)).model_dump_json(exclude_unset=True))
+        except AdmissionRejected as e:
+            yield _sse(PROGRESS_DONE, serializers.ProveV2Response(code=STATUS_CODE_NODE_OVERLOADED, msg=e.msg).model_dump_json())
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def _prove_batch_item(index: int, item: serializers.ProveBatchItem, request: serializers.ProveBatchV2Request, prove_service_cls: ProveServiceV2, proof_manager_cls: ProofManager, result_reporter_cls: ResultReporter, admission_cls: AdmissionController):
+    try:
+        async with admission_cls.admit(request.circuit_template_id) as ticket:
+            ok, msg = proof_manager_cls.claim_task(item.proof_hash)
+            if ok != True:
+                return index, item, ProofResult(code=ok, msg=msg)
+
+            proof_result: ProofResult = await prove_service_cls.prove(
+                request.task_type or TASK_TYPE_ZKLOGIN,
+                request.prover,
+                request.circuit_template_id,
+                item.payload,
+                request.is_encrypted,
+                request.auth_token,
+                item.length or request.length,
+                request.oauth_provider or OAUTH_PROVIDER_GOOGLE,
+                request.fields,
+            )
+            ticket.record(proof_result.code)
+    except AdmissionRejected as e:
+        return index, item, ProofResult(code=STATUS_CODE_NODE_OVERLOADED, msg=e.msg)
+
+    if proof_result.project_name:
+        result_reporter_cls.report(proof_result.project_name, item.proof_hash, proof_result.duration, proof_result.verifiers)
+    return index, item, proof_result
+
+def _batch_line(index: int, proof_hash: str, proof_result: ProofResult, fields: List[str], media_type: str):
+    if media_type != MEDIA_TYPE_JSON:
+        item = {"index": index, "proof_hash": proof_hash, "result": _proof_outputs(proof_result, fields)}
+        return encode_stream_item(item, media_type, prove_service_v2_pb2.ProveBatchResponse)
+    return serializers.ProveBatchV2ItemResponse(
+        index=index,
+        proof_hash=proof_hash,
+        result=serializers.ProveV2Response(**_proof_outputs(proof_result, fields)),
+    ).model_dump_json(exclude_unset=True) + "\n"
+
+@router.post("/api/v2/prove_batch")
+async def prove_batch(request: serializers.ProveBatchV2Request, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency, admission_cls: admission_dependency, config_cls: config_dependency):
+    """
+    Prove a batch of items sharing prover and circuit; one item is streamed per proof as it finishes,
+    a JSON line by default or a length-delimited ProveBatchResponse with protobuf.
+    """
+    if len(request.items) > config_cls.Batch.max_items:
+        raise HTTPException(code=STATUS_CODE_ERROR, msg=f"Batch is limited to {config_cls.Batch.max_items} items", status_code=400)
+
+    ok, msg = await prove_service_cls.validate_batch(
+        request.task_type or TASK_TYPE_ZKLOGIN,
+        request.prover,
+        request.circuit_template_id,
+        request.is_encrypted,
+        request.oauth_provider or OAUTH_PROVIDER_GOOGLE,
+        request.fields,
     )
 
-def create_http_prover_service(app: FastAPI = FastAPI()) -> FastAPI:
+    media_type = stream_media_type(prove_service_v2_pb2.ProveBatchResponse)
+
+    async def stream():
+        if ok != True:
+            # The proof hashes are left unclaimed so the batch can be sent again
+            for index, item in enumerate(request.items):
+                yield _batch_line(index, item.proof_hash, ProofResult(code=ok, msg=msg), request.fields, media_type)
+            return
+
+        factories = [
+            (lambda index=index, item=item: _prove_batch_item(index, item, request, prove_service_cls, proof_manager_cls, result_reporter_cls, admission_cls))
+            for index, item in enumerate(request.items)
+        ]
+        async for index, item, proof_result in bounded_as_completed(factories, config_cls.Batch.max_concurrency):
+            yield _batch_line(index, item.proof_hash, proof_result, request.fields, media_type)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson" if media_type == MEDIA_TYPE_JSON else media_type)
+
+async def _prove_job(job: Job, request: serializers.ProveV2Request, prove_service_cls: ProveServiceV2, result_reporter_cls: ResultReporter, admission_cls: AdmissionController, job_manager_cls: JobManager) -> ProofResult:
+    async with job_manager_cls.admit(job, admission_cls, request.circuit_template_id) as ticket:
+        proof_result: ProofResult = await prove_service_cls.prove(
+            request.task_type or TASK_TYPE_ZKLOGIN,
+            request.prover,
+            request.circuit_template_id,
+            request.payload,
+            request.is_encrypted,
+            request.auth_token,
+            request.length,
+            request.oauth_provider or OAUTH_PROVIDER_GOOGLE,
+            request.fields,
+        )
+        ticket.record(proof_result.code)
+
+    if proof_result.project_name:
+        result_reporter_cls.report(proof_result.project_name, request.proof_hash, proof_result.duration, proof_result.verifiers)
+    return proof_result
+
+@router.post("/api/v2/jobs", response_model=serializers.SubmitProofV2Response)
+async def submit_proof(request: serializers.SubmitProofV2Request, prove_service_cls: prove_service_dependency, proof_manager_cls: proof_manager_dependency, result_reporter_cls: result_reporter_dependency, admission_cls: admission_dependency, job_manager_cls: job_manager_dependency):
+    if request.callback_url:
+        reason = job_manager_cls.check_callback_url(request.callback_url)
+        if reason is not None:
+            raise HTTPException(code=STATUS_CODE_CALLBACK_URL_INVALID, msg=reason, status_code=400)
+    # A full job queue turns the request away before the single-use proof hash is spent
+    job_manager_cls.ensure_capacity()
+    # Claim right away so an unknown or reused proof hash fails like /api/v2/prove
+    ok, msg = proof_manager_cls.claim_task(request.proof_hash)
+    if ok != True:
+        raise HTTPException(code=ok, msg=msg, status_code=500)
+
+    try:
+        job = job_manager_cls.submit(
+            lambda job: _prove_job(job, request, prove_service_cls, result_reporter_cls, admission_cls, job_manager_cls),
+            request.callback_url,
+        )
+    except AdmissionRejected:
+        proof_manager_cls.release_task(request.proof_hash)
+        raise
+    response = {"code": STATUS_CODE_SUCCESSFULLY, "msg": "Successfully", "job_id": job.id}
+    if response_format() != MEDIA_TYPE_JSON:
+        return negotiated_response(response, prove_service_v2_pb2.SubmitProofResponse)
+    return serializers.SubmitProofV2Response(**response)
+
+@router.get("/api/v2/jobs/{job_id}", response_model=serializers.ProofJobResponse)
+async def get_proof_job(job_id: str, job_manager_cls: job_manager_dependency, config_cls: config_dependency, wait: float = 0):
+    """Job status; with `wait` seconds the call returns as soon as the job is done."""
+    job = await job_manager_cls.wait(job_id, min(wait, config_cls.Jobs.max_wait))
+    if job is None:
+        raise HTTPException(code=STATUS_CODE_JOB_NOT_FOUND, msg="Job does not exist or has expired", status_code=404)
+    if response_format() != MEDIA_TYPE_JSON:
+        return negotiated_response({"code": STATUS_CODE_SUCCESSFULLY, "msg": "Successfully", **job.to_dict(encode_bytes=False)}, prove_service_v2_pb2.GetProofJobResponse)
+    return serializers.ProofJobResponse(code=STATUS_CODE_SUCCESSFULLY, msg="Successfully", **job.to_dict())
+
+def _submit_proof_from_protobuf(body: bytes) -> dict:
+    message = prove_service_v2_pb2.SubmitProofRequest.FromString(body)
+    return {**message_to_dict(message.request), "callback_url": message.callback_url or None}
+
+# Decoders of the protobuf request bodies, the messages are those of the gRPC service
+PROTOBUF_REQUESTS = {
+    "/api/v2/prove": lambda body: message_to_dict(prove_service_v2_pb2.GenerateProofRequest.FromString(body)),
+    "/api/v2/prove_stream": lambda body: message_to_dict(prove_service_v2_pb2.GenerateProofRequest.FromString(body)),
+    "/api/v2/prove_batch": lambda body: message_to_dict(prove_service_v2_pb2.ProveBatchRequest.FromString(body)),
+    "/api/v2/jobs": _submit_proof_from_protobuf,
+}
+
+def create_http_prover_service(app: FastAPI = FastAPI(), context: AppContext | None = None) -> FastAPI:
     """
     Initializes and configures the FastAPI server with necessary middlewares and settings.
+    The shared node context is attached to the app state for the route dependencies.
     """
+    if context is not None:
+        app.state.context = context
     
     # Set up CORS (Cross-Origin Resource Sharing) to allow requests from specific origins
     app.add_middleware(
@@ -127,6 +325,12 @@ def create_http_prover_service(app: FastAPI = FastAPI()) -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Responses as JSON, base64 JSON, MessagePack or protobuf following the Accept header
+    app.add_middleware(ContentNegotiationMiddleware, protobuf_requests=PROTOBUF_REQUESTS)
+
+    # Overloaded nodes answer 429 so clients can move to another node right away
+    app.add_exception_handler(AdmissionRejected, admission_rejected_handler)
+
     # Include the router with all endpoints
     app.include_router(router)
 
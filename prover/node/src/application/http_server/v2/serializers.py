@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import List, Optional
 import base64
 
 class PingResponse(BaseModel):
@@ -16,6 +16,8 @@ class ProveV2Request(BaseModel):
     length: int
     oauth_provider: str
     proof_hash: str
+    # Output representations to return, see OUTPUT_FIELDS; empty returns all of them
+    fields: List[str] = []
 
 class ProveV2Response(BaseModel):
     code: int
@@ -52,4 +54,45 @@ class ProveV2Response(BaseModel):
         if isinstance(v, bytes):
             # Encode bytes data to Base85 and return as string
             return base64.b85encode(v).decode('utf-8')
-        return v  # Return original value if not bytes
\ No newline at end of file
+        return v  # Return original value if not bytes
+
+class SubmitProofV2Request(ProveV2Request):
+    callback_url: Optional[str] = None
+
+class SubmitProofV2Response(BaseModel):
+    code: int
+    msg: str
+    job_id: Optional[str] = None
+
+class ProofJobResponse(BaseModel):
+    code: int
+    msg: str
+    job_id: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ProveV2Response] = None
+    error: Optional[str] = None
+
+
+class ProveBatchItem(BaseModel):
+    payload: str
+    proof_hash: str
+    length: Optional[int] = None
+
+class ProveBatchV2Request(BaseModel):
+    prover: str
+    circuit_template_id: str
+    is_encrypted: bool = False
+    auth_token: Optional[str] = None
+    task_type: int = 0
+    length: int = 0
+    oauth_provider: str
+    items: List[ProveBatchItem]
+    fields: List[str] = []
+
+class ProveBatchV2ItemResponse(BaseModel):
+    index: int
+    proof_hash: str
+    result: ProveV2Response
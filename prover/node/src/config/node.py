@@ -24,6 +24,9 @@ class Config:
         oauth_provider_resolver_path = "./utils/oauth_provider_resolver.json"
         proxy = ""
         node_register_token = ""
+        # Bearer token of the /admin profiling endpoints, also read from
+        # ADMIN_TOKEN; they answer 404 while neither is set
+        admin_token = ""
         require_tls = True
         verify_hub_tls = False
         verify_prover_tls = False
@@ -31,9 +34,26 @@ class Config:
         tls_keyfile = _default_tls_path("tls.key")
 
     class Server:
+        # Processes sharing the gRPC and HTTP ports through SO_REUSEPORT. With
+        # more than one, proof hashes are claimed and async job states kept in
+        # claim_store_path, and the worker holding heartbeat_lock_path sends
+        # the hub heartbeats with the load of all workers.
+        workers = 1
+        claim_store_path = "./claims.db"
+        heartbeat_lock_path = "./heartbeat.lock"
+
         class Grpc:
             host = "[::]"
             port = 50050
+            # 0 leaves the gRPC default
+            max_concurrent_rpcs = 0
+            max_receive_message_length = 16 * 1024 * 1024
+            max_send_message_length = 16 * 1024 * 1024
+            keepalive_time_ms = 30000
+            keepalive_timeout_ms = 10000
+            keepalive_permit_without_calls = True
+            # "gzip", "deflate" or "" for none
+            compression = ""
 
         class FastAPI:
             host = "0.0.0.0"
@@ -47,14 +67,116 @@ class Config:
             grpc = "your-node-host:50050"
             http = "https://your-node-host:50051"
 
+        class Reporter:
+            # Suffixed with the worker index when the node runs several workers
+            spool_path = "./result_spool.json"
+            batch_size = 32
+            max_queue_size = 10000
+            max_attempts = 20
+            base_backoff = 1.0
+            max_backoff = 60.0
+
+        class Heartbeat:
+            min_interval = 5
+            max_interval = 120
+            change_threshold = 0.25
+
+    class Admission:
+        initial_limit = 16
+        min_limit = 1
+        max_limit = 256
+        max_queue_size = 256
+        max_queue_wait = 5.0
+        latency_tolerance = 2.0
+        backoff_ratio = 0.9
+
+    class Batch:
+        max_items = 256
+        max_concurrency = 8
+
+    class Jobs:
+        retention = 600
+        max_jobs = 10000
+        max_queue_time = 300
+        callback_attempts = 3
+        max_wait = 60
+        # Hosts a job may be called back at, "*.example.com" matches the
+        # subdomains; empty turns callback URLs away. Private, loopback and
+        # other non-public addresses are refused unless in the networks
+        callback_allowed_hosts = []
+        callback_allowed_networks = []
+
+    class Capture:
+        # Record request shapes and arrival times from startup, for `main.py
+        # replay`; POST /admin/capture/start does it on demand. Each worker
+        # writes file_path suffixed with its pid
+        enabled = False
+        file_path = "./logs/traffic.jsonl"
+        max_events = 1000000
+
+    class LoopMonitor:
+        # Tick of the event loop lag timer
+        interval = 0.05
+        # A callback running longer than this gets its stack logged; 0 turns
+        # the detector off
+        slow_callback_threshold = 0.1
+
+    class Tracing:
+        service_name = "zkp-node"
+        # Share of the traces started here that are recorded; a traceparent from
+        # the hub or a client keeps the sampling decision of the caller
+        sample_ratio = 0.01
+        # OTLP/HTTP collector, e.g. "http://otel-collector:4318"; without one the
+        # spans are appended to file_path as OTLP/JSON lines
+        otlp_endpoint = ""
+        file_path = "./logs/traces.jsonl"
+
     class Prover:
+        class Pool:
+            min_channels = 2
+            max_channels = 4
+            max_streams_per_channel = 100
+            warmup_timeout = 5
+
+        class Router:
+            max_failures = 3
+            probe_interval = 5
+
+        # Per-circuit overrides, e.g. circuits = {"10001": {"timeout": 60, "retries": 0}}
+        class Rpc:
+            default_timeout = 30
+            min_timeout = 5
+            max_timeout = 120
+            timeout_multiplier = 3
+            min_samples = 20
+            max_retries = 2
+            retry_budget_ratio = 0.1
+            circuits = {}
+
+        # `backends` overrides `address` with several backends of the same type,
+        # e.g. [{"address": "circom-gpu:60051", "circuit_templates": ["10001"], "weight": 4}]
+        # A prover on the same host started with -uds is reached without TLS at
+        # "unix:/run/prover/circom.sock", or "unix:/run/prover/gnark.sock"
         class Circom:
             address = "circom-prover:60051"
+            backends = []
+            circuit_templates = []
 
         class Private:
             address = "gnark-prover:60050"
+            backends = []
+            circuit_templates = ["10005", "10006", "10010"]
 
     class OauthProvider:
+        class Jwks:
+            snapshot_path = "./jwks_cache"
+            # Seconds startup waits for a fetch before serving the snapshot
+            startup_timeout = 3
+            default_max_age = 3600
+            min_refresh_interval = 60
+            negative_cache_ttl = 300
+            negative_cache_size = 4096
+
         class Google:
             api = "https://www.googleapis.com/oauth2/v3/certs"
             circom_bigint_n = 121
@@ -1,12 +1,17 @@
 import argparse
 import logging
 import asyncio
+import multiprocessing
+import signal
+import time
 
 from config import Config
 from utils.logger_util import setup_logger, patch_framework_loggers
 from utils.constant import CLI_LOGGER, PROVE_SERVICE_LOGGER
 from utils.crypto_key_util import CryptoKey
 from utils.server_util import ServerBuilder
+from utils.transport_bench_util import run_transport_bench, DEFAULT_PAYLOAD_SIZES
+from utils.replay_util import run_replay
 
 # Initialize configuration
 config = Config()
@@ -16,11 +21,11 @@ patch_framework_loggers()
 
 logger = logging.getLogger(CLI_LOGGER)
 
-async def server(grpc_host: str, grpc_port: str, fastapi_host: str, fastapi_port: str, session_key_path: str, hub_api: str):
+async def server(grpc_host: str, grpc_port: str, fastapi_host: str, fastapi_port: str, session_key_path: str, hub_api: str, workers: int = 1, worker: int = 0):
     """
     Start the server, including gRPC and FastAPI.
     """
-    builder = ServerBuilder(config)  # Use global configuration
+    builder = ServerBuilder(config, workers, worker)  # Use global configuration
     server = await builder.build(
         hub_api=hub_api,
         grpc_host=grpc_host,
@@ -31,6 +36,93 @@ async def server(grpc_host: str, grpc_port: str, fastapi_host: str, fastapi_port
     logger.info("Server initialized, running now...")
     await server.run()
 
+# Seconds a stopping worker gets to flush its state before it is killed
+_WORKER_STOP_TIMEOUT = 30
+# Longest delay before restarting a worker that keeps exiting
+_MAX_RESTART_DELAY = 60
+
+async def _serve_worker(**kwargs):
+    """Run a worker until SIGTERM, which cancels the server so its finally blocks flush state."""
+    task = asyncio.ensure_future(server(**kwargs))
+
+    def stop():
+        # uvicorn re-raises the signal it saw, a second cancel would interrupt the flush
+        if not task.cancelling():
+            logger.info("Worker received SIGTERM, stopping")
+            task.cancel()
+
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop)
+    try:
+        await task
+    except asyncio.CancelledError:
+        logger.info("Worker stopped")
+
+def _run_worker(**kwargs):
+    # Workers leave shutdown to the supervisor and exit on its SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve_worker(**kwargs))
+
+def serve_workers(workers: int, **kwargs):
+    """
+    Run `workers` server processes sharing the gRPC and HTTP ports through
+    SO_REUSEPORT. A worker that dies is restarted, after a delay doubling up to
+    `_MAX_RESTART_DELAY` while it keeps dying. SIGINT or SIGTERM stops them
+    all: each worker gets SIGTERM and `_WORKER_STOP_TIMEOUT` seconds to exit
+    before it is killed.
+    """
+    spawn = multiprocessing.get_context("spawn")
+    processes = {}
+    started_at = {}
+    restart_delay = {}
+    restart_at = {}
+
+    def start(index: int):
+        process = spawn.Process(target=_run_worker, kwargs={**kwargs, "worker": index}, name=f"node-worker-{index}")
+        process.start()
+        processes[index] = process
+        started_at[index] = time.monotonic()
+        logger.info(f"Worker {index} started with pid {process.pid}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(workers):
+        start(index)
+    while not stopping:
+        time.sleep(1)
+        now = time.monotonic()
+        for index, process in list(processes.items()):
+            if process.is_alive() or stopping:
+                continue
+            if index not in restart_at:
+                # A worker that stayed up for a while starts over from the shortest delay
+                if now - started_at[index] > _MAX_RESTART_DELAY:
+                    restart_delay[index] = 1.0
+                else:
+                    restart_delay[index] = min(restart_delay.get(index, 0.5) * 2, _MAX_RESTART_DELAY)
+                restart_at[index] = now + restart_delay[index]
+                logger.error(f"Worker {index} exited with code {process.exitcode}, restarting in {restart_delay[index]}s")
+            elif now >= restart_at[index]:
+                del restart_at[index]
+                start(index)
+
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + _WORKER_STOP_TIMEOUT
+    for process in processes.values():
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            logger.warning(f"Worker pid {process.pid} did not stop within {_WORKER_STOP_TIMEOUT}s, killing it")
+            process.kill()
+            process.join()
+
 def crypto_keys(path: str, size: int):
     """
     Generate encryption keys.
@@ -46,6 +138,42 @@ def crypto_keys(path: str, size: int):
     crypto_key.generate_keys(size)
     logger.info(f"Crypto keys generated at {path} with size {size} bits.")
 
+def bench_transport(sizes: list, iterations: int):
+    """
+    Benchmark the node to prover round trip over TLS TCP and a Unix socket.
+
+    Args:
+        sizes (list): Payload sizes in bytes.
+        iterations (int): Round trips per transport and size.
+    """
+    results = asyncio.run(run_transport_bench(sizes, iterations))
+    print(f"{'size':>10} {'transport':>10} {'p50 ms':>10} {'p99 ms':>10} {'mean ms':>10}")
+    for size in sizes:
+        for transport, by_size in results.items():
+            stats = by_size[size]
+            print(f"{size:>10} {transport:>10} {stats['p50_ms']:>10.3f} {stats['p99_ms']:>10.3f} {stats['mean_ms']:>10.3f}")
+
+def replay(files: list, http_url: str, grpc_address: str, speed: float, headers: list, max_in_flight: int, timeout: float, tls_certfile: str):
+    """
+    Replay captured traffic against a node.
+    Args:
+        files (list): Capture files, one per worker.
+        http_url (str): Base URL of the node's HTTP server, empty to skip HTTP requests.
+        grpc_address (str): Address of the node's gRPC server, empty to skip gRPC calls.
+        speed (float): Replay speed, 2 sends the requests twice as fast as captured.
+        headers (list): "Name: value" headers added to every HTTP request.
+    """
+    extra_headers = {}
+    for header in headers:
+        name, _, value = header.partition(":")
+        extra_headers[name.strip()] = value.strip()
+    summary = asyncio.run(run_replay(files, http_url, grpc_address, speed, extra_headers, max_in_flight, timeout, tls_certfile))
+    print(f"{summary['requests']} requests in {summary['elapsed_seconds']}s ({summary['rate_per_second']}/s), "
+          f"captured over {summary['captured_seconds']}s, schedule lag p99 {summary['lag_p99_ms']}ms max {summary['lag_max_ms']}ms")
+    print(f"{'endpoint':<48} {'count':>8} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10}  outcomes")
+    for endpoint, stats in summary["endpoints"].items():
+        print(f"{endpoint:<48} {stats['count']:>8} {stats['p50_ms']:>10.3f} {stats['p90_ms']:>10.3f} {stats['p99_ms']:>10.3f}  {stats['outcomes']}")
+
 def main():
     # Create argument parser
     parser = argparse.ArgumentParser(description="Command-line tool for server and crypto key management.")
@@ -59,6 +187,7 @@ def main():
     server_parser.add_argument('-fastapi_port', type=int, default=config.Server.FastAPI.port, help='FastAPI port')
     server_parser.add_argument('-hub_api', type=str, default=config.Hub.API.url, help='Hub API URL')
     server_parser.add_argument('-session_key', type=str, default=config.Env.session_keys_path, help='Session key path')
+    server_parser.add_argument('-workers', type=int, default=config.Server.workers, help='Server processes sharing the ports')
     server_parser.set_defaults(func=server)
 
     # crypto_keys subcommand
@@ -67,23 +196,51 @@ def main():
     crypto_keys_parser.add_argument('-s', '--size', type=int, required=True, help='Key size in bits (required)')
     crypto_keys_parser.set_defaults(func=crypto_keys)
 
+    # bench_transport subcommand
+    bench_parser = subparsers.add_parser('bench_transport', help='Compare prover round trips over TLS TCP and a Unix socket.')
+    bench_parser.add_argument('-sizes', type=int, nargs='+', default=DEFAULT_PAYLOAD_SIZES, help='Payload sizes in bytes')
+    bench_parser.add_argument('-iterations', type=int, default=200, help='Round trips per transport and size')
+    bench_parser.set_defaults(func=bench_transport)
+
+    # replay subcommand
+    replay_parser = subparsers.add_parser('replay', help='Replay captured traffic against a node at 1x to Nx speed.')
+    replay_parser.add_argument('files', type=str, nargs='+', help='Capture files written by Capture or /admin/capture')
+    replay_parser.add_argument('-http_url', type=str, default=f"http://127.0.0.1:{config.Server.FastAPI.port}", help='Node HTTP base URL, empty to skip')
+    replay_parser.add_argument('-grpc_address', type=str, default=f"127.0.0.1:{config.Server.Grpc.port}", help='Node gRPC address, empty to skip')
+    replay_parser.add_argument('-speed', type=float, default=1.0, help='Replay speed factor')
+    replay_parser.add_argument('-header', type=str, action='append', default=[], help='"Name: value" header for every HTTP request')
+    replay_parser.add_argument('-max_in_flight', type=int, default=1000, help='Requests outstanding at most')
+    replay_parser.add_argument('-timeout', type=float, default=30.0, help='Timeout per request in seconds')
+    replay_parser.add_argument('-tls_certfile', type=str, default="", help='CA of the node gRPC server; plaintext without one')
+    replay_parser.set_defaults(func=replay)
+
     args = parser.parse_args()
 
     # Call corresponding function based on subcommand
     if hasattr(args, 'func'):
         if args.command == 'server':
-            asyncio.run(
-                args.func(
-                    grpc_host=args.grpc_host,
-                    grpc_port=args.grpc_port,
-                    fastapi_host=args.fastapi_host,
-                    fastapi_port=args.fastapi_port,
-                    session_key_path=args.session_key,
-                    hub_api=args.hub_api
-                )
+            server_kwargs = dict(
+                grpc_host=args.grpc_host,
+                grpc_port=args.grpc_port,
+                fastapi_host=args.fastapi_host,
+                fastapi_port=args.fastapi_port,
+                session_key_path=args.session_key,
+                hub_api=args.hub_api,
+                workers=args.workers
             )
+            if args.workers > 1:
+                serve_workers(args.workers, **server_kwargs)
+            else:
+                asyncio.run(args.func(**server_kwargs))
         elif args.command == 'crypto_keys':
             args.func(path=args.path, size=args.size)
+        elif args.command == 'bench_transport':
+            args.func(sizes=args.sizes, iterations=args.iterations)
+        elif args.command == 'replay':
+            if args.speed <= 0:
+                parser.error("-speed must be positive")
+            args.func(files=args.files, http_url=args.http_url, grpc_address=args.grpc_address, speed=args.speed,
+                      headers=args.header, max_in_flight=args.max_in_flight, timeout=args.timeout, tls_certfile=args.tls_certfile)
     else:
         parser.print_help()
 
@@ -0,0 +1,220 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.constant import STATUS_CODE_SUCCESSFULLY, STATUS_CODE_PROVER_NOT_RESPONSE
+from utils.progress_util import emit_progress, PROGRESS_QUEUED
+from utils.trace_util import start_span
+
+
+class AdmissionRejected(Exception):
+    """Raised when the node is saturated; `retry_after` is a hint in seconds."""
+
+    def __init__(self, msg: str, retry_after: int):
+        super().__init__(msg)
+        self.msg = msg
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    __slots__ = ("key", "granted_at", "code")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.granted_at = time.perf_counter()
+        self.code: Optional[int] = None
+
+    def record(self, code: int) -> None:
+        """Report the prove result code so the latency feeds the concurrency limit."""
+        self.code = code
+
+
+class AdmissionController:
+    """
+    Adaptive concurrency limit with a weighted fair queue in front of the provers.
+
+    The limit follows AIMD: every successful proof whose latency stays within
+    `latency_tolerance` times the best latency seen for its circuit grows the
+    limit by 1/limit, while slow proofs, prover timeouts and a prover backlog
+    that is not ours shrink it by `backoff_ratio`.
+
+    Requests above the limit wait in a bounded queue ordered by weighted fair
+    queueing, so a busy key cannot starve the others. A full queue or a wait
+    longer than `max_queue_wait` rejects immediately with AdmissionRejected.
+    """
+
+    _MAX_RETRY_AFTER = 30
+
+    def __init__(
+        self,
+        weight: Callable[[str], float],
+        *,
+        initial_limit: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        max_queue_size: int = 256,
+        max_queue_wait: float = 5.0,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.9,
+        baseline_drift: float = 0.01,
+    ):
+        self.weight = weight
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue_size = max_queue_size
+        self.max_queue_wait = max_queue_wait
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.baseline_drift = baseline_drift
+
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self._queue: List[Tuple[float, int, asyncio.Future]] = []
+        self._waiting = 0
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_tag: Dict[str, float] = {}
+        self._baseline: Dict[str, float] = {}
+        self._latency = 0.0
+
+        self.stats: Dict[str, int] = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "limit_increase": 0,
+            "limit_decrease": 0,
+        }
+
+    @property
+    def queue_size(self) -> int:
+        return self._waiting
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_size": self._waiting,
+        }
+
+    @asynccontextmanager
+    async def admit(self, key: str):
+        with start_span("queue", circuit_template_id=key) as span:
+            ticket = await self.acquire(key)
+            span.set_attribute("in_flight", self.in_flight)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    async def acquire(self, key: str) -> AdmissionTicket:
+        if self.in_flight < int(self.limit) and not self._waiting:
+            return self._grant(key)
+
+        if self._waiting >= self.max_queue_size:
+            self.stats["rejected_queue_full"] += 1
+            raise AdmissionRejected("Node is overloaded, queue is full", self._retry_after())
+
+        tag = max(self._virtual_time, self._last_tag.get(key, 0.0)) + 1.0 / max(self.weight(key), 0.01)
+        self._last_tag[key] = tag
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (tag, next(self._sequence), future))
+        self._waiting += 1
+        self.stats["queued"] += 1
+        emit_progress(PROGRESS_QUEUED, queue_position=self._waiting)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_queue_wait)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._waiting -= 1
+                self.stats["rejected_timeout"] += 1
+                raise AdmissionRejected("Node is overloaded, queue wait exceeded", self._retry_after())
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+                self._waiting -= 1
+            elif not future.cancelled():
+                # Granted while the caller went away, hand the slot on
+                self.in_flight -= 1
+                self._pump()
+            raise
+        return AdmissionTicket(key)
+
+    def release(self, ticket: AdmissionTicket) -> None:
+        self.in_flight -= 1
+        if ticket.code is not None:
+            self._update_limit(ticket.key, time.perf_counter() - ticket.granted_at, ticket.code)
+        self._pump()
+
+    def observe_backlog(self, running: int) -> None:
+        """Shrink the limit when the provers run far more tasks than this node admitted."""
+        if running > self.in_flight + max(2, self.limit / 2):
+            self._decrease()
+            self._pump()
+
+    async def run(self, node_load, interval: float = 5.0) -> None:
+        """Feed the prover-reported running tasks into the limit."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                counts = await node_load.running_tasks()
+                self.observe_backlog(sum(count or 0 for count in counts.values()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"[Admission] - Failed to observe prover backlog: {e}")
+
+    def _grant(self, key: str) -> AdmissionTicket:
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        return AdmissionTicket(key)
+
+    def _pump(self) -> None:
+        while self._queue and self.in_flight < int(self.limit):
+            tag, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._virtual_time = tag
+            self._waiting -= 1
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            future.set_result(None)
+
+    def _update_limit(self, key: str, latency: float, code: int) -> None:
+        if code == STATUS_CODE_PROVER_NOT_RESPONSE:
+            self._decrease()
+            return
+        if code != STATUS_CODE_SUCCESSFULLY:
+            # Other failures, the request running out of its own deadline included, say nothing about capacity
+            return
+
+        self._latency = latency if not self._latency else 0.9 * self._latency + 0.1 * latency
+        baseline = self._baseline.get(key)
+        # The baseline tracks the best latency and drifts up slowly to follow the circuit
+        baseline = latency if baseline is None else min(latency, baseline * (1 + self.baseline_drift))
+        self._baseline[key] = baseline
+
+        if latency > baseline * self.latency_tolerance:
+            self._decrease()
+        elif self.limit < self.max_limit and self.in_flight + 1 >= int(self.limit):
+            # Grow only while the limit is actually reached
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.stats["limit_increase"] += 1
+
+    def _decrease(self) -> None:
+        limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        if limit < self.limit:
+            self.limit = limit
+            self.stats["limit_decrease"] += 1
+
+    def _retry_after(self) -> int:
+        """Rough time until the queue drains, between one second and `_MAX_RETRY_AFTER`."""
+        per_slot = self._latency or 1.0
+        return min(self._MAX_RETRY_AFTER, max(1, round((self._waiting + 1) * per_slot / max(self.limit, 1.0))))
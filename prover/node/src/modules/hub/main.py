@@ -1,22 +1,39 @@
 import asyncio
 import aiohttp
-import aiofiles
 import logging
 import os
-from modules.encryptor import RSAEncryption
+import time
+from modules.key_cache import KeyCache
+from modules.node_load import NodeLoad
 import config
 from utils.constant import CLI_LOGGER
 from utils.tls import aiohttp_ssl_param
-from typing import List
+from utils.trace_util import trace_headers
+from typing import List, Optional
 import ujson
 
 logger = logging.getLogger(CLI_LOGGER)
 
 class Hub:
+    _REQUEST_TIMEOUT = 30
+
     def __init__(self, hub_api: str, session_key_path: str, config:config.NodeConfig):
         self.hub_api = hub_api
         self.session_key_path = session_key_path
+        self.session_key = KeyCache(public_key_path=session_key_path)
         self.config = config
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the persistent session shared by all hub requests."""
+        if self._session is None or self._session.closed:
+            timeout = aiohttp.ClientTimeout(total=self._REQUEST_TIMEOUT)
+            self._session = aiohttp.ClientSession(timeout=timeout)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
 
     def _node_register_headers(self) -> dict:
         token = getattr(self.config.Env, "node_register_token", "") or os.getenv("NODE_REGISTER_TOKEN", "")
@@ -30,17 +47,15 @@ class Hub:
             getattr(self.config.Env, "tls_certfile", ""),
         )
 
-    async def send_result(self, project_name: str, proof_hash: str, duration: int, verifiers: List[str]) -> None:
+    async def send_result(self, project_name: str, proof_hash: str, duration: int, verifiers: List[str]) -> bool:
         hub_api = f"{self.hub_api}/api/v1/hub/result"
 
         try:
-            async with aiofiles.open(self.session_key_path, mode='r') as file:
-                session_key = await file.read()
+            encryptor = await self.session_key.get_encryptor()
         except FileNotFoundError:
             logger.error("[API] - Session key file not found.")
-            return
+            return False
         
-        encryptor = RSAEncryption(public_key=session_key)
         encrypted_project_name = encryptor.encrypt(project_name)
         encrypted_proof_hash = encryptor.encrypt(proof_hash)
         encrypted_duration = encryptor.encrypt(str(duration))
@@ -53,36 +68,36 @@ class Hub:
             "verifiers": encrypted_verifiers
         }
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                response = await session.post(
-                    hub_api,
-                    json=body,
-                    proxy=self.config.Env.proxy,
-                    ssl=self._request_ssl(),
-                )
+        try:
+            async with self._get_session().post(
+                hub_api,
+                json=body,
+                headers=trace_headers(),
+                proxy=self.config.Env.proxy,
+                ssl=self._request_ssl(),
+            ) as response:
                 if response.status == 200:
                     logger.info("[Result] - Successfully sent result to the hub.")
-                else:
-                    logger.error(f"[Result] - Failed to send result. Status: {response.status}")
-                    response_text = await response.text()
-                    logger.error(f"[Result] - Response: {response_text}")
-            except aiohttp.ClientError as e:
-                logger.error(f"[Result] - An error occurred: {e}")
-            except Exception as e:
-                logger.error(f"[Result] - Unexpected error: {e}")
+                    return True
+                logger.error(f"[Result] - Failed to send result. Status: {response.status}")
+                response_text = await response.text()
+                logger.error(f"[Result] - Response: {response_text}")
+                return False
+        except aiohttp.ClientError as e:
+            logger.error(f"[Result] - An error occurred: {e}")
+        except Exception as e:
+            logger.error(f"[Result] - Unexpected error: {e}")
+        return False
 
     async def update_verifier(self, proof_hash: str, verifiers: List[str]) -> None:
         hub_api = f"{self.hub_api}/api/v1/hub/verifier"
 
         try:
-            async with aiofiles.open(self.session_key_path, mode='r') as file:
-                session_key = await file.read()
+            encryptor = await self.session_key.get_encryptor()
         except FileNotFoundError:
             logger.error("[API] - Session key file not found.")
             return
         
-        encryptor = RSAEncryption(public_key=session_key)
         encrypted_proof_hash = encryptor.encrypt(proof_hash)
         encrypted_verifiers = encryptor.encrypt(ujson.dumps(verifiers))
 
@@ -91,14 +106,14 @@ class Hub:
             "verifiers": encrypted_verifiers
         }
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                response = await session.put(
-                    hub_api,
-                    json=body,
-                    proxy=self.config.Env.proxy,
-                    ssl=self._request_ssl(),
-                )
+        try:
+            async with self._get_session().put(
+                hub_api,
+                json=body,
+                headers=trace_headers(),
+                proxy=self.config.Env.proxy,
+                ssl=self._request_ssl(),
+            ) as response:
                 if response.status == 200:
                     logger.info("[update_verifier] - Successfully update verifier to the hub.")
                     return True
@@ -107,51 +122,87 @@ class Hub:
                     response_text = await response.text()
                     logger.error(f"[update_verifier] - Response: {response_text}")
                     return False
-            except aiohttp.ClientError as e:
-                logger.error(f"[update_verifier] - An error occurred: {e}")
-                return False
-            except Exception as e:
-                logger.error(f"[update_verifier] - Unexpected error: {e}")
-                return False
-
-    async def send_heartbeat(self, interval: int = 10) -> None:
-        hub_api = f"{self.hub_api}/api/v1/hub/node"
-        logger.info(f"[Heartbeat] - Starting heartbeat to {hub_api} every {interval} seconds.")
+        except aiohttp.ClientError as e:
+            logger.error(f"[update_verifier] - An error occurred: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"[update_verifier] - Unexpected error: {e}")
+            return False
+
+    async def _post_heartbeat(self, hub_api: str, body: dict, headers: dict) -> bool:
         try:
-            async with aiofiles.open(self.session_key_path, mode='r') as file:
-                session_key = await file.read()
-        except FileNotFoundError:
-            logger.error("[API] - Session key file not found.")
-            return
-        encryptor = RSAEncryption(public_key=session_key)
-
-        grpc_info = encryptor.encrypt(self.config.Hub.Info.grpc)
-        http_info = encryptor.encrypt(self.config.Hub.Info.http)
-        body = {"grpc_info": grpc_info, "http_info": http_info}
+            async with self._get_session().post(
+                hub_api,
+                json=body,
+                headers=headers,
+                proxy=self.config.Env.proxy,
+                ssl=self._request_ssl(),
+            ) as response:
+                if response.status == 200:
+                    logger.info("[Heartbeat] - Successfully sent heartbeat to the hub.")
+                    return True
+                logger.error(f"[Heartbeat] - Failed to send heartbeat. Status: {response.status}")
+                response_text = await response.text()
+                logger.error(f"[Heartbeat] - Response: {response_text}")
+        except aiohttp.ClientError as e:
+            logger.error(f"[Heartbeat] - An error occurred: {e}")
+        except Exception as e:
+            logger.error(f"[Heartbeat] - Unexpected error: {e}")
+        return False
+
+    async def send_heartbeat(
+        self,
+        node_load: Optional[NodeLoad] = None,
+        min_interval: int = 5,
+        max_interval: int = 120,
+        change_threshold: float = 0.25,
+    ) -> None:
+        """
+        Register the node with the hub and keep advertising its load.
+
+        The load is sampled every `min_interval` seconds. A heartbeat is sent
+        right away when the load moved by more than `change_threshold` since the
+        last heartbeat, otherwise the interval doubles up to `max_interval`
+        while the node stays stable.
+        """
+        hub_api = f"{self.hub_api}/api/v1/hub/node"
+        logger.info(f"[Heartbeat] - Starting heartbeat to {hub_api} every {min_interval}-{max_interval} seconds.")
         headers = self._node_register_headers()
 
         if not headers:
             logger.warning("[Heartbeat] - NODE_REGISTER_TOKEN is empty; hub registration may be rejected.")
 
+        interval = min_interval
+        last_attempt_at = 0.0
+        last_total: Optional[int] = None
         while True:
-            async with aiohttp.ClientSession() as session:
+            load = await node_load.snapshot() if node_load else None
+            total = NodeLoad.total(load) if load else 0
+            changed = last_total is not None and abs(total - last_total) > max(1, change_threshold * last_total)
+            due = time.monotonic() - last_attempt_at >= interval
+
+            if due or changed:
+                last_attempt_at = time.monotonic()
                 try:
-                    response = await session.post(
-                        hub_api,
-                        json=body,
-                        headers=headers,
-                        proxy=self.config.Env.proxy,
-                        ssl=self._request_ssl(),
-                    )
-                    if response.status == 200:
-                        logger.info("[Heartbeat] - Successfully sent heartbeat to the hub.")
-                    else:
-                        logger.error(f"[Heartbeat] - Failed to send heartbeat. Status: {response.status}")
-                        response_text = await response.text()
-                        logger.error(f"[Heartbeat] - Response: {response_text}")
-                except aiohttp.ClientError as e:
-                    logger.error(f"[Heartbeat] - An error occurred: {e}")
-                except Exception as e:
-                    logger.error(f"[Heartbeat] - Unexpected error: {e}")
-
-                await asyncio.sleep(interval)
+                    encryptor = await self.session_key.get_encryptor()
+                except FileNotFoundError:
+                    logger.error("[API] - Session key file not found.")
+                    await asyncio.sleep(min_interval)
+                    continue
+
+                body = {
+                    "grpc_info": encryptor.encrypt(self.config.Hub.Info.grpc),
+                    "http_info": encryptor.encrypt(self.config.Hub.Info.http),
+                }
+                if load is not None:
+                    body["load"] = load
+
+                if await self._post_heartbeat(hub_api, body, headers):
+                    interval = min_interval if changed else min(interval * 2, max_interval)
+                    last_total = total
+                else:
+                    # Back off while the hub is unreachable, load changes alone do not retry
+                    interval = min(interval * 2, max_interval)
+                    last_total = None
+
+            await asyncio.sleep(min_interval)
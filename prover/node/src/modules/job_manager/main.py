@@ -0,0 +1,340 @@
+import asyncio
+import base64
+import contextvars
+import fnmatch
+import ipaddress
+import logging
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+from modules.admission import AdmissionController, AdmissionRejected
+from modules.job_manager.shared import SharedJobStore
+from utils.constant import JOB_STATUS_QUEUED, JOB_STATUS_RUNNING, JOB_STATUS_DONE
+
+_RESULT_FIELDS = ("code", "msg", "proof", "proof_solidity", "proof_bytes", "public_witness", "public_witness_bytes")
+
+
+class Job:
+    """A prove request running in the background, readable until its retention expires."""
+
+    def __init__(self, callback_url: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.status = JOB_STATUS_QUEUED
+        self.callback_url = callback_url
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        """A job of another worker, read back from its `to_dict(encode_bytes=False)`."""
+        job = cls()
+        job.id = data["job_id"]
+        job.status = data["status"]
+        job.error = data.get("error")
+        job.created_at = data["created_at"]
+        job.started_at = data["started_at"]
+        job.finished_at = data["finished_at"]
+        if data.get("result") is not None:
+            job.result = SimpleNamespace(**data["result"])
+        if job.status == JOB_STATUS_DONE:
+            job.done.set()
+        return job
+
+    def mark_running(self) -> None:
+        self.status = JOB_STATUS_RUNNING
+        self.started_at = time.time()
+
+    def to_dict(self, encode_bytes: bool = True) -> Dict[str, Any]:
+        """JSON view of the job, bytes of the result are Base85 encoded like the prove responses unless `encode_bytes` is False."""
+        data: Dict[str, Any] = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if self.result is not None:
+            result = {}
+            for name in _RESULT_FIELDS:
+                value = getattr(self.result, name, None)
+                result[name] = base64.b85encode(value).decode("utf-8") if encode_bytes and isinstance(value, bytes) else value
+            data["result"] = result
+        return data
+
+
+class _CallbackResolver(AbstractResolver):
+    """Resolver of the callback session, fails a host resolving to an address callbacks may not reach."""
+
+    def __init__(self, address_allowed: Callable[[str], bool]):
+        self._resolver = DefaultResolver()
+        self._address_allowed = address_allowed
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> List[Dict[str, Any]]:
+        hosts = await self._resolver.resolve(host, port, family)
+        for resolved in hosts:
+            if not self._address_allowed(resolved["host"]):
+                raise OSError(f"Callback host {host} resolves to the disallowed address {resolved['host']}")
+        return hosts
+
+    async def close(self) -> None:
+        await self._resolver.close()
+
+
+class JobManager:
+    """
+    Background prove jobs: submit returns at once, the result is polled,
+    long-polled or POSTed to a callback URL.
+
+    Jobs run in their own task, detached from the submitting request and its
+    deadline, and stay readable for `retention` seconds once done. A job stays
+    queued while it waits for admission and is running once admitted. At most
+    `max_jobs` unfinished jobs are accepted; past that submit raises
+    AdmissionRejected like an overloaded prove call.
+
+    Callbacks go to http(s) URLs whose host matches `callback_allowed_hosts`,
+    "*.example.com" style patterns included, and only to public addresses:
+    a private, loopback or otherwise non-global address, literal or resolved,
+    has to lie in `callback_allowed_networks`. Redirects are not followed.
+
+    With a `store` the node runs several workers: a job still runs in the
+    worker that accepted it, which writes its state to the store, and a poll
+    reaching another worker reads it from there. Unfinished jobs of a worker
+    that exited are marked failed.
+    """
+
+    _CALLBACK_TIMEOUT = 10
+    _POLL_INTERVAL = 0.25
+    _PERSIST_ATTEMPTS = 5
+
+    def __init__(
+        self,
+        retention: float = 600,
+        max_jobs: int = 10000,
+        max_queue_time: float = 300,
+        callback_attempts: int = 3,
+        callback_allowed_hosts: Sequence[str] = (),
+        callback_allowed_networks: Sequence[str] = (),
+        store: Optional[SharedJobStore] = None,
+    ):
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self.max_queue_time = max_queue_time
+        self.callback_attempts = callback_attempts
+        self.callback_allowed_hosts = [host.lower() for host in callback_allowed_hosts]
+        self.callback_allowed_networks = [ipaddress.ip_network(network, strict=False) for network in callback_allowed_networks]
+        self.store = store
+        self.jobs: Dict[str, Job] = {}
+        self._pending = 0
+        self._tasks = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "expired": 0,
+            "callbacks_sent": 0,
+            "callbacks_failed": 0,
+            "callbacks_rejected": 0,
+        }
+
+    def _address_allowed(self, address: str) -> bool:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        if any(ip in network for network in self.callback_allowed_networks):
+            return True
+        return ip.is_global and not ip.is_multicast
+
+    def check_callback_url(self, callback_url: str) -> Optional[str]:
+        """Why `callback_url` may not be called back, None when it may; the resolved addresses are checked again on each callback."""
+        try:
+            url = urlsplit(callback_url)
+            host = (url.hostname or "").lower()
+            url.port  # raises on an out of range port
+        except ValueError:
+            return "Callback URL is malformed"
+        if url.scheme not in ("http", "https") or not host:
+            return "Callback URL must be an http(s) URL"
+        if url.username is not None or url.password is not None:
+            return "Callback URL must not carry credentials"
+        if not any(fnmatch.fnmatchcase(host, pattern) for pattern in self.callback_allowed_hosts):
+            self.stats["callbacks_rejected"] += 1
+            return f"Callback host {host} is not allowed"
+        try:
+            allowed = self._address_allowed(host)
+        except ValueError:
+            return None
+        if not allowed:
+            self.stats["callbacks_rejected"] += 1
+            return f"Callback address {host} is not allowed"
+        return None
+
+    def ensure_capacity(self) -> None:
+        """Raise AdmissionRejected when no job can be submitted, checked before a proof hash is claimed for one."""
+        if self._pending >= self.max_jobs:
+            raise AdmissionRejected("Node is overloaded, too many pending jobs", 1)
+
+    def submit(self, work: Callable[[Job], Awaitable[Any]], callback_url: Optional[str] = None) -> Job:
+        """Start `work(job)` in the background; it calls `job.mark_running()` once admitted."""
+        self.ensure_capacity()
+        job = Job(callback_url)
+        if self.store is not None:
+            self.store.put(job.id, job.to_dict(encode_bytes=False))
+        self.jobs[job.id] = job
+        self._pending += 1
+        self.stats["submitted"] += 1
+        # A fresh context keeps the submitting request's deadline away from the job
+        task = asyncio.get_running_loop().create_task(self._run(job, work), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    @asynccontextmanager
+    async def admit(self, job: Job, admission: AdmissionController, key: str):
+        """
+        Admission for a job: a job has no client waiting on the connection, so
+        a rejection is retried after its hint for up to `max_queue_time` seconds.
+        """
+        deadline = time.monotonic() + self.max_queue_time
+        while True:
+            try:
+                ticket = await admission.acquire(key)
+                break
+            except AdmissionRejected as e:
+                if time.monotonic() + e.retry_after > deadline:
+                    raise
+                await asyncio.sleep(e.retry_after)
+        job.mark_running()
+        if self.store is not None:
+            try:
+                self.store.put(job.id, job.to_dict(encode_bytes=False))
+            except AdmissionRejected:
+                # Polls of other workers see it queued until it is done
+                pass
+        try:
+            yield ticket
+        finally:
+            admission.release(ticket)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None and self.store is not None:
+            data = self.store.get(job_id)
+            if data is not None:
+                job = Job.from_dict(data)
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Return the job once done or after `timeout` seconds, whichever comes first."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            # A job of another worker is polled in the store
+            job = self.get(job_id)
+            deadline = time.monotonic() + timeout
+            while job is not None and job.status != JOB_STATUS_DONE and time.monotonic() < deadline:
+                await asyncio.sleep(max(0.0, min(self._POLL_INTERVAL, deadline - time.monotonic())))
+                job = self.get(job_id)
+            return job
+        if timeout <= 0:
+            return job
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[Any]]) -> None:
+        try:
+            job.result = await work(job)
+            self.stats["completed"] += 1
+        except Exception as e:
+            job.error = getattr(e, "msg", None) or str(e) or type(e).__name__
+            self.stats["failed"] += 1
+            logging.warning(f"[JobManager] - Job {job.id} failed: {job.error}")
+        finally:
+            self._pending -= 1
+            job.status = JOB_STATUS_DONE
+            job.finished_at = time.time()
+            job.done.set()
+        if self.store is not None:
+            await self._persist(job)
+        if job.callback_url:
+            await self._send_callback(job)
+
+    async def _persist(self, job: Job) -> None:
+        for attempt in range(self._PERSIST_ATTEMPTS):
+            try:
+                self.store.put(job.id, job.to_dict(encode_bytes=False))
+                return
+            except AdmissionRejected:
+                await asyncio.sleep(0.05 * 2 ** attempt)
+        logging.warning(f"[JobManager] - Job {job.id} could not be written to the job store")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(resolver=_CallbackResolver(self._address_allowed))
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self._CALLBACK_TIMEOUT))
+        return self._session
+
+    async def _send_callback(self, job: Job) -> None:
+        reason = self.check_callback_url(job.callback_url)
+        if reason is not None:
+            logging.warning(f"[JobManager] - Callback of job {job.id} skipped: {reason}")
+            self.stats["callbacks_failed"] += 1
+            return
+        body = job.to_dict()
+        for attempt in range(self.callback_attempts):
+            try:
+                async with self._get_session().post(job.callback_url, json=body, allow_redirects=False) as response:
+                    if response.status < 300:
+                        self.stats["callbacks_sent"] += 1
+                        return
+                    logging.warning(f"[JobManager] - Callback of job {job.id} returned {response.status}")
+            except Exception as e:
+                logging.warning(f"[JobManager] - Callback of job {job.id} failed: {e}")
+            await asyncio.sleep(2 ** attempt)
+        self.stats["callbacks_failed"] += 1
+
+    def prune(self) -> None:
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+        self.stats["expired"] += len(expired)
+        if self.store is not None:
+            try:
+                self.store.delete_finished(cutoff)
+                for job_id, data in self.store.orphans():
+                    self.store.fail(job_id, data, "Worker of the job exited")
+            except AdmissionRejected:
+                pass
+
+    async def run(self) -> None:
+        """Drop finished jobs past their retention until cancelled."""
+        interval = max(1.0, self.retention / 10)
+        while True:
+            await asyncio.sleep(interval)
+            self.prune()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": self._pending, "retained": len(self.jobs)}
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import msgpack
+
+from modules.admission import AdmissionRejected
+from utils.constant import JOB_STATUS_DONE
+
+
+class SharedJobStore:
+    """
+    Job states of a node running several worker processes.
+
+    A job runs in the worker that accepted it while its polls may reach any
+    worker, so each worker writes the state of its jobs to a SQLite table and
+    reads the jobs of the others from it. Like SharedProofManager a statement
+    waits at most `_BUSY_TIMEOUT` for another worker's write and is turned
+    away with AdmissionRejected past that.
+    """
+    _BUSY_TIMEOUT = 0.01
+
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self.owner = os.getpid()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_path, timeout=self._BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, owner INTEGER NOT NULL, finished_at REAL, data BLOB NOT NULL)"
+        )
+        self.busy = 0
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            try:
+                return self._conn.execute(sql, params)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                self.busy += 1
+                raise AdmissionRejected("Node is busy, the job store is locked", 1) from e
+
+    def put(self, job_id: str, data: Dict[str, Any]) -> None:
+        """Write the state of a job of this worker, `data` as returned by Job.to_dict(encode_bytes=False)."""
+        self._execute(
+            "INSERT OR REPLACE INTO jobs (job_id, owner, finished_at, data) VALUES (?, ?, ?, ?)",
+            (job_id, self.owner, data.get("finished_at"), msgpack.packb(data, use_bin_type=True)),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return msgpack.unpackb(row[0], raw=False) if row is not None else None
+
+    def delete_finished(self, cutoff: float) -> int:
+        """Drop the jobs of every worker finished before `cutoff`."""
+        return self._execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)).rowcount
+
+    def orphans(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Unfinished jobs of workers that exited, they will never finish."""
+        rows = self._execute("SELECT job_id, owner, data FROM jobs WHERE finished_at IS NULL AND owner != ?", (self.owner,)).fetchall()
+        orphans = []
+        for job_id, owner, data in rows:
+            try:
+                os.kill(owner, 0)
+            except ProcessLookupError:
+                orphans.append((job_id, msgpack.unpackb(data, raw=False)))
+            except PermissionError:
+                pass
+        return orphans
+
+    def fail(self, job_id: str, data: Dict[str, Any], error: str) -> None:
+        """Mark an orphaned job failed, so its pollers stop waiting."""
+        data = {**data, "status": JOB_STATUS_DONE, "error": error, "finished_at": time.time()}
+        self._execute(
+            "UPDATE jobs SET finished_at = ?, data = ? WHERE job_id = ? AND finished_at IS NULL",
+            (data["finished_at"], msgpack.packb(data, use_bin_type=True), job_id),
+        )
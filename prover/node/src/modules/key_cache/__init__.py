@@ -0,0 +1,3 @@
+from .main import *
+
+__all__ = [name for name in dir() if name[0].isupper()]
\ No newline at end of file
@@ -0,0 +1,47 @@
+import asyncio
+import aiofiles
+import aiofiles.os
+from typing import Optional, Tuple
+
+from modules.encryptor import RSAEncryption
+
+class KeyCache:
+    """
+    RSA key caching based on file mtime:
+    - Cache after the first read
+    - Hot update when private/public key file mtime changes
+    - Either path may be empty when only one half of the pair is needed
+    """
+    def __init__(self, public_key_path: str = "", private_key_path: str = ""):
+        self._public_key_path = public_key_path
+        self._private_key_path = private_key_path
+        self._lock = asyncio.Lock()
+        self._cache: Optional[Tuple[float, float, RSAEncryption]] = None
+
+    async def _mtime(self, path: str) -> float:
+        if not path:
+            return 0.0
+        stat = await aiofiles.os.stat(path)
+        return stat.st_mtime
+
+    async def _read(self, path: str) -> str:
+        if not path:
+            return ""
+        async with aiofiles.open(path, mode="r") as f:
+            return await f.read()
+
+    async def get_encryptor(self) -> RSAEncryption:
+        async with self._lock:
+            pub_mtime = await self._mtime(self._public_key_path)
+            priv_mtime = await self._mtime(self._private_key_path)
+
+            if self._cache and self._cache[0] == pub_mtime and self._cache[1] == priv_mtime:
+                return self._cache[2]
+
+            public_key = await self._read(self._public_key_path)
+            private_key = await self._read(self._private_key_path)
+
+            # Parsing an RSA private key takes tens of milliseconds, too long for the loop
+            encryptor = await asyncio.to_thread(RSAEncryption, public_key=public_key, private_key=private_key)
+            self._cache = (pub_mtime, priv_mtime, encryptor)
+            return encryptor
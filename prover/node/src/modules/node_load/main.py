@@ -0,0 +1,161 @@
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from modules.admission import AdmissionController
+from modules.node_load.shared import SharedLoadStore
+from modules.prover import Prover
+from utils.constant import STATUS_CODE_SUCCESSFULLY
+from utils.metrics_util import Histogram, LatencyWindow
+
+
+class NodeLoad:
+    """
+    Live capacity of the node as advertised to the hub.
+
+    Tracks the prove requests currently handled by the node and a sliding
+    window of successful prove latencies, and asks every prover backend for
+    the number of tasks it is running when a snapshot is taken.
+
+    With a `store` the node runs several workers: each one publishes its
+    queue depth and latencies there, and the snapshot of the worker sending
+    heartbeats covers all of them. The prover backends are shared by the
+    workers, their running tasks are counted once.
+
+    The prover and circuit labels of the latency histogram come from the
+    requests, the ids outside `provers` and `circuit_templates` are
+    labelled "other".
+    """
+
+    _PROVER_TIMEOUT = 2
+    # Heartbeat intervals a worker's published load counts for
+    _STORE_MAX_AGE = 3
+
+    def __init__(
+        self,
+        provers: Dict[str, Prover],
+        circuit_templates: List[str],
+        window_size: int = 512,
+        admission: Optional[AdmissionController] = None,
+        store: Optional[SharedLoadStore] = None,
+    ):
+        self.provers = provers
+        self.circuit_templates = circuit_templates
+        self.admission = admission
+        self.store = store
+        self._store_max_age = 0.0
+        self.in_flight = 0
+        self.latency = LatencyWindow(window_size)
+        self.prove_latency = Histogram(("prover", "circuit_template_id", "outcome"))
+
+    def begin(self) -> float:
+        self.in_flight += 1
+        return time.perf_counter()
+
+    def end(self, started_at: float, success: bool, prover: Optional[str] = None, circuit_template_id: Optional[str] = None) -> None:
+        self.in_flight -= 1
+        elapsed = time.perf_counter() - started_at
+        if success:
+            self.latency.observe(elapsed)
+        self.prove_latency.observe(
+            elapsed,
+            self._label(prover, self.provers),
+            self._label(circuit_template_id, self.circuit_templates),
+            "success" if success else "failure",
+        )
+
+    @staticmethod
+    def _label(value: Optional[str], known) -> str:
+        if not value:
+            return ""
+        return value if value in known else "other"
+
+    async def _running_tasks(self, name: str, prover: Prover) -> Optional[int]:
+        try:
+            code, msg, count = await asyncio.wait_for(prover.get_running_prove_tasks(), self._PROVER_TIMEOUT)
+        except Exception as e:
+            logging.warning(f"[NodeLoad] - Failed to query running tasks of {name}: {e}")
+            return None
+        if code != STATUS_CODE_SUCCESSFULLY:
+            logging.warning(f"[NodeLoad] - Failed to query running tasks of {name}: {msg}")
+            return None
+        return count
+
+    async def running_tasks(self) -> Dict[str, Optional[int]]:
+        names = list(self.provers)
+        counts = await asyncio.gather(*(self._running_tasks(name, self.provers[name]) for name in names))
+        return dict(zip(names, counts))
+
+    def queue_depth(self) -> int:
+        """Prove requests served or waiting for admission in this worker."""
+        return self.in_flight + (self.admission.queue_size if self.admission else 0)
+
+    async def run(self, interval: float = 5.0) -> None:
+        """Publish the load of this worker every `interval` seconds until cancelled, when the node runs several workers."""
+        if self.store is None:
+            return
+        self._store_max_age = self._STORE_MAX_AGE * interval
+        while True:
+            try:
+                self.store.publish(self.queue_depth(), self.latency.samples(), self._store_max_age)
+            except Exception as e:
+                logging.warning(f"[NodeLoad] - Failed to publish the worker load: {e}")
+            await asyncio.sleep(interval)
+
+    async def snapshot(self) -> Dict[str, Any]:
+        running_tasks = await self.running_tasks()
+        queue_depth = self.queue_depth()
+        latency = self.latency
+        if self.store is not None and self._store_max_age:
+            try:
+                others, samples = self.store.others(self._store_max_age)
+            except Exception as e:
+                logging.warning(f"[NodeLoad] - Failed to read the load of the other workers: {e}")
+            else:
+                queue_depth += others
+                if samples:
+                    latency = LatencyWindow(len(self.latency) + len(samples))
+                    for sample in self.latency.samples() + samples:
+                        latency.observe(sample)
+        p50 = latency.percentile(50)
+        p95 = latency.percentile(95)
+        return {
+            "running_tasks": running_tasks,
+            "queue_depth": queue_depth,
+            "circuit_templates": self.circuit_templates,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+    @staticmethod
+    def total(snapshot: Dict[str, Any]) -> int:
+        """Single load figure used to detect sharp changes between snapshots."""
+        running = sum(count or 0 for count in snapshot.get("running_tasks", {}).values())
+        return running + snapshot.get("queue_depth", 0)
+
+
+def track_load(func):
+    """
+    Record a prove call of a service holding `self.node_load` in the node load.
+
+    The prove methods all take (method, prover_id, circuit_template_id, ...),
+    which label the latency histogram.
+    """
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        node_load: Optional[NodeLoad] = getattr(self, "node_load", None)
+        if node_load is None:
+            return await func(self, *args, **kwargs)
+        started_at = node_load.begin()
+        success = False
+        try:
+            result = await func(self, *args, **kwargs)
+            success = getattr(result, "code", None) == STATUS_CODE_SUCCESSFULLY
+            return result
+        finally:
+            prover = args[1] if len(args) > 1 else kwargs.get("prover_id")
+            circuit_template_id = args[2] if len(args) > 2 else kwargs.get("circuit_template_id")
+            node_load.end(started_at, success, prover, circuit_template_id)
+    return wrapper
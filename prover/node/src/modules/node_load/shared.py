@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Tuple
+
+import msgpack
+
+
+class SharedLoadStore:
+    """
+    Load of every worker of a node running several worker processes.
+
+    Only the elected worker sends heartbeats, so each worker publishes its
+    queue depth and recent prove latencies to a SQLite table and the elected
+    one adds those of the others to its own. A worker that stops publishing
+    drops out once its row is older than `max_age`.
+    """
+    _BUSY_TIMEOUT = 0.01
+
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self.owner = os.getpid()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_path, timeout=self._BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS worker_load (owner INTEGER PRIMARY KEY, queue_depth INTEGER NOT NULL, latencies BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def publish(self, queue_depth: int, latencies: List[float], max_age: float) -> None:
+        """Write the load of this worker, dropping the rows of workers silent for `max_age` seconds."""
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO worker_load (owner, queue_depth, latencies, updated_at) VALUES (?, ?, ?, ?)",
+            (self.owner, queue_depth, msgpack.packb(latencies), now),
+        )
+        self._execute("DELETE FROM worker_load WHERE updated_at <= ?", (now - max_age,))
+
+    def others(self, max_age: float) -> Tuple[int, List[float]]:
+        """Queue depth summed and latencies joined over the other workers published within `max_age` seconds."""
+        rows = self._execute(
+            "SELECT queue_depth, latencies FROM worker_load WHERE owner != ? AND updated_at > ?",
+            (self.owner, time.time() - max_age),
+        ).fetchall()
+        latencies = []
+        for _, samples in rows:
+            latencies.extend(msgpack.unpackb(samples))
+        return sum(queue_depth for queue_depth, _ in rows), latencies
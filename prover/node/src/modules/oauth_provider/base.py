@@ -1,21 +1,275 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import asyncio
+import base64
 import ujson
 import os
+import re
+import time
 import logging
 import threading
 
+import aiofiles
+import aiohttp
+
 
 class OAuthProvider(ABC):
-    
+
     @abstractmethod
     def verify(self, input_data: str):
         pass
-    
+
     @abstractmethod
     def update_jwks(self):
         pass
 
 
+class JWKSProvider(OAuthProvider):
+    """
+    OAuth provider backed by a remote JWKS document.
+
+    The modulus of every key is decomposed into circom bigint limbs once, when
+    the JWKS is loaded, so verifying a payload is a single set lookup.
+    Refreshing is single-flight and follows the Cache-Control max-age of the
+    provider. Unknown moduli may trigger at most one refresh per
+    `min_refresh_interval` and are then remembered in a bounded negative cache,
+    so bad inputs cannot be turned into outbound HTTP calls.
+    """
+
+    name = "jwks"
+
+    _MAX_AGE_PATTERN = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+    _MAX_MAX_AGE = 24 * 3600
+    _FETCH_TIMEOUT = 10
+
+    def __init__(
+        self,
+        provider_api: str,
+        circom_bitint_n: int,
+        circom_bitint_k: int,
+        snapshot_path: str = "",
+        *,
+        default_max_age: int = 3600,
+        min_refresh_interval: int = 60,
+        negative_cache_ttl: int = 300,
+        negative_cache_size: int = 4096,
+    ):
+        if self._initialized == True:
+            return
+
+        self.provider_api = provider_api
+        self.circom_bigint_n = circom_bitint_n
+        self.circom_bigint_k = circom_bitint_k
+
+        self.snapshot_path = snapshot_path
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.negative_cache_ttl = negative_cache_ttl
+        self.negative_cache_size = negative_cache_size
+
+        self.jwks = None
+        self._limbs: FrozenSet[Tuple[str, ...]] = frozenset()
+        self._expires_at = 0.0
+        self._last_refresh_attempt = 0.0
+        self._refresh_task: Optional[asyncio.Future] = None
+        self._negative_cache: "OrderedDict[Tuple[str, ...], float]" = OrderedDict()
+
+        self.stats: Dict[str, int] = {
+            "refresh_success": 0,
+            "refresh_failure": 0,
+            "refresh_rate_limited": 0,
+            "negative_cache_hit": 0,
+        }
+
+        self._load_snapshot()
+        self._initialized = True
+
+    @abstractmethod
+    def _parse_jwks(self, data: Dict[str, Any]):
+        """Convert the raw provider response into a JWKS model."""
+
+    @property
+    def has_keys(self) -> bool:
+        return bool(self._limbs)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "keys": len(self._limbs),
+            "expires_in": self._expires_at - time.time() if self._expires_at else 0.0,
+            "negative_cache_size": len(self._negative_cache),
+        }
+
+    async def verify(self, input_data: str) -> bool:
+        """
+        Verify that the modulus in the input data belongs to a key of the provider.
+
+        Args:
+            input_data (str): The input data to be verified.
+
+        Returns:
+            bool: True if verification is successful, False otherwise.
+        """
+        limbs = self._parse_input_limbs(input_data)
+        if limbs is None:
+            return False
+        if limbs in self._limbs:
+            return True
+        if self._negative_cache_hit(limbs):
+            self.stats["negative_cache_hit"] += 1
+            return False
+
+        # The key may have just been rotated, refresh once per interval at most
+        if time.monotonic() - self._last_refresh_attempt >= self.min_refresh_interval:
+            try:
+                await self.update_jwks()
+            except Exception as e:
+                logging.warning(f"[{self.name}] - JWKS refresh on unknown modulus failed: {e}")
+            if limbs in self._limbs:
+                return True
+        else:
+            self.stats["refresh_rate_limited"] += 1
+
+        self._remember_negative(limbs)
+        return False
+
+    async def update_jwks(self):
+        """Fetch the JWKS, sharing a single in-flight request between all callers."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._fetch_jwks())
+        await asyncio.shield(self._refresh_task)
+
+    async def run_refresh(self):
+        """Keep the JWKS fresh in the background according to its max-age."""
+        failures = 0
+        while True:
+            if failures:
+                delay = min(self.min_refresh_interval * (2 ** failures), self.default_max_age)
+            else:
+                delay = max(self._expires_at - time.time(), self.min_refresh_interval)
+            await asyncio.sleep(delay)
+            try:
+                await self.update_jwks()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logging.error(f"[{self.name}] - Background JWKS refresh failed: {e}")
+
+    async def _fetch_jwks(self):
+        self._last_refresh_attempt = time.monotonic()
+        try:
+            timeout = aiohttp.ClientTimeout(total=self._FETCH_TIMEOUT)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(self.provider_api) as response:
+                    response.raise_for_status()  # Ensure HTTP status is successful (2xx)
+                    data = await response.json()
+                    max_age = self._parse_max_age(response.headers)
+            self._apply(data, max_age)
+        except Exception:
+            self.stats["refresh_failure"] += 1
+            raise
+        self.stats["refresh_success"] += 1
+        await self._save_snapshot(data, max_age)
+        logging.info(f"[{self.name}] - JWKS refreshed, {len(self._limbs)} keys, max-age {max_age}s")
+
+    def _apply(self, data: Dict[str, Any], max_age: int, fetched_at: Optional[float] = None):
+        jwks = self._parse_jwks(data)
+        self._limbs = frozenset(
+            tuple(self._to_circom_bigint_bytes(self._jwk_modulus(key.n))) for key in jwks.keys
+        )
+        self.jwks = jwks
+        self._expires_at = (fetched_at or time.time()) + max_age
+        # New keys may turn previously unknown moduli into valid ones
+        self._negative_cache.clear()
+
+    def _parse_max_age(self, headers) -> int:
+        match = self._MAX_AGE_PATTERN.search(headers.get("Cache-Control", ""))
+        if not match:
+            return self.default_max_age
+        max_age = int(match.group(1))
+        try:
+            max_age -= int(headers.get("Age", 0))
+        except ValueError:
+            pass
+        return min(max(max_age, self.min_refresh_interval), self._MAX_MAX_AGE)
+
+    def _parse_input_limbs(self, input_data: str) -> Optional[Tuple[str, ...]]:
+        try:
+            modulus = ujson.loads(input_data)['modulus']
+        except:
+            return None
+        if not isinstance(modulus, list) or not all(isinstance(limb, str) for limb in modulus):
+            return None
+        return tuple(modulus)
+
+    def _negative_cache_hit(self, limbs: Tuple[str, ...]) -> bool:
+        expiry = self._negative_cache.get(limbs)
+        if expiry is None:
+            return False
+        if expiry <= time.monotonic():
+            del self._negative_cache[limbs]
+            return False
+        return True
+
+    def _remember_negative(self, limbs: Tuple[str, ...]):
+        self._negative_cache[limbs] = time.monotonic() + self.negative_cache_ttl
+        self._negative_cache.move_to_end(limbs)
+        while len(self._negative_cache) > self.negative_cache_size:
+            self._negative_cache.popitem(last=False)
+
+    def _snapshot_file(self) -> Optional[str]:
+        if not self.snapshot_path:
+            return None
+        return os.path.join(self.snapshot_path, f"{self.name}.json")
+
+    def _load_snapshot(self):
+        """Load the last persisted JWKS so verification works before the first fetch."""
+        snapshot_file = self._snapshot_file()
+        if not snapshot_file or not os.path.exists(snapshot_file):
+            return
+        try:
+            with open(snapshot_file, 'r') as file:
+                snapshot = ujson.load(file)
+            self._apply(snapshot["data"], snapshot["max_age"], snapshot["fetched_at"])
+            logging.info(f"[{self.name}] - JWKS snapshot loaded from {snapshot_file}")
+        except Exception as e:
+            logging.error(f"[{self.name}] - Failed to load JWKS snapshot: {e}")
+
+    async def _save_snapshot(self, data: Dict[str, Any], max_age: int):
+        snapshot_file = self._snapshot_file()
+        if not snapshot_file:
+            return
+        snapshot = {"fetched_at": time.time(), "max_age": max_age, "data": data}
+        tmp_file = f"{snapshot_file}.tmp"
+        try:
+            os.makedirs(self.snapshot_path, exist_ok=True)
+            async with aiofiles.open(tmp_file, mode='w') as file:
+                await file.write(ujson.dumps(snapshot))
+            os.replace(tmp_file, snapshot_file)
+        except Exception as e:
+            logging.error(f"[{self.name}] - Failed to save JWKS snapshot: {e}")
+
+    @staticmethod
+    def _jwk_modulus(n: str) -> int:
+        n_bytes = base64.urlsafe_b64decode(n + "==")  # Fix base64 padding
+        return int.from_bytes(n_bytes, byteorder='big')
+
+    # Convert big integer to CIRCOM BigInt format
+    def _to_circom_bigint_bytes(self, num: int) -> List[str]:
+        msk = (1 << self.circom_bigint_n) - 1  # 2^CIRCOM_BIGINT_N - 1
+        res = []
+
+        for i in range(self.circom_bigint_k):
+            shifted = num >> (i * self.circom_bigint_n)
+            chunk = shifted & msk
+            res.append(str(chunk))
+
+        return res
+
+
 class OAuthProviderResolver:
     """
     Used to determine if a template_id is bound to an OAuthProvider,
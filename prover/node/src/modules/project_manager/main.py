@@ -1,13 +1,25 @@
+import asyncio
+import os
 import ujson
 import logging
 import threading
 
+import aiofiles
+import aiofiles.os
+
+ANONYMOUS_PROJECT = {"project_name": "Anonymous", "verifiers": ["Unknow"]}
+
+# Characters that may not appear in a plain trailing signal
+_NON_SCALAR = frozenset('[]{}"\\,')
+
 class ProjectManager:
     """
     Singleton manager for project configurations.
     
     Loads project information from a JSON file and provides methods
-    to retrieve project details by project ID.
+    to retrieve project details by project ID. The IDs are looked up in a
+    table holding both their plain and their encoded form, rebuilt by `run`
+    when the file changes.
     """
     _instance = None
     _locker = threading.Lock()
@@ -31,6 +43,8 @@ class ProjectManager:
 
         self.project_path = project_path
         self.projects = {}
+        self._table = {}
+        self._mtime = None
         self._load_projects()
         self._initialized = True
 
@@ -38,34 +52,94 @@ class ProjectManager:
         """Load project configurations from JSON file."""
         try:
             with open(self.project_path, 'r') as file:
-                self.projects = ujson.load(file)
+                self._mtime = os.fstat(file.fileno()).st_mtime
+                self._set_projects(ujson.load(file))
             logging.info("Projects loaded successfully.")
         except Exception as e:
             logging.error(f"Failed to load projects: {e}")
-            self.projects = {}
+            self._set_projects({})
+
+    def _set_projects(self, projects):
+        """Swap in the projects with their lookup table, built aside so readers never see a partial one."""
+        table = {}
+        for project_id, project in projects.items():
+            # Only 5 digit IDs are matched as they are, like the decoding below
+            if len(project_id) == 5:
+                table[project_id] = project
+            if project_id.isdigit():
+                # Circuits carry the ID as the decimal ASCII codes of its digits
+                table["".join(str(ord(char)) for char in project_id)] = project
+        self.projects = projects
+        self._table = table
 
+    async def reload_if_changed(self):
+        """Reload project.json when its mtime changed, keeping the current projects if it cannot be read."""
+        try:
+            mtime = (await aiofiles.os.stat(self.project_path)).st_mtime
+            if mtime == self._mtime:
+                return
+            async with aiofiles.open(self.project_path, mode='r') as file:
+                projects = ujson.loads(await file.read())
+        except Exception as e:
+            logging.error(f"Failed to reload projects: {e}")
+            return
+        self._mtime = mtime
+        self._set_projects(projects)
+        logging.info("Projects reloaded.")
 
+    async def run(self, interval: float = 5.0):
+        """Watch project.json until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.reload_if_changed()
 
     def get_project(self, project_id):
         """Retrieve details of a specific project based on project_id."""
+        project = self._table.get(str(project_id))
+        if project is not None:
+            return project
+        return self._decode_project(str(project_id))
+
+    def _decode_project(self, project_id):
+        """Slow path for IDs outside the table, e.g. encoded ones holding chunks that are not digits."""
         # Check if the project_id length is 5 digits
-        if len(str(project_id)) == 5:
-            # Directly match project in the projects dictionary
-            return self.projects.get(str(project_id), {"project_name": "Anonymous", "verifiers": ["Unknow"]})
-        else:
-            # If the project_id length is not 5, process it by splitting
-            if len(str(project_id)) % 2 != 0:
-                logging.warning(f"Project ID length is odd, unable to split correctly.")
-                return {"project_name": "Anonymous", "verifiers": ["Unknow"]}
-            
-            # Split the project_id into chunks of 2 characters each
-            clean_id = ""
-            for i in range(0, len(str(project_id)), 2):
-                chunk = str(project_id)[i:i+2]
-                try:
-                    char = int(chr(int(chunk)))
-                except Exception as e:
-                    continue
-                char = str(char)  # Convert the 2-character hex to character
-                clean_id += char
-            return self.projects.get(clean_id, {"project_name": "Anonymous", "verifiers": ["Unknow"]})
+        if len(project_id) == 5:
+            return ANONYMOUS_PROJECT
+        # If the project_id length is not 5, process it by splitting
+        if len(project_id) % 2 != 0:
+            logging.warning(f"Project ID length is odd, unable to split correctly.")
+            return ANONYMOUS_PROJECT
+
+        # Split the project_id into chunks of 2 characters each
+        clean_id = ""
+        for i in range(0, len(project_id), 2):
+            chunk = project_id[i:i+2]
+            try:
+                char = int(chr(int(chunk)))
+            except Exception as e:
+                continue
+            char = str(char)  # Convert the 2-character hex to character
+            clean_id += char
+        return self.projects.get(clean_id, ANONYMOUS_PROJECT)
+
+    def get_project_from_signals(self, signals):
+        """
+        Project of a proof from its public signals, a JSON array whose last element is the project ID.
+
+        Only the trailing element is parsed, the whole array is decoded only when it is not a plain scalar.
+        """
+        text = signals.rstrip()
+        start = max(text.rfind(",", 0, -1), text.rfind("[", 0, -1)) + 1
+        token = text[start:-1].strip() if text.endswith("]") else ""
+        if len(token) >= 2 and token[0] == '"' and token[-1] == '"':
+            token = token[1:-1]
+        if not token or not _NON_SCALAR.isdisjoint(token):
+            return self.get_project(ujson.loads(signals)[-1])
+        return self.get_project(token)
+
+    def get_weight(self, project_id) -> float:
+        """Scheduling weight of a project, `weight` in project.json, 1 by default."""
+        try:
+            return float(self.projects.get(str(project_id), {}).get("weight", 1))
+        except (TypeError, ValueError):
+            return 1.0
@@ -1,3 +1,4 @@
 from .main import *
+from .shared import *
 
 __all__ = [name for name in dir() if name[0].isupper()]
\ No newline at end of file
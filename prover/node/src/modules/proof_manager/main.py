@@ -4,6 +4,7 @@ import time
 import logging
 import threading
 from utils.constant import STATUS_CODE_TASK_INVALID, STATUS_CODE_TASK_NOT_FOUND, TASK_STATUS_PENGDING, TASK_STATUS_RUNNING
+from utils.trace_util import Tracer
 
 class ProofManager:
     _instance = None
@@ -27,6 +28,7 @@ class ProofManager:
         self._dirty = False
         self._stop_event = threading.Event()
         self._write_lock = threading.Lock()
+        self.stats = {"claimed": 0, "not_found": 0, "invalid": 0, "released": 0}
         self._start_background_flush()
         self._initialized = True
 
@@ -118,10 +120,23 @@ class ProofManager:
             self._save_cache()
 
     def claim_task(self, proof_hash: str) -> bool:
+        Tracer().link(proof_hash)
         status = self.get(proof_hash)
         if status is None:
+            self.stats["not_found"] += 1
             return STATUS_CODE_TASK_NOT_FOUND, "Proof hash does not exist"
         if status != TASK_STATUS_PENGDING:
+            self.stats["invalid"] += 1
             return STATUS_CODE_TASK_INVALID, "Proof hash is invalid"
         self.set(proof_hash, TASK_STATUS_RUNNING)
+        self.stats["claimed"] += 1
         return True, "Successfully"
+
+    def release_task(self, proof_hash: str) -> None:
+        """Hand a claimed proof hash back, for a request turned away before its proof started."""
+        if self.get(proof_hash) == TASK_STATUS_RUNNING:
+            self.set(proof_hash, TASK_STATUS_PENGDING)
+            self.stats["released"] += 1
+
+    def metrics(self):
+        return {**self.stats, "size": len(self.cache)}
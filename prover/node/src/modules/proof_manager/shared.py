@@ -0,0 +1,121 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from modules.admission import AdmissionRejected
+from utils.constant import STATUS_CODE_TASK_INVALID, STATUS_CODE_TASK_NOT_FOUND, TASK_STATUS_PENGDING, TASK_STATUS_RUNNING
+from utils.trace_util import Tracer
+
+
+class SharedProofManager:
+    """
+    ProofManager for a node running several worker processes.
+
+    A task pushed by the hub reaches one worker while its prove request may
+    reach another, so the tasks live in a SQLite database shared by the
+    workers instead of each process' memory. A claim is a single conditional
+    UPDATE, which SQLite serializes across processes: a proof hash is claimed
+    exactly once whichever worker serves it.
+
+    The statements run on the event loop, so a write waits at most
+    `_BUSY_TIMEOUT` for another worker's write to finish; past that the
+    request is turned away with AdmissionRejected, to be retried, instead of
+    stalling every request of the worker.
+    """
+    _instance = None
+    _locker = threading.Lock()
+    _CLEAN_INTERVAL = 60
+    _BUSY_TIMEOUT = 0.01
+
+    def __new__(cls, *args, **kwargs):
+        with cls._locker:
+            if cls._instance is None:
+                cls._instance = super(SharedProofManager, cls).__new__(cls)
+                cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, store_path):
+        if self._initialized == True:
+            return
+
+        self.store_path = store_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_path, timeout=self._BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tasks (proof_hash TEXT PRIMARY KEY, status INTEGER NOT NULL, expiry REAL)")
+        self._stop_event = threading.Event()
+        # Claims served by this worker
+        self.stats = {"claimed": 0, "not_found": 0, "invalid": 0, "released": 0}
+        # Statements turned away on a store locked by another worker
+        self.busy = 0
+        self._start_background_clean()
+        self._initialized = True
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            try:
+                return self._conn.execute(sql, params)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                self.busy += 1
+                raise AdmissionRejected("Node is busy, the task store is locked", 1) from e
+
+    def get(self, key):
+        row = self._execute(
+            "SELECT status FROM tasks WHERE proof_hash = ? AND (expiry IS NULL OR expiry > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, key, value, ttl=60):
+        expiry = time.time() + ttl if ttl is not None else None
+        self._execute("INSERT OR REPLACE INTO tasks (proof_hash, status, expiry) VALUES (?, ?, ?)", (key, value, expiry))
+
+    def clean_expired(self):
+        """Clean expired keys"""
+        deleted = self._execute("DELETE FROM tasks WHERE expiry IS NOT NULL AND expiry <= ?", (time.time(),)).rowcount
+        if deleted:
+            logging.info("Expired tasks cleaned: %d", deleted)
+
+    def _start_background_clean(self):
+        def _clean_loop():
+            while not self._stop_event.wait(self._CLEAN_INTERVAL):
+                try:
+                    self.clean_expired()
+                except Exception as e:
+                    logging.error("Background clean failed: %s", e)
+        t = threading.Thread(target=_clean_loop, daemon=True)
+        t.start()
+
+    def claim_task(self, proof_hash: str) -> bool:
+        # The push of the hash may have reached another worker, then only the proof_hash attribute joins the traces
+        Tracer().link(proof_hash)
+        now = time.time()
+        claimed = self._execute(
+            "UPDATE tasks SET status = ?, expiry = ? WHERE proof_hash = ? AND status = ? AND (expiry IS NULL OR expiry > ?)",
+            (TASK_STATUS_RUNNING, now + 60, proof_hash, TASK_STATUS_PENGDING, now),
+        ).rowcount
+        if claimed == 1:
+            self.stats["claimed"] += 1
+            return True, "Successfully"
+        if self.get(proof_hash) is None:
+            self.stats["not_found"] += 1
+            return STATUS_CODE_TASK_NOT_FOUND, "Proof hash does not exist"
+        self.stats["invalid"] += 1
+        return STATUS_CODE_TASK_INVALID, "Proof hash is invalid"
+
+    def release_task(self, proof_hash: str) -> None:
+        """Hand a claimed proof hash back, for a request turned away before its proof started."""
+        released = self._execute(
+            "UPDATE tasks SET status = ?, expiry = ? WHERE proof_hash = ? AND status = ?",
+            (TASK_STATUS_PENGDING, time.time() + 60, proof_hash, TASK_STATUS_RUNNING),
+        ).rowcount
+        if released == 1:
+            self.stats["released"] += 1
+
+    def metrics(self):
+        size = self._execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        return {**self.stats, "size": size, "busy": self.busy}
@@ -1,24 +1,24 @@
-import os
 import logging
-import aiofiles
 import time
 import threading
 import ujson
 
 from modules.project_manager import ProjectManager
-from modules.prover.circom import CircomProver, CircomResultV1
+from modules.prover.circom import CircomResultV1
 from modules.prover.private import PrivateProver
-from modules.encryptor import RSAEncryption
+from modules.key_cache import KeyCache
+from modules.prover import ProverRouter
+from modules.node_load import NodeLoad, track_load
 from modules.oauth_provider import OAuthProvider, OAuthProviderResolver
 
 from config import NodeConfig
 from utils.constant import PROVER_CIRCOM, PROVER_PRIVATE
 from utils.constant import TASK_TYPE_ZKLOGIN, TASK_TYPE_TIGA
-from utils.constant import PUBLIC_KEY, PRIVATE_KEY
 from utils.constant import STATUS_CODE_PRIVATE_KEY_INVALID, STATUS_CODE_PRIVATE_KEY_NOT_FOUND, STATUS_CODE_PUBLIC_KEY_NOT_FOUND, STATUS_CODE_PUBLIC_KEY_INVALID
 from utils.constant import STATUS_CODE_UNAUTHORIZED_PAYLOAD
 from utils.constant import STATUS_CODE_UNSUPPORT_TASK_TYPE, STATUS_CODE_UNSUPPORT_PROVER, STATUS_CODE_UNSUPPORT_OAUTH_PROVIDER
 from utils.constant import STATUS_CODE_SUCCESSFULLY, STATUS_CODE_ERROR
+from utils.trace_util import start_span
 
 from dataclasses import dataclass, field
 from typing import Any, List, Tuple, Optional, Dict
@@ -44,7 +44,7 @@ class ProveServiceV1:
                 cls._instance._initialized = False
         return cls._instance
 
-    def __init__(self, project_manager: ProjectManager, oauth_provider: Dict[str, OAuthProvider], oauth_provider_resolver: OAuthProviderResolver, config: NodeConfig):
+    def __init__(self, project_manager: ProjectManager, oauth_provider: Dict[str, OAuthProvider], oauth_provider_resolver: OAuthProviderResolver, config: NodeConfig, node_key: KeyCache, provers: Dict[str, ProverRouter], node_load: Optional[NodeLoad] = None):
         if self._initialized:
             return
         
@@ -52,6 +52,9 @@ class ProveServiceV1:
         self.oauth_provider = oauth_provider
         self.oauth_provider_resolver = oauth_provider_resolver
         self.config = config
+        self.node_key = node_key
+        self.provers = provers
+        self.node_load = node_load
 
         self._initialized = True
 
@@ -67,12 +70,10 @@ class ProveServiceV1:
         Returns:
             tuple: (Processed input data, Error message if any)
         """
-        private_key_path = os.path.join(self.config.Env.crypto_keys_path, PRIVATE_KEY)
         if is_encrypted:
             try:
-                # Asynchronously read the private key file
-                async with aiofiles.open(private_key_path, mode='r') as file:
-                    private_key = await file.read()
+                # The node key pair is cached and only reloaded when the files change
+                rsa_encryption = await self.node_key.get_encryptor()
             except FileNotFoundError:
                 logging.error("[process_input] - Private key file not found")
                 end_time = time.perf_counter()  # End timer
@@ -80,8 +81,8 @@ class ProveServiceV1:
                 return STATUS_CODE_PRIVATE_KEY_NOT_FOUND, "Private key file not found"
 
             # Decrypt the input data using RSA
-            rsa_encryption = RSAEncryption(private_key=private_key)
-            input_data = rsa_encryption.decrypt(input_data)
+            with start_span("decrypt"):
+                input_data = rsa_encryption.decrypt(input_data)
             if not input_data:
                 logging.error("[process_input] - Decryption failed with provided private key")
                 end_time = time.perf_counter()  # End timer
@@ -112,7 +113,9 @@ class ProveServiceV1:
             oauth_provider_cls: Optional[OAuthProvider] = self.oauth_provider.get(oauth_provider, None)
             if not oauth_provider_cls:
                 return STATUS_CODE_UNSUPPORT_OAUTH_PROVIDER, f"OAuth provider '{oauth_provider}' not found"
-            if not await oauth_provider_cls.verify(input_data):
+            with start_span("oauth_verify", oauth_provider=oauth_provider):
+                verified = await oauth_provider_cls.verify(input_data)
+            if not verified:
                 return STATUS_CODE_UNAUTHORIZED_PAYLOAD, "Verification failed due to invalid input data"
 
         elif task_type == TASK_TYPE_TIGA:
@@ -126,6 +129,7 @@ class ProveServiceV1:
         
         return True, None
 
+    @track_load
     async def prove(
         self,
         method: int,
@@ -160,12 +164,9 @@ class ProveServiceV1:
 
         try:
             if prover_id == PROVER_CIRCOM:
-                prover_instance = CircomProver(
-                    self.config.Prover.Circom.address,
-                    verify_tls=self.config.Env.verify_prover_tls,
-                    tls_certfile=self.config.Env.tls_certfile,
+                prover_result: CircomResultV1 = await self.provers[PROVER_CIRCOM].call(
+                    circuit_template_id, lambda prover: prover.prove(input_data, circuit_template_id)
                 )
-                prover_result: CircomResultV1 = await prover_instance.prove(input_data, circuit_template_id)
             else:
                 logging.info(f"[v1] - [prove] took {time.perf_counter() - start_time:.4f} seconds")
                 return ProofResult(
@@ -187,7 +188,7 @@ class ProveServiceV1:
         end_time = time.perf_counter()  # End timer
 
         if prover_result.proof:
-            project = self.project_manager.get_project(ujson.loads(prover_result.proof)[-1])
+            project = self.project_manager.get_project_from_signals(prover_result.proof)
             project_name = project["project_name"]
             verifiers = project["verifiers"]
             duration = int((end_time - start_time) * 1000)
@@ -201,6 +202,7 @@ class ProveServiceV1:
                 duration=duration
             )
     
+    @track_load
     async def prove_nosha256(
         self,
         method: int,
@@ -237,12 +239,9 @@ class ProveServiceV1:
             
         try:
             if prover_id == PROVER_CIRCOM:
-                prover_instance = CircomProver(
-                    self.config.Prover.Circom.address,
-                    verify_tls=self.config.Env.verify_prover_tls,
-                    tls_certfile=self.config.Env.tls_certfile,
+                prover_result = await self.provers[PROVER_CIRCOM].call(
+                    circuit_template_id, lambda prover: prover.prove_nosha256(input_data, circuit_template_id, length)
                 )
-                prover_result = await prover_instance.prove_nosha256(input_data, circuit_template_id, length)
             else:
                 return ProofResult(
                     code=STATUS_CODE_UNSUPPORT_PROVER,
@@ -263,7 +262,7 @@ class ProveServiceV1:
         end_time = time.perf_counter()  # End timer
 
         if prover_result.proof:
-            project = self.project_manager.get_project(ujson.loads(prover_result.proof)[-1])
+            project = self.project_manager.get_project_from_signals(prover_result.proof)
             project_name = project["project_name"]
             verifiers = project["verifiers"]
             duration = int((end_time - start_time) * 1000)
@@ -277,6 +276,7 @@ class ProveServiceV1:
                 duration=duration
             )
 
+    @track_load
     async def prove_nosha256_with_witness(
         self,
         method: int,
@@ -313,12 +313,9 @@ class ProveServiceV1:
             
         try:
             if prover_id == PROVER_CIRCOM:
-                prover_instance = CircomProver(
-                    self.config.Prover.Circom.address,
-                    verify_tls=self.config.Env.verify_prover_tls,
-                    tls_certfile=self.config.Env.tls_certfile,
+                prover_result = await self.provers[PROVER_CIRCOM].call(
+                    circuit_template_id, lambda prover: prover.prove_nosha256_with_witness(input_data, circuit_template_id, length)
                 )
-                prover_result = await prover_instance.prove_nosha256_with_witness(input_data, circuit_template_id, length)
             else:
                 return ProofResult(
                     code=STATUS_CODE_UNSUPPORT_PROVER,
@@ -339,7 +336,7 @@ class ProveServiceV1:
         end_time = time.perf_counter()  # End timer
 
         if prover_result.proof:
-            project = self.project_manager.get_project(ujson.loads(prover_result.witness)[-1])
+            project = self.project_manager.get_project_from_signals(prover_result.witness)
             project_name = project["project_name"]
             verifiers = project["verifiers"]
             duration = int((end_time - start_time) * 1000)
@@ -353,6 +350,7 @@ class ProveServiceV1:
                 duration=duration
             )
 
+    @track_load
     async def prove_nosha256_offchain(
         self,
         method: int,
@@ -388,12 +386,9 @@ class ProveServiceV1:
             
         try:
             if prover_id == PROVER_CIRCOM:
-                prover_instance = CircomProver(
-                    self.config.Prover.Circom.address,
-                    verify_tls=self.config.Env.verify_prover_tls,
-                    tls_certfile=self.config.Env.tls_certfile,
+                prover_result = await self.provers[PROVER_CIRCOM].call(
+                    circuit_template_id, lambda prover: prover.prove_nosha256_offchain(input_data, circuit_template_id, length)
                 )
-                prover_result = await prover_instance.prove_nosha256_offchain(input_data, circuit_template_id, length)
             else:
                 return ProofResult(
                     code=STATUS_CODE_UNSUPPORT_PROVER,
@@ -414,7 +409,7 @@ class ProveServiceV1:
         end_time = time.perf_counter()  # End timer
 
         if prover_result.proof:
-            project = self.project_manager.get_project(ujson.loads(prover_result.witness)[-1])
+            project = self.project_manager.get_project_from_signals(prover_result.witness)
             project_name = project["project_name"]
             verifiers = project["verifiers"]
             duration = int((end_time - start_time) * 1000)
@@ -431,11 +426,8 @@ class ProveServiceV1:
 
     async def get_public_key(self) -> Tuple[int, str, Optional[str]]:
         start_time = time.perf_counter()
-        public_key_path = os.path.join(self.config.Env.crypto_keys_path, PUBLIC_KEY)
-
         try:
-            async with aiofiles.open(public_key_path, mode='r') as file:
-                public_key = await file.read()
+            public_key = (await self.node_key.get_encryptor()).public_key
         except FileNotFoundError:
             logging.error("[get_public_key] - Public key file not found")
             logging.info(f"[get_public_key] took {time.perf_counter() - start_time:.4f} seconds")
@@ -1,28 +1,32 @@
-import os
 import logging
-import aiofiles
 import time
-from typing import Tuple, Optional, Dict, List
+from typing import Tuple, Optional, Dict, List, Sequence
 import threading
 import ujson
 
 from modules.project_manager import ProjectManager
-from modules.prover.circom import CircomProver, CircomResultV2
+from modules.prover.circom import CircomResultV2
 from modules.prover.gnark import PrivateProver
-from modules.encryptor import RSAEncryption
+from modules.key_cache import KeyCache
+from modules.prover import ProverRouter
+from modules.node_load import NodeLoad, track_load
 from modules.oauth_provider import OAuthProvider, OAuthProviderResolver
 
 from config import NodeConfig
 from utils.constant import PROVER_CIRCOM, PROVER_PRIVATE
 from utils.constant import TASK_TYPE_ZKLOGIN, TASK_TYPE_TIGA
-from utils.constant import PUBLIC_KEY, PRIVATE_KEY
 from utils.constant import STATUS_CODE_PRIVATE_KEY_INVALID, STATUS_CODE_PRIVATE_KEY_NOT_FOUND, STATUS_CODE_PUBLIC_KEY_NOT_FOUND, STATUS_CODE_PUBLIC_KEY_INVALID
 from utils.constant import STATUS_CODE_UNAUTHORIZED_PAYLOAD
 from utils.constant import STATUS_CODE_UNSUPPORT_TASK_TYPE, STATUS_CODE_UNSUPPORT_PROVER, STATUS_CODE_UNSUPPORT_OAUTH_PROVIDER
 from utils.constant import STATUS_CODE_SUCCESSFULLY, STATUS_CODE_ERROR
+from utils.progress_util import emit_progress, PROGRESS_DECRYPTED, PROGRESS_VALIDATED
+from utils.trace_util import start_span
 
 from dataclasses import dataclass, field
 
+# Representations of the proof a client can select, all of them by default
+OUTPUT_FIELDS = ("proof", "proof_solidity", "proof_bytes", "public_witness", "public_witness_bytes")
+
 @dataclass
 class ProofResult:
     code: int
@@ -39,6 +43,11 @@ class ProofResult:
 class ProveServiceV2:
     _instance = None
     _locker = threading.Lock()
+    _PRIVATE_RPC = {
+        "10005": PrivateProver.prove_tiga_offchain,
+        "10006": PrivateProver.prove_binance_offchain,
+        "10010": PrivateProver.prove_merkle_offchain,
+    }
 
     def __new__(cls, *args, **kwargs):
         with cls._locker:
@@ -47,7 +56,7 @@ class ProveServiceV2:
                 cls._instance._initialized = False
         return cls._instance
 
-    def __init__(self, project_manager: ProjectManager, oauth_provider: Dict[str, OAuthProvider], oauth_provider_resolver: OAuthProviderResolver, config: NodeConfig):
+    def __init__(self, project_manager: ProjectManager, oauth_provider: Dict[str, OAuthProvider], oauth_provider_resolver: OAuthProviderResolver, config: NodeConfig, node_key: KeyCache, provers: Dict[str, ProverRouter], node_load: Optional[NodeLoad] = None):
         if self._initialized:
             return
         
@@ -55,6 +64,9 @@ class ProveServiceV2:
         self.oauth_provider = oauth_provider
         self.oauth_provider_resolver = oauth_provider_resolver
         self.config = config
+        self.node_key = node_key
+        self.provers = provers
+        self.node_load = node_load
 
         self._initialized = True
 
@@ -70,12 +82,10 @@ class ProveServiceV2:
         Returns:
             tuple: (Processed input data, Error message if any)
         """
-        private_key_path = os.path.join(self.config.Env.crypto_keys_path, PRIVATE_KEY)
         if is_encrypted:
             try:
-                # Asynchronously read the private key file
-                async with aiofiles.open(private_key_path, mode='r') as file:
-                    private_key = await file.read()
+                # The node key pair is cached and only reloaded when the files change
+                rsa_encryption = await self.node_key.get_encryptor()
             except FileNotFoundError:
                 logging.error("[process_input] - Private key file not found")
                 end_time = time.perf_counter()  # End timer
@@ -83,8 +93,8 @@ class ProveServiceV2:
                 return STATUS_CODE_PRIVATE_KEY_NOT_FOUND, "Private key file not found"
 
             # Decrypt the input data using RSA
-            rsa_encryption = RSAEncryption(private_key=private_key)
-            input_data = rsa_encryption.decrypt(input_data)
+            with start_span("decrypt"):
+                input_data = rsa_encryption.decrypt(input_data)
             if not input_data:
                 logging.error("[process_input] - Decryption failed with provided private key")
                 end_time = time.perf_counter()  # End timer
@@ -115,7 +125,9 @@ class ProveServiceV2:
             oauth_provider_cls: Optional[OAuthProvider] = self.oauth_provider.get(oauth_provider, None)
             if not oauth_provider_cls:
                 return STATUS_CODE_UNSUPPORT_OAUTH_PROVIDER, f"OAuth provider '{oauth_provider}' not found"
-            if not await oauth_provider_cls.verify(input_data):
+            with start_span("oauth_verify", oauth_provider=oauth_provider):
+                verified = await oauth_provider_cls.verify(input_data)
+            if not verified:
                 return STATUS_CODE_UNAUTHORIZED_PAYLOAD, "Verification failed due to invalid input data"
 
         elif task_type == TASK_TYPE_TIGA:
@@ -129,6 +141,44 @@ class ProveServiceV2:
         
         return True, None
 
+    async def validate_batch(
+        self,
+        method: int,
+        prover_id: str,
+        circuit_template_id: str,
+        is_encrypted: bool,
+        oauth_provider: str,
+        fields: Sequence[str] = ()
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Checks shared by every item of a batch, done once before the items are proven.
+
+        Returns:
+            A tuple of (bool, msg). If validation passes, bool is true.
+        """
+        if prover_id not in (PROVER_CIRCOM, PROVER_PRIVATE):
+            return STATUS_CODE_UNSUPPORT_PROVER, "Prover not match"
+        unknown_fields = set(fields) - set(OUTPUT_FIELDS)
+        if unknown_fields:
+            return STATUS_CODE_ERROR, f"Unknown output fields: {', '.join(sorted(unknown_fields))}"
+        if prover_id == PROVER_PRIVATE and circuit_template_id not in self._PRIVATE_RPC:
+            return STATUS_CODE_UNSUPPORT_TASK_TYPE, f"Unsupported circuit_template_id: {circuit_template_id}"
+
+        if method == TASK_TYPE_ZKLOGIN:
+            oauth_provider = self.oauth_provider_resolver.resolve_provider(circuit_template_id) or oauth_provider
+            if oauth_provider not in self.oauth_provider:
+                return STATUS_CODE_UNSUPPORT_OAUTH_PROVIDER, f"OAuth provider '{oauth_provider}' not found"
+        elif method != TASK_TYPE_TIGA:
+            return STATUS_CODE_UNSUPPORT_TASK_TYPE, f"Task '{method}' is not supported. Please choose a supported method"
+
+        if is_encrypted:
+            try:
+                await self.node_key.get_encryptor()
+            except FileNotFoundError:
+                return STATUS_CODE_PRIVATE_KEY_NOT_FOUND, "Private key file not found"
+        return True, None
+
+    @track_load
     async def prove(
         self,
         method: int,
@@ -138,9 +188,17 @@ class ProveServiceV2:
         is_encrypted: bool, 
         auth_token: str,
         length: int,
-        oauth_provider: str
+        oauth_provider: str,
+        fields: Sequence[str] = ()
     ) -> Tuple[int, str, Optional[str]]:
         start_time = time.perf_counter()
+
+        unknown_fields = set(fields) - set(OUTPUT_FIELDS)
+        if unknown_fields:
+            return ProofResult(
+                code=STATUS_CODE_ERROR,
+                msg=f"Unknown output fields: {', '.join(sorted(unknown_fields))}"
+            )
         
         ok, msg = await self._process_input(input_data, is_encrypted)
         if ok != True:
@@ -149,6 +207,7 @@ class ProveServiceV2:
                 msg=msg
             )
         input_data = msg
+        emit_progress(PROGRESS_DECRYPTED)
             
         ok, msg = await self._validate_task_type_and_input(method, circuit_template_id, input_data, oauth_provider)
         if ok != True:
@@ -156,27 +215,15 @@ class ProveServiceV2:
                 code=ok,
                 msg=msg
             )
+        emit_progress(PROGRESS_VALIDATED)
             
         try:
             if prover_id == PROVER_CIRCOM:
-                prover_instance = CircomProver(
-                    self.config.Prover.Circom.address,
-                    verify_tls=self.config.Env.verify_prover_tls,
-                    tls_certfile=self.config.Env.tls_certfile,
+                prover_result = await self.provers[PROVER_CIRCOM].call(
+                    circuit_template_id, lambda prover: prover.prove_v2(input_data, circuit_template_id, length)
                 )
-                prover_result = await prover_instance.prove_v2(input_data, circuit_template_id, length)
             elif prover_id == PROVER_PRIVATE:
-                private_prover = PrivateProver(
-                    self.config.Prover.Private.address,
-                    verify_tls=self.config.Env.verify_prover_tls,
-                    tls_certfile=self.config.Env.tls_certfile,
-                )
-                rpc_map = {
-                    "10005": private_prover.prove_tiga_offchain,
-                    "10006": private_prover.prove_binance_offchain,
-                    "10010": private_prover.prove_merkle_offchain,
-                }
-                rpc_func = rpc_map.get(circuit_template_id)
+                rpc_func = self._PRIVATE_RPC.get(circuit_template_id)
                 if not rpc_func:
                     logging.info(f"[v2] - [prove] Unsupported circuit_template_id: {circuit_template_id}")
                     return ProofResult(
@@ -184,7 +231,9 @@ class ProveServiceV2:
                         msg=f"Unsupported circuit_template_id: {circuit_template_id}"
                     )
                 
-                prover_result = await rpc_func(input_data, circuit_template_id)
+                prover_result = await self.provers[PROVER_PRIVATE].call(
+                    circuit_template_id, lambda prover: rpc_func(prover, input_data, circuit_template_id)
+                )
 
             else:
                 logging.info(f"[v2] - [prove] took {time.perf_counter() - start_time:.4f} seconds")
@@ -211,20 +260,18 @@ class ProveServiceV2:
         duration = None
  
         if prover_result.proof:
-            project = self.project_manager.get_project(ujson.loads(prover_result.public_witness)[-1])
+            project = self.project_manager.get_project_from_signals(prover_result.public_witness)
             project_name = project["project_name"]
             verifiers = project["verifiers"]
             duration = int((end_time - start_time) * 1000)
         
+        # Unselected representations are dropped here so no transport encodes them
+        outputs = {name: getattr(prover_result, name) for name in (fields or OUTPUT_FIELDS)}
         return ProofResult(
                 code=prover_result.code,
                 msg=prover_result.msg,
-                proof=prover_result.proof,
-                proof_solidity=prover_result.proof_solidity,
-                proof_bytes=prover_result.proof_bytes,
-                public_witness=prover_result.public_witness,
-                public_witness_bytes=prover_result.public_witness_bytes,
                 project_name=project_name,
                 verifiers=verifiers,
-                duration=duration
+                duration=duration,
+                **outputs
             )
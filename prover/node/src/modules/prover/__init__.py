@@ -1,3 +1,6 @@
 from .base import *
+from .pool import *
+from .policy import *
+from .router import *
 
 __all__ = [name for name in dir() if name[0].isupper()]
\ No newline at end of file
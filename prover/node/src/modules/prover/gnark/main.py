@@ -1,15 +1,12 @@
-import asyncio
-from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Optional, Union, Tuple, Callable, Awaitable, Dict, TypeVar
+from typing import Optional, Union, Callable, Awaitable, Dict, Any, TypeVar
 
 import grpc
 
-from modules.prover import Prover
+from modules.prover import Prover, ChannelPool, RpcPolicy
+from modules.prover.policy import rpc_error_code
 from modules.prover.gnark import gnark_prove_pb2 as prove_pb2
 from modules.prover.gnark import gnark_prove_pb2_grpc as prove_pb2_grpc
-from utils.constant import STATUS_CODE_PROVER_NOT_RESPONSE
-from utils.tls import grpc_channel_credentials, grpc_channel_options
 
 # =========================
 # Result model
@@ -26,89 +23,6 @@ class PrivateResult:
     public_witness_bytes: Optional[bytes] = None
 
 
-# =========================
-# Connection pool
-# =========================
-
-class ConnectionPool:
-    """
-    Simple gRPC channel pool: supports lazy creation and preheating, unified channel options.
-    """
-    def __init__(
-        self,
-        address: str,
-        max_connections: int = 100,
-        initial_size: int = 0,
-        verify_tls: bool = False,
-        tls_certfile: str = "",
-        *,
-        max_send_message_length: int = 64 * 1024 * 1024,
-        max_receive_message_length: int = 64 * 1024 * 1024,
-        keepalive_time_ms: int = 60_000,
-        keepalive_timeout_ms: int = 20_000,
-        ping_min_interval_ms: int = 30_000,
-        ping_min_interval_no_data_ms: int = 10_000,
-    ):
-        self.address = address
-        self.max_connections = max_connections
-        self._pool: asyncio.Queue[Tuple[grpc.aio.Channel, prove_pb2_grpc.ProveServiceStub]] = asyncio.Queue()
-        self._created = 0
-        self._closed = False
-        self.verify_tls = verify_tls
-        self.tls_certfile = tls_certfile
-        self._options = [
-            ("grpc.max_send_message_length", max_send_message_length),
-            ("grpc.max_receive_message_length", max_receive_message_length),
-            ("grpc.keepalive_time_ms", keepalive_time_ms),
-            ("grpc.keepalive_timeout_ms", keepalive_timeout_ms),
-            ("grpc.keepalive_permit_without_calls", True),
-            ("grpc.http2.max_pings_without_data", 2),
-            ("grpc.http2.min_time_between_pings_ms", ping_min_interval_ms),
-            ("grpc.http2.min_ping_interval_without_data_ms", ping_min_interval_no_data_ms),
-        ]
-
-        initial_size = max(0, min(initial_size, max_connections))
-        for _ in range(initial_size):
-            self._pool.put_nowait(self._new_pair())
-
-    def _new_pair(self) -> Tuple[grpc.aio.Channel, prove_pb2_grpc.ProveServiceStub]:
-        credentials = grpc_channel_credentials(self.tls_certfile)
-        options = self._options + grpc_channel_options(self.verify_tls, self.tls_certfile)
-        ch = grpc.aio.secure_channel(self.address, credentials, options=options)
-        stub = prove_pb2_grpc.ProveServiceStub(ch)
-        self._created += 1
-        return ch, stub
-
-    async def acquire(self) -> Tuple[grpc.aio.Channel, prove_pb2_grpc.ProveServiceStub]:
-        if self._closed:
-            raise RuntimeError("ConnectionPool is closed")
-        try:
-            return self._pool.get_nowait()
-        except asyncio.QueueEmpty:
-            if self._created < self.max_connections:
-                return self._new_pair()
-            return await self._pool.get()
-
-    async def release(self, pair: Tuple[grpc.aio.Channel, prove_pb2_grpc.ProveServiceStub]) -> None:
-        if self._closed:
-            ch, _ = pair
-            await ch.close()
-        else:
-            await self._pool.put(pair)
-
-    async def close(self) -> None:
-        self._closed = True
-        closings = []
-        while True:
-            try:
-                ch, _ = self._pool.get_nowait()
-                closings.append(ch.close())
-            except asyncio.QueueEmpty:
-                break
-        if closings:
-            await asyncio.gather(*closings, return_exceptions=True)
-
-
 # =========================
 # PrivateProver
 # =========================
@@ -118,48 +32,55 @@ TResp = TypeVar("TResp")
 
 class PrivateProver(Prover):
     """
-    - Singleton by address + pool size
-    - Unified _rpc(): deadline + exponential backoff retry (for transient errors)
+    - Singleton by address, sharing one multiplexed channel pool
+    - Unified _rpc(): request deadline + RpcPolicy retries (non-idempotent calls only on UNAVAILABLE)
     - Supports async with
     """
     _instances: Dict[str, "PrivateProver"] = {}
 
-    def __new__(cls, address: str, max_connections: int = 100, **kwargs):
-        key = f"{address}::{max_connections}"
+    def __new__(cls, address: str, max_channels: int = 4, **kwargs):
+        # The first instance for an address fixes its pool configuration
+        key = address
         inst = cls._instances.get(key)
         if inst is None:
             inst = super().__new__(cls)
-            inst._init(address, max_connections, **kwargs)
+            inst._init(address, max_channels, **kwargs)
             cls._instances[key] = inst
         return inst
 
-    def __init__(self, address: str, max_connections: int = 100, **kwargs):
+    def __init__(self, address: str, max_channels: int = 4, **kwargs):
         # Initialization is handled in __new__/_init for singleton reuse.
         pass
 
     def _init(
         self,
         address: str,
-        max_connections: int,
+        max_channels: int,
         verify_tls: bool = False,
         tls_certfile: str = "",
         *,
-        pool_initial_size: int = 0,
+        min_channels: int = 1,
+        max_streams_per_channel: int = 100,
         rpc_timeout_sec: float = 30.0,
         max_retries: int = 2,
         base_backoff_ms: int = 150,
+        policy: Optional[RpcPolicy] = None,
     ) -> None:
         self.address = address
-        self.connection_pool = ConnectionPool(
+        self.connection_pool = ChannelPool(
             address,
-            max_connections,
-            initial_size=pool_initial_size,
+            prove_pb2_grpc.ProveServiceStub,
             verify_tls=verify_tls,
             tls_certfile=tls_certfile,
+            min_channels=min_channels,
+            max_channels=max_channels,
+            max_streams_per_channel=max_streams_per_channel,
+        )
+        self.policy = policy or RpcPolicy(
+            default_timeout=rpc_timeout_sec,
+            max_retries=max_retries,
+            base_backoff_ms=base_backoff_ms,
         )
-        self.rpc_timeout_sec = rpc_timeout_sec
-        self.max_retries = max_retries
-        self.base_backoff_ms = base_backoff_ms
 
     async def __aenter__(self) -> "PrivateProver":
         return self
@@ -167,88 +88,82 @@ class PrivateProver(Prover):
     async def __aexit__(self, exc_type, exc, tb) -> None:
         await self.close()
 
-    @asynccontextmanager
-    async def _acquire_stub(self):
-        pair = await self.connection_pool.acquire()
-        try:
-            yield pair
-        finally:
-            await self.connection_pool.release(pair)
+    def _acquire_stub(self):
+        return self.connection_pool.stream()
+
+    async def warmup(self, timeout: float = 5.0) -> bool:
+        return await self.connection_pool.warmup(timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.connection_pool.metrics()
 
     async def _rpc(
         self,
         accessor: Callable[[prove_pb2_grpc.ProveServiceStub], Callable[[TReq], Awaitable[TResp]]],
         request: TReq,
         *,
+        circuit: Optional[str] = None,
+        idempotent: bool = False,
         timeout: Optional[float] = None,
         retries: Optional[int] = None,
     ) -> TResp:
-        timeout = self.rpc_timeout_sec if timeout is None else timeout
-        retries = self.max_retries if retries is None else retries
-
-        attempt = 0
-        while True:
-            attempt += 1
-            try:
-                async with self._acquire_stub() as (_, stub):
-                    call = accessor(stub)
-                    return await call(request, timeout=timeout)
-            except grpc.aio.AioRpcError as e:
-                code = e.code()
-                if attempt <= retries and code in (
-                    grpc.StatusCode.UNAVAILABLE,
-                    grpc.StatusCode.DEADLINE_EXCEEDED,
-                    grpc.StatusCode.INTERNAL,
-                ):
-                    backoff = min((self.base_backoff_ms / 1000.0) * (2 ** (attempt - 1)), 2.0)
-                    await asyncio.sleep(backoff)
-                    continue
-                raise
+        """
+        Unified unary-unary call, bounded by the request deadline and retried per the RpcPolicy.
+        """
+        return await self.policy.call(
+            self._acquire_stub,
+            accessor,
+            request,
+            circuit=circuit,
+            idempotent=idempotent,
+            timeout=timeout,
+            retries=retries,
+        )
 
     # -------- Public APIs --------
 
     async def prove_tiga_offchain(self, input_data: str, temp: str) -> PrivateResult:
         req = prove_pb2.ProveRequest(input=input_data, temp=temp)
         try:
-            resp = await self._rpc(lambda s: s.ProveTigaOffchain, req)
+            resp = await self._rpc(lambda s: s.ProveTigaOffchain, req, circuit=temp)
             return PrivateResult(
                 code=resp.code, msg=resp.msg, proof=resp.proof,
                 proof_solidity=resp.proof_solidity, proof_bytes=resp.proof_bytes,
                 public_witness=resp.public_witness, public_witness_bytes=resp.public_witness_bytes
             )
         except grpc.aio.AioRpcError as e:
-            return PrivateResult(code=STATUS_CODE_PROVER_NOT_RESPONSE, msg=f"{e.code().name}: {e.details()}")
+            return PrivateResult(code=rpc_error_code(e), msg=f"{e.code().name}: {e.details()}")
 
     async def prove_binance_offchain(self, input_data: str, temp: str) -> PrivateResult:
         req = prove_pb2.ProveRequest(input=input_data, temp=temp)
         try:
-            resp = await self._rpc(lambda s: s.ProveBinanceOffchain, req)
+            resp = await self._rpc(lambda s: s.ProveBinanceOffchain, req, circuit=temp)
             return PrivateResult(
                 code=resp.code, msg=resp.msg, proof=resp.proof,
                 proof_solidity=resp.proof_solidity, proof_bytes=resp.proof_bytes,
                 public_witness=resp.public_witness, public_witness_bytes=resp.public_witness_bytes
             )
         except grpc.aio.AioRpcError as e:
-            return PrivateResult(code=STATUS_CODE_PROVER_NOT_RESPONSE, msg=f"{e.code().name}: {e.details()}")
+            return PrivateResult(code=rpc_error_code(e), msg=f"{e.code().name}: {e.details()}")
 
     async def prove_merkle_offchain(self, input_data: str, temp: str) -> PrivateResult:
         req = prove_pb2.ProveRequest(input=input_data, temp=temp)
         try:
-            resp = await self._rpc(lambda s: s.ProveMerkleOffchain, req)
+            resp = await self._rpc(lambda s: s.ProveMerkleOffchain, req, circuit=temp)
             return PrivateResult(
                 code=resp.code, msg=resp.msg, proof=resp.proof,
                 proof_solidity=resp.proof_solidity, proof_bytes=resp.proof_bytes,
                 public_witness=resp.public_witness, public_witness_bytes=resp.public_witness_bytes
             )
         except grpc.aio.AioRpcError as e:
-            return PrivateResult(code=STATUS_CODE_PROVER_NOT_RESPONSE, msg=f"{e.code().name}: {e.details()}")
+            return PrivateResult(code=rpc_error_code(e), msg=f"{e.code().name}: {e.details()}")
 
     async def get_running_prove_tasks(self) -> tuple[int, str, Optional[int]]:
         try:
-            resp = await self._rpc(lambda s: s.GetRunningProveTasks, prove_pb2.Empty())
+            resp = await self._rpc(lambda s: s.GetRunningProveTasks, prove_pb2.Empty(), idempotent=True)
             return resp.code, resp.msg, resp.count
         except grpc.aio.AioRpcError as e:
-            return STATUS_CODE_PROVER_NOT_RESPONSE, f"{e.code().name}: {e.details()}", None
+            return rpc_error_code(e), f"{e.code().name}: {e.details()}", None
 
     async def close(self) -> None:
         await self.connection_pool.close()
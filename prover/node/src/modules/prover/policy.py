@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+import grpc
+
+from utils.constant import STATUS_CODE_DEADLINE_EXCEEDED, STATUS_CODE_PROVER_NOT_RESPONSE
+from utils.deadline_util import remaining_time
+from utils.metrics_util import Histogram, LatencyWindow
+from utils.trace_util import SPAN_KIND_CLIENT, start_span, trace_metadata
+
+
+class RequestDeadlineExceeded(grpc.aio.AioRpcError):
+    """DEADLINE_EXCEEDED of a prover call cut short by the deadline of the request being served."""
+
+    def __init__(self, details: str):
+        super().__init__(grpc.StatusCode.DEADLINE_EXCEEDED, grpc.aio.Metadata(), grpc.aio.Metadata(), details)
+
+
+def rpc_error_code(error: grpc.aio.AioRpcError) -> int:
+    """Result code of a failed prover call; the caller running out of time is not the prover's fault."""
+    if isinstance(error, RequestDeadlineExceeded):
+        return STATUS_CODE_DEADLINE_EXCEEDED
+    return STATUS_CODE_PROVER_NOT_RESPONSE
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of the calls.
+
+    Every first attempt deposits `ratio` tokens and every retry withdraws one,
+    so under overload retries add at most `ratio` extra load. Below
+    `min_tokens` the bucket also refills with time, `min_tokens` every
+    `refill_period` seconds, which keeps a few retries available when traffic
+    is too low for the deposits to matter.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_tokens: float = 10.0, max_tokens: float = 100.0, refill_period: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max(max_tokens, min_tokens)
+        self.tokens = min_tokens
+        self.min_tokens = min_tokens
+        self.refill_period = refill_period
+        self.exhausted = 0
+        self._refilled_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.tokens < self.min_tokens and self.refill_period > 0:
+            refill = (now - self._refilled_at) * self.min_tokens / self.refill_period
+            self.tokens = min(self.min_tokens, self.tokens + refill)
+        self._refilled_at = now
+
+    def deposit(self) -> None:
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.exhausted += 1
+        return False
+
+
+class RpcPolicy:
+    """
+    Timeout and retry policy of prover RPCs, shared by every backend.
+
+    Each attempt is bounded by the deadline of the request being served and by
+    a per-circuit timeout: an explicit override from `circuits`, otherwise
+    `timeout_multiplier` times the p99 latency seen for the circuit once
+    `min_samples` calls succeeded, otherwise `default_timeout`.
+
+    Only UNAVAILABLE is retried for prove calls, since the request never
+    reached the prover; DEADLINE_EXCEEDED and INTERNAL may leave a proof
+    running on the GPU and are retried for idempotent calls only. A retry also
+    needs a token from the shared RetryBudget and enough time left before the
+    deadline to cover the circuit's median latency. An attempt cut short by
+    the request deadline rather than by the circuit timeout raises
+    RequestDeadlineExceeded, so it is not taken for an unresponsive prover.
+
+    Circuit ids come from the requests, so with `circuit_templates` given
+    the ids outside them and `circuits` share the "other" metric label and
+    latency window.
+    """
+
+    def __init__(
+        self,
+        *,
+        default_timeout: float = 30.0,
+        min_timeout: float = 5.0,
+        max_timeout: float = 120.0,
+        timeout_multiplier: float = 3.0,
+        min_samples: int = 20,
+        window_size: int = 256,
+        max_retries: int = 2,
+        base_backoff_ms: int = 150,
+        circuits: Optional[Dict[str, Dict[str, Any]]] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        circuit_templates: Optional[Sequence[str]] = None,
+    ):
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.max_retries = max_retries
+        self.base_backoff_ms = base_backoff_ms
+        self.circuits = circuits or {}
+        self.known_circuits = None if circuit_templates is None else set(circuit_templates) | set(self.circuits)
+        self.retry_budget = retry_budget or RetryBudget()
+        self._latency: Dict[str, LatencyWindow] = {}
+        # Every attempt, failed ones included, by status code
+        self.rpc_latency = Histogram(("circuit", "code"))
+
+        self.stats: Dict[str, int] = {
+            "calls": 0,
+            "retries": 0,
+            "deadline_exceeded": 0,
+            "request_deadline_exceeded": 0,
+            "cancelled": 0,
+        }
+        self.gpu_seconds_saved = 0.0
+
+    def label(self, circuit: Optional[str]) -> str:
+        """Metric label of `circuit`, "other" for a circuit that is not configured."""
+        if not circuit:
+            return ""
+        if self.known_circuits is not None and circuit not in self.known_circuits:
+            return "other"
+        return circuit
+
+    def timeout(self, circuit: Optional[str]) -> float:
+        override = self.circuits.get(circuit, {}).get("timeout") if circuit else None
+        if override is not None:
+            return float(override)
+        window = self._latency.get(self.label(circuit))
+        if window is None or len(window) < self.min_samples:
+            return self.default_timeout
+        learned = window.percentile(99) * self.timeout_multiplier
+        return min(self.max_timeout, max(self.min_timeout, learned))
+
+    def retries(self, circuit: Optional[str]) -> int:
+        override = self.circuits.get(circuit, {}).get("retries") if circuit else None
+        return self.max_retries if override is None else int(override)
+
+    def observe(self, circuit: Optional[str], latency: float) -> None:
+        if circuit is None:
+            return
+        circuit = self.label(circuit)
+        window = self._latency.get(circuit)
+        if window is None:
+            window = self._latency[circuit] = LatencyWindow(self.window_size)
+        window.observe(latency)
+
+    def _retryable(self, code: grpc.StatusCode, idempotent: bool) -> bool:
+        if code == grpc.StatusCode.UNAVAILABLE:
+            return True
+        return idempotent and code in (grpc.StatusCode.DEADLINE_EXCEEDED, grpc.StatusCode.INTERNAL)
+
+    def _time_for_retry(self, circuit: Optional[str], backoff: float) -> bool:
+        remaining = remaining_time()
+        if remaining is None:
+            return True
+        window = self._latency.get(self.label(circuit))
+        expected = window.percentile(50) if window is not None and len(window) else 0.0
+        return remaining - backoff > expected
+
+    async def call(
+        self,
+        acquire_stub: Callable[[], Any],
+        func: Callable[[Any], Callable[..., Awaitable[Any]]],
+        request: Any,
+        *,
+        circuit: Optional[str] = None,
+        idempotent: bool = False,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+    ) -> Any:
+        """Unary call with the policy's deadline and retries; raises grpc.aio.AioRpcError on failure."""
+        timeout = self.timeout(circuit) if timeout is None else timeout
+        retries = self.retries(circuit) if retries is None else retries
+        self.stats["calls"] += 1
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            attempt_timeout = timeout
+            remaining = remaining_time()
+            if remaining is not None:
+                if remaining <= 0:
+                    self.stats["deadline_exceeded"] += 1
+                    self.stats["request_deadline_exceeded"] += 1
+                    raise RequestDeadlineExceeded("Request deadline exceeded before calling the prover")
+                attempt_timeout = min(timeout, remaining)
+
+            started_at = time.perf_counter()
+            try:
+                with start_span("prover_rpc", kind=SPAN_KIND_CLIENT, circuit=circuit, attempt=attempt):
+                    async with acquire_stub() as (channel, stub):
+                        resp = await func(stub)(request, timeout=attempt_timeout, metadata=trace_metadata())
+                elapsed = time.perf_counter() - started_at
+                self.observe(circuit, elapsed)
+                self.rpc_latency.observe(elapsed, self.label(circuit), grpc.StatusCode.OK.name)
+                return resp
+            except asyncio.CancelledError:
+                # The caller went away, cancelling the call stops the proof on the backend
+                self._record_cancelled(circuit, time.perf_counter() - started_at)
+                raise
+            except grpc.aio.AioRpcError as e:
+                code = e.code()
+                self.rpc_latency.observe(time.perf_counter() - started_at, self.label(circuit), code.name)
+                if code == grpc.StatusCode.DEADLINE_EXCEEDED:
+                    self.stats["deadline_exceeded"] += 1
+                    if attempt_timeout < timeout:
+                        # The request ran out of time, the prover was still within its circuit timeout
+                        self.stats["request_deadline_exceeded"] += 1
+                        raise RequestDeadlineExceeded(e.details()) from e
+                if attempt > retries or not self._retryable(code, idempotent):
+                    raise
+                backoff = min((self.base_backoff_ms / 1000.0) * (2 ** (attempt - 1)), 2.0)
+                if not self._time_for_retry(circuit, backoff) or not self.retry_budget.withdraw():
+                    raise
+                self.stats["retries"] += 1
+                logging.info(f"[RpcPolicy] - Retrying {code.name} for circuit {circuit} (attempt {attempt + 1})")
+                await asyncio.sleep(backoff)
+
+    def _record_cancelled(self, circuit: Optional[str], elapsed: float) -> None:
+        self.stats["cancelled"] += 1
+        self.rpc_latency.observe(elapsed, self.label(circuit), grpc.StatusCode.CANCELLED.name)
+        window = self._latency.get(self.label(circuit))
+        expected = window.percentile(50) if window is not None and len(window) else None
+        if expected is not None:
+            self.gpu_seconds_saved += max(0.0, expected - elapsed)
+        logging.info(f"[RpcPolicy] - Cancelled prover call for circuit {circuit} after {elapsed:.2f}s")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "gpu_seconds_saved": round(self.gpu_seconds_saved, 2),
+            "retry_budget_tokens": round(self.retry_budget.tokens, 2),
+            "retry_budget_exhausted": self.retry_budget.exhausted,
+            "timeouts": {circuit: round(self.timeout(circuit), 2) for circuit in self._latency},
+        }
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List
+
+import grpc
+
+from utils.tls import grpc_channel_credentials, grpc_channel_options
+
+
+class PooledChannel:
+    """A channel of the pool with its stub and the number of streams in flight."""
+
+    __slots__ = ("channel", "stub", "in_flight", "streams")
+
+    def __init__(self, channel: grpc.aio.Channel, stub: Any):
+        self.channel = channel
+        self.stub = stub
+        self.in_flight = 0
+        self.streams = 0
+
+    def broken(self) -> bool:
+        state = self.channel.get_state(try_to_connect=False)
+        return state in (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN)
+
+
+class ChannelPool:
+    """
+    Shared multiplexed gRPC channel pool for prover backends.
+
+    A single HTTP/2 channel carries many concurrent streams, so the pool keeps a
+    small set of channels and hands out the least-loaded one by in-flight
+    stream count instead of one channel per RPC. A new channel is only opened
+    when every channel carries `max_streams_per_channel` streams, up to
+    `max_channels`; past that the least-loaded channel is shared anyway, so
+    acquiring never blocks. Channels in TRANSIENT_FAILURE or SHUTDOWN are
+    replaced the next time they would be picked.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        stub_class: Callable[[grpc.aio.Channel], Any],
+        verify_tls: bool = False,
+        tls_certfile: str = "",
+        *,
+        min_channels: int = 1,
+        max_channels: int = 4,
+        max_streams_per_channel: int = 100,
+        max_send_message_length: int = 64 * 1024 * 1024,
+        max_receive_message_length: int = 64 * 1024 * 1024,
+        keepalive_time_ms: int = 60_000,
+        keepalive_timeout_ms: int = 20_000,
+        ping_min_interval_ms: int = 30_000,
+        ping_min_interval_no_data_ms: int = 10_000,
+    ):
+        self.address = address
+        self.stub_class = stub_class
+        self.verify_tls = verify_tls
+        self.tls_certfile = tls_certfile
+        self.min_channels = max(1, min_channels)
+        self.max_channels = max(self.min_channels, max_channels)
+        self.max_streams_per_channel = max_streams_per_channel
+
+        self._channels: List[PooledChannel] = []
+        self._closed = False
+        self._replaced = 0
+
+        self._channel_options = [
+            ("grpc.max_send_message_length", max_send_message_length),
+            ("grpc.max_receive_message_length", max_receive_message_length),
+            ("grpc.keepalive_time_ms", keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", keepalive_timeout_ms),
+            ("grpc.keepalive_permit_without_calls", True),
+            ("grpc.http2.max_pings_without_data", 2),
+            ("grpc.http2.min_time_between_pings_ms", ping_min_interval_ms),
+            ("grpc.http2.min_ping_interval_without_data_ms", ping_min_interval_no_data_ms),
+            # Keep channels distinct, otherwise grpc shares one subchannel between them
+            ("grpc.use_local_subchannel_pool", 1),
+        ]
+
+    def _new_channel(self) -> PooledChannel:
+        credentials = grpc_channel_credentials(self.tls_certfile, self.address)
+        options = self._channel_options + grpc_channel_options(self.verify_tls, self.tls_certfile, self.address)
+        channel = grpc.aio.secure_channel(self.address, credentials, options=options)
+        return PooledChannel(channel, self.stub_class(channel))
+
+    def _replace(self, index: int) -> PooledChannel:
+        old = self._channels[index]
+        new = self._new_channel()
+        self._channels[index] = new
+        self._replaced += 1
+        logging.warning(f"[ChannelPool] - Replaced broken channel to {self.address}")
+        # Streams still running on the old channel are left to finish
+        if old.in_flight == 0:
+            asyncio.ensure_future(old.channel.close())
+        return new
+
+    def _pick(self) -> PooledChannel:
+        if self._closed:
+            raise RuntimeError("ChannelPool is closed")
+        while len(self._channels) < self.min_channels:
+            self._channels.append(self._new_channel())
+
+        index = min(range(len(self._channels)), key=lambda i: self._channels[i].in_flight)
+        pooled = self._channels[index]
+        if pooled.in_flight >= self.max_streams_per_channel and len(self._channels) < self.max_channels:
+            pooled = self._new_channel()
+            self._channels.append(pooled)
+        elif pooled.broken():
+            pooled = self._replace(index)
+        return pooled
+
+    @asynccontextmanager
+    async def stream(self):
+        """Yield `(channel, stub)` of the least-loaded channel for the duration of one RPC."""
+        pooled = self._pick()
+        pooled.in_flight += 1
+        pooled.streams += 1
+        try:
+            yield pooled.channel, pooled.stub
+        finally:
+            pooled.in_flight -= 1
+            if pooled not in self._channels and pooled.in_flight == 0:
+                await pooled.channel.close()
+
+    async def warmup(self, timeout: float = 5.0) -> bool:
+        """Open `min_channels` channels and wait until they are connected."""
+        while len(self._channels) < self.min_channels:
+            self._channels.append(self._new_channel())
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(pooled.channel.channel_ready() for pooled in self._channels)),
+                timeout,
+            )
+            return True
+        except asyncio.TimeoutError:
+            logging.warning(f"[ChannelPool] - Prover {self.address} is not ready after {timeout}s")
+            return False
+
+    def metrics(self) -> Dict[str, Any]:
+        in_flight = [pooled.in_flight for pooled in self._channels]
+        capacity = len(self._channels) * self.max_streams_per_channel
+        return {
+            "address": self.address,
+            "channels": len(self._channels),
+            "in_flight": sum(in_flight),
+            "in_flight_per_channel": in_flight,
+            "utilization": sum(in_flight) / capacity if capacity else 0.0,
+            "streams": sum(pooled.streams for pooled in self._channels),
+            "replaced": self._replaced,
+        }
+
+    async def close(self) -> None:
+        self._closed = True
+        channels, self._channels = self._channels, []
+        await asyncio.gather(*(pooled.channel.close() for pooled in channels), return_exceptions=True)
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.constant import STATUS_CODE_DEADLINE_EXCEEDED, STATUS_CODE_SUCCESSFULLY, STATUS_CODE_PROVER_NOT_RESPONSE
+from utils.progress_util import emit_progress, PROGRESS_DISPATCHED, PROGRESS_PROOF_RECEIVED
+from utils.trace_util import start_span
+
+
+class ProverBackend:
+    """One prover instance behind a router, with its affinity, weight and health."""
+
+    def __init__(self, prover: Any, address: str, circuit_templates: Optional[List[str]] = None, weight: float = 1.0):
+        self.prover = prover
+        self.address = address
+        self.circuit_templates = set(circuit_templates or [])
+        self.weight = max(float(weight), 0.01)
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until == 0.0
+
+    def serves(self, circuit_template_id: str) -> bool:
+        return not self.circuit_templates or circuit_template_id in self.circuit_templates
+
+
+class ProverRouter:
+    """
+    Route prover calls over several backends of the same prover type.
+
+    Backends listing `circuit_templates` are preferred for those circuits and
+    only serve them; backends without a list serve every circuit. Each call
+    goes to the healthy candidate with the fewest outstanding requests per
+    unit of weight. A backend answering `max_failures` times in a row with
+    STATUS_CODE_PROVER_NOT_RESPONSE is ejected and probed with
+    GetRunningProveTasks every `probe_interval` seconds until it answers again.
+    A call cut short by the request deadline says nothing about the backend
+    and leaves its failure count as it was.
+    When every candidate is ejected the router still tries them rather than
+    failing the request.
+
+    The router exposes the prover methods used by NodeLoad and the startup
+    warm-up, so it can stand in for a single prover there.
+    """
+
+    def __init__(self, name: str, backends: List[ProverBackend], *, max_failures: int = 3, probe_interval: float = 5.0):
+        if not backends:
+            raise ValueError(f"No backend configured for prover {name}")
+        self.name = name
+        self.backends = backends
+        self.max_failures = max_failures
+        self.probe_interval = probe_interval
+
+    def _candidates(self, circuit_template_id: Optional[str]) -> List[ProverBackend]:
+        if circuit_template_id is None:
+            return self.backends
+        affine = [b for b in self.backends if b.circuit_templates and circuit_template_id in b.circuit_templates]
+        if affine:
+            return affine
+        return [b for b in self.backends if b.serves(circuit_template_id)] or self.backends
+
+    def pick(self, circuit_template_id: Optional[str] = None) -> ProverBackend:
+        candidates = self._candidates(circuit_template_id)
+        healthy = [b for b in candidates if b.healthy] or candidates
+        return min(healthy, key=lambda b: (b.outstanding + 1) / b.weight)
+
+    @asynccontextmanager
+    async def route(self, circuit_template_id: Optional[str] = None):
+        backend = self.pick(circuit_template_id)
+        backend.outstanding += 1
+        backend.requests += 1
+        try:
+            yield backend
+        finally:
+            backend.outstanding -= 1
+
+    async def call(self, circuit_template_id: Optional[str], func: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run `func(prover)` on the selected backend and track its health from the result code."""
+        async with self.route(circuit_template_id) as backend:
+            emit_progress(PROGRESS_DISPATCHED, backend=backend.address)
+            with start_span("backend", prover=self.name, backend=backend.address, circuit_template_id=circuit_template_id) as span:
+                result = await func(backend.prover)
+                span.set_attribute("code", getattr(result, "code", None))
+        emit_progress(PROGRESS_PROOF_RECEIVED, backend=backend.address)
+        self.observe(backend, getattr(result, "code", STATUS_CODE_SUCCESSFULLY))
+        return result
+
+    def observe(self, backend: ProverBackend, code: int) -> None:
+        if code == STATUS_CODE_DEADLINE_EXCEEDED:
+            return
+        if code != STATUS_CODE_PROVER_NOT_RESPONSE:
+            backend.failures = 0
+            return
+        backend.failures += 1
+        if backend.healthy and backend.failures >= self.max_failures:
+            backend.ejected_until = time.monotonic() + self.probe_interval
+            logging.warning(f"[ProverRouter] - Ejected {self.name} backend {backend.address} after {backend.failures} failures")
+
+    async def _probe(self, backend: ProverBackend) -> None:
+        code, msg, _ = await backend.prover.get_running_prove_tasks()
+        if code == STATUS_CODE_SUCCESSFULLY:
+            backend.failures = 0
+            backend.ejected_until = 0.0
+            logging.info(f"[ProverRouter] - Re-admitted {self.name} backend {backend.address}")
+        else:
+            backend.ejected_until = time.monotonic() + self.probe_interval
+
+    async def run(self) -> None:
+        """Probe ejected backends until cancelled."""
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            now = time.monotonic()
+            due = [b for b in self.backends if not b.healthy and b.ejected_until <= now]
+            if due:
+                await asyncio.gather(*(self._probe(b) for b in due), return_exceptions=True)
+
+    async def get_running_prove_tasks(self) -> Tuple[int, str, Optional[int]]:
+        results = await asyncio.gather(*(b.prover.get_running_prove_tasks() for b in self.backends if b.healthy))
+        counts = [count for code, _, count in results if code == STATUS_CODE_SUCCESSFULLY and count is not None]
+        if results and not counts:
+            return results[0]
+        return STATUS_CODE_SUCCESSFULLY, "Successfully", sum(counts)
+
+    async def warmup(self, timeout: float = 5.0) -> bool:
+        ready = await asyncio.gather(*(b.prover.warmup(timeout) for b in self.backends))
+        return all(ready)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "address": ",".join(b.address for b in self.backends),
+            "channels": sum(b.prover.metrics()["channels"] for b in self.backends),
+            "backends": [
+                {
+                    "address": b.address,
+                    "healthy": b.healthy,
+                    "outstanding": b.outstanding,
+                    "requests": b.requests,
+                    "weight": b.weight,
+                    "pool": b.prover.metrics(),
+                }
+                for b in self.backends
+            ],
+        }
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+import aiofiles
+import ujson
+
+from modules.hub import Hub
+from utils.trace_util import SPAN_KIND_CLIENT, current_traceparent, parse_traceparent, start_span
+
+
+class ResultReporter:
+    """
+    Report proof results to the hub in the background.
+
+    Results are queued in memory and spooled to disk, so neither hub latency
+    nor hub outages delay the answer to the client, and queued reports survive
+    a restart. The queue is drained in batches over the persistent hub session;
+    a batch that fails entirely backs the reporter off exponentially, failed
+    reports are retried up to `max_attempts` times before being dropped.
+    """
+
+    def __init__(
+        self,
+        hub: Hub,
+        spool_path: str = "",
+        *,
+        batch_size: int = 32,
+        max_queue_size: int = 10000,
+        max_attempts: int = 20,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        spool_interval: float = 1.0,
+    ):
+        self.hub = hub
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.spool_interval = spool_interval
+
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._inflight: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._dirty = False
+        self._last_spool_at = 0.0
+        self._failures = 0
+        self._last_success_at = 0.0
+
+        self.stats: Dict[str, int] = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "dropped": 0,
+            "batches": 0,
+        }
+
+        self._load_spool()
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue) + len(self._inflight)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters plus the current queue depth and the age of the oldest report."""
+        oldest = self._queue[0]["created_at"] if self._queue else None
+        return {
+            **self.stats,
+            "queue_size": self.queue_size,
+            "oldest_age": time.time() - oldest if oldest else 0.0,
+            "consecutive_failures": self._failures,
+            "last_success_at": self._last_success_at,
+        }
+
+    def report(self, project_name: str, proof_hash: str, duration: int, verifiers: List[str]) -> None:
+        """Queue a result for the hub. Never blocks and never raises."""
+        if len(self._queue) >= self.max_queue_size:
+            self._queue.popleft()
+            self.stats["dropped"] += 1
+            logging.warning("[ResultReporter] - Queue is full, dropped the oldest report")
+
+        self._queue.append({
+            "project_name": project_name,
+            "proof_hash": proof_hash,
+            "duration": duration,
+            "verifiers": verifiers,
+            "attempts": 0,
+            "created_at": time.time(),
+            # The report is sent later, as a span of the prove request's trace
+            "traceparent": current_traceparent(),
+        })
+        self.stats["enqueued"] += 1
+        self._dirty = True
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        """Drain the queue until cancelled, flushing the spool on the way out."""
+        logging.info(f"[ResultReporter] - Started with {len(self._queue)} spooled reports")
+        try:
+            while True:
+                if not self._queue:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.spool_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    await self._save_spool()
+                    continue
+
+                if not await self._send_batch():
+                    await self._save_spool()
+                    await asyncio.sleep(self._backoff())
+                    continue
+                await self._save_spool()
+        finally:
+            await self._save_spool(force=True)
+
+    async def _send_batch(self) -> bool:
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        self._inflight = batch
+        self._dirty = True
+        self.stats["batches"] += 1
+
+        results = await asyncio.gather(
+            *(self._send(item) for item in batch), return_exceptions=True
+        )
+        self._inflight = []
+
+        retry = []
+        for item, ok in zip(batch, results):
+            if ok is True:
+                self.stats["sent"] += 1
+                continue
+            self.stats["failed"] += 1
+            item["attempts"] += 1
+            if item["attempts"] >= self.max_attempts:
+                self.stats["dropped"] += 1
+                logging.error(f"[ResultReporter] - Dropped report {item['proof_hash']} after {item['attempts']} attempts")
+                continue
+            retry.append(item)
+
+        # Failed reports go back to the head of the queue to keep the order
+        self._queue.extendleft(reversed(retry))
+
+        if len(retry) < len(batch):
+            self._failures = 0
+            self._last_success_at = time.time()
+            return True
+
+        self._failures += 1
+        return False
+
+    async def _send(self, item: Dict[str, Any]) -> bool:
+        parent = parse_traceparent(item.get("traceparent"))
+        with start_span("report", parent, SPAN_KIND_CLIENT, proof_hash=item["proof_hash"], attempt=item["attempts"] + 1) as span:
+            ok = await self.hub.send_result(
+                item["project_name"], item["proof_hash"], item["duration"], item["verifiers"]
+            )
+            if ok is not True:
+                span.record_error("Hub did not accept the result")
+            return ok
+
+    def _backoff(self) -> float:
+        return min(self.base_backoff * (2 ** (self._failures - 1)), self.max_backoff)
+
+    def _load_spool(self):
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return
+        try:
+            with open(self.spool_path, 'r') as file:
+                self._queue.extend(ujson.load(file)[-self.max_queue_size:])
+            logging.info(f"[ResultReporter] - Loaded {len(self._queue)} reports from {self.spool_path}")
+        except Exception as e:
+            logging.error(f"[ResultReporter] - Failed to load spool: {e}")
+
+    async def _save_spool(self, force: bool = False):
+        if not self.spool_path or not (self._dirty or force):
+            return
+        if not force and time.monotonic() - self._last_spool_at < self.spool_interval:
+            return
+        self._dirty = False
+        self._last_spool_at = time.monotonic()
+        tmp_path = f"{self.spool_path}.tmp"
+        try:
+            spool_dir = os.path.dirname(self.spool_path)
+            if spool_dir:
+                os.makedirs(spool_dir, exist_ok=True)
+            async with aiofiles.open(tmp_path, mode='w') as file:
+                # In-flight reports are kept until the hub acknowledged them
+                await file.write(ujson.dumps(self._inflight + list(self._queue)))
+            os.replace(tmp_path, self.spool_path)
+        except Exception as e:
+            self._dirty = True
+            logging.error(f"[ResultReporter] - Failed to save spool: {e}")
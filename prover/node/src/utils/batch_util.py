@@ -0,0 +1,23 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, List
+
+
+async def bounded_as_completed(factories: List[Callable[[], Awaitable[Any]]], limit: int) -> AsyncIterator[Any]:
+    """
+    Run the coroutines made by `factories` with at most `limit` at a time and
+    yield their results in completion order. Leaving the loop early cancels
+    the coroutines still running.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(factory: Callable[[], Awaitable[Any]]) -> Any:
+        async with semaphore:
+            return await factory()
+
+    tasks = [asyncio.ensure_future(run(factory)) for factory in factories]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,296 @@
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import grpc
+import ujson
+
+CAPTURE_VERSION = 1
+
+# Requests carrying any of these are marked as authenticated; the value is never kept
+_AUTH_HEADERS = (b"authorization", b"x-node-token")
+
+_MAX_DEPTH = 8
+_MAX_KEYS = 64
+
+
+def _bucket(length: int) -> int:
+    """`length` rounded up to a power of two, so shapes repeat while the sizes stay close."""
+    return 0 if length <= 0 else 1 << (length - 1).bit_length()
+
+
+def shape_of(value: Any, depth: int = 0) -> Any:
+    """
+    The shape of a decoded body: its keys and value types, with string and
+    bytes lengths rounded up to a power of two. No value is kept.
+    """
+    if depth >= _MAX_DEPTH:
+        return "any"
+    if isinstance(value, dict):
+        return {str(key): shape_of(item, depth + 1) for key, item in list(value.items())[:_MAX_KEYS]}
+    if isinstance(value, (list, tuple)):
+        return {"list": shape_of(value[0], depth + 1) if value else "null", "len": _bucket(len(value))}
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return f"str:{_bucket(len(value))}"
+    if isinstance(value, (bytes, bytearray)):
+        return f"bytes:{_bucket(len(value))}"
+    if value is None:
+        return "null"
+    return "any"
+
+
+def synthesize(shape: Any) -> Any:
+    """A value of `shape` with placeholder content, for replaying a captured request."""
+    if isinstance(shape, dict):
+        if set(shape) == {"list", "len"}:
+            return [synthesize(shape["list"]) for _ in range(shape["len"])] if shape["list"] != "null" else []
+        return {key: synthesize(item) for key, item in shape.items()}
+    if shape == "bool":
+        return False
+    if shape == "int":
+        return 0
+    if shape == "float":
+        return 0.0
+    if isinstance(shape, str) and shape.startswith("str:"):
+        return "A" * int(shape[4:])
+    if isinstance(shape, str) and shape.startswith("bytes:"):
+        return b"\0" * int(shape[6:])
+    return None
+
+
+def message_shape(message) -> Dict[str, Any]:
+    """The shape of a protobuf message, set fields only."""
+    fields = {}
+    for field, value in message.ListFields():
+        if field.message_type is not None:
+            if field.label == field.LABEL_REPEATED:
+                fields[field.name] = {"list": message_shape(value[0]) if len(value) else "null", "len": _bucket(len(value))}
+            else:
+                fields[field.name] = message_shape(value)
+        else:
+            fields[field.name] = shape_of(list(value) if field.label == field.LABEL_REPEATED else value)
+    return fields
+
+
+class TrafficCapture:
+    """
+    Capture of the requests a node serves, for `main.py replay`.
+
+    Each request is recorded as its arrival time and a shape: the route, the
+    content type, whether it was authenticated and the keys and value sizes of
+    its body, never the values themselves. Shapes are written once and events
+    refer to them, so a line per request is a few bytes:
+
+        {"capture": 1, "service": "node", "pid": 7, "started_at": 1714560000.0}
+        {"shape": 0, "kind": "http", "method": "POST", "path": "/prove", ...}
+        [12.5, 0, 1843]                       # ms since started_at, shape, body bytes
+
+    A background thread writes the lines, one file per worker process. Off,
+    the only cost to a request is reading `active`.
+    """
+    _instance = None
+    _locker = threading.Lock()
+    _MAX_SHAPES = 10000
+
+    def __new__(cls, *args, **kwargs):
+        with cls._locker:
+            if cls._instance is None:
+                cls._instance = super(TrafficCapture, cls).__new__(cls)
+                cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized == True:
+            return
+
+        self.active = False
+        self.path = ""
+        self.started_at = 0.0
+        self._deadline = None
+        self._max_events = 0
+        self._shapes: Dict[str, int] = {}
+        self._queue: Optional[queue.Queue] = None
+        self.stats = {"events": 0, "dropped": 0}
+        self._initialized = True
+
+    def start(self, file_path: str, max_events: int = 1000000, seconds: float = 0) -> str:
+        """Start capturing into `file_path`, suffixed with the pid; stops by itself after `max_events` or `seconds`."""
+        if self.active:
+            return self.path
+        root, ext = os.path.splitext(file_path)
+        self.path = f"{root}-{os.getpid()}{ext}"
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.started_at = time.time()
+        self._deadline = self.started_at + seconds if seconds > 0 else None
+        self._max_events = max_events
+        self._shapes = {}
+        self.stats = {"events": 0, "dropped": 0}
+        self._queue = queue.Queue(maxsize=10000)
+        self._queue.put({"capture": CAPTURE_VERSION, "service": "node", "pid": os.getpid(), "started_at": self.started_at})
+        threading.Thread(target=self._write_loop, args=(self.path, self._queue), name="traffic-capture", daemon=True).start()
+        self.active = True
+        logging.info(f"[TrafficCapture] - Capturing requests to {self.path}")
+        return self.path
+
+    def stop(self) -> Dict[str, Any]:
+        if self.active:
+            self.active = False
+            self._queue.put(None)
+            logging.info(f"[TrafficCapture] - Captured {self.stats['events']} requests to {self.path}")
+        return self.metrics()
+
+    def record(self, arrived_at: float, shape: Dict[str, Any], size: int) -> None:
+        if not self.active:
+            return
+        if self.stats["events"] >= self._max_events or (self._deadline is not None and arrived_at >= self._deadline):
+            self.stop()
+            return
+        key = ujson.dumps(shape, sort_keys=True)
+        shape_id = self._shapes.get(key)
+        try:
+            if shape_id is None:
+                if len(self._shapes) >= self._MAX_SHAPES:
+                    self.stats["dropped"] += 1
+                    return
+                shape_id = len(self._shapes)
+                self._queue.put_nowait({"shape": shape_id, **shape})
+                self._shapes[key] = shape_id
+            self._queue.put_nowait([round(max(0.0, arrived_at - self.started_at) * 1000, 1), shape_id, size])
+            self.stats["events"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def record_http(self, arrived_at: float, scope, body: bytes) -> None:
+        route = scope.get("route")
+        # Unmatched paths are scanner noise, admin calls are not load
+        if route is None or route.path.startswith("/admin"):
+            return
+        content_type, accept, authenticated = "", "", False
+        for name, value in scope["headers"]:
+            if name == b"content-type":
+                content_type = value.decode("latin-1")
+            elif name == b"accept":
+                accept = value.decode("latin-1")
+            elif name in _AUTH_HEADERS:
+                authenticated = True
+        body_shape = None
+        if body and "json" in content_type:
+            try:
+                body_shape = shape_of(ujson.loads(body))
+            except ValueError:
+                pass
+        query = {}
+        for pair in scope.get("query_string", b"").decode("latin-1").split("&"):
+            if pair:
+                name, _, value = pair.partition("=")
+                query[name] = f"str:{_bucket(len(value))}"
+        self.record(arrived_at, {
+            "kind": "http",
+            "method": scope["method"],
+            "path": route.path,
+            "content_type": content_type,
+            "accept": accept,
+            "auth": authenticated,
+            "query": query,
+            "body": body_shape,
+        }, len(body))
+
+    def record_grpc(self, arrived_at: float, method: str, rpc: str, request, authenticated: bool) -> None:
+        self.record(arrived_at, {
+            "kind": "grpc",
+            "method": method,
+            "rpc": rpc,
+            "type": request.DESCRIPTOR.full_name,
+            "auth": authenticated,
+            "body": message_shape(request),
+        }, request.ByteSize())
+
+    def _write_loop(self, path: str, lines: queue.Queue) -> None:
+        try:
+            with open(path, "a") as file:
+                while True:
+                    line = lines.get()
+                    if line is None:
+                        return
+                    file.write(ujson.dumps(line) + "\n")
+                    if lines.empty():
+                        file.flush()
+        except OSError as e:
+            self.active = False
+            logging.error(f"[TrafficCapture] - Failed to write {path}: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"active": self.active, "path": self.path, "shapes": len(self._shapes), **self.stats}
+
+
+class CaptureMiddleware:
+    """ASGI middleware recording the requests of the node while a capture runs."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        capture = TrafficCapture()
+        if scope["type"] != "http" or not capture.active:
+            await self.app(scope, receive, send)
+            return
+
+        arrived_at = time.time()
+        chunks = []
+
+        async def captured_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        try:
+            await self.app(scope, captured_receive, send)
+        finally:
+            # The route is only known once the router matched it
+            capture.record_http(arrived_at, scope, b"".join(chunks))
+
+
+class CaptureInterceptor(grpc.aio.ServerInterceptor):
+    """gRPC server interceptor recording the calls of the node while a capture runs."""
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        capture = TrafficCapture()
+        if handler is None or not capture.active:
+            return handler
+
+        method = handler_call_details.method
+        authenticated = any(key.encode() in _AUTH_HEADERS for key, _ in handler_call_details.invocation_metadata or ())
+
+        if handler.unary_unary is not None:
+            behavior = handler.unary_unary
+
+            async def unary_unary(request, context):
+                capture.record_grpc(time.time(), method, "unary_unary", request, authenticated)
+                return await behavior(request, context)
+
+            return grpc.unary_unary_rpc_method_handler(unary_unary, handler.request_deserializer, handler.response_serializer)
+
+        if handler.unary_stream is not None:
+            behavior = handler.unary_stream
+
+            async def unary_stream(request, context):
+                capture.record_grpc(time.time(), method, "unary_stream", request, authenticated)
+                async for response in behavior(request, context):
+                    yield response
+
+            return grpc.unary_stream_rpc_method_handler(unary_stream, handler.request_deserializer, handler.response_serializer)
+
+        return handler
@@ -0,0 +1,239 @@
+import base64
+import contextvars
+from typing import Any, Callable, Dict, Optional
+
+import msgpack
+import ujson
+from fastapi.responses import Response
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.message import DecodeError, Message
+
+MEDIA_TYPE_JSON = "application/json"
+# JSON with bytes as standard base64 instead of Base85, encoded by ujson instead of pydantic
+MEDIA_TYPE_JSON_BASE64 = "application/x-base64+json"
+MEDIA_TYPE_MSGPACK = "application/msgpack"
+# The messages of the gRPC service, for the routes that have one
+MEDIA_TYPE_PROTOBUF = "application/x-protobuf"
+
+_MEDIA_TYPES = {
+    MEDIA_TYPE_JSON: MEDIA_TYPE_JSON,
+    MEDIA_TYPE_JSON_BASE64: MEDIA_TYPE_JSON_BASE64,
+    MEDIA_TYPE_MSGPACK: MEDIA_TYPE_MSGPACK,
+    "application/x-msgpack": MEDIA_TYPE_MSGPACK,
+    "application/vnd.msgpack": MEDIA_TYPE_MSGPACK,
+    MEDIA_TYPE_PROTOBUF: MEDIA_TYPE_PROTOBUF,
+    "application/protobuf": MEDIA_TYPE_PROTOBUF,
+}
+
+# Response format negotiated for the request being served
+_format: contextvars.ContextVar[str] = contextvars.ContextVar("response_format", default=MEDIA_TYPE_JSON)
+
+
+def _media_type(value: str) -> str:
+    return value.split(";", 1)[0].strip().lower()
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """The supported media type of an Accept header with the highest quality, JSON when none is."""
+    best, best_quality = MEDIA_TYPE_JSON, 0.0
+    for entry in (accept or "").split(","):
+        media_type = _MEDIA_TYPES.get(_media_type(entry))
+        if media_type is None:
+            continue
+        quality = 1.0
+        for param in entry.split(";")[1:]:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def response_format() -> str:
+    return _format.get()
+
+
+def message_to_dict(message: Message) -> Dict[str, Any]:
+    """All fields of a protobuf message, defaults included, bytes kept as bytes."""
+    data = {}
+    for field in message.DESCRIPTOR.fields:
+        value = getattr(message, field.name)
+        if field.type == FieldDescriptor.TYPE_MESSAGE:
+            if field.label == FieldDescriptor.LABEL_REPEATED:
+                value = [message_to_dict(item) for item in value]
+            else:
+                value = message_to_dict(value)
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            value = list(value)
+        data[field.name] = value
+    return data
+
+
+def _fill(message: Message, data: Dict[str, Any]) -> Message:
+    for field in message.DESCRIPTOR.fields:
+        value = data.get(field.name)
+        if value is None:
+            continue
+        if field.type == FieldDescriptor.TYPE_MESSAGE:
+            if field.label == FieldDescriptor.LABEL_REPEATED:
+                for item in value:
+                    _fill(getattr(message, field.name).add(), item)
+            else:
+                _fill(getattr(message, field.name), value)
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            getattr(message, field.name).extend(value)
+        else:
+            setattr(message, field.name, value)
+    return message
+
+
+def dict_to_message(message_cls, data: Dict[str, Any]) -> Message:
+    """Build a protobuf message from the keys of `data` it defines; None values are left unset."""
+    return _fill(message_cls(), data)
+
+
+def _base64(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, dict):
+        return {key: _base64(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_base64(item) for item in value]
+    return value
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def encode(data: Dict[str, Any], media_type: str, message_cls=None) -> bytes:
+    """
+    Encode a response in one of the binary friendly formats; bytes values are
+    base64 in JSON and raw in MessagePack and protobuf.
+    """
+    if media_type == MEDIA_TYPE_MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    if media_type == MEDIA_TYPE_PROTOBUF and message_cls is not None:
+        return dict_to_message(message_cls, data).SerializeToString()
+    return ujson.dumps(_base64(data)).encode("utf-8")
+
+
+def encode_stream_item(data: Dict[str, Any], media_type: str, message_cls=None) -> bytes:
+    """
+    One item of a streamed response: JSON items end with a newline, MessagePack
+    objects follow each other and protobuf messages are varint length-delimited.
+    """
+    body = encode(data, media_type, message_cls)
+    if media_type == MEDIA_TYPE_MSGPACK:
+        return body
+    if media_type == MEDIA_TYPE_PROTOBUF and message_cls is not None:
+        return _varint(len(body)) + body
+    return body + b"\n"
+
+
+def stream_media_type(message_cls=None) -> str:
+    media_type = response_format()
+    if media_type == MEDIA_TYPE_PROTOBUF and message_cls is None:
+        return MEDIA_TYPE_JSON_BASE64
+    return media_type
+
+
+def negotiated_response(data: Dict[str, Any], message_cls=None, status_code: int = 200) -> Response:
+    """
+    Response in the negotiated format. Routes without a protobuf message answer
+    base64 JSON to a protobuf request.
+    """
+    media_type = stream_media_type(message_cls)
+    return Response(content=encode(data, media_type, message_cls), status_code=status_code, media_type=media_type)
+
+
+class ContentNegotiationMiddleware:
+    """
+    ASGI middleware negotiating the response format from the Accept header and
+    decoding MessagePack and protobuf request bodies.
+
+    Request bodies are small next to proofs, so they are handed to the routes
+    as JSON and the same handlers serve every format; the routes encode their
+    response with `negotiated_response` unless plain JSON was negotiated.
+    `protobuf_requests` maps a path to the function decoding its protobuf body
+    into the fields of the JSON request.
+    """
+
+    def __init__(self, app, protobuf_requests: Optional[Dict[str, Callable[[bytes], Dict[str, Any]]]] = None):
+        self.app = app
+        self.protobuf_requests = protobuf_requests or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = None
+        content_type = None
+        for name, value in scope["headers"]:
+            if name == b"accept":
+                accept = value.decode("latin-1")
+            elif name == b"content-type":
+                content_type = _MEDIA_TYPES.get(_media_type(value.decode("latin-1")))
+
+        token = _format.set(negotiate(accept))
+        try:
+            if content_type not in (MEDIA_TYPE_MSGPACK, MEDIA_TYPE_PROTOBUF):
+                await self.app(scope, receive, send)
+                return
+
+            body = b""
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    break
+                body += message.get("body", b"")
+                if not message.get("more_body", False):
+                    break
+
+            try:
+                if content_type == MEDIA_TYPE_MSGPACK:
+                    data = msgpack.unpackb(body, raw=False)
+                else:
+                    decoder = self.protobuf_requests.get(scope["path"])
+                    if decoder is None:
+                        await self._reject(send, 415, f"{scope['path']} does not accept {MEDIA_TYPE_PROTOBUF}")
+                        return
+                    data = decoder(body)
+                json_body = ujson.dumps(data).encode("utf-8")
+            except (TypeError, ValueError, DecodeError, msgpack.UnpackException) as e:
+                await self._reject(send, 400, f"Invalid {content_type} body: {e}")
+                return
+
+            headers = [(name, value) for name, value in scope["headers"] if name not in (b"content-type", b"content-length")]
+            headers += [(b"content-type", MEDIA_TYPE_JSON.encode()), (b"content-length", str(len(json_body)).encode())]
+            sent = False
+
+            async def json_receive():
+                nonlocal sent
+                if not sent:
+                    sent = True
+                    return {"type": "http.request", "body": json_body, "more_body": False}
+                return await receive()
+
+            await self.app({**scope, "headers": headers}, json_receive, send)
+        finally:
+            _format.reset(token)
+
+    @staticmethod
+    async def _reject(send, status: int, msg: str) -> None:
+        body = ujson.dumps({"detail": {"code": -1, "msg": msg}}).encode("utf-8")
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", MEDIA_TYPE_JSON.encode()), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
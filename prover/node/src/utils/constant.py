@@ -17,6 +17,10 @@ STATUS_CODE_UNSUPPORT_PROVER = 1003
 STATUS_CODE_UNSUPPORT_OAUTH_PROVIDER = 1004
 STATUS_CODE_UNAUTHORIZED_PAYLOAD = 1005
 STATUS_CODE_PROVER_NOT_RESPONSE = 1006
+STATUS_CODE_NODE_OVERLOADED = 1007
+STATUS_CODE_JOB_NOT_FOUND = 1008
+STATUS_CODE_CALLBACK_URL_INVALID = 1009
+STATUS_CODE_DEADLINE_EXCEEDED = 1010
 
 
 STATUS_CODE_PUBLIC_KEY_NOT_FOUND = 2000
@@ -36,4 +40,8 @@ TASK_TYPE_ZKLOGIN = 0
 TASK_TYPE_TIGA = -1
 
 TASK_STATUS_PENGDING = 0
-TASK_STATUS_RUNNING = 1
\ No newline at end of file
+TASK_STATUS_RUNNING = 1
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
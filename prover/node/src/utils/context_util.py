@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Union
+
+from config import NodeConfig
+from modules.admission import AdmissionController
+from modules.hub import Hub
+from modules.job_manager import JobManager
+from modules.key_cache import KeyCache
+from modules.node_load import NodeLoad
+from modules.proof_manager import ProofManager, SharedProofManager
+from modules.prover import ProverRouter, RpcPolicy
+from modules.result_reporter import ResultReporter
+from modules.project_manager import ProjectManager
+from modules.oauth_provider import OAuthProvider, OAuthProviderResolver
+from modules.prove_service.v1 import ProveServiceV1
+from modules.prove_service.v2 import ProveServiceV2
+from utils.deadline_util import CancelOnDisconnectMiddleware
+from utils.metrics_util import LoopLagMonitor, PrometheusText
+from utils.profile_util import LoopProfiler, MemoryProfiler
+from utils.trace_util import Tracer
+
+
+@dataclass
+class AppContext:
+    """
+    Dependency graph of a running node.
+
+    Built once by the ServerBuilder and shared by the gRPC and HTTP transports,
+    so no request has to resolve configuration, providers or key files again.
+    """
+    config: NodeConfig
+    hub: Hub
+    result_reporter: ResultReporter
+    node_key: KeyCache
+    node_load: NodeLoad
+    admission: AdmissionController
+    job_manager: JobManager
+    provers: Dict[str, ProverRouter]
+    rpc_policy: RpcPolicy
+    proof_manager: Union[ProofManager, SharedProofManager]
+    project_manager: ProjectManager
+    oauth_provider: Dict[str, OAuthProvider]
+    oauth_resolver: OAuthProviderResolver
+    prove_service_v1: ProveServiceV1
+    prove_service_v2: ProveServiceV2
+    # Set once the node is warm and both transports listen
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    loop_lag: LoopLagMonitor = field(default_factory=LoopLagMonitor)
+    profiler: LoopProfiler = field(default_factory=LoopProfiler)
+    memory_profiler: MemoryProfiler = field(default_factory=MemoryProfiler)
+    # Registered by the middleware once the HTTP app builds its stack
+    http_disconnect: Optional[CancelOnDisconnectMiddleware] = None
+
+    def render_metrics(self) -> str:
+        """The metrics of every component in the Prometheus text format, for `GET /metrics`."""
+        out = PrometheusText("node_")
+        out.gauge("worker_info", "The worker process answering the scrape", 1, pid=os.getpid())
+        out.gauge("ready", "1 once the node is warm and serving", int(self.ready.is_set()))
+
+        out.histogram("prove_duration_seconds", "Prove requests from admission to result", self.node_load.prove_latency)
+        out.gauge("prove_in_flight", "Prove requests being served", self.node_load.in_flight)
+
+        policy = self.rpc_policy.metrics()
+        out.histogram("prover_rpc_duration_seconds", "Prover RPC attempts by status code", self.rpc_policy.rpc_latency)
+        out.counter("prover_rpc_calls", "Prover RPCs, retries excluded", policy["calls"])
+        out.counter("prover_rpc_retries", "Prover RPC retries", policy["retries"])
+        out.counter("prover_rpc_deadline_exceeded", "Prover RPCs past their deadline", policy["deadline_exceeded"])
+        out.counter("prover_rpc_request_deadline_exceeded", "Prover RPCs cut short by the request deadline", policy["request_deadline_exceeded"])
+        out.counter("prover_rpc_cancelled", "Prover RPCs cancelled by their client", policy["cancelled"])
+        out.counter("prover_rpc_retry_budget_exhausted", "Retries refused by the retry budget", policy["retry_budget_exhausted"])
+        out.counter("prover_gpu_seconds_saved", "Expected prover seconds left when a call was cancelled by its client", policy["gpu_seconds_saved"])
+        out.counter(
+            "http_disconnect_cancelled",
+            "HTTP handlers cancelled because their client disconnected",
+            self.http_disconnect.cancelled if self.http_disconnect is not None else 0,
+        )
+        for circuit, timeout in policy["timeouts"].items():
+            out.gauge("prover_rpc_timeout_seconds", "Learned prover RPC timeout", timeout, circuit=circuit)
+
+        for name, router in self.provers.items():
+            for backend in router.metrics()["backends"]:
+                pool = backend["pool"]
+                labels = {"prover": name, "backend": backend["address"]}
+                out.gauge("prover_backend_healthy", "1 unless the backend is ejected", int(backend["healthy"]), **labels)
+                out.gauge("prover_backend_outstanding", "Calls routed to the backend and not done", backend["outstanding"], **labels)
+                out.counter("prover_backend_requests", "Calls routed to the backend", backend["requests"], **labels)
+                out.gauge("prover_pool_channels", "Open channels of the backend pool", pool["channels"], **labels)
+                out.gauge("prover_pool_in_flight", "Streams in flight on the backend pool", pool["in_flight"], **labels)
+                out.gauge("prover_pool_utilization", "In-flight streams over the pool stream capacity", pool["utilization"], **labels)
+                out.counter("prover_pool_channels_replaced", "Broken channels replaced", pool["replaced"], **labels)
+
+        admission = self.admission.metrics()
+        out.gauge("admission_limit", "Concurrent prove requests admitted", admission["limit"])
+        out.gauge("admission_in_flight", "Prove requests holding an admission slot", admission["in_flight"])
+        out.gauge("admission_queue_size", "Prove requests waiting for a slot", admission["queue_size"])
+        for outcome in ("admitted", "queued", "rejected_queue_full", "rejected_timeout"):
+            out.counter("admission_requests", "Admission decisions", admission[outcome], outcome=outcome)
+
+        proof_manager = self.proof_manager.metrics()
+        out.gauge("proof_manager_size", "Proof hashes held by the ProofManager", proof_manager["size"])
+        for outcome in ("claimed", "not_found", "invalid", "released"):
+            out.counter("proof_claims", "Proof hash claims by outcome", proof_manager[outcome], outcome=outcome)
+        if "busy" in proof_manager:
+            out.counter("proof_store_busy", "Task store statements turned away on a lock held by another worker", proof_manager["busy"])
+
+        for name, provider in self.oauth_provider.items():
+            jwks = provider.metrics()
+            out.counter("jwks_refreshes", "JWKS fetches by outcome", jwks["refresh_success"], provider=name, outcome="success")
+            out.counter("jwks_refreshes", "JWKS fetches by outcome", jwks["refresh_failure"], provider=name, outcome="failure")
+            out.counter("jwks_refreshes", "JWKS fetches by outcome", jwks["refresh_rate_limited"], provider=name, outcome="rate_limited")
+            out.counter("jwks_negative_cache_hits", "Unknown moduli answered from the negative cache", jwks["negative_cache_hit"], provider=name)
+            out.gauge("jwks_keys", "Keys in the JWKS", jwks["keys"], provider=name)
+            out.gauge("jwks_expires_in_seconds", "Seconds until the JWKS is due for a refresh", jwks["expires_in"], provider=name)
+
+        reporter = self.result_reporter.metrics()
+        out.gauge("hub_report_queue_size", "Results waiting to be reported to the hub", reporter["queue_size"])
+        out.gauge("hub_report_lag_seconds", "Age of the oldest result not reported yet", reporter["oldest_age"])
+        out.gauge("hub_report_consecutive_failures", "Failed report batches in a row", reporter["consecutive_failures"])
+        if reporter["last_success_at"]:
+            out.gauge("hub_report_last_success_age_seconds", "Seconds since the hub last accepted a report", time.time() - reporter["last_success_at"])
+        for outcome in ("sent", "failed", "dropped"):
+            out.counter("hub_reports", "Result reports by outcome", reporter[outcome], outcome=outcome)
+
+        jobs = self.job_manager.metrics()
+        out.gauge("jobs_pending", "Async prove jobs not finished", jobs["pending"])
+        for outcome in ("submitted", "completed", "failed", "expired"):
+            out.counter("jobs", "Async prove jobs by outcome", jobs[outcome], outcome=outcome)
+        for outcome in ("sent", "failed", "rejected"):
+            out.counter("job_callbacks", "Job callbacks by outcome", jobs[f"callbacks_{outcome}"], outcome=outcome)
+
+        out.histogram("event_loop_lag_seconds", "Delay of a timer past its due time", self.loop_lag.histogram)
+        out.gauge("event_loop_lag_max_seconds", "Largest event loop lag seen", self.loop_lag.max)
+        out.counter("event_loop_slow_callbacks", "Callbacks that blocked the event loop past the slow callback threshold", self.loop_lag.slow_callbacks)
+
+        tracing = Tracer().metrics()
+        out.counter("trace_spans_exported", "Spans exported", tracing["exported"])
+        out.counter("trace_spans_dropped", "Spans dropped on a full export queue", tracing["dropped"])
+        return out.text()
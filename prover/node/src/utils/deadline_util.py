@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import grpc
+
+# Absolute time.monotonic() deadline of the request being served, None when unbounded
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+DEADLINE_HEADER = "x-request-timeout-ms"
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request deadline, None without a deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]):
+    """Bound the calls made inside the block by `timeout` seconds, keeping an earlier outer deadline."""
+    if timeout is None:
+        yield
+        return
+    deadline = time.monotonic() + timeout
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def grpc_propagate_deadline(func):
+    """
+    Apply the deadline of the incoming gRPC call to the prover calls of a servicer method.
+
+    grpc.aio cancels the servicer task when the client cancels or its deadline
+    passes, and the cancellation reaches the prover RPC being awaited.
+    """
+    @functools.wraps(func)
+    async def wrapper(self, request, context: grpc.aio.ServicerContext):
+        with deadline_scope(context.time_remaining()):
+            try:
+                return await func(self, request, context)
+            except asyncio.CancelledError:
+                logging.info(f"[gRPC] - Client cancelled {func.__name__}")
+                raise
+    return wrapper
+
+
+class DeadlineMiddleware:
+    """ASGI middleware applying the `X-Request-Timeout-Ms` header of a request as its deadline."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        timeout = None
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name.decode("latin-1").lower() == DEADLINE_HEADER:
+                    try:
+                        timeout = max(0.0, float(value) / 1000)
+                    except ValueError:
+                        pass
+                    break
+        with deadline_scope(timeout):
+            await self.app(scope, receive, send)
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    ASGI middleware cancelling a request handler when its client disconnects.
+
+    Uvicorn keeps running a handler whose client went away, so a proof would
+    keep its admission slot and its prover busy for nobody. The middleware
+    reads the request messages itself, hands them to the handler in order and
+    cancels the handler on `http.disconnect`, which cancels the prover RPC it
+    is awaiting. Starlette builds the middleware itself, so it registers with
+    the node `context` to have its count exported.
+    """
+
+    def __init__(self, app, context=None):
+        self.app = app
+        self.cancelled = 0
+        if context is not None:
+            context.http_disconnect = self
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+
+        async def read_messages():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def wrapped_receive():
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        handler = asyncio.ensure_future(self.app(scope, wrapped_receive, send))
+        reader = asyncio.ensure_future(read_messages())
+        disconnect = asyncio.ensure_future(disconnected.wait())
+        try:
+            await asyncio.wait((handler, disconnect), return_when=asyncio.FIRST_COMPLETED)
+            if not handler.done():
+                self.cancelled += 1
+                logging.info(f"[HTTP] - Client disconnected, cancelled {scope['path']}")
+                handler.cancel()
+                await asyncio.gather(handler, return_exceptions=True)
+                return
+            await handler
+        finally:
+            for task in (handler, reader, disconnect):
+                task.cancel()
@@ -1,8 +1,37 @@
+import functools
+
 import fastapi
+import grpc
+from fastapi.responses import JSONResponse
+
+from modules.admission import AdmissionRejected
+from utils.constant import STATUS_CODE_NODE_OVERLOADED
 
 class HTTPException(fastapi.HTTPException):
     def __init__(self, code=-1, msg="System busy", status_code=500):
         super().__init__(detail={
             "code": code,
             "msg": msg,
-        }, status_code=status_code)
\ No newline at end of file
+        }, status_code=status_code)
+
+async def admission_rejected_handler(request: fastapi.Request, exc: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": {"code": STATUS_CODE_NODE_OVERLOADED, "msg": exc.msg}},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def grpc_abort_on_rejection(func):
+    """Turn AdmissionRejected raised by a servicer method into RESOURCE_EXHAUSTED."""
+    @functools.wraps(func)
+    async def wrapper(self, request, context: grpc.aio.ServicerContext):
+        try:
+            return await func(self, request, context)
+        except AdmissionRejected as e:
+            await context.abort(
+                grpc.StatusCode.RESOURCE_EXHAUSTED,
+                e.msg,
+                trailing_metadata=(("retry-after", str(e.retry_after)),),
+            )
+    return wrapper
@@ -0,0 +1,50 @@
+import asyncio
+import fcntl
+import logging
+import os
+from typing import Optional
+
+
+class LeaderLock:
+    """
+    Leadership among the worker processes of a node.
+
+    The leader holds an exclusive flock on `path`. The kernel drops the lock
+    when its process dies, so another worker takes over at its next attempt
+    without any lease to expire.
+    """
+
+    def __init__(self, path: str, retry_interval: float = 1.0):
+        self.path = path
+        self.retry_interval = retry_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    async def acquire(self) -> None:
+        """Wait until this process is the leader."""
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_interval)
+        logging.info(f"[Leader] - Worker {os.getpid()} holds {self.path}")
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -1,10 +1,12 @@
 # logging_setup.py
 
+import atexit
 import os
 import sys
 import re
+import queue
 import logging
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 
 
 class ReTimedRotatinFileHandler(TimedRotatingFileHandler):
@@ -53,6 +55,20 @@ def create_timed_handler(filename, when, level, backup=7):
     return handler
 
 
+class LocalQueueHandler(QueueHandler):
+    """
+    Hand records to a QueueListener thread, which writes them to the files and
+    stdout so no logging call blocks the event loop on disk I/O.
+
+    The listener runs in the same process, so records are passed on as they
+    are, exception info included, with only the message rendered up front.
+    """
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
 def setup_logger(log_name, logs_path, when="MIDNIGHT", level=logging.INFO, apply_to_root=True):
     formatter = logging.Formatter(
         "[%(asctime)s] [%(process)d] [%(levelname)s] - %(name)s.%(module)s.%(funcName)s (%(filename)s:%(lineno)d) - %(message)s"
@@ -71,13 +87,17 @@ def setup_logger(log_name, logs_path, when="MIDNIGHT", level=logging.INFO, apply
     stream_handler = logging.StreamHandler(sys.stdout)
     stream_handler.setFormatter(formatter)
 
+    # Writes happen on the listener thread, flushed on exit
+    listener = QueueListener(queue.SimpleQueue(), info_handler, error_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    queue_handler = LocalQueueHandler(listener.queue)
+
     # Create logger
     logger = logging.getLogger(log_name)
     logger.handlers = []  # Clear duplicates
     logger.setLevel(level)
-    logger.addHandler(info_handler)
-    logger.addHandler(error_handler)
-    logger.addHandler(stream_handler)
+    logger.addHandler(queue_handler)
     logger.propagate = False
 
     # Apply to root logger (global default)
@@ -85,9 +105,7 @@ def setup_logger(log_name, logs_path, when="MIDNIGHT", level=logging.INFO, apply
         root_logger = logging.getLogger()
         root_logger.handlers = []
         root_logger.setLevel(level)
-        root_logger.addHandler(info_handler)
-        root_logger.addHandler(error_handler)
-        root_logger.addHandler(stream_handler)
+        root_logger.addHandler(queue_handler)
 
     return logger
 
@@ -0,0 +1,198 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import ujson
+
+
+class LatencyWindow:
+    """
+    Sliding window over the most recent latency samples.
+
+    Percentiles are computed on demand by sorting the window, which is cheap
+    for the few hundred samples kept and only happens when a reading is taken.
+    """
+
+    def __init__(self, size: int = 512):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+
+    def samples(self) -> List[float]:
+        return list(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th percentile (0-100) of the window, None when empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+# Seconds, from a fast ping to the slowest proofs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """
+    Cumulative histogram per label values, in the Prometheus layout.
+
+    Unlike LatencyWindow it never forgets a sample, so rates and quantiles
+    over any range can be computed by the scraper.
+    """
+
+    def __init__(self, label_names: Tuple[str, ...], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: Any) -> None:
+        key = tuple(str(label) for label in label_values)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def series(self) -> Iterator[Tuple[Tuple[str, ...], List[int], float]]:
+        """Yield the label values, the cumulative bucket counts ending with +Inf, and the sum."""
+        for key, series in self._series.items():
+            yield key, list(itertools.accumulate(series[:-1])), series[-1]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class PrometheusText:
+    """Writer of the Prometheus text exposition format."""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._lines: List[str] = []
+        self._declared = set()
+
+    def _declare(self, name: str, kind: str, help_text: str) -> str:
+        name = self.prefix + name
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+    def _sample(self, name: str, value: Optional[float], labels: Dict[str, Any]) -> None:
+        if value is None:
+            return
+        self._lines.append(f"{name}{self._labels(labels)} {float(value)!r}")
+
+    def gauge(self, name: str, help_text: str, value: Optional[float], **labels) -> None:
+        self._sample(self._declare(name, "gauge", help_text), value, labels)
+
+    def counter(self, name: str, help_text: str, value: Optional[float], **labels) -> None:
+        self._sample(self._declare(name, "counter", help_text) + "_total", value, labels)
+
+    def histogram(self, name: str, help_text: str, histogram: Histogram, **labels) -> None:
+        name = self._declare(name, "histogram", help_text)
+        for key, cumulative, total in histogram.series():
+            series_labels = {**labels, **dict(zip(histogram.label_names, key))}
+            for bound, count in zip(histogram.buckets + (float("inf"),), cumulative):
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                self._sample(f"{name}_bucket", count, {**series_labels, "le": le})
+            self._sample(f"{name}_sum", total, series_labels)
+            self._sample(f"{name}_count", cumulative[-1], series_labels)
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+class LoopLagMonitor:
+    """
+    Event loop lag, sampled as the delay of a timer past its due time, and a
+    detector of the callbacks that block the loop.
+
+    The timer ticks every `interval` so a lag is seen as soon as it happens. A
+    watchdog thread checks that the ticks keep coming; once one is overdue by
+    `slow_callback_threshold`, the loop is stuck in a single callback and the
+    stack of the loop thread shows which. The stall is logged with that stack
+    when it is caught and with its full length when the loop resumes, and the
+    latest ones are kept for `GET /admin/loop`. A callback holding the GIL in C
+    code is caught once it lets go, so its stack may already be past the culprit.
+    """
+    _RECENT = 20
+
+    def __init__(self, interval: float = 0.05, slow_callback_threshold: float = 0.1):
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.last = 0.0
+        self.max = 0.0
+        self.histogram = Histogram((), buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+        self.slow_callbacks = 0
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=self._RECENT)
+        # time.monotonic() the next tick is due at, read by the watchdog
+        self._due = time.monotonic()
+        # Due time of the overdue tick and its stall, completed when the loop resumes
+        self._stall: Optional[Tuple[float, Dict[str, Any]]] = None
+
+    async def run(self) -> None:
+        if self.slow_callback_threshold > 0:
+            threading.Thread(target=self._watch, args=(threading.get_ident(),), name="loop-watchdog", daemon=True).start()
+        while True:
+            due = self._due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - due)
+            self.last = lag
+            self.max = max(self.max, lag)
+            self.histogram.observe(lag)
+            caught, self._stall = self._stall, None
+            if caught is not None and caught[0] == due:
+                stall = caught[1]
+                stall["blocked_ms"] = round(lag * 1000, 3)
+                logging.warning(f"[LoopMonitor] - event=loop_resumed blocked_ms={stall['blocked_ms']} callback={stall['callback']!r}")
+
+    def _watch(self, thread_id: int) -> None:
+        caught_due = None
+        while True:
+            time.sleep(self.slow_callback_threshold / 2)
+            due = self._due
+            overdue = time.monotonic() - due
+            if overdue < self.slow_callback_threshold or due == caught_due:
+                continue
+            caught_due = due
+            frame = sys._current_frames().get(thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            del frame
+            stall = {
+                "at": time.time(),
+                "callback": stack[-1].strip().splitlines()[0] if stack else "",
+                "blocked_ms": round(overdue * 1000, 3),
+                "stack": [line.rstrip() for line in stack],
+            }
+            self.slow_callbacks += 1
+            self.recent.append(stall)
+            self._stall = (due, stall)
+            logging.warning(
+                f"[LoopMonitor] - event=slow_callback blocked_ms>={stall['blocked_ms']} threshold_ms={self.slow_callback_threshold * 1000:g} "
+                f"callback={stall['callback']!r} stack={ujson.dumps(stall['stack'])}"
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"last": self.last, "max": self.max, "slow_callbacks": self.slow_callbacks}
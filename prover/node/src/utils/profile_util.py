@@ -0,0 +1,286 @@
+import asyncio
+import cProfile
+import heapq
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+PROFILE_FORMATS = ("collapsed", "top", "pstats", "prof")
+
+# Longest profile an admin can ask for
+MAX_PROFILE_SECONDS = 60.0
+
+
+class ProfileBusy(Exception):
+    """Raised when a profile is asked for while another one is running."""
+
+
+class HandlerTimings:
+    """
+    Latency of the HTTP and gRPC handlers of this process.
+
+    Recording is a dict lookup and a few additions per request; the slowest
+    single requests are kept in a bounded min-heap, so a request only touches
+    it when it is slower than the fastest of them.
+    """
+    _instance = None
+    _locker = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        with cls._locker:
+            if cls._instance is None:
+                cls._instance = super(HandlerTimings, cls).__new__(cls)
+                cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, slowest: int = 50):
+        if self._initialized == True:
+            return
+
+        self.slowest = slowest
+        # name -> [count, total seconds, max seconds]
+        self._handlers: Dict[str, List[float]] = {}
+        self._slowest: List[tuple] = []
+        self._initialized = True
+
+    def record(self, name: str, seconds: float) -> None:
+        entry = self._handlers.get(name)
+        if entry is None:
+            entry = self._handlers[name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+        if len(self._slowest) < self.slowest:
+            heapq.heappush(self._slowest, (seconds, time.time(), name))
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, time.time(), name))
+
+    def top(self, limit: int = 10, sort: str = "total") -> Dict[str, Any]:
+        """The handlers with the most total, mean or max time, and the slowest requests served."""
+        handlers = [
+            {
+                "name": name,
+                "count": int(count),
+                "total_s": round(total, 6),
+                "mean_ms": round(total / count * 1000, 3),
+                "max_ms": round(longest * 1000, 3),
+            }
+            for name, (count, total, longest) in self._handlers.items()
+        ]
+        key = {"total": "total_s", "mean": "mean_ms", "max": "max_ms"}.get(sort, "total_s")
+        handlers.sort(key=lambda handler: handler[key], reverse=True)
+        slowest = [
+            {"name": name, "ms": round(seconds * 1000, 3), "at": at}
+            for seconds, at, name in sorted(self._slowest, reverse=True)[:limit]
+        ]
+        return {"handlers": handlers[:limit], "slowest": slowest}
+
+    def reset(self) -> None:
+        self._handlers.clear()
+        self._slowest.clear()
+
+
+_labels: Dict[Any, str] = {}
+
+
+def _label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+    return label
+
+
+def _stack(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class LoopProfiler:
+    """
+    CPU profiles of the event loop thread, one at a time.
+
+    `sample` reads the stack of the loop thread from another thread every
+    `interval`, which costs the loop nothing but the GIL hand-overs and shows
+    where a stalled loop spends its time, waiting in the selector included.
+    `trace` runs cProfile on the loop thread for exact call counts at the
+    price of slowing every call down while it runs. Nothing runs in between.
+    """
+
+    def __init__(self):
+        self._running = False
+
+    def _acquire(self, seconds: float) -> float:
+        if self._running:
+            raise ProfileBusy("A profile is already running")
+        self._running = True
+        return min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+
+    async def sample(self, seconds: float, interval: float = 0.005) -> Counter:
+        """Collapsed stacks of the loop thread and how many samples caught each."""
+        seconds = self._acquire(seconds)
+        thread_id = threading.get_ident()
+
+        def _sample() -> Counter:
+            stacks = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                if frame is not None:
+                    stacks[_stack(frame)] += 1
+                del frame
+                time.sleep(interval)
+            return stacks
+
+        try:
+            return await asyncio.to_thread(_sample)
+        finally:
+            self._running = False
+
+    async def trace(self, seconds: float) -> cProfile.Profile:
+        seconds = self._acquire(seconds)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+        finally:
+            self._running = False
+        return profile
+
+    async def profile(self, seconds: float, output: str = "collapsed", limit: int = 50):
+        """
+        A profile rendered as `output`: `collapsed` stacks for flamegraph.pl or
+        speedscope, the `top` functions by samples, `pstats` text or a `prof`
+        dump for pstats and snakeviz. Returns text, or bytes for `prof`.
+        """
+        if output not in PROFILE_FORMATS:
+            raise ValueError(f"Unknown profile format {output}, expected one of {', '.join(PROFILE_FORMATS)}")
+        if output in ("collapsed", "top"):
+            stacks = await self.sample(seconds)
+            return render_collapsed(stacks) if output == "collapsed" else render_top(stacks, limit)
+        profile = await self.trace(seconds)
+        if output == "prof":
+            profile.create_stats()
+            return marshal.dumps(profile.stats)
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+def render_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def render_top(stacks: Counter, limit: int = 50) -> str:
+    """Functions by the samples they ran in themselves and the samples they were on the stack for."""
+    total = sum(stacks.values()) or 1
+    own, cumulative = Counter(), Counter()
+    for stack, count in stacks.items():
+        labels = stack.split(";")
+        own[labels[-1]] += count
+        for label in set(labels):
+            cumulative[label] += count
+    lines = [f"{total} samples", f"{'own%':>7} {'total%':>7}  function"]
+    for label, count in own.most_common(limit):
+        lines.append(f"{count * 100 / total:>6.1f}% {cumulative[label] * 100 / total:>6.1f}%  {label}")
+    return "\n".join(lines) + "\n"
+
+
+class MemoryProfiler:
+    """
+    tracemalloc snapshots of this process, each compared with the one before.
+
+    Tracing slows allocations down, so it only runs between `start` and `stop`.
+    """
+    _FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self, frames: int = 1) -> bool:
+        """Start tracing with `frames` frames per allocation; False when it already traces."""
+        if tracemalloc.is_tracing():
+            return False
+        self._previous = None
+        tracemalloc.start(frames)
+        return True
+
+    def stop(self) -> bool:
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self._previous = None
+        return True
+
+    def _snapshot(self, limit: int, key_type: str) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._FILTERS)
+        result = {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [
+                {"where": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics(key_type)[:limit]
+            ],
+        }
+        if self._previous is not None:
+            result["diff"] = [
+                {"where": str(stat.traceback), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff, "size_bytes": stat.size}
+                for stat in snapshot.compare_to(self._previous, key_type)[:limit]
+            ]
+        self._previous = snapshot
+        return result
+
+    async def snapshot(self, limit: int = 20, key_type: str = "lineno") -> Dict[str, Any]:
+        """The largest allocation sites and, from the second snapshot on, the ones that grew the most since the last."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing, start it first")
+        if key_type not in ("lineno", "filename", "traceback"):
+            raise ValueError(f"Unknown key type {key_type}")
+        # Walking the traces takes a while with many allocations; the loop keeps turning in between
+        return await asyncio.to_thread(self._snapshot, limit, key_type)
+
+
+def _coroutine_stack(coro, limit: int) -> List[str]:
+    """The await chain of a coroutine, outermost first, where `Task.get_stack` only gives its first frame."""
+    stack = []
+    while coro is not None and len(stack) < limit:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        stack.append(f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_qualname}")
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return stack
+
+
+def dump_tasks(limit: int = 30) -> List[Dict[str, Any]]:
+    """Every task of the running loop with the stack it is suspended at."""
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "state": "cancelled" if task.cancelled() else "done" if task.done() else "pending",
+            "stack": _coroutine_stack(coro, limit),
+        })
+    tasks.sort(key=lambda task: task["coro"])
+    return tasks
@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+PROGRESS_QUEUED = "queued"
+PROGRESS_CLAIMED = "claimed"
+PROGRESS_DECRYPTED = "decrypted"
+PROGRESS_VALIDATED = "validated"
+PROGRESS_DISPATCHED = "dispatched"
+PROGRESS_PROOF_RECEIVED = "proof_received"
+PROGRESS_REPORTED = "reported"
+PROGRESS_DONE = "done"
+
+
+@dataclass
+class ProgressEvent:
+    stage: str
+    timestamp: float = field(default_factory=time.time)
+    queue_position: Optional[int] = None
+    backend: Optional[str] = None
+
+
+# Listener of the request being served, None when nobody follows its progress
+_listener: contextvars.ContextVar[Optional[Callable[[ProgressEvent], None]]] = contextvars.ContextVar("progress", default=None)
+
+
+def emit_progress(stage: str, queue_position: Optional[int] = None, backend: Optional[str] = None) -> None:
+    """Report a stage of the current prove request; a no-op unless its progress is streamed."""
+    listener = _listener.get()
+    if listener is not None:
+        listener(ProgressEvent(stage, queue_position=queue_position, backend=backend))
+
+
+@contextmanager
+def progress_scope(listener: Callable[[ProgressEvent], None]):
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+async def stream_progress(work: Callable[[], Awaitable[Any]]) -> AsyncIterator[Any]:
+    """
+    Run `work()` and yield its ProgressEvents as they happen, then its result.
+
+    An exception of `work()` is raised after the events emitted before it.
+    Closing the iterator early cancels the work.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run() -> Any:
+        with progress_scope(events.put_nowait):
+            return await work()
+
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            getter = asyncio.ensure_future(events.get())
+            await asyncio.wait((getter, task), return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+                continue
+            getter.cancel()
+            while not events.empty():
+                yield events.get_nowait()
+            yield task.result()
+            return
+    finally:
+        task.cancel()
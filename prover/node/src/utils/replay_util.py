@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+import grpc
+import ujson
+from google.protobuf import symbol_database
+
+# The request types of the captured calls are looked up in the default pool
+from application.grpc_server.v1 import prove_service_pb2  # noqa: F401
+from application.grpc_server.v2 import prove_service_v2_pb2  # noqa: F401
+from utils.capture_util import synthesize
+from utils.tls import grpc_channel_credentials, grpc_channel_options
+
+
+def load_capture(paths: List[str]) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    The captured requests of `paths` as (arrival time, shape), oldest first.
+
+    Files of several workers are merged on their wall clock times, and a file
+    holding several captures, one appended after the other, is read in full.
+    """
+    events = []
+    for path in paths:
+        started_at, shapes = None, {}
+        with open(path, "r") as file:
+            for line in file:
+                record = ujson.loads(line)
+                if isinstance(record, list):
+                    if started_at is not None and record[1] in shapes:
+                        events.append((started_at + record[0] / 1000, shapes[record[1]]))
+                elif "capture" in record:
+                    started_at, shapes = record["started_at"], {}
+                elif "shape" in record:
+                    shapes[record["shape"]] = record
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def _percentile(ordered: List[float], percentile: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def _build_message(cls, shape: Dict[str, Any]):
+    message = cls()
+    for name, field_shape in shape.items():
+        field = cls.DESCRIPTOR.fields_by_name.get(name)
+        if field is None:
+            continue
+        repeated = field.label == field.LABEL_REPEATED
+        if field.message_type is not None:
+            sub_cls = symbol_database.Default().GetSymbol(field.message_type.full_name)
+            if repeated:
+                item = field_shape["list"]
+                getattr(message, name).extend(_build_message(sub_cls, item) for _ in range(field_shape["len"]) if item != "null")
+            else:
+                getattr(message, name).CopyFrom(_build_message(sub_cls, field_shape))
+        elif repeated:
+            getattr(message, name).extend(synthesize(field_shape))
+        else:
+            setattr(message, name, synthesize(field_shape))
+    return message
+
+
+class _Replayer:
+    def __init__(self, http_url: str, grpc_address: str, headers: Dict[str, str], timeout: float, tls_certfile: str):
+        self.http_url = http_url.rstrip("/")
+        self.grpc_address = grpc_address
+        self.headers = headers
+        self.timeout = timeout
+        self.tls_certfile = tls_certfile
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.channel: Optional[grpc.aio.Channel] = None
+        self.calls: Dict[str, Any] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    async def __aenter__(self):
+        if self.http_url:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        if self.grpc_address:
+            if self.tls_certfile:
+                self.channel = grpc.aio.secure_channel(
+                    self.grpc_address,
+                    grpc_channel_credentials(self.tls_certfile, self.grpc_address),
+                    options=grpc_channel_options(False, self.tls_certfile, self.grpc_address),
+                )
+            else:
+                self.channel = grpc.aio.insecure_channel(self.grpc_address)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.session is not None:
+            await self.session.close()
+        if self.channel is not None:
+            await self.channel.close()
+
+    def _record(self, endpoint: str, outcome: str, started: float) -> None:
+        result = self.results.get(endpoint)
+        if result is None:
+            result = self.results[endpoint] = {"latencies": [], "outcomes": Counter()}
+        result["latencies"].append((time.perf_counter() - started) * 1000)
+        result["outcomes"][outcome] += 1
+
+    async def send(self, shape: Dict[str, Any]) -> None:
+        if shape["kind"] == "grpc":
+            await self._send_grpc(shape)
+        else:
+            await self._send_http(shape)
+
+    async def _send_http(self, shape: Dict[str, Any]) -> None:
+        endpoint = f"{shape['method']} {shape['path']}"
+        if self.session is None:
+            self._record(endpoint, "skipped", time.perf_counter())
+            return
+        headers = dict(self.headers)
+        for name in ("content_type", "accept"):
+            if shape.get(name):
+                headers[name.replace("_", "-")] = shape[name]
+        body = ujson.dumps(synthesize(shape["body"])) if shape.get("body") is not None else None
+        query = {name: synthesize(value) for name, value in (shape.get("query") or {}).items()}
+        started = time.perf_counter()
+        try:
+            async with self.session.request(shape["method"], self.http_url + shape["path"], params=query, data=body, headers=headers, ssl=False) as response:
+                await response.read()
+                outcome = str(response.status)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        except aiohttp.ClientError as e:
+            outcome = type(e).__name__
+        self._record(endpoint, outcome, started)
+
+    async def _send_grpc(self, shape: Dict[str, Any]) -> None:
+        endpoint = shape["method"]
+        if self.channel is None:
+            self._record(endpoint, "skipped", time.perf_counter())
+            return
+        cls = symbol_database.Default().GetSymbol(shape["type"])
+        request = _build_message(cls, shape["body"])
+        call = self.calls.get(endpoint)
+        if call is None:
+            factory = self.channel.unary_stream if shape["rpc"] == "unary_stream" else self.channel.unary_unary
+            call = self.calls[endpoint] = factory(endpoint, request_serializer=cls.SerializeToString)
+        started = time.perf_counter()
+        try:
+            if shape["rpc"] == "unary_stream":
+                async for _ in call(request, timeout=self.timeout):
+                    pass
+            else:
+                await call(request, timeout=self.timeout)
+            outcome = "OK"
+        except grpc.aio.AioRpcError as e:
+            outcome = e.code().name
+        self._record(endpoint, outcome, started)
+
+
+async def run_replay(
+    paths: List[str],
+    http_url: str = "",
+    grpc_address: str = "",
+    speed: float = 1.0,
+    headers: Optional[Dict[str, str]] = None,
+    max_in_flight: int = 1000,
+    timeout: float = 30.0,
+    tls_certfile: str = "",
+) -> Dict[str, Any]:
+    """
+    Send the captured requests of `paths` to a node with the arrival process
+    of the capture, `speed` times as fast.
+
+    The bodies are synthesized from the captured shapes, so requests that
+    need real ciphertexts or signatures are turned away at their checks;
+    `headers`, e.g. an Authorization, are added to every HTTP request. A
+    request is sent when due whatever the replies, up to `max_in_flight` at a
+    time; how late the sends fell behind the schedule is reported as lag.
+    """
+    events = load_capture(paths)
+    if not events:
+        raise ValueError(f"No captured requests in {', '.join(paths)}")
+
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+    lags = []
+    origin = events[0][0]
+
+    async with _Replayer(http_url, grpc_address, headers or {}, timeout, tls_certfile) as replayer:
+        async def fire(shape):
+            try:
+                await replayer.send(shape)
+            finally:
+                in_flight.release()
+
+        started = loop.time()
+        for arrived_at, shape in events:
+            due = started + (arrived_at - origin) / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            lags.append(max(0.0, loop.time() - due))
+            task = asyncio.create_task(fire(shape))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+
+    lags.sort()
+    summary = {
+        "requests": len(events),
+        "captured_seconds": round(events[-1][0] - origin, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "rate_per_second": round(len(events) / elapsed, 3) if elapsed > 0 else None,
+        "lag_p99_ms": round(_percentile(lags, 0.99) * 1000, 3),
+        "lag_max_ms": round(lags[-1] * 1000, 3),
+        "endpoints": {},
+    }
+    for endpoint, result in sorted(replayer.results.items()):
+        latencies = sorted(result["latencies"])
+        summary["endpoints"][endpoint] = {
+            "count": len(latencies),
+            "p50_ms": round(_percentile(latencies, 0.5), 3),
+            "p90_ms": round(_percentile(latencies, 0.9), 3),
+            "p99_ms": round(_percentile(latencies, 0.99), 3),
+            "outcomes": dict(result["outcomes"]),
+        }
+    logging.info(
+        f"[Replay] - Sent {summary['requests']} requests captured over {summary['captured_seconds']}s "
+        f"in {summary['elapsed_seconds']}s at {speed}x, schedule lag p99 {summary['lag_p99_ms']}ms"
+    )
+    return summary
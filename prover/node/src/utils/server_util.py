@@ -1,48 +1,75 @@
 import asyncio
 import signal
 import logging
+import time
 import uvicorn
 import contextlib
+import socket
 from fastapi import FastAPI
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Tuple
 
+import os
 from config import Config, NodeConfig
-from utils.constant import OAUTH_PROVIDER_GOOGLE, OAUTH_PROVIDER_X509_GOOGLE
+from utils.constant import OAUTH_PROVIDER_GOOGLE, OAUTH_PROVIDER_TELEGRAM, OAUTH_PROVIDER_X509_GOOGLE
+from utils.constant import PUBLIC_KEY, PRIVATE_KEY
+from utils.constant import PROVER_CIRCOM, PROVER_PRIVATE
+from utils.context_util import AppContext
 from modules.hub import Hub
+from modules.key_cache import KeyCache
+from modules.result_reporter import ResultReporter
+from modules.node_load import NodeLoad, SharedLoadStore
+from modules.admission import AdmissionController
+from modules.job_manager import JobManager, SharedJobStore
+from modules.prover.circom import CircomProver
+from modules.prover.gnark import PrivateProver
+from modules.prover import ProverBackend, ProverRouter, RetryBudget, RpcPolicy
 import grpc
 from modules.prove_service.v1 import ProveServiceV1
 from modules.prove_service.v2 import ProveServiceV2
-from modules.proof_manager import ProofManager
+from modules.proof_manager import ProofManager, SharedProofManager
 from modules.project_manager import ProjectManager
 
 from modules.oauth_provider import OAuthProvider, OAuthProviderResolver
-from modules.oauth_provider import google, x509_google
+from modules.oauth_provider import google, telegram, x509_google
 
 from application.grpc_server.v1 import create_grpc_prover_service as v1_grpc_server
 from application.http_server.v1 import create_http_prover_service as v1_http_server
 
 from application.grpc_server.v2 import create_grpc_prover_service as v2_grpc_server
 from application.http_server.v2 import create_http_prover_service as v2_http_server
+from application.http_server.admin import create_http_admin_service as admin_http_server
 from utils.tls import load_pem_bytes, normalize_path
+from utils.deadline_util import CancelOnDisconnectMiddleware, DeadlineMiddleware
+from utils.trace_util import Tracer, TraceInterceptor, TraceMiddleware
+from utils.capture_util import CaptureInterceptor, CaptureMiddleware, TrafficCapture
+from utils.leader_util import LeaderLock
+from utils.metrics_util import LoopLagMonitor
 
 class GrpcServerRunner:
     def __init__(
         self,
         host: str,
         port: int,
-        *services: tuple[Callable[[grpc.Server, Any, ProofManager, Hub], None], Any],
-        proof_manager: ProofManager,
-        hub: Hub,
+        context: AppContext,
+        *register_funcs: Callable[[grpc.Server, AppContext], None],
         tls_certfile: str = "",
         tls_keyfile: str = "",
         require_tls: bool = False,
+        options: Optional[List[Tuple[str, Any]]] = None,
+        maximum_concurrent_rpcs: Optional[int] = None,
+        compression: Optional[grpc.Compression] = None,
     ):
         self.host = host
         self.port = port
-        self.services = services
-        self.proof_manager = proof_manager
-        self.hub = hub
-        self.server = grpc.aio.server()
+        self.context = context
+        self.register_funcs = register_funcs
+        self.server = grpc.aio.server(
+            interceptors=[TraceInterceptor(), CaptureInterceptor()],
+            options=options,
+            maximum_concurrent_rpcs=maximum_concurrent_rpcs,
+            compression=compression,
+        )
+        self.started = asyncio.Event()
         self.tls_certfile = normalize_path(tls_certfile)
         self.tls_keyfile = normalize_path(tls_keyfile)
         self.require_tls = require_tls
@@ -55,8 +82,8 @@ class GrpcServerRunner:
         scheme = "grpcs" if self.tls_certfile and self.tls_keyfile else "grpc"
         logging.info(f"[gRPC] - Running on {scheme}://{self.host}:{self.port}")
 
-        for register_func, service_impl in self.services:
-            register_func(self.server, service_impl, self.proof_manager, self.hub)
+        for register_func in self.register_funcs:
+            register_func(self.server, self.context)
 
         bind_address = f"{self.host}:{self.port}"
         if self.tls_certfile and self.tls_keyfile:
@@ -67,14 +94,17 @@ class GrpcServerRunner:
         else:
             self.server.add_insecure_port(bind_address)
         await self.server.start()
+        self.started.set()
         await self.server.wait_for_termination()
 
 
 class FastApiServerRunner:
-    def __init__(self, host: str, port: int, tls_certfile: str = "", tls_keyfile: str = "", require_tls: bool = False):
+    def __init__(self, host: str, port: int, context: AppContext, tls_certfile: str = "", tls_keyfile: str = "", require_tls: bool = False, reuse_port: bool = False):
         self.host = host
         self.port = port
+        self.context = context
         self.server = None
+        self.reuse_port = reuse_port
         self.tls_certfile = normalize_path(tls_certfile)
         self.tls_keyfile = normalize_path(tls_keyfile)
         self.require_tls = require_tls
@@ -87,38 +117,198 @@ class FastApiServerRunner:
         scheme = "https" if self.tls_certfile and self.tls_keyfile else "http"
         logging.info(f"[FastAPI] - Running on {scheme}://{self.host}:{self.port}")
         app = FastAPI()
-        v1_http_server(app)
-        v2_http_server(app)
+        app.add_middleware(CancelOnDisconnectMiddleware, context=self.context)
+        app.add_middleware(DeadlineMiddleware)
+        app.add_middleware(TraceMiddleware)
+        app.add_middleware(CaptureMiddleware)
+        v1_http_server(app, self.context)
+        v2_http_server(app, self.context)
+        admin_http_server(app, self.context)
         config_kwargs = {"app": app, "host": self.host, "port": self.port, "loop": "auto"}
         if self.tls_certfile and self.tls_keyfile:
             config_kwargs["ssl_certfile"] = self.tls_certfile
             config_kwargs["ssl_keyfile"] = self.tls_keyfile
         config = uvicorn.Config(**config_kwargs)
         self.server = uvicorn.Server(config)
-        await self.server.serve()
+        # uvicorn binds without SO_REUSEPORT, the workers of a node hand it a socket bound with it
+        await self.server.serve(sockets=[self._reuse_port_socket()] if self.reuse_port else None)
+
+    def _reuse_port_socket(self) -> socket.socket:
+        host = self.host.strip("[]")
+        sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, self.port))
+        sock.set_inheritable(True)
+        return sock
+
+    async def wait_started(self):
+        """Wait until uvicorn listens, it exposes a flag but no event."""
+        while self.server is None or not self.server.started:
+            await asyncio.sleep(0.05)
 
 
 class Server:
     def __init__(self,
                  grpc_runner: GrpcServerRunner,
                  http_runner: FastApiServerRunner,
-                 hub: Hub):
+                 context: AppContext,
+                 heartbeat_leader: Optional[LeaderLock] = None):
         self.grpc_runner = grpc_runner
         self.http_runner = http_runner
-        self.hub = hub
+        self.context = context
+        self.heartbeat_leader = heartbeat_leader
 
-    async def run(self, interval: int = 30) -> None:
-        await asyncio.gather(
-            self.grpc_runner.start(),
-            self.http_runner.start(),
-            self.hub.send_heartbeat(interval),
+    async def _announce(self) -> None:
+        """Register with the hub only once both transports listen, so no traffic is routed to a node still starting."""
+        await asyncio.gather(self.grpc_runner.started.wait(), self.http_runner.wait_started())
+        self.context.ready.set()
+        logging.info("[Startup] - Node is ready")
+        # Among several workers only the elected one registers the node
+        if self.heartbeat_leader is not None:
+            await self.heartbeat_leader.acquire()
+        heartbeat = self.context.config.Hub.Heartbeat
+        await self.context.hub.send_heartbeat(
+            self.context.node_load,
+            heartbeat.min_interval,
+            heartbeat.max_interval,
+            heartbeat.change_threshold,
         )
 
+    async def run(self) -> None:
+        heartbeat = self.context.config.Hub.Heartbeat
+        tasks = [
+            asyncio.ensure_future(work)
+            for work in (
+                self.grpc_runner.start(),
+                self.http_runner.start(),
+                self._announce(),
+                self.context.result_reporter.run(),
+                self.context.admission.run(self.context.node_load, heartbeat.min_interval),
+                self.context.node_load.run(heartbeat.min_interval),
+                *(provider.run_refresh() for provider in self.context.oauth_provider.values()),
+                self.context.project_manager.run(),
+                self.context.job_manager.run(),
+                self.context.loop_lag.run(),
+                *(router.run() for router in self.context.provers.values()),
+            )
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # gather gives up at the first task cancelled, wait for the others to
+            # run their own finally blocks, like the reporter flushing its spool;
+            # cancelling a task twice would interrupt those
+            for task in tasks:
+                if not task.done() and not task.cancelling():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.context.hub.close()
+            await self.context.job_manager.close()
+            if self.heartbeat_leader is not None:
+                self.heartbeat_leader.release()
+
 
 class ServerBuilder:
-    def __init__(self, config: NodeConfig):
+    def __init__(self, config: NodeConfig, workers: int = 1, worker: int = 0):
         self.config = config
-        self.project_manager = ProjectManager(config.Env.project_path)
+        self.workers = workers
+        # Index of this process among the workers, kept by a restarted worker
+        self.worker = worker
+        self.project_manager: Optional[ProjectManager] = None
+
+    def _build_router(self, name: str, prover_cls, prover_config, pool_options: Dict[str, Any]) -> ProverRouter:
+        """One backend per entry of `backends`, or the single `address` when none is listed."""
+        entries = prover_config.backends or [{"address": prover_config.address}]
+        backends = [
+            ProverBackend(
+                prover_cls(entry["address"], **pool_options),
+                entry["address"],
+                circuit_templates=entry.get("circuit_templates"),
+                weight=entry.get("weight", 1),
+            )
+            for entry in entries
+        ]
+        return ProverRouter(
+            name,
+            backends,
+            max_failures=self.config.Prover.Router.max_failures,
+            probe_interval=self.config.Prover.Router.probe_interval,
+        )
+
+    _GRPC_COMPRESSION = {
+        "": None,
+        "gzip": grpc.Compression.Gzip,
+        "deflate": grpc.Compression.Deflate,
+    }
+
+    def _grpc_options(self, reuse_port: bool) -> List[Tuple[str, Any]]:
+        grpc_config = self.config.Server.Grpc
+        return [
+            ("grpc.so_reuseport", int(reuse_port)),
+            ("grpc.max_receive_message_length", grpc_config.max_receive_message_length),
+            ("grpc.max_send_message_length", grpc_config.max_send_message_length),
+            ("grpc.keepalive_time_ms", grpc_config.keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", grpc_config.keepalive_timeout_ms),
+            ("grpc.keepalive_permit_without_calls", int(grpc_config.keepalive_permit_without_calls)),
+        ]
+
+    async def _phase(self, name: str, work) -> Any:
+        """Await one startup phase and log how long it took."""
+        started = time.perf_counter()
+        try:
+            return await work
+        finally:
+            logging.info(f"[Startup] - {name} took {time.perf_counter() - started:.3f}s")
+
+    async def _warmup_jwks(self, oauth_provider: Dict[str, OAuthProvider]) -> None:
+        """
+        Fetch every JWKS at once. A provider holding keys from its on-disk
+        snapshot waits for the network only `startup_timeout` seconds and then
+        serves the snapshot while the fetch completes in the background; one
+        without keys has nothing to fall back to and must fetch.
+        """
+        timeout = self.config.OauthProvider.Jwks.startup_timeout
+
+        async def fetch(provider: OAuthProvider) -> None:
+            if not provider.has_keys:
+                await provider.update_jwks()
+                return
+            try:
+                # update_jwks shields the fetch, the timeout does not cancel it
+                await asyncio.wait_for(provider.update_jwks(), timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"[Startup] - {provider.name} JWKS fetch is slow, serving the snapshot meanwhile")
+            except Exception as e:
+                logging.warning(f"[Startup] - {provider.name} JWKS fetch failed, serving the snapshot: {e}")
+
+        await asyncio.gather(*(fetch(provider) for provider in oauth_provider.values()))
+
+    async def _load_node_key(self, node_key: KeyCache) -> None:
+        """Load the node key pair once so the first request does not pay for it."""
+        try:
+            await node_key.get_encryptor()
+        except FileNotFoundError:
+            logging.warning("[Server] - Node key pair not found, encrypted requests will be rejected")
+
+    def _load_tables(self):
+        """Read project.json, the OAuth resolver table and the proof cache."""
+        self.project_manager = ProjectManager(self.config.Env.project_path)
+        oauth_resolver = OAuthProviderResolver(self.config.Env.oauth_provider_resolver_path)
+        if self.workers > 1:
+            proof_manager = SharedProofManager(self.config.Server.claim_store_path)
+        else:
+            proof_manager = ProofManager(self.config.Env.cache_path)
+        return oauth_resolver, proof_manager
+
+    async def _warmup_provers(self, provers: Dict[str, Any]) -> None:
+        """Connect the prover channel pools before serving, a prover that is down is only logged."""
+        timeout = self.config.Prover.Pool.warmup_timeout
+        names = list(provers)
+        ready = await asyncio.gather(*(provers[name].warmup(timeout) for name in names))
+        for name, ok in zip(names, ready):
+            metrics = provers[name].metrics()
+            logging.info(f"[Server] - Prover {name} at {metrics['address']}: {metrics['channels']} channels, ready={ok}")
 
     async def build(self,
                     hub_api: str,
@@ -129,43 +319,165 @@ class ServerBuilder:
 
         fastapi_host = fastapi_host or grpc_host
         fastapi_port = fastapi_port or grpc_port + 1
+        started = time.perf_counter()
 
+        Tracer(
+            self.config.Tracing.service_name,
+            self.config.Tracing.sample_ratio,
+            file_path=self.config.Tracing.file_path,
+            otlp_endpoint=self.config.Tracing.otlp_endpoint,
+        )
+        if self.config.Capture.enabled:
+            TrafficCapture().start(self.config.Capture.file_path, self.config.Capture.max_events)
         hub = Hub(hub_api, self.config.Env.session_keys_path, self.config)
+        spool_path = self.config.Hub.Reporter.spool_path
+        if spool_path and self.workers > 1:
+            # One spool per worker index, so a restarted worker sends what its predecessor left
+            root, ext = os.path.splitext(spool_path)
+            spool_path = f"{root}-{self.worker}{ext}"
+        result_reporter = ResultReporter(
+            hub,
+            spool_path,
+            batch_size=self.config.Hub.Reporter.batch_size,
+            max_queue_size=self.config.Hub.Reporter.max_queue_size,
+            max_attempts=self.config.Hub.Reporter.max_attempts,
+            base_backoff=self.config.Hub.Reporter.base_backoff,
+            max_backoff=self.config.Hub.Reporter.max_backoff,
+        )
+        node_key = KeyCache(
+            public_key_path=os.path.join(self.config.Env.crypto_keys_path, PUBLIC_KEY),
+            private_key_path=os.path.join(self.config.Env.crypto_keys_path, PRIVATE_KEY),
+        )
 
+        jwks_options = {
+            "snapshot_path": self.config.OauthProvider.Jwks.snapshot_path,
+            "default_max_age": self.config.OauthProvider.Jwks.default_max_age,
+            "min_refresh_interval": self.config.OauthProvider.Jwks.min_refresh_interval,
+            "negative_cache_ttl": self.config.OauthProvider.Jwks.negative_cache_ttl,
+            "negative_cache_size": self.config.OauthProvider.Jwks.negative_cache_size,
+        }
         oauth_provider: Dict[str, OAuthProvider] = {
             OAUTH_PROVIDER_GOOGLE: google.Provider(
                 self.config.OauthProvider.Google.api,
                 self.config.OauthProvider.Google.circom_bigint_n,
-                self.config.OauthProvider.Google.circom_bigint_k
+                self.config.OauthProvider.Google.circom_bigint_k,
+                **jwks_options
+            ),
+            OAUTH_PROVIDER_TELEGRAM: telegram.Provider(
+                self.config.OauthProvider.Telegram.api,
+                self.config.OauthProvider.Telegram.circom_bigint_n,
+                self.config.OauthProvider.Telegram.circom_bigint_k,
+                **jwks_options
             ),
             OAUTH_PROVIDER_X509_GOOGLE: x509_google.Provider(
                 self.config.OauthProvider.X509Google.api,
                 self.config.OauthProvider.X509Google.circom_bigint_n,
-                self.config.OauthProvider.X509Google.circom_bigint_k
+                self.config.OauthProvider.X509Google.circom_bigint_k,
+                **jwks_options
             ),
         }
 
-        for provider in oauth_provider.values():
-            await provider.update_jwks()
+        circuit_templates = self.config.Prover.Circom.circuit_templates + self.config.Prover.Private.circuit_templates
+        rpc_policy = RpcPolicy(
+            default_timeout=self.config.Prover.Rpc.default_timeout,
+            min_timeout=self.config.Prover.Rpc.min_timeout,
+            max_timeout=self.config.Prover.Rpc.max_timeout,
+            timeout_multiplier=self.config.Prover.Rpc.timeout_multiplier,
+            min_samples=self.config.Prover.Rpc.min_samples,
+            max_retries=self.config.Prover.Rpc.max_retries,
+            circuits=self.config.Prover.Rpc.circuits,
+            retry_budget=RetryBudget(self.config.Prover.Rpc.retry_budget_ratio),
+            circuit_templates=circuit_templates,
+        )
+        pool_options = {
+            "verify_tls": self.config.Env.verify_prover_tls,
+            "tls_certfile": self.config.Env.tls_certfile,
+            "max_channels": self.config.Prover.Pool.max_channels,
+            "min_channels": self.config.Prover.Pool.min_channels,
+            "max_streams_per_channel": self.config.Prover.Pool.max_streams_per_channel,
+            "policy": rpc_policy,
+        }
+        provers = {
+            PROVER_CIRCOM: self._build_router(PROVER_CIRCOM, CircomProver, self.config.Prover.Circom, pool_options),
+            PROVER_PRIVATE: self._build_router(PROVER_PRIVATE, PrivateProver, self.config.Prover.Private, pool_options),
+        }
 
-        oauth_resolver = OAuthProviderResolver(self.config.Env.oauth_provider_resolver_path)
-        proof_manager = ProofManager(self.config.Env.cache_path)
-        project_manager = ProjectManager(self.config.Env.project_path)
-
-        grpc_runner = GrpcServerRunner(grpc_host, grpc_port, 
-                                    (v1_grpc_server, ProveServiceV1(project_manager, oauth_provider, oauth_resolver, self.config)),
-                                    (v2_grpc_server, ProveServiceV2(project_manager, oauth_provider, oauth_resolver, self.config)),
-                                    proof_manager=proof_manager,
-                                    hub=hub,
+        # The warm-up phases wait on the network and the disk, they run side by side
+        _, _, _, (oauth_resolver, proof_manager) = await asyncio.gather(
+            self._phase("JWKS", self._warmup_jwks(oauth_provider)),
+            self._phase("Node key", self._load_node_key(node_key)),
+            self._phase("Prover channels", self._warmup_provers(provers)),
+            self._phase("Tables", asyncio.to_thread(self._load_tables)),
+        )
+        logging.info(f"[Startup] - Warm in {time.perf_counter() - started:.3f}s")
+
+        admission = AdmissionController(
+            self.project_manager.get_weight,
+            initial_limit=self.config.Admission.initial_limit,
+            min_limit=self.config.Admission.min_limit,
+            max_limit=self.config.Admission.max_limit,
+            max_queue_size=self.config.Admission.max_queue_size,
+            max_queue_wait=self.config.Admission.max_queue_wait,
+            latency_tolerance=self.config.Admission.latency_tolerance,
+            backoff_ratio=self.config.Admission.backoff_ratio,
+        )
+        job_manager = JobManager(
+            retention=self.config.Jobs.retention,
+            max_jobs=self.config.Jobs.max_jobs,
+            max_queue_time=self.config.Jobs.max_queue_time,
+            callback_attempts=self.config.Jobs.callback_attempts,
+            callback_allowed_hosts=self.config.Jobs.callback_allowed_hosts,
+            callback_allowed_networks=self.config.Jobs.callback_allowed_networks,
+            store=SharedJobStore(self.config.Server.claim_store_path) if self.workers > 1 else None,
+        )
+        node_load = NodeLoad(
+            provers,
+            circuit_templates,
+            admission=admission,
+            store=SharedLoadStore(self.config.Server.claim_store_path) if self.workers > 1 else None,
+        )
+
+        project_manager = self.project_manager
+
+        context = AppContext(
+            config=self.config,
+            hub=hub,
+            result_reporter=result_reporter,
+            node_key=node_key,
+            node_load=node_load,
+            admission=admission,
+            job_manager=job_manager,
+            provers=provers,
+            rpc_policy=rpc_policy,
+            proof_manager=proof_manager,
+            project_manager=project_manager,
+            oauth_provider=oauth_provider,
+            oauth_resolver=oauth_resolver,
+            prove_service_v1=ProveServiceV1(project_manager, oauth_provider, oauth_resolver, self.config, node_key, provers, node_load),
+            prove_service_v2=ProveServiceV2(project_manager, oauth_provider, oauth_resolver, self.config, node_key, provers, node_load),
+            loop_lag=LoopLagMonitor(self.config.LoopMonitor.interval, self.config.LoopMonitor.slow_callback_threshold),
+        )
+
+        multi_worker = self.workers > 1
+        grpc_config = self.config.Server.Grpc
+        grpc_runner = GrpcServerRunner(grpc_host, grpc_port, context,
+                                    v1_grpc_server,
+                                    v2_grpc_server,
                                     tls_certfile=self.config.Env.tls_certfile,
                                     tls_keyfile=self.config.Env.tls_keyfile,
-                                    require_tls=self.config.Env.require_tls)
+                                    require_tls=self.config.Env.require_tls,
+                                    options=self._grpc_options(multi_worker),
+                                    maximum_concurrent_rpcs=grpc_config.max_concurrent_rpcs or None,
+                                    compression=self._GRPC_COMPRESSION[grpc_config.compression])
         http_runner = FastApiServerRunner(
             fastapi_host,
             fastapi_port,
+            context,
             tls_certfile=self.config.Env.tls_certfile,
             tls_keyfile=self.config.Env.tls_keyfile,
             require_tls=self.config.Env.require_tls,
+            reuse_port=multi_worker,
         )
+        heartbeat_leader = LeaderLock(self.config.Server.heartbeat_lock_path) if multi_worker else None
 
-        return Server(grpc_runner, http_runner, hub)
+        return Server(grpc_runner, http_runner, context, heartbeat_leader)
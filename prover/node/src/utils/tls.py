@@ -69,12 +69,20 @@ def grpc_target_name_override(path: Optional[str]) -> Optional[str]:
     return None
 
 
-def grpc_channel_credentials(path: Optional[str]) -> grpc.ChannelCredentials:
+def is_unix_address(address: str) -> bool:
+    return address.startswith("unix:") or address.startswith("unix-abstract:")
+
+
+def grpc_channel_credentials(path: Optional[str], address: str = "") -> grpc.ChannelCredentials:
+    # A prover on the same host serves its Unix socket without TLS; local
+    # credentials keep the channel from ever leaving the host in plaintext
+    if is_unix_address(address):
+        return grpc.local_channel_credentials(grpc.LocalConnectionType.UDS)
     return grpc.ssl_channel_credentials(root_certificates=load_pem_bytes(path))
 
 
-def grpc_channel_options(verify_tls: bool, tls_certfile: Optional[str]) -> list[tuple[str, str]]:
-    if verify_tls:
+def grpc_channel_options(verify_tls: bool, tls_certfile: Optional[str], address: str = "") -> list[tuple[str, str]]:
+    if verify_tls or is_unix_address(address):
         return []
 
     override = grpc_target_name_override(tls_certfile)
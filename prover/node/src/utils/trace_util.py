@@ -0,0 +1,373 @@
+import contextvars
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import grpc
+import ujson
+
+from utils.profile_util import HandlerTimings
+
+TRACEPARENT_HEADER = "traceparent"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_STATUS_ERROR = 2
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """The context of a W3C `traceparent` header, None when it is missing or malformed."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff" or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        if int(parts[1], 16) == 0 or int(parts[2], 16) == 0:
+            return None
+    except ValueError:
+        return None
+    return SpanContext(parts[1].lower(), parts[2].lower(), bool(flags & 1))
+
+
+class Span:
+    __slots__ = ("name", "context", "parent_id", "kind", "start_ns", "end_ns", "attributes", "links", "error")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.links: List[SpanContext] = []
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def add_link(self, context: SpanContext) -> None:
+        self.links.append(context)
+
+    def record_error(self, message: str) -> None:
+        self.error = message
+
+
+# Span of the work being done, None outside of any traced request
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _attribute_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": span.context.trace_id,
+        "spanId": span.context.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _attributes(span.attributes),
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    if span.links:
+        data["links"] = [{"traceId": link.trace_id, "spanId": link.span_id} for link in span.links]
+    if span.error is not None:
+        data["status"] = {"code": _STATUS_ERROR, "message": span.error}
+    return data
+
+
+class FileSpanExporter:
+    """Append batches as OTLP/JSON lines, the format of the collector's `otlpjsonfile` receiver."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        with open(self.path, "a") as file:
+            file.write(ujson.dumps(payload) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """Post batches to an OTLP/HTTP endpoint in its JSON encoding, e.g. http://otel-collector:4318."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        request = urllib.request.Request(
+            self.url, data=ujson.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer:
+    """
+    Span recorder of the node.
+
+    A trace continues the `traceparent` of the caller, sampled or not as the
+    caller decided; new traces are sampled with `sample_ratio`. Ended spans of
+    sampled traces are queued and exported in batches by a background thread,
+    so exporting never blocks the event loop. Unsampled spans only carry the
+    context on to the provers and the hub.
+    """
+    _instance = None
+    _locker = threading.Lock()
+    _BATCH_SIZE = 256
+    _FLUSH_INTERVAL = 2.0
+    _REMEMBERED = 10000
+
+    def __new__(cls, *args, **kwargs):
+        with cls._locker:
+            if cls._instance is None:
+                cls._instance = super(Tracer, cls).__new__(cls)
+                cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, service_name: str = "zkp-node", sample_ratio: float = 0.0, file_path: str = "", otlp_endpoint: str = "", max_queue_size: int = 10000):
+        if self._initialized == True:
+            return
+
+        self.service_name = service_name
+        self.sample_ratio = sample_ratio
+        self.exporter = None
+        if otlp_endpoint:
+            self.exporter = OtlpHttpSpanExporter(otlp_endpoint)
+        elif file_path:
+            self.exporter = FileSpanExporter(file_path)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._remembered: "OrderedDict[str, SpanContext]" = OrderedDict()
+        self.stats = {"exported": 0, "dropped": 0, "export_failures": 0}
+        if self.exporter is not None:
+            threading.Thread(target=self._export_loop, daemon=True).start()
+        self._initialized = True
+
+    def _sampled(self) -> bool:
+        return self.exporter is not None and random.random() < self.sample_ratio
+
+    @contextmanager
+    def start_span(self, name: str, parent: Optional[SpanContext] = None, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        """Record the block as a child of `parent`, or of the current span, or as a new trace."""
+        if parent is None:
+            current = _current.get()
+            parent = current.context if current is not None else None
+        if parent is not None:
+            context = SpanContext(parent.trace_id, f"{random.getrandbits(64):016x}", parent.sampled)
+        else:
+            context = SpanContext(f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}", self._sampled())
+        span = Span(name, context, parent.span_id if parent is not None else None, kind, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(repr(e))
+            raise
+        finally:
+            try:
+                _current.reset(token)
+            except ValueError:
+                # A streaming handler closed from another context
+                pass
+            span.end_ns = time.time_ns()
+            if context.sampled and self.exporter is not None:
+                try:
+                    self._queue.put_nowait(span)
+                except queue.Full:
+                    self.stats["dropped"] += 1
+
+    def remember(self, key: str) -> None:
+        """Keep the current context under `key`, for a later request of the same proof to link to."""
+        current = _current.get()
+        if current is None:
+            return
+        self._remembered[key] = current.context
+        if len(self._remembered) > self._REMEMBERED:
+            self._remembered.popitem(last=False)
+
+    def link(self, key: str) -> None:
+        """Link the current span to the context remembered under `key`, if any."""
+        current = _current.get()
+        if current is None:
+            return
+        current.set_attribute("proof_hash", key)
+        remembered = self._remembered.pop(key, None)
+        if remembered is not None and remembered.trace_id != current.context.trace_id:
+            current.add_link(remembered)
+
+    def _batch(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": self.service_name, "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "zkp-node"}, "spans": [_otlp_span(span) for span in spans]}],
+        }]}
+
+    def _export_loop(self) -> None:
+        while True:
+            spans = []
+            deadline = time.monotonic() + self._FLUSH_INTERVAL
+            while len(spans) < self._BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    spans.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if not spans:
+                continue
+            try:
+                self.exporter.export(self._batch(spans))
+                self.stats["exported"] += len(spans)
+            except Exception as e:
+                self.stats["export_failures"] += 1
+                logging.error(f"[Tracer] - Failed to export {len(spans)} spans: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "queue_size": self._queue.qsize(), "sample_ratio": self.sample_ratio}
+
+
+def start_span(name: str, parent: Optional[SpanContext] = None, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    return Tracer().start_span(name, parent, kind, **attributes)
+
+
+def current_traceparent() -> Optional[str]:
+    current = _current.get()
+    return current.context.traceparent if current is not None else None
+
+
+def trace_headers() -> Dict[str, str]:
+    """Headers carrying the current trace to an HTTP call."""
+    traceparent = current_traceparent()
+    return {TRACEPARENT_HEADER: traceparent} if traceparent else {}
+
+
+def trace_metadata() -> Optional[List[tuple]]:
+    """Metadata carrying the current trace to a gRPC call."""
+    traceparent = current_traceparent()
+    return [(TRACEPARENT_HEADER, traceparent)] if traceparent else None
+
+
+def _record_handler(name: str, span: Span) -> None:
+    HandlerTimings().record(name, (span.end_ns - span.start_ns) / 1e9)
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware recording a server span per HTTP request, child of its
+    `traceparent` header, and the handler latency for the admin top-N.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+
+        with start_span(f"{scope['method']} {scope['path']}", parent, SPAN_KIND_SERVER, **{"http.method": scope["method"], "http.target": scope["path"]}) as span:
+            async def traced_send(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.record_error(f"HTTP {message['status']}")
+                await send(message)
+
+            await self.app(scope, receive, traced_send)
+        # The route template, paths nothing matched would fill the table with scanner noise
+        route = scope.get("route")
+        _record_handler(f"{scope['method']} {getattr(route, 'path', '<unmatched>')}", span)
+
+
+class TraceInterceptor(grpc.aio.ServerInterceptor):
+    """
+    gRPC server interceptor recording a server span per call, child of its
+    `traceparent` metadata, and the handler latency for the admin top-N.
+    """
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return handler
+
+        method = handler_call_details.method
+        parent = None
+        for key, value in handler_call_details.invocation_metadata or ():
+            if key == TRACEPARENT_HEADER:
+                parent = parse_traceparent(value)
+                break
+
+        if handler.unary_unary is not None:
+            behavior = handler.unary_unary
+
+            async def unary_unary(request, context):
+                try:
+                    with start_span(method, parent, SPAN_KIND_SERVER, **{"rpc.method": method}) as span:
+                        return await behavior(request, context)
+                finally:
+                    _record_handler(method, span)
+
+            return grpc.unary_unary_rpc_method_handler(unary_unary, handler.request_deserializer, handler.response_serializer)
+
+        if handler.unary_stream is not None:
+            behavior = handler.unary_stream
+
+            async def unary_stream(request, context):
+                try:
+                    with start_span(method, parent, SPAN_KIND_SERVER, **{"rpc.method": method}) as span:
+                        async for response in behavior(request, context):
+                            yield response
+                finally:
+                    _record_handler(method, span)
+
+            return grpc.unary_stream_rpc_method_handler(unary_stream, handler.request_deserializer, handler.response_serializer)
+
+        return handler
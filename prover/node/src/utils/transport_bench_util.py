@@ -0,0 +1,126 @@
+import datetime
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+import grpc
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from modules.prover.pool import ChannelPool
+
+_ECHO_METHOD = "/bench.Echo/Echo"
+
+DEFAULT_PAYLOAD_SIZES = [1024, 64 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+
+
+def _self_signed_cert(directory: str):
+    """A localhost certificate and key, like the ones the provers are started with."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    certfile = os.path.join(directory, "bench.crt")
+    with open(certfile, "wb") as file:
+        file.write(cert_pem)
+    return certfile, cert_pem, key_pem
+
+
+async def _echo(request: bytes, context) -> bytes:
+    return request
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+async def _measure(pool: ChannelPool, size: int, iterations: int) -> Dict[str, float]:
+    payload = os.urandom(size)
+    async with pool.stream() as (_, echo):
+        await echo(payload)
+    samples = []
+    for _ in range(iterations):
+        async with pool.stream() as (_, echo):
+            start = time.perf_counter()
+            await echo(payload)
+            samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": _percentile(samples, 0.5),
+        "p99_ms": _percentile(samples, 0.99),
+        "mean_ms": statistics.fmean(samples),
+    }
+
+
+async def run_transport_bench(payload_sizes: List[int] = None, iterations: int = 200) -> Dict[str, Dict[int, Dict[str, float]]]:
+    """
+    Compare the round trip of the node to a co-located prover over TLS TCP
+    and over a Unix socket with local credentials.
+
+    A bytes echo server stands in for the prover, listening on both
+    transports, and the node's own ChannelPool connects to it, so the numbers
+    include everything but the proving itself.
+    """
+    payload_sizes = payload_sizes or DEFAULT_PAYLOAD_SIZES
+    max_length = 2 * max(payload_sizes) + 1024
+    options = [("grpc.max_send_message_length", max_length), ("grpc.max_receive_message_length", max_length)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, cert_pem, key_pem = _self_signed_cert(directory)
+        socket_path = os.path.join(directory, "bench.sock")
+
+        server = grpc.aio.server(options=options)
+        server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler("bench.Echo", {
+            "Echo": grpc.unary_unary_rpc_method_handler(_echo),
+        }),))
+        port = server.add_secure_port("127.0.0.1:0", grpc.ssl_server_credentials([(key_pem, cert_pem)]))
+        server.add_secure_port(f"unix:{socket_path}", grpc.local_server_credentials(grpc.LocalConnectionType.UDS))
+        await server.start()
+
+        transports = {
+            "tls_tcp": f"127.0.0.1:{port}",
+            "uds_local": f"unix:{socket_path}",
+        }
+        results = {}
+        try:
+            for transport, address in transports.items():
+                pool = ChannelPool(
+                    address,
+                    lambda channel: channel.unary_unary(_ECHO_METHOD),
+                    tls_certfile=certfile,
+                    max_send_message_length=max_length,
+                    max_receive_message_length=max_length,
+                )
+                try:
+                    if not await pool.warmup():
+                        raise RuntimeError(f"Cannot connect to {address}")
+                    results[transport] = {size: await _measure(pool, size, iterations) for size in payload_sizes}
+                finally:
+                    await pool.close()
+        finally:
+            await server.stop(None)
+
+    for size in payload_sizes:
+        tls, uds = results["tls_tcp"][size], results["uds_local"][size]
+        logging.info(
+            f"[TransportBench] - {size} bytes: tls_tcp p50 {tls['p50_ms']:.3f}ms p99 {tls['p99_ms']:.3f}ms, "
+            f"uds_local p50 {uds['p50_ms']:.3f}ms p99 {uds['p99_ms']:.3f}ms"
+        )
+    return results
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from modules.admission import AdmissionController, AdmissionRejected
+from utils.constant import STATUS_CODE_PROVER_NOT_RESPONSE, STATUS_CODE_SUCCESSFULLY
+
+
+def _controller(**kwargs):
+    return AdmissionController(lambda key: 1.0, **kwargs)
+
+
+def test_grants_up_to_the_limit_then_queues():
+    async def scenario():
+        admission = _controller(initial_limit=2, max_queue_wait=1.0)
+        first = await admission.acquire("a")
+        await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("a"))
+        await asyncio.sleep(0)
+        assert admission.in_flight == 2
+        assert admission.queue_size == 1
+
+        admission.release(first)
+        await asyncio.wait_for(waiter, 1)
+        assert admission.in_flight == 2
+        assert admission.queue_size == 0
+        assert admission.stats["queued"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_with_a_retry_hint():
+    async def scenario():
+        admission = _controller(initial_limit=1, max_queue_size=1, max_queue_wait=1.0)
+        await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("a")
+        assert rejected.value.retry_after >= 1
+        assert admission.stats["rejected_queue_full"] == 1
+        waiter.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_queue_wait_timeout_rejects():
+    async def scenario():
+        admission = _controller(initial_limit=1, max_queue_wait=0.05)
+        await admission.acquire("a")
+        with pytest.raises(AdmissionRejected):
+            await admission.acquire("a")
+        assert admission.queue_size == 0
+        assert admission.stats["rejected_timeout"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        admission = _controller(initial_limit=1, max_queue_wait=1.0)
+        ticket = await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("a"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission.queue_size == 0
+
+        admission.release(ticket)
+        assert admission.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_fair_queue_alternates_between_keys():
+    async def scenario():
+        admission = _controller(initial_limit=1, max_queue_wait=1.0)
+        ticket = await admission.acquire("busy")
+        order = []
+
+        async def wait(key):
+            granted = await admission.acquire(key)
+            order.append(key)
+            admission.release(granted)
+
+        # The busy key queues first, the quiet one still gets the second slot
+        waiters = [asyncio.create_task(wait("busy")) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiters.append(asyncio.create_task(wait("quiet")))
+        await asyncio.sleep(0)
+        admission.release(ticket)
+        await asyncio.gather(*waiters)
+        assert order.index("quiet") <= 1
+
+    asyncio.run(scenario())
+
+
+def test_limit_follows_latency_and_prover_failures():
+    async def scenario():
+        admission = _controller(initial_limit=2, max_limit=4)
+        tickets = [await admission.acquire("a") for _ in range(2)]
+        for ticket in tickets:
+            ticket.record(STATUS_CODE_SUCCESSFULLY)
+            admission.release(ticket)
+        assert admission.limit > 2
+
+        limit = admission.limit
+        ticket = await admission.acquire("a")
+        ticket.record(STATUS_CODE_PROVER_NOT_RESPONSE)
+        admission.release(ticket)
+        assert admission.limit < limit
+        assert admission.stats["limit_decrease"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_foreign_backlog_shrinks_the_limit():
+    admission = _controller(initial_limit=10, min_limit=2)
+    admission.observe_backlog(3)
+    assert admission.limit == 10
+    admission.observe_backlog(100)
+    assert admission.limit == 9
@@ -0,0 +1,33 @@
+from application.grpc_server.v2 import prove_service_v2_pb2
+from utils.capture_util import message_shape, shape_of, synthesize
+
+
+def test_shape_keeps_no_value():
+    shape = shape_of({"proof_hash": "secret-hash", "length": 7, "ok": True, "payload": b"\x01" * 5, "fields": ["x", "y", "z"], "none": None})
+    assert shape == {
+        "proof_hash": "str:16",
+        "length": "int",
+        "ok": "bool",
+        "payload": "bytes:8",
+        "fields": {"list": "str:1", "len": 4},
+        "none": "null",
+    }
+    assert "secret" not in str(shape)
+
+
+def test_synthesized_values_have_the_captured_shape():
+    for body in (
+        {"proof_hash": "abc", "items": [{"payload": "p" * 100, "length": 3}], "rate": 0.5},
+        {"empty": [], "nested": {"deep": {"deeper": b"raw"}}},
+    ):
+        shape = shape_of(body)
+        assert shape_of(synthesize(shape)) == shape
+
+
+def test_message_shape_covers_set_fields_only():
+    request = prove_service_v2_pb2.ProveBatchRequest(prover="circom", fields=["a"])
+    request.items.add(proof_hash="h1", payload="payload")
+    shape = message_shape(request)
+    assert set(shape) == {"prover", "fields", "items"}
+    assert shape["items"] == {"list": {"proof_hash": "str:2", "payload": "str:8"}, "len": 1}
+    assert shape_of(synthesize(shape)) == shape
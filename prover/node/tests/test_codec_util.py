@@ -0,0 +1,131 @@
+import asyncio
+import base64
+
+import msgpack
+import ujson
+
+from application.grpc_server.v2 import prove_service_v2_pb2
+from utils.codec_util import (
+    MEDIA_TYPE_JSON,
+    MEDIA_TYPE_JSON_BASE64,
+    MEDIA_TYPE_MSGPACK,
+    MEDIA_TYPE_PROTOBUF,
+    ContentNegotiationMiddleware,
+    dict_to_message,
+    encode,
+    encode_stream_item,
+    message_to_dict,
+    negotiate,
+)
+
+RESPONSE = {
+    "code": 0,
+    "msg": "Successfully",
+    "proof": "proof",
+    "proof_solidity": "",
+    "proof_bytes": b"\x00\xffproof",
+    "public_witness": "witness",
+    "public_witness_bytes": b"\x01\x02",
+}
+
+
+def _read_varint(data, offset):
+    value, shift = 0, 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def test_negotiate_picks_the_best_supported_type():
+    assert negotiate(None) == MEDIA_TYPE_JSON
+    assert negotiate("text/html") == MEDIA_TYPE_JSON
+    assert negotiate("application/x-msgpack") == MEDIA_TYPE_MSGPACK
+    assert negotiate("application/json;q=0.5, application/x-protobuf;q=0.9") == MEDIA_TYPE_PROTOBUF
+
+
+def test_message_round_trip():
+    batch = prove_service_v2_pb2.ProveBatchRequest(prover="circom", circuit_template_id="10005", fields=["a", "b"])
+    batch.items.add(proof_hash="h1", payload="p1")
+    batch.items.add(proof_hash="h2", payload="p2")
+    data = message_to_dict(batch)
+    assert [item["proof_hash"] for item in data["items"]] == ["h1", "h2"]
+    assert dict_to_message(prove_service_v2_pb2.ProveBatchRequest, data) == batch
+
+
+def test_encode_round_trips():
+    assert msgpack.unpackb(encode(RESPONSE, MEDIA_TYPE_MSGPACK), raw=False) == RESPONSE
+
+    message = prove_service_v2_pb2.GenerateProofResponse.FromString(encode(RESPONSE, MEDIA_TYPE_PROTOBUF, prove_service_v2_pb2.GenerateProofResponse))
+    assert message_to_dict(message) == RESPONSE
+
+    decoded = ujson.loads(encode(RESPONSE, MEDIA_TYPE_JSON_BASE64))
+    assert base64.b64decode(decoded["proof_bytes"]) == RESPONSE["proof_bytes"]
+    assert decoded["msg"] == RESPONSE["msg"]
+
+
+def test_stream_items_are_delimited():
+    items = [{**RESPONSE, "code": index} for index in range(3)]
+
+    stream = b"".join(encode_stream_item(item, MEDIA_TYPE_PROTOBUF, prove_service_v2_pb2.GenerateProofResponse) for item in items)
+    offset, codes = 0, []
+    while offset < len(stream):
+        length, offset = _read_varint(stream, offset)
+        codes.append(prove_service_v2_pb2.GenerateProofResponse.FromString(stream[offset:offset + length]).code)
+        offset += length
+    assert codes == [0, 1, 2]
+
+    unpacker = msgpack.Unpacker(raw=False)
+    unpacker.feed(b"".join(encode_stream_item(item, MEDIA_TYPE_MSGPACK) for item in items))
+    assert [item["code"] for item in unpacker] == [0, 1, 2]
+
+    lines = b"".join(encode_stream_item(item, MEDIA_TYPE_JSON_BASE64) for item in items).splitlines()
+    assert [ujson.loads(line)["code"] for line in lines] == [0, 1, 2]
+
+
+def _send_through_middleware(content_type, body, path="/api/v2/jobs"):
+    seen = {}
+    sent = []
+
+    async def app(scope, receive, send):
+        seen["headers"] = dict(scope["headers"])
+        seen["body"] = (await receive())["body"]
+
+    async def scenario():
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = ContentNegotiationMiddleware(app, {"/api/v2/jobs": lambda data: message_to_dict(prove_service_v2_pb2.SubmitProofRequest.FromString(data))})
+        scope = {"type": "http", "path": path, "headers": [(b"content-type", content_type.encode())]}
+        await middleware(scope, receive, send)
+
+    asyncio.run(scenario())
+    return seen, sent
+
+
+def test_middleware_hands_binary_bodies_to_the_routes_as_json():
+    seen, _ = _send_through_middleware(MEDIA_TYPE_MSGPACK, msgpack.packb({"proof_hash": "h1"}))
+    assert ujson.loads(seen["body"]) == {"proof_hash": "h1"}
+    assert seen["headers"][b"content-type"] == MEDIA_TYPE_JSON.encode()
+
+    request = prove_service_v2_pb2.SubmitProofRequest(callback_url="https://hooks.example.com")
+    request.request.proof_hash = "h2"
+    seen, _ = _send_through_middleware(MEDIA_TYPE_PROTOBUF, request.SerializeToString())
+    body = ujson.loads(seen["body"])
+    assert body["request"]["proof_hash"] == "h2"
+    assert body["callback_url"] == "https://hooks.example.com"
+
+
+def test_middleware_rejects_undecodable_bodies():
+    _, sent = _send_through_middleware(MEDIA_TYPE_MSGPACK, b"\xc1")
+    assert sent[0]["status"] == 400
+    _, sent = _send_through_middleware(MEDIA_TYPE_PROTOBUF, b"", path="/api/v2/prove/stream")
+    assert sent[0]["status"] == 415
@@ -0,0 +1,107 @@
+import asyncio
+
+from aiohttp import web
+
+from config import NodeConfig
+from modules.encryptor import RSAEncryption
+from modules.hub import Hub
+
+MIN_INTERVAL = 0.02
+MAX_INTERVAL = 0.16
+
+
+class HeartbeatConfig(NodeConfig):
+    class Env(NodeConfig.Env):
+        proxy = None
+        node_register_token = "token"
+
+
+class FakeLoad:
+    """Queue depth given per sample by `depth(index)`."""
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.samples = 0
+
+    async def snapshot(self):
+        depth = self.depth(self.samples)
+        self.samples += 1
+        return {"running_tasks": {}, "queue_depth": depth}
+
+
+async def _hub_server(heartbeats, load, status):
+    async def node(request):
+        heartbeats.append((load.samples - 1, request.headers.get("X-Node-Token"), await request.json()))
+        return web.Response(status=status[0])
+
+    app = web.Application()
+    app.router.add_post("/api/v1/hub/node", node)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+def _keys(tmp_path):
+    encryption = RSAEncryption()
+    encryption.generate_keys(2048)
+    encryption.serialize_keys()
+    public_key_path = tmp_path / "public_key"
+    public_key_path.write_text(encryption.public_key_pem)
+    return str(public_key_path), RSAEncryption(private_key=encryption.private_key_pem)
+
+
+def _heartbeats(tmp_path, load, samples, status=200):
+    public_key_path, decryption = _keys(tmp_path)
+
+    async def run():
+        heartbeats = []
+        runner, port = await _hub_server(heartbeats, load, [status])
+        hub = Hub(f"http://127.0.0.1:{port}", public_key_path, HeartbeatConfig)
+        task = asyncio.create_task(hub.send_heartbeat(load, MIN_INTERVAL, MAX_INTERVAL))
+        try:
+            async with asyncio.timeout(30):
+                while load.samples < samples:
+                    await asyncio.sleep(MIN_INTERVAL)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await hub.close()
+            await runner.cleanup()
+        return heartbeats
+
+    return asyncio.run(run()), decryption
+
+
+def test_stable_load_backs_off_and_a_change_is_sent_right_away(tmp_path):
+    load = FakeLoad(lambda index: 0 if index < 40 else 10)
+    heartbeats, decryption = _heartbeats(tmp_path, load, 45)
+
+    index, token, body = heartbeats[0]
+    assert index == 0
+    assert token == "token"
+    assert decryption.decrypt(body["grpc_info"]) == HeartbeatConfig.Hub.Info.grpc
+    assert decryption.decrypt(body["http_info"]) == HeartbeatConfig.Hub.Info.http
+
+    # While the load is stable the interval doubles, far fewer heartbeats than samples
+    stable = [index for index, _, _ in heartbeats if index < 40]
+    assert len(stable) < 15
+    gaps = [later - earlier for earlier, later in zip(stable, stable[1:])]
+    assert gaps[-1] > gaps[0]
+
+    # The sample where the load moved is sent without waiting for the interval
+    changed = [(index, body) for index, _, body in heartbeats if index >= 40]
+    assert changed[0][0] == 40
+    assert changed[0][1]["load"]["queue_depth"] == 10
+
+
+def test_unreachable_hub_backs_off_despite_load_changes(tmp_path):
+    load = FakeLoad(lambda index: index * 10)
+    heartbeats, _ = _heartbeats(tmp_path, load, 40, status=503)
+
+    indexes = [index for index, _, _ in heartbeats]
+    assert indexes[0] == 0
+    assert len(indexes) < 15
+    gaps = [later - earlier for earlier, later in zip(indexes, indexes[1:])]
+    assert gaps[-1] > gaps[0]
@@ -0,0 +1,44 @@
+import asyncio
+
+from modules.node_load import NodeLoad, SharedLoadStore
+
+
+def test_snapshot_adds_the_load_of_the_other_workers(tmp_path):
+    async def scenario():
+        store_path = str(tmp_path / "claims.db")
+        other = NodeLoad({}, ["10005"], store=SharedLoadStore(store_path))
+        other.store.owner = -1
+        other.in_flight = 4
+        for latency in (1.0, 2.0, 3.0):
+            other.latency.observe(latency)
+        other.store.publish(other.queue_depth(), other.latency.samples(), 15)
+
+        leader = NodeLoad({}, ["10005"], store=SharedLoadStore(store_path))
+        leader.in_flight = 1
+        leader.latency.observe(0.5)
+        publishing = asyncio.create_task(leader.run(5))
+        await asyncio.sleep(0)
+        snapshot = await leader.snapshot()
+        publishing.cancel()
+        assert snapshot["queue_depth"] == 5
+        assert snapshot["latency_p50_ms"] == 2000.0
+        assert snapshot["latency_p95_ms"] == 3000.0
+
+    asyncio.run(scenario())
+
+
+def test_silent_workers_drop_out(tmp_path):
+    store_path = str(tmp_path / "claims.db")
+    other = SharedLoadStore(store_path)
+    other.owner = -1
+    other.publish(7, [], 15)
+    assert SharedLoadStore(store_path).others(15) == (7, [])
+    assert SharedLoadStore(store_path).others(0) == (0, [])
+
+
+def test_unconfigured_provers_and_circuits_are_labelled_other():
+    load = NodeLoad({"circom": None}, ["10005"])
+    load.end(load.begin(), True, "circom", "10005")
+    load.end(load.begin(), False, "made-up", "made-up")
+    load.end(load.begin(), False, "other-made-up", "other-made-up")
+    assert sorted(label for label, *_ in load.prove_latency.series()) == [("circom", "10005", "success"), ("other", "other", "failure")]
@@ -0,0 +1,114 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import grpc
+import pytest
+
+from modules.prover.policy import RetryBudget, RpcPolicy
+from utils.deadline_util import deadline_scope
+
+
+def _error(code):
+    return grpc.aio.AioRpcError(code, grpc.aio.Metadata(), grpc.aio.Metadata(), code.name)
+
+
+@asynccontextmanager
+async def _stub():
+    yield None, None
+
+
+def _call(policy, outcomes, deadline=None, **kwargs):
+    """Run policy.call against a stub answering `outcomes` in turn, return the result and the timeouts of the attempts made."""
+    attempts = []
+
+    async def rpc(request, timeout=None, metadata=None):
+        attempts.append(timeout)
+        outcome = outcomes[len(attempts) - 1]
+        if isinstance(outcome, grpc.StatusCode):
+            raise _error(outcome)
+        return outcome
+
+    async def scenario():
+        with deadline_scope(deadline):
+            return await policy.call(_stub, lambda stub: rpc, "request", **kwargs)
+
+    return asyncio.run(scenario()), attempts
+
+
+def test_retry_budget_allows_a_ratio_of_the_calls():
+    budget = RetryBudget(ratio=0.5, min_tokens=0, max_tokens=10)
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    assert budget.exhausted == 2
+
+
+def test_retry_budget_refills_up_to_its_floor(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("modules.prover.policy.time.monotonic", lambda: now[0])
+    budget = RetryBudget(ratio=0.1, min_tokens=2, max_tokens=10, refill_period=10)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+
+    now[0] += 5
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+    now[0] += 60
+    budget.deposit()
+    assert budget.tokens == pytest.approx(2.1)
+
+
+def test_unavailable_is_retried():
+    policy = RpcPolicy(base_backoff_ms=1)
+    result, attempts = _call(policy, [grpc.StatusCode.UNAVAILABLE, "ok"], circuit="10005")
+    assert result == "ok"
+    assert len(attempts) == 2
+    assert policy.stats["retries"] == 1
+
+
+def test_deadline_exceeded_is_retried_for_idempotent_calls_only():
+    policy = RpcPolicy(base_backoff_ms=1)
+    with pytest.raises(grpc.aio.AioRpcError):
+        _call(policy, [grpc.StatusCode.DEADLINE_EXCEEDED, "ok"])
+    result, attempts = _call(policy, [grpc.StatusCode.DEADLINE_EXCEEDED, "ok"], idempotent=True)
+    assert result == "ok"
+    assert policy.stats["deadline_exceeded"] == 2
+
+
+def test_attempts_are_bounded_by_the_request_deadline():
+    policy = RpcPolicy(default_timeout=30)
+    _, attempts = _call(policy, ["ok"], deadline=2)
+    assert attempts[0] <= 2
+
+    with pytest.raises(grpc.aio.AioRpcError) as error:
+        _call(policy, ["ok"], deadline=0)
+    assert error.value.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+
+
+def test_retries_stop_when_the_budget_is_spent():
+    policy = RpcPolicy(base_backoff_ms=1, retry_budget=RetryBudget(ratio=0, min_tokens=0))
+    with pytest.raises(grpc.aio.AioRpcError):
+        _call(policy, [grpc.StatusCode.UNAVAILABLE, "ok"])
+    assert policy.retry_budget.exhausted == 1
+
+
+def test_timeout_is_learned_per_circuit():
+    policy = RpcPolicy(default_timeout=30, min_timeout=1, max_timeout=60, timeout_multiplier=2, min_samples=3, circuits={"10006": {"timeout": 7}})
+    assert policy.timeout("10005") == 30
+    for _ in range(3):
+        policy.observe("10005", 4.0)
+    assert policy.timeout("10005") == 8.0
+    assert policy.timeout("10006") == 7.0
+
+
+def test_unconfigured_circuits_share_the_other_label():
+    policy = RpcPolicy(base_backoff_ms=1, circuit_templates=["10005"])
+    _call(policy, ["ok"], circuit="10005")
+    _call(policy, ["ok"], circuit="made-up-1")
+    _call(policy, ["ok"], circuit="made-up-2")
+    assert policy.label("10005") == "10005"
+    assert policy.label("made-up-1") == "other"
+    assert sorted(policy.metrics()["timeouts"]) == ["10005", "other"]
@@ -0,0 +1,94 @@
+import asyncio
+
+import grpc
+import pytest
+
+from modules.prover.pool import ChannelPool
+
+
+def _pool(address="unix:/nonexistent/prover.sock", **kwargs):
+    # Channels connect lazily, so picking never touches the address
+    return ChannelPool(address, lambda channel: object(), **kwargs)
+
+
+def test_least_loaded_channel_is_picked_and_grown_up_to_max_channels():
+    async def run():
+        pool = _pool(max_channels=2, max_streams_per_channel=2)
+        async with pool.stream() as (first, _):
+            async with pool.stream() as (second, _):
+                # The first channel still has room, no new channel is opened
+                assert second is first
+                assert pool.metrics()["channels"] == 1
+                async with pool.stream() as (third, _):
+                    assert third is not first
+                    async with pool.stream() as (fourth, _):
+                        assert fourth is third
+                        async with pool.stream() as (fifth, _):
+                            # Every channel is full at max_channels, the least-loaded one is shared
+                            assert fifth in (first, third)
+                            metrics = pool.metrics()
+                            assert metrics["channels"] == 2
+                            assert sorted(metrics["in_flight_per_channel"]) == [2, 3]
+                            assert metrics["utilization"] == 5 / 4
+        metrics = pool.metrics()
+        assert metrics["in_flight"] == 0
+        assert metrics["streams"] == 5
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_broken_channel_is_replaced_when_picked():
+    async def run():
+        pool = _pool()
+        async with pool.stream() as (first, _):
+            pass
+        # Nothing listens on the socket, connecting leaves the channel in TRANSIENT_FAILURE
+        state = first.get_state(try_to_connect=True)
+        while state != grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+            await asyncio.wait_for(first.wait_for_state_change(state), 5)
+            state = first.get_state()
+        async with pool.stream() as (second, _):
+            assert second is not first
+        metrics = pool.metrics()
+        assert metrics["channels"] == 1
+        assert metrics["replaced"] == 1
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_closed_pool_refuses_streams():
+    async def run():
+        pool = _pool()
+        async with pool.stream():
+            pass
+        await pool.close()
+        assert pool.metrics()["channels"] == 0
+        with pytest.raises(RuntimeError):
+            async with pool.stream():
+                pass
+
+    asyncio.run(run())
+
+
+def test_warmup_connects_min_channels(tmp_path):
+    async def run():
+        address = f"unix:{tmp_path / 'prover.sock'}"
+        server = grpc.aio.server()
+        server.add_secure_port(address, grpc.local_server_credentials(grpc.LocalConnectionType.UDS))
+        await server.start()
+        try:
+            pool = _pool(address, min_channels=2)
+            assert await pool.warmup(timeout=5) is True
+            assert pool.metrics()["channels"] == 2
+            await pool.close()
+        finally:
+            await server.stop(None)
+
+        # Nothing listens any more
+        pool = _pool(address)
+        assert await pool.warmup(timeout=0.2) is False
+        await pool.close()
+
+    asyncio.run(run())
@@ -0,0 +1,107 @@
+import asyncio
+
+import ujson
+
+from modules.result_reporter import ResultReporter
+
+
+class FakeHub:
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.received = []
+
+    async def send_result(self, project_name, proof_hash, duration, verifiers):
+        if proof_hash in self.reject:
+            return False
+        self.received.append(proof_hash)
+        return True
+
+
+def _report(reporter, *proof_hashes):
+    for proof_hash in proof_hashes:
+        reporter.report("project", proof_hash, 10, ["verifier"])
+
+
+async def _run_until(reporter, condition, timeout=5):
+    task = asyncio.create_task(reporter.run())
+    try:
+        async with asyncio.timeout(timeout):
+            while not condition():
+                await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def test_spooled_reports_survive_a_restart(tmp_path):
+    spool_path = str(tmp_path / "spool" / "results.json")
+    hub = FakeHub(reject={"hash-0", "hash-1", "hash-2"})
+
+    async def first_run():
+        reporter = ResultReporter(hub, spool_path, base_backoff=10)
+        _report(reporter, "hash-0", "hash-1", "hash-2")
+        await _run_until(reporter, lambda: reporter.stats["failed"] == 3)
+
+    asyncio.run(first_run())
+    with open(spool_path) as file:
+        assert [item["proof_hash"] for item in ujson.load(file)] == ["hash-0", "hash-1", "hash-2"]
+
+    hub.reject.clear()
+
+    async def second_run():
+        reporter = ResultReporter(hub, spool_path)
+        assert reporter.queue_size == 3
+        await _run_until(reporter, lambda: reporter.stats["sent"] == 3)
+        return reporter
+
+    reporter = asyncio.run(second_run())
+    assert hub.received == ["hash-0", "hash-1", "hash-2"]
+    assert reporter.queue_size == 0
+    with open(spool_path) as file:
+        assert ujson.load(file) == []
+
+
+def test_failed_reports_are_retried_in_order_then_dropped():
+    hub = FakeHub(reject={"hash-1"})
+
+    async def run():
+        reporter = ResultReporter(hub, batch_size=2, max_attempts=2)
+        _report(reporter, "hash-0", "hash-1", "hash-2")
+        # A partly accepted batch is a success, the failed report goes back to the head
+        assert await reporter._send_batch() is True
+        assert [item["proof_hash"] for item in reporter._queue] == ["hash-1", "hash-2"]
+        assert reporter._queue[0]["attempts"] == 1
+        assert await reporter._send_batch() is True
+        return reporter
+
+    reporter = asyncio.run(run())
+    assert hub.received == ["hash-0", "hash-2"]
+    assert reporter.queue_size == 0
+    assert reporter.stats["failed"] == 2
+    assert reporter.stats["dropped"] == 1
+
+
+def test_full_queue_drops_the_oldest_report():
+    reporter = ResultReporter(FakeHub(), max_queue_size=2)
+    _report(reporter, "hash-0", "hash-1", "hash-2")
+    assert [item["proof_hash"] for item in reporter._queue] == ["hash-1", "hash-2"]
+    assert reporter.stats["dropped"] == 1
+
+
+def test_failed_batches_back_off_exponentially():
+    hub = FakeHub(reject={"hash-0"})
+
+    async def run():
+        reporter = ResultReporter(hub, base_backoff=1, max_backoff=5)
+        _report(reporter, "hash-0")
+        backoffs = []
+        for _ in range(5):
+            assert await reporter._send_batch() is False
+            backoffs.append(reporter._backoff())
+        hub.reject.clear()
+        assert await reporter._send_batch() is True
+        return reporter, backoffs
+
+    reporter, backoffs = asyncio.run(run())
+    assert backoffs == [1, 2, 4, 5, 5]
+    assert reporter.metrics()["consecutive_failures"] == 0
@@ -0,0 +1,175 @@
+import asyncio
+from types import SimpleNamespace
+
+import grpc
+import pytest
+
+from modules.admission import AdmissionController
+from modules.prover.circom import CircomProver
+from modules.prover.circom import circom_prove_pb2 as prove_pb2
+from modules.prover.circom import circom_prove_pb2_grpc as prove_pb2_grpc
+from modules.prover.policy import RpcPolicy
+from modules.prover.router import ProverBackend, ProverRouter
+from utils.constant import STATUS_CODE_DEADLINE_EXCEEDED, STATUS_CODE_PROVER_NOT_RESPONSE, STATUS_CODE_SUCCESSFULLY
+from utils.deadline_util import deadline_scope
+
+
+class FakeProver:
+    def __init__(self, running=0, code=STATUS_CODE_SUCCESSFULLY):
+        self.running = running
+        self.code = code
+
+    async def get_running_prove_tasks(self):
+        return self.code, "", self.running
+
+
+def _backend(address, circuit_templates=None, weight=1.0, **kwargs):
+    return ProverBackend(FakeProver(**kwargs), address, circuit_templates, weight)
+
+
+def _result(code):
+    async def func(prover):
+        return SimpleNamespace(code=code)
+    return func
+
+
+def test_router_needs_a_backend():
+    with pytest.raises(ValueError):
+        ProverRouter("circom", [])
+
+
+def test_affine_backends_serve_their_circuits():
+    shared = _backend("shared")
+    affine = _backend("affine", ["circuit-a"])
+    other = _backend("other", ["circuit-b"])
+    router = ProverRouter("circom", [shared, affine, other])
+
+    assert router.pick("circuit-a") is affine
+    assert router.pick("circuit-b") is other
+    # Circuits without an affine backend only go to backends serving every circuit
+    assert router.pick("circuit-c") is shared
+    assert router.pick(None) in (shared, affine, other)
+
+
+def test_pick_balances_outstanding_per_weight():
+    light = _backend("light")
+    heavy = _backend("heavy", weight=3.0)
+    router = ProverRouter("circom", [light, heavy])
+
+    async def run():
+        async with router.route() as first, router.route() as second, router.route() as third, router.route() as fourth:
+            picked = [first, second, third, fourth]
+        return picked
+
+    picked = asyncio.run(run())
+    assert picked.count(heavy) == 3
+    assert picked.count(light) == 1
+    assert light.outstanding == heavy.outstanding == 0
+    assert light.requests + heavy.requests == 4
+
+
+def test_backend_is_ejected_after_consecutive_failures():
+    failing = _backend("failing")
+    standby = _backend("standby", weight=0.5)
+    router = ProverRouter("circom", [failing, standby], max_failures=2)
+
+    async def run():
+        await router.call(None, _result(STATUS_CODE_PROVER_NOT_RESPONSE))
+        await router.call(None, _result(STATUS_CODE_SUCCESSFULLY))
+        await router.call(None, _result(STATUS_CODE_PROVER_NOT_RESPONSE))
+        assert failing.healthy
+        await router.call(None, _result(STATUS_CODE_PROVER_NOT_RESPONSE))
+
+    asyncio.run(run())
+    assert failing.failures == 2
+    assert not failing.healthy
+    assert router.pick() is standby
+
+
+def test_every_candidate_ejected_still_routes():
+    only = _backend("only")
+    router = ProverRouter("circom", [only], max_failures=1)
+    router.observe(only, STATUS_CODE_PROVER_NOT_RESPONSE)
+    assert not only.healthy
+    assert router.pick() is only
+
+
+def test_probe_readmits_answering_backend():
+    answering = _backend("answering")
+    silent = _backend("silent", code=STATUS_CODE_PROVER_NOT_RESPONSE)
+    router = ProverRouter("circom", [answering, silent], max_failures=1)
+    router.observe(answering, STATUS_CODE_PROVER_NOT_RESPONSE)
+    router.observe(silent, STATUS_CODE_PROVER_NOT_RESPONSE)
+
+    async def run():
+        await router._probe(answering)
+        await router._probe(silent)
+
+    asyncio.run(run())
+    assert answering.healthy and answering.failures == 0
+    assert not silent.healthy
+
+
+def test_running_tasks_are_summed_over_healthy_backends():
+    first = _backend("first", running=2)
+    second = _backend("second", running=3)
+    ejected = _backend("ejected", running=7)
+    router = ProverRouter("circom", [first, second, ejected], max_failures=1)
+    router.observe(ejected, STATUS_CODE_PROVER_NOT_RESPONSE)
+
+    assert asyncio.run(router.get_running_prove_tasks()) == (STATUS_CODE_SUCCESSFULLY, "Successfully", 5)
+
+
+class SlowProveService(prove_pb2_grpc.ProveServiceServicer):
+    async def Prove(self, request, context):
+        await asyncio.sleep(1)
+        return prove_pb2.ProveResponse(code=STATUS_CODE_SUCCESSFULLY, msg="Successfully")
+
+
+def _slow_prove(tmp_path, policy, deadline):
+    """Prove through a router and an admission ticket against a prover answering after a second."""
+    async def run():
+        address = f"unix:{tmp_path / 'prover.sock'}"
+        server = grpc.aio.server()
+        prove_pb2_grpc.add_ProveServiceServicer_to_server(SlowProveService(), server)
+        server.add_secure_port(address, grpc.local_server_credentials(grpc.LocalConnectionType.UDS))
+        await server.start()
+        prover = CircomProver(address, policy=policy)
+        backend = ProverBackend(prover, address)
+        router = ProverRouter("circom", [backend], max_failures=1)
+        admission = AdmissionController(lambda key: 1.0, initial_limit=8)
+        try:
+            ticket = await admission.acquire("key")
+            with deadline_scope(deadline):
+                result = await router.call("circuit", lambda p: p.prove("{}", "circuit"))
+            ticket.record(result.code)
+            admission.release(ticket)
+        finally:
+            await prover.close()
+            CircomProver._instances.pop(address, None)
+            await server.stop(None)
+        return result, backend, admission
+
+    return asyncio.run(run())
+
+
+def test_request_deadline_is_not_a_prover_failure(tmp_path):
+    policy = RpcPolicy(default_timeout=30, max_retries=0)
+    result, backend, admission = _slow_prove(tmp_path, policy, deadline=0.2)
+
+    assert result.code == STATUS_CODE_DEADLINE_EXCEEDED
+    assert backend.failures == 0
+    assert backend.healthy
+    assert admission.limit == 8
+    assert policy.stats["request_deadline_exceeded"] == 1
+
+
+def test_prover_timeout_is_a_prover_failure(tmp_path):
+    policy = RpcPolicy(default_timeout=0.2, max_retries=0)
+    result, backend, admission = _slow_prove(tmp_path, policy, deadline=30)
+
+    assert result.code == STATUS_CODE_PROVER_NOT_RESPONSE
+    assert backend.failures == 1
+    assert not backend.healthy
+    assert admission.limit < 8
+    assert policy.stats["request_deadline_exceeded"] == 0
@@ -0,0 +1,97 @@
+import multiprocessing
+import sqlite3
+import time
+
+import pytest
+
+from modules.admission import AdmissionRejected
+from modules.proof_manager import SharedProofManager
+from utils.constant import STATUS_CODE_TASK_INVALID, STATUS_CODE_TASK_NOT_FOUND, TASK_STATUS_PENGDING
+from utils.leader_util import LeaderLock
+
+HASHES = 200
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    # SharedProofManager is a per-process singleton, each test gets its own store
+    SharedProofManager._instance = None
+    yield str(tmp_path / "claims.db")
+    SharedProofManager._instance = None
+
+
+def _claim_all(store_path, start, results):
+    manager = SharedProofManager(store_path)
+    start.wait()
+    claimed = []
+    for index in range(HASHES):
+        while True:
+            try:
+                ok, _ = manager.claim_task(f"hash-{index}")
+                break
+            except AdmissionRejected:
+                # The other process holds the store past the busy timeout
+                time.sleep(0.001)
+        if ok is True:
+            claimed.append(index)
+    results.put(claimed)
+
+
+def test_each_hash_is_claimed_once_across_processes(store_path):
+    manager = SharedProofManager(store_path)
+    for index in range(HASHES):
+        manager.set(f"hash-{index}", TASK_STATUS_PENGDING, 60)
+
+    context = multiprocessing.get_context("spawn")
+    start, results = context.Event(), context.Queue()
+    workers = [context.Process(target=_claim_all, args=(store_path, start, results)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    claimed = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=10)
+
+    assert sorted(claimed[0] + claimed[1]) == list(range(HASHES))
+    assert manager.claim_task("hash-0") == (STATUS_CODE_TASK_INVALID, "Proof hash is invalid")
+
+
+def test_unknown_expired_and_released_hashes(store_path):
+    manager = SharedProofManager(store_path)
+    assert manager.claim_task("missing")[0] == STATUS_CODE_TASK_NOT_FOUND
+
+    manager.set("expired", TASK_STATUS_PENGDING, -1)
+    assert manager.claim_task("expired")[0] == STATUS_CODE_TASK_NOT_FOUND
+
+    manager.set("released", TASK_STATUS_PENGDING, 60)
+    assert manager.claim_task("released")[0] is True
+    manager.release_task("released")
+    assert manager.claim_task("released")[0] is True
+    assert manager.metrics()["released"] == 1
+
+
+
+def test_a_locked_store_turns_the_claim_away(store_path):
+    manager = SharedProofManager(store_path)
+    manager.set("locked", TASK_STATUS_PENGDING, 60)
+    other = sqlite3.connect(store_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(AdmissionRejected):
+            manager.claim_task("locked")
+    finally:
+        other.execute("COMMIT")
+        other.close()
+    assert manager.claim_task("locked")[0] is True
+    assert manager.metrics()["busy"] == 1
+
+
+def test_one_leader_at_a_time(tmp_path):
+    path = str(tmp_path / "heartbeat.lock")
+    leader, follower = LeaderLock(path), LeaderLock(path)
+    assert leader.try_acquire()
+    assert not follower.try_acquire()
+    leader.release()
+    assert follower.try_acquire()
+    assert follower.is_leader and not leader.is_leader
+    follower.release()